@@ -5,11 +5,16 @@
 
 import argparse
 import faulthandler
+import multiprocessing
 import os
 import sys
 
 from UM.Platform import Platform
 
+# Mesh files are read in worker processes (see UM.Mesh.MeshReadProcessPool). In frozen Windows builds, the worker
+# processes start this same executable, so they have to be redirected before anything else happens.
+multiprocessing.freeze_support()
+
 parser = argparse.ArgumentParser(prog = "cura",
                                  add_help = False)
 parser.add_argument("--debug",
@@ -134,5 +139,6 @@ import Arcus #@UnusedImport
 import Savitar #@UnusedImport
 from cura.CuraApplication import CuraApplication
 
-app = CuraApplication()
-app.run()
+if __name__ == "__main__":
+    app = CuraApplication()
+    app.run()
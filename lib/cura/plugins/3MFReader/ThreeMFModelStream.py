@@ -0,0 +1,261 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import zipfile
+
+import numpy
+
+from UM.Logger import Logger
+
+MYPY = False
+try:
+    if not MYPY:
+        import xml.etree.cElementTree as ET
+except ImportError:
+    Logger.log("w", "Unable to load cElementTree, switching to slower version")
+    import xml.etree.ElementTree as ET
+
+
+##  Numpy array that grows as rows are appended to it.
+#
+#   Values are collected as strings and converted in chunks, so that decoding
+#   never needs more than one chunk of Python objects at a time.
+class _GrowingArray:
+    _chunk_size = 65536
+
+    def __init__(self, columns: int, dtype: type) -> None:
+        self._columns = columns
+        self._dtype = dtype
+        self._data = numpy.empty((self._chunk_size, columns), dtype = dtype)
+        self._count = 0
+        self._pending = []  # type: List[str]
+
+    def append(self, values: Tuple[str, ...]) -> None:
+        self._pending.extend(values)
+        if len(self._pending) >= self._chunk_size * self._columns:
+            self._flush()
+
+    def getArray(self) -> numpy.ndarray:
+        self._flush()
+        return self._data[:self._count]
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        rows = numpy.array(self._pending, dtype = numpy.float64).astype(self._dtype).reshape(-1, self._columns)
+        self._pending = []
+        if self._count + len(rows) > len(self._data):
+            data = numpy.empty((max(len(self._data) * 2, self._count + len(rows)), self._columns), dtype = self._dtype)
+            data[:self._count] = self._data[:self._count]
+            self._data = data
+        self._data[self._count:self._count + len(rows)] = rows
+        self._count += len(rows)
+
+
+##  An object from the resources of a 3MF model.
+class ModelObject:
+    def __init__(self, object_id: str) -> None:
+        self.object_id = object_id
+        self.vertices = None  # type: Optional[numpy.ndarray] # Three vertices per face, like MeshBuilder.setVertices expects.
+        self.components = []  # type: List[Tuple[str, str]] # Object IDs and transformation strings of the components.
+        self.settings = {}  # type: Dict[str, str]
+
+
+##  A node of the scene described by the build items of a 3MF model.
+#
+#   Nodes of the same object share its vertex array.
+class ModelNode:
+    def __init__(self, model_object: ModelObject, transformation: str, children: List["ModelNode"]) -> None:
+        self.vertices = model_object.vertices
+        self.settings = model_object.settings
+        self.transformation = transformation
+        self.children = children
+
+
+##  Stream parser for the 3D/3dmodel.model file of a 3MF archive.
+#
+#   Instead of loading the whole XML document, this decodes the vertices and
+#   triangles of every object straight into numpy arrays while the document is
+#   being read, and throws away the XML elements as soon as they are decoded.
+#   Only the unindexed vertices of the completed objects are kept in memory.
+class ThreeMFModelStream:
+    def __init__(self, stream) -> None:
+        self._stream = stream
+        self._unit = None  # type: Optional[str]
+        self._objects = {}  # type: Dict[str, ModelObject]
+
+    ##  The unit of the model, or None if it wasn't specified.
+    #
+    #   This is known as soon as the first node has been read.
+    def getUnit(self) -> Optional[str]:
+        return self._unit
+
+    ##  Read the model, yielding a node for each build item as soon as it is read.
+    def readNodes(self) -> Iterator[ModelNode]:
+        element_stack = []  # type: List[ET.Element]
+        current_object = None  # type: Optional[ModelObject]
+        vertices = None  # type: Optional[_GrowingArray]
+        triangles = None  # type: Optional[_GrowingArray]
+        in_build = False
+
+        for event, element in ET.iterparse(self._stream, events = ("start", "end")):
+            tag = element.tag.rsplit("}", 1)[-1]  # Ignore namespaces, like libSavitar does.
+            if event == "start":
+                element_stack.append(element)
+                if tag == "model":
+                    self._unit = element.get("unit")
+                elif tag == "object":
+                    current_object = ModelObject(element.get("id"))
+                elif tag == "vertices":
+                    vertices = _GrowingArray(3, numpy.float32)
+                elif tag == "triangles":
+                    triangles = _GrowingArray(3, numpy.int32)
+                elif tag == "build":
+                    in_build = True
+                continue
+
+            element_stack.pop()
+            if tag == "vertex" and vertices is not None:
+                vertices.append((element.get("x"), element.get("y"), element.get("z")))
+            elif tag == "triangle" and triangles is not None:
+                triangles.append((element.get("v1"), element.get("v2"), element.get("v3")))
+            elif tag == "component" and current_object is not None:
+                current_object.components.append((element.get("objectid"), element.get("transform", "")))
+            elif tag == "metadata" and current_object is not None:
+                # Other metadata, like the title or designer, isn't a setting.
+                key = element.get("name", "")
+                if key.startswith("cura:"):
+                    current_object.settings[key[len("cura:"):]] = element.text or ""
+            elif tag == "mesh" and current_object is not None and vertices is not None and triangles is not None:
+                current_object.vertices = vertices.getArray()[triangles.getArray().reshape(-1)]
+                vertices = None
+                triangles = None
+            elif tag == "object" and current_object is not None:
+                self._objects[current_object.object_id] = current_object
+                current_object = None
+            elif tag == "item" and in_build:
+                node = self._createNode(element.get("objectid"), element.get("transform", ""), set())
+                if node is not None:
+                    yield node
+
+            # The element is fully decoded, so detach it to keep the memory use bounded.
+            if element_stack:
+                element_stack[-1].remove(element)
+
+    ##  Create the node (and child nodes) for an object.
+    #
+    #   \param object_id The ID of the object to create a node for.
+    #   \param transformation The transformation string of the node.
+    #   \param visited The objects that are already being created higher up in
+    #   the tree, to guard against circular components.
+    def _createNode(self, object_id: str, transformation: str, visited: set) -> Optional[ModelNode]:
+        model_object = self._objects.get(object_id)
+        if model_object is None or object_id in visited:
+            Logger.log("w", "Build item or component refers to unknown or circular object %s", object_id)
+            return None
+
+        children = []
+        for child_id, child_transformation in model_object.components:
+            child = self._createNode(child_id, child_transformation, visited | {object_id})
+            if child is not None:
+                children.append(child)
+        return ModelNode(model_object, transformation, children)
+
+
+##  Decodes the model of a 3MF file in a background thread.
+#
+#   This allows the meshes of a project to be decoded while its settings are
+#   being loaded. The decoded nodes are collected until a callback is set, and
+#   from then on they are passed to the callback as soon as each of them is
+#   decoded. The callback is called from the decoding thread.
+class BackgroundModelDecoder:
+    def __init__(self, file_name: str) -> None:
+        self._file_name = file_name
+        self._lock = threading.RLock()  # Reentrant, since the callbacks are called while holding it.
+        self._decoded_nodes = []  # type: List[Tuple[ModelNode, Optional[str]]] # Nodes with the unit of the model, until the callback is set.
+        self._node_callback = None  # type: Optional[Callable[[ModelNode, Optional[str]], None]]
+        self._finished_callback = None  # type: Optional[Callable[[], None]]
+        self._is_cancelled = False
+        self._node_count = 0
+        self._decode_time = None  # type: Optional[float]
+        self._finished = threading.Event()
+        self._thread = threading.Thread(target = self._run, name = "3MF model decoder", daemon = True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    ##  Stop decoding. Nodes that are decoded afterwards are dropped.
+    def cancel(self) -> None:
+        with self._lock:
+            self._is_cancelled = True
+            self._decoded_nodes = []
+
+    ##  Take the nodes that were decoded so far, with the unit of the model.
+    def takeDecodedNodes(self) -> List[Tuple[ModelNode, Optional[str]]]:
+        with self._lock:
+            result = self._decoded_nodes
+            self._decoded_nodes = []
+        return result
+
+    ##  Pass the nodes that are decoded from now on to a callback.
+    #
+    #   \param node_callback Called with each node and the unit of the model.
+    #   \param finished_callback Called when decoding is finished. If decoding
+    #   was already finished, this is called right away.
+    def setCallbacks(self, node_callback: Callable[[ModelNode, Optional[str]], None], finished_callback: Callable[[], None]) -> None:
+        # The nodes that were already decoded are passed on while holding the lock, so that the decoder can't pass on
+        # newer nodes or finish in between.
+        with self._lock:
+            for node, unit in self._decoded_nodes:
+                node_callback(node, unit)
+            self._decoded_nodes = []
+            self._node_callback = node_callback
+            self._finished_callback = finished_callback
+            if self._finished.is_set():
+                finished_callback()
+
+    def isFinished(self) -> bool:
+        return self._finished.is_set()
+
+    ##  Wait until all nodes are decoded.
+    #
+    #   \param timeout The maximum time to wait, in seconds.
+    #   \return Whether decoding is finished.
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._finished.wait(timeout)
+
+    ##  The number of nodes that were decoded.
+    def getNodeCount(self) -> int:
+        return self._node_count
+
+    ##  The time that decoding took in seconds, or None if it isn't finished.
+    def getDecodeTime(self) -> Optional[float]:
+        return self._decode_time
+
+    def _run(self) -> None:
+        start_time = time.perf_counter()
+        try:
+            with zipfile.ZipFile(self._file_name, "r") as archive:
+                model_stream = ThreeMFModelStream(archive.open("3D/3dmodel.model"))
+                for node in model_stream.readNodes():
+                    with self._lock:
+                        if self._is_cancelled:
+                            return
+                        self._node_count += 1
+                        node_callback = self._node_callback
+                        if node_callback is None:
+                            self._decoded_nodes.append((node, model_stream.getUnit()))
+                    if node_callback is not None:
+                        node_callback(node, model_stream.getUnit())
+        except Exception:
+            Logger.logException("e", "An exception occurred while decoding the model of %s.", self._file_name)
+        finally:
+            with self._lock:
+                self._decode_time = time.perf_counter() - start_time
+                self._finished.set()
+                finished_callback = self._finished_callback if not self._is_cancelled else None
+            if finished_callback is not None:
+                finished_callback()
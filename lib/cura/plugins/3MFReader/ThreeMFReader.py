@@ -3,12 +3,9 @@
 
 from typing import Optional
 import os.path
+import time
 import zipfile
 
-import numpy
-
-import Savitar
-
 from UM.Application import Application
 from UM.Logger import Logger
 from UM.Math.Matrix import Matrix
@@ -25,15 +22,7 @@ from cura.Scene.SliceableObjectDecorator import SliceableObjectDecorator
 from cura.Scene.ZOffsetDecorator import ZOffsetDecorator
 from cura.Machines.QualityManager import getMachineDefinitionIDForQualitySearch
 
-MYPY = False
-
-
-try:
-    if not MYPY:
-        import xml.etree.cElementTree as ET
-except ImportError:
-    Logger.log("w", "Unable to load cElementTree, switching to slower version")
-    import xml.etree.ElementTree as ET
+from .ThreeMFModelStream import BackgroundModelDecoder, ThreeMFModelStream, ModelNode
 
 
 ##    Base implementation for reading 3MF files. Has no support for textures. Only loads meshes!
@@ -85,9 +74,9 @@ class ThreeMFReader(MeshReader):
 
         return temp_mat
 
-    ##  Convenience function that converts a SceneNode object (as obtained from libSavitar) to a Uranium scene node.
+    ##  Convenience function that converts a ModelNode (as obtained from ThreeMFModelStream) to a Uranium scene node.
     #   \returns Uranium scene node.
-    def _convertSavitarNodeToUMNode(self, savitar_node):
+    def _convertModelNodeToUMNode(self, model_node: ModelNode):
         self._object_count += 1
         node_name = "Object %s" % self._object_count
 
@@ -96,29 +85,24 @@ class ThreeMFReader(MeshReader):
         um_node = CuraSceneNode() # This adds a SettingOverrideDecorator
         um_node.addDecorator(BuildPlateDecorator(active_build_plate))
         um_node.setName(node_name)
-        transformation = self._createMatrixFromTransformationString(savitar_node.getTransformation())
+        transformation = self._createMatrixFromTransformationString(model_node.transformation)
         um_node.setTransformation(transformation)
-        mesh_builder = MeshBuilder()
-
-        data = numpy.fromstring(savitar_node.getMeshData().getFlatVerticesAsBytes(), dtype=numpy.float32)
-
-        vertices = numpy.resize(data, (int(data.size / 3), 3))
-        mesh_builder.setVertices(vertices)
-        mesh_builder.calculateNormals(fast=True)
-        mesh_data = mesh_builder.build()
 
-        if len(mesh_data.getVertices()):
-            um_node.setMeshData(mesh_data)
+        if model_node.vertices is not None and len(model_node.vertices):
+            mesh_builder = MeshBuilder()
+            mesh_builder.setVertices(model_node.vertices)
+            mesh_builder.calculateNormals(fast=True)
+            um_node.setMeshData(mesh_builder.build())
 
-        for child in savitar_node.getChildren():
-            child_node = self._convertSavitarNodeToUMNode(child)
+        for child in model_node.children:
+            child_node = self._convertModelNodeToUMNode(child)
             if child_node:
                 um_node.addChild(child_node)
 
         if um_node.getMeshData() is None and len(um_node.getChildren()) == 0:
             return None
 
-        settings = savitar_node.getSettings()
+        settings = model_node.settings
 
         # Add the setting override decorator, so we can add settings to this node.
         if settings:
@@ -161,6 +145,79 @@ class ThreeMFReader(MeshReader):
             um_node.addDecorator(sliceable_decorator)
         return um_node
 
+    ##  Start decoding the model of a 3MF file in a background thread.
+    #
+    #   The decoded nodes can be converted to scene nodes with
+    #   createSceneNode(). Scene nodes are named in the order they are created.
+    #   \param file_name The 3MF file to decode.
+    #   \return The decoder, which is already started.
+    def startDecoding(self, file_name: str) -> BackgroundModelDecoder:
+        self._object_count = 0
+        self._base_name = os.path.basename(file_name)
+        decoder = BackgroundModelDecoder(file_name)
+        decoder.start()
+        return decoder
+
+    ##  Convert a decoded model node to a scene node and place it on the build
+    #   plate of the active machine.
+    #
+    #   This needs to be called on the main thread.
+    #   \param node The node as decoded from the model.
+    #   \param unit The unit of the model that the node was decoded from.
+    #   \return The scene node, or None if the node has no meshes.
+    def createSceneNode(self, node: ModelNode, unit: Optional[str]) -> Optional[CuraSceneNode]:
+        self._unit = unit
+        um_node = self._convertModelNodeToUMNode(node)
+        if um_node is None:
+            return None
+        # compensate for original center position, if object(s) is/are not around its zero position
+
+        transform_matrix = Matrix()
+        mesh_data = um_node.getMeshData()
+        if mesh_data is not None:
+            extents = mesh_data.getExtents()
+            center_vector = Vector(extents.center.x, extents.center.y, extents.center.z)
+            transform_matrix.setByTranslation(center_vector)
+        transform_matrix.multiply(um_node.getLocalTransformation())
+        um_node.setTransformation(transform_matrix)
+
+        global_container_stack = Application.getInstance().getGlobalContainerStack()
+
+        # Create a transformation Matrix to convert from 3mf worldspace into ours.
+        # First step: flip the y and z axis.
+        transformation_matrix = Matrix()
+        transformation_matrix._data[1, 1] = 0
+        transformation_matrix._data[1, 2] = 1
+        transformation_matrix._data[2, 1] = -1
+        transformation_matrix._data[2, 2] = 0
+
+        # Second step: 3MF defines the left corner of the machine as center, whereas cura uses the center of the
+        # build volume.
+        if global_container_stack:
+            translation_vector = Vector(x = -global_container_stack.getProperty("machine_width", "value") / 2,
+                                        y = -global_container_stack.getProperty("machine_depth", "value") / 2,
+                                        z = 0)
+            translation_matrix = Matrix()
+            translation_matrix.setByTranslation(translation_vector)
+            transformation_matrix.multiply(translation_matrix)
+
+        # Third step: 3MF also defines a unit, whereas Cura always assumes mm.
+        scale_matrix = Matrix()
+        scale_matrix.setByScaleVector(self._getScaleFromUnit(self._unit))
+        transformation_matrix.multiply(scale_matrix)
+
+        # Pre multiply the transformation with the loaded transformation, so the data is handled correctly.
+        um_node.setTransformation(um_node.getLocalTransformation().preMultiply(transformation_matrix))
+
+        # Check if the model is positioned below the build plate and honor that when loading project files.
+        if um_node.getMeshData() is not None:
+            minimum_z_value = um_node.getMeshData().getExtents(um_node.getWorldTransformation()).minimum.y  # y is z in transformation coordinates
+            if minimum_z_value < 0:
+                um_node.addDecorator(ZOffsetDecorator())
+                um_node.callDecoration("setZOffset", minimum_z_value)
+
+        return um_node
+
     def _read(self, file_name):
         result = []
         self._object_count = 0  # Used to name objects as there is no node name yet.
@@ -168,60 +225,15 @@ class ThreeMFReader(MeshReader):
         try:
             archive = zipfile.ZipFile(file_name, "r")
             self._base_name = os.path.basename(file_name)
-            parser = Savitar.ThreeMFParser()
-            scene_3mf = parser.parse(archive.open("3D/3dmodel.model").read())
-            self._unit = scene_3mf.getUnit()
-            for node in scene_3mf.getSceneNodes():
-                um_node = self._convertSavitarNodeToUMNode(node)
-                if um_node is None:
-                    continue
-                # compensate for original center position, if object(s) is/are not around its zero position
-
-                transform_matrix = Matrix()
-                mesh_data = um_node.getMeshData()
-                if mesh_data is not None:
-                    extents = mesh_data.getExtents()
-                    center_vector = Vector(extents.center.x, extents.center.y, extents.center.z)
-                    transform_matrix.setByTranslation(center_vector)
-                transform_matrix.multiply(um_node.getLocalTransformation())
-                um_node.setTransformation(transform_matrix)
-
-                global_container_stack = Application.getInstance().getGlobalContainerStack()
-
-                # Create a transformation Matrix to convert from 3mf worldspace into ours.
-                # First step: flip the y and z axis.
-                transformation_matrix = Matrix()
-                transformation_matrix._data[1, 1] = 0
-                transformation_matrix._data[1, 2] = 1
-                transformation_matrix._data[2, 1] = -1
-                transformation_matrix._data[2, 2] = 0
-
-                # Second step: 3MF defines the left corner of the machine as center, whereas cura uses the center of the
-                # build volume.
-                if global_container_stack:
-                    translation_vector = Vector(x = -global_container_stack.getProperty("machine_width", "value") / 2,
-                                                y = -global_container_stack.getProperty("machine_depth", "value") / 2,
-                                                z = 0)
-                    translation_matrix = Matrix()
-                    translation_matrix.setByTranslation(translation_vector)
-                    transformation_matrix.multiply(translation_matrix)
-
-                # Third step: 3MF also defines a unit, whereas Cura always assumes mm.
-                scale_matrix = Matrix()
-                scale_matrix.setByScaleVector(self._getScaleFromUnit(self._unit))
-                transformation_matrix.multiply(scale_matrix)
-
-                # Pre multiply the transformation with the loaded transformation, so the data is handled correctly.
-                um_node.setTransformation(um_node.getLocalTransformation().preMultiply(transformation_matrix))
-
-                # Check if the model is positioned below the build plate and honor that when loading project files.
-                if um_node.getMeshData() is not None:
-                    minimum_z_value = um_node.getMeshData().getExtents(um_node.getWorldTransformation()).minimum.y  # y is z in transformation coordinates
-                    if minimum_z_value < 0:
-                        um_node.addDecorator(ZOffsetDecorator())
-                        um_node.callDecoration("setZOffset", minimum_z_value)
-
-                result.append(um_node)
+            # Stream the model, so that the XML document is never fully in memory.
+            start_time = time.time()
+            model_stream = ThreeMFModelStream(archive.open("3D/3dmodel.model"))
+            for node in model_stream.readNodes():
+                um_node = self.createSceneNode(node, model_stream.getUnit())
+                if um_node is not None:
+                    result.append(um_node)
+
+            Logger.log("d", "Reading %s nodes from the 3MF model took %0.3f seconds", len(result), time.time() - start_time)
 
         except Exception:
             Logger.logException("e", "An exception occurred in 3mf reader.")
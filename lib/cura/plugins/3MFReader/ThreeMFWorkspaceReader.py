@@ -1,10 +1,12 @@
 # Copyright (c) 2018 Ultimaker B.V.
 # Cura is released under the terms of the LGPLv3 or higher.
 
+import concurrent.futures  # To parse the containers of a project in parallel.
 from configparser import ConfigParser
+import time
 import zipfile
 import os
-from typing import Dict, List, Tuple, cast
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
 
 import xml.etree.ElementTree as ET
 
@@ -19,10 +21,13 @@ from UM.Settings.ContainerFormatError import ContainerFormatError
 from UM.Settings.ContainerStack import ContainerStack
 from UM.Settings.DefinitionContainer import DefinitionContainer
 from UM.Settings.InstanceContainer import InstanceContainer
+from UM.Settings.SettingDefinition import SettingDefinition
+from UM.Settings.SettingFunction import SettingFunction
 from UM.Settings.ContainerRegistry import ContainerRegistry
 from UM.MimeTypeDatabase import MimeTypeDatabase, MimeType
 from UM.Job import Job
 from UM.Preferences import Preferences
+from UM.Scene.SceneNode import SceneNode
 
 from cura.Settings.CuraStackBuilder import CuraStackBuilder
 from cura.Settings.ExtruderStack import ExtruderStack
@@ -31,6 +36,7 @@ from cura.Settings.CuraContainerStack import _ContainerIndexes
 from cura.CuraApplication import CuraApplication
 from cura.Utils.Threading import call_on_qt_thread
 
+from .ThreeMFModelStream import BackgroundModelDecoder, ModelNode
 from .WorkspaceDialog import WorkspaceDialog
 
 i18n_catalog = i18nCatalog("cura")
@@ -68,6 +74,38 @@ class MachineInfo:
         self.extruder_info_dict = {} # type: Dict[str, ExtruderInfo]
 
 
+##  Measures how long the phases of loading a project take.
+#
+#   Starting a phase ends the previous one.
+class LoadingPhaseTimer:
+    def __init__(self) -> None:
+        self._phases = []  # type: List[Tuple[str, float]]
+        self._current_phase = None  # type: Optional[str]
+        self._start_time = 0.0
+
+    def startPhase(self, name: str) -> None:
+        self.endPhase()
+        self._current_phase = name
+        self._start_time = time.perf_counter()
+
+    def endPhase(self) -> None:
+        if self._current_phase is not None:
+            self._phases.append((self._current_phase, time.perf_counter() - self._start_time))
+            self._current_phase = None
+
+    ##  Add a phase that was measured elsewhere.
+    def addPhase(self, name: str, duration: float) -> None:
+        self._phases.append((name, duration))
+
+    ##  The finished phases with their durations in seconds.
+    def getPhases(self) -> List[Tuple[str, float]]:
+        return list(self._phases)
+
+    ##  Summarise the phases, to show in the log.
+    def getReport(self) -> str:
+        return ", ".join("{name}: {duration:.3f}s".format(name = name, duration = duration) for name, duration in self._phases)
+
+
 class ExtruderInfo:
     def __init__(self) -> None:
         self.position = None
@@ -81,6 +119,9 @@ class ExtruderInfo:
 
 ##    Base implementation for reading 3MF workspace files.
 class ThreeMFWorkspaceReader(WorkspaceReader):
+    ##  The minimum number of container files to parse them in parallel.
+    ParallelParseThreshold = 8
+
     def __init__(self) -> None:
         super().__init__()
 
@@ -122,11 +163,22 @@ class ThreeMFWorkspaceReader(WorkspaceReader):
         self._old_new_materials = {} # type: Dict[str, str]
         self._machine_info = None
 
+        self._parse_worker_count = min(os.cpu_count() or 1, 8) # type: int
+        self._material_serialized = {} # type: Dict[str, str] # The material files that preRead read, by file name.
+        self._model_decoder = None # type: Optional[BackgroundModelDecoder]
+        self._phase_timer = LoadingPhaseTimer()
+
     def _clearState(self):
         self._is_same_machine_type = False
         self._id_mapping = {}
         self._old_new_materials = {}
         self._machine_info = None
+        self._material_serialized = {}
+        self._phase_timer = LoadingPhaseTimer()
+
+    ##  How long the phases of loading the last project took, in seconds.
+    def getLoadingPhases(self) -> List[Tuple[str, float]]:
+        return self._phase_timer.getPhases()
 
     ##  Get a unique name based on the old_id. This is different from directly calling the registry in that it caches results.
     #   This has nothing to do with speed, but with getting consistent new naming for instances & objects.
@@ -207,6 +259,7 @@ class ThreeMFWorkspaceReader(WorkspaceReader):
         #
         # Read definition containers
         #
+        self._phase_timer.startPhase("Reading definitions")
         machine_definition_id = None
         machine_definition_container_count = 0
         extruder_definition_container_count = 0
@@ -238,23 +291,33 @@ class ThreeMFWorkspaceReader(WorkspaceReader):
         if machine_definition_container_count != 1:
             return WorkspaceReader.PreReadResult.failed  # Not a workspace file but ordinary 3MF.
 
-        material_labels = []
-        material_conflict = False
+        # Read and parse the material and instance container files at once, since that takes most of the time.
+        self._phase_timer.startPhase("Parsing containers")
         xml_material_profile = self._getXmlProfileClass()
-        reverse_material_id_dict = {}
         if self._material_container_suffix is None:
             self._material_container_suffix = ContainerRegistry.getMimeTypeForContainer(xml_material_profile).preferredSuffix
+        material_container_files = []
         if xml_material_profile:
             material_container_files = [name for name in cura_file_names if name.endswith(self._material_container_suffix)]
-            for material_container_file in material_container_files:
+        instance_container_files = [name for name in cura_file_names if name.endswith(self._instance_container_suffix)]
+        parse_results = self._parseFiles(archive, [(self._parseMaterialFile, file_name) for file_name in material_container_files] +
+                                                  [(self._parseInstanceContainerFile, file_name) for file_name in instance_container_files])
+        material_parse_results = parse_results[:len(material_container_files)]
+        instance_container_infos = parse_results[len(material_container_files):]
+
+        self._phase_timer.startPhase("Checking conflicts")
+        material_labels = []
+        material_conflict = False
+        reverse_material_id_dict = {}
+        if xml_material_profile:
+            for material_container_file, (serialized, metadata_list, label) in zip(material_container_files, material_parse_results):
                 container_id = self._stripFileToId(material_container_file)
+                self._material_serialized[material_container_file] = serialized
 
-                serialized = archive.open(material_container_file).read().decode("utf-8")
-                metadata_list = xml_material_profile.deserializeMetadata(serialized, container_id)
                 reverse_map = {metadata["id"]: container_id for metadata in metadata_list}
                 reverse_material_id_dict.update(reverse_map)
 
-                material_labels.append(self._getMaterialLabelFromSerialized(serialized))
+                material_labels.append(label)
                 if self._container_registry.findContainersMetadata(id = container_id): #This material already exists.
                     containers_found_dict["material"] = True
                     if not self._container_registry.isReadOnly(container_id):  # Only non readonly materials can be in conflict
@@ -262,7 +325,6 @@ class ThreeMFWorkspaceReader(WorkspaceReader):
                 Job.yieldThread()
 
         # Check if any quality_changes instance container is in conflict.
-        instance_container_files = [name for name in cura_file_names if name.endswith(self._instance_container_suffix)]
         quality_name = ""
         custom_quality_name = ""
         num_settings_overriden_by_quality_changes = 0 # How many settings are changed by the quality changes
@@ -273,21 +335,9 @@ class ThreeMFWorkspaceReader(WorkspaceReader):
 
         quality_changes_info_list = []
         instance_container_info_dict = {}  # id -> parser
-        for instance_container_file_name in instance_container_files:
-            container_id = self._stripFileToId(instance_container_file_name)
-
-            serialized = archive.open(instance_container_file_name).read().decode("utf-8")
-
-            # Qualities and variants don't have upgrades, so don't upgrade them
-            parser = ConfigParser(interpolation = None)
-            parser.read_string(serialized)
-            container_type = parser["metadata"]["type"]
-            if container_type not in ("quality", "variant"):
-                serialized = InstanceContainer._updateSerialized(serialized, instance_container_file_name)
-
-            parser = ConfigParser(interpolation = None)
-            parser.read_string(serialized)
-            container_info = ContainerInfo(instance_container_file_name, serialized, parser)
+        for container_info in instance_container_infos:
+            container_id = self._stripFileToId(container_info.file_name)
+            parser = container_info.parser
             instance_container_info_dict[container_id] = container_info
 
             container_type = parser["metadata"]["type"]
@@ -308,16 +358,14 @@ class ThreeMFWorkspaceReader(WorkspaceReader):
                 quality_changes = self._container_registry.findInstanceContainers(id = container_id)
                 if quality_changes:
                     containers_found_dict["quality_changes"] = True
-                    # Check if there really is a conflict by comparing the values
-                    instance_container = InstanceContainer(container_id)
+                    # Check if there really is a conflict by comparing the metadata and the values
                     try:
-                        instance_container.deserialize(serialized, file_name = instance_container_file_name)
-                    except ContainerFormatError:
-                        Logger.logException("e", "Failed to deserialize InstanceContainer %s from project file %s",
-                                            instance_container_file_name, file_name)
+                        if not self._hasSameContents(quality_changes[0], parser):
+                            quality_changes_conflict = True
+                    except (KeyError, ValueError):
+                        Logger.logException("e", "Failed to read InstanceContainer %s from project file %s",
+                                            container_info.file_name, file_name)
                         return ThreeMFWorkspaceReader.PreReadResult.failed
-                    if quality_changes[0] != instance_container:
-                        quality_changes_conflict = True
             elif container_type == "quality":
                 if not quality_name:
                     quality_name = parser["general"]["name"]
@@ -482,6 +530,9 @@ class ThreeMFWorkspaceReader(WorkspaceReader):
                        self._machine_info.definition_id, file_name)
             return WorkspaceReader.PreReadResult.failed
 
+        self._phase_timer.endPhase()
+        Logger.log("d", "Reading the project information of %s took %s", file_name, self._phase_timer.getReport())
+
         # In case we use preRead() to check if a file is a valid project file, we don't want to show a dialog.
         if not show_dialog:
             return WorkspaceReader.PreReadResult.accepted
@@ -554,6 +605,87 @@ class ThreeMFWorkspaceReader(WorkspaceReader):
 
         return WorkspaceReader.PreReadResult.accepted
 
+    ##  Read and parse files from the project archive.
+    #
+    #   If there are many files, they are read and parsed in parallel.
+    #   \param archive The project archive.
+    #   \param parse_tasks The function to parse each file with, and the name
+    #   of the file. The function gets the archive and the file name.
+    #   \return The results of the functions, in the same order as the tasks.
+    def _parseFiles(self, archive: zipfile.ZipFile, parse_tasks: List[Tuple[Callable[[zipfile.ZipFile, str], Any], str]]) -> List[Any]:
+        if self._parse_worker_count <= 1 or len(parse_tasks) < self.ParallelParseThreshold:
+            return [parse_function(archive, file_name) for parse_function, file_name in parse_tasks]
+        with concurrent.futures.ThreadPoolExecutor(max_workers = self._parse_worker_count) as executor:
+            futures = [executor.submit(parse_function, archive, file_name) for parse_function, file_name in parse_tasks]
+            return [future.result() for future in futures]
+
+    ##  Read the metadata and the label of a material file.
+    #
+    #   \return The serialized material, its metadata and its label.
+    def _parseMaterialFile(self, archive: zipfile.ZipFile, file_name: str) -> Tuple[str, List[Dict[str, Any]], str]:
+        serialized = archive.open(file_name).read().decode("utf-8")
+        metadata_list = self._getXmlProfileClass().deserializeMetadata(serialized, self._stripFileToId(file_name))
+        return serialized, metadata_list, self._getMaterialLabelFromSerialized(serialized)
+
+    ##  Read an instance container file, upgraded to the current version.
+    def _parseInstanceContainerFile(self, archive: zipfile.ZipFile, file_name: str) -> ContainerInfo:
+        serialized = archive.open(file_name).read().decode("utf-8")
+
+        # Qualities and variants don't have upgrades, so don't upgrade them
+        parser = ConfigParser(interpolation = None)
+        parser.read_string(serialized)
+        container_type = parser["metadata"]["type"]
+        if container_type not in ("quality", "variant"):
+            serialized = InstanceContainer._updateSerialized(serialized, file_name)
+
+            parser = ConfigParser(interpolation = None)
+            parser.read_string(serialized)
+        return ContainerInfo(file_name, serialized, parser)
+
+    ##  Whether an existing instance container has the same metadata and
+    #   setting values as an instance container in the project.
+    #
+    #   Only the parsed metadata and values of the container in the project are
+    #   compared, so it doesn't need to be deserialized.
+    #   \param existing_container The container in the registry.
+    #   \param parser The parsed container from the project.
+    def _hasSameContents(self, existing_container: InstanceContainer, parser: ConfigParser) -> bool:
+        metadata = dict(parser["metadata"]) if parser.has_section("metadata") else {}
+        metadata["name"] = parser["general"].get("name", existing_container.getId())
+        metadata["version"] = parser["general"]["version"]
+        metadata["definition"] = parser["general"]["definition"]
+        existing_metadata = {key: value for key, value in existing_container.getMetaData().items() if key not in {"id", "container_type"}}
+        if metadata.keys() != existing_metadata.keys():
+            return False
+        for key, value in metadata.items():
+            if str(existing_metadata[key]) != value:
+                return False
+
+        values = parser["values"] if parser.has_section("values") else {}
+        if set(values.keys()) != existing_container.getAllKeys():
+            return False
+        definition = None
+        for key, serialized_value in values.items():
+            existing_value = existing_container.getProperty(key, "value")
+            if str(existing_value) == serialized_value:
+                continue
+            # Compare the values the way the setting instances would.
+            if serialized_value.strip().startswith("="):
+                value = SettingFunction(serialized_value.strip()[1:])  # type: Any
+            else:
+                if definition is None:
+                    definition = existing_container.getDefinition()
+                setting_definitions = definition.findDefinitions(key = key)
+                if not setting_definitions:
+                    return False
+                try:
+                    value = SettingDefinition.settingValueFromString(setting_definitions[0].type, serialized_value)
+                except Exception:
+                    value = serialized_value
+            if value != existing_value:
+                return False
+        return True
+
     ##  Read the project file
     #   Add all the definitions / materials / quality changes that do not exist yet. Then it loads
     #   all the stacks into the container registry. In some cases it will reuse the container for the global stack.
@@ -578,12 +710,21 @@ class ThreeMFWorkspaceReader(WorkspaceReader):
         # because of this, do not expect to have the latest data in the lookup tables in project loading.
         #
         with postponeSignals(*signals, compress = CompressTechnique.NoCompression):
-            return self._read(file_name)
+            try:
+                return self._read(file_name)
+            except:
+                self._cancelModelDecoding()
+                raise
 
     def _read(self, file_name):
         application = CuraApplication.getInstance()
         material_manager = application.getMaterialManager()
 
+        # Decode the meshes while the settings are loaded. The nodes of the previous project are no longer needed.
+        self._cancelModelDecoding()
+        self._model_decoder = self._3mf_mesh_reader.startDecoding(file_name)
+
+        self._phase_timer.startPhase("Preferences")
         archive = zipfile.ZipFile(file_name, "r")
 
         cura_file_names = [name for name in archive.namelist() if name.startswith("Cura/")]
@@ -613,6 +754,7 @@ class ThreeMFWorkspaceReader(WorkspaceReader):
         application.expandedCategoriesChanged.emit()  # Notify the GUI of the change
 
         # If a machine with the same name is of a different type, always create a new one.
+        self._phase_timer.startPhase("Machine")
         if not self._is_same_machine_type or self._resolve_strategies["machine"] != "override":
             # We need to create a new machine
             machine_name = self._container_registry.uniqueName(self._machine_info.name)
@@ -630,6 +772,7 @@ class ThreeMFWorkspaceReader(WorkspaceReader):
             extruder_stack_dict = {stack.getMetaDataEntry("position"): stack for stack in extruder_stacks}
 
         Logger.log("d", "Workspace loading is checking definitions...")
+        self._phase_timer.startPhase("Definitions")
         # Get all the definition files & check if they exist. If not, add them.
         definition_container_files = [name for name in cura_file_names if name.endswith(self._definition_container_suffix)]
         for definition_container_file in definition_container_files:
@@ -650,6 +793,7 @@ class ThreeMFWorkspaceReader(WorkspaceReader):
             Job.yieldThread()
 
         Logger.log("d", "Workspace loading is checking materials...")
+        self._phase_timer.startPhase("Materials")
         # Get all the material files and check if they exist. If not, add them.
         xml_material_profile = self._getXmlProfileClass()
         if self._material_container_suffix is None:
@@ -684,9 +828,11 @@ class ThreeMFWorkspaceReader(WorkspaceReader):
 
                 if to_deserialize_material:
                     material_container = xml_material_profile(container_id)
+                    serialized = self._material_serialized.get(material_container_file)
+                    if serialized is None:
+                        serialized = archive.open(material_container_file).read().decode("utf-8")
                     try:
-                        material_container.deserialize(archive.open(material_container_file).read().decode("utf-8"),
-                                                       file_name = container_id + "." + self._material_container_suffix)
+                        material_container.deserialize(serialized, file_name = container_id + "." + self._material_container_suffix)
                     except ContainerFormatError:
                         Logger.logException("e", "Failed to deserialize material file %s in project file %s",
                                             material_container_file, file_name)
@@ -699,9 +845,11 @@ class ThreeMFWorkspaceReader(WorkspaceReader):
                 Job.yieldThread()
 
         # Handle quality changes if any
+        self._phase_timer.startPhase("Quality changes")
         self._processQualityChanges(global_stack)
 
         # Prepare the machine
+        self._phase_timer.startPhase("Stacks")
         self._applyChangesToMachine(global_stack, extruder_stack_dict)
 
         Logger.log("d", "Workspace loading is notifying rest of the code of changes...")
@@ -712,12 +860,19 @@ class ThreeMFWorkspaceReader(WorkspaceReader):
         # function is running on the main thread (Qt thread), although those "changed" signals have been emitted, but
         # they won't take effect until this function is done.
         # To solve this, we schedule _updateActiveMachine() for later so it will have the latest data.
+        self._phase_timer.startPhase("Activating machine")
         self._updateActiveMachine(global_stack)
 
-        # Load all the nodes / mesh data of the workspace
-        nodes = self._3mf_mesh_reader.read(file_name)
-        if nodes is None:
-            nodes = []
+        # Load the nodes that were decoded in the meanwhile. The others are added to the scene when they are decoded,
+        # after the project is loaded. See addRemainingNodes().
+        self._phase_timer.startPhase("Meshes")
+        nodes = []
+        for model_node, unit in self._model_decoder.takeDecodedNodes():
+            scene_node = self._3mf_mesh_reader.createSceneNode(model_node, unit)
+            if scene_node is not None:
+                nodes.append(scene_node)
+        self._phase_timer.endPhase()
+        Logger.log("d", "Loading project %s took %s, with %s of its meshes", file_name, self._phase_timer.getReport(), len(nodes))
 
         base_file_name = os.path.basename(file_name)
         if base_file_name.endswith(".curaproject.3mf"):
@@ -725,6 +880,37 @@ class ThreeMFWorkspaceReader(WorkspaceReader):
         self.setWorkspaceName(base_file_name)
         return nodes
 
+    ##  Add the nodes that were still being decoded when the project was
+    #   loaded, as soon as each of them is decoded.
+    def addRemainingNodes(self, add_node_callback: Callable[[SceneNode], None]) -> None:
+        decoder = self._model_decoder
+        if decoder is None:
+            return
+        application = CuraApplication.getInstance()
+        decoder.setCallbacks(lambda model_node, unit: application.callLater(self._addDecodedNode, decoder, model_node, unit, add_node_callback),
+                             lambda: application.callLater(self._onModelDecodingFinished, decoder))
+
+    ##  Convert a node that was decoded after the project was loaded and add it
+    #   to the scene.
+    def _addDecodedNode(self, decoder: BackgroundModelDecoder, model_node: ModelNode, unit: Optional[str], add_node_callback: Callable[[SceneNode], None]) -> None:
+        if decoder is not self._model_decoder:  # Another project was loaded in the meanwhile.
+            return
+        scene_node = self._3mf_mesh_reader.createSceneNode(model_node, unit)
+        if scene_node is not None:
+            add_node_callback(scene_node)
+
+    def _onModelDecodingFinished(self, decoder: BackgroundModelDecoder) -> None:
+        if decoder is not self._model_decoder:
+            return
+        self._phase_timer.addPhase("Decoding meshes in the background", decoder.getDecodeTime())
+        Logger.log("d", "Decoding the %s meshes of the project took %0.3f seconds", decoder.getNodeCount(), decoder.getDecodeTime())
+
+    ##  Stop adding the meshes of the previous project, if they are still being decoded.
+    def _cancelModelDecoding(self) -> None:
+        if self._model_decoder is not None:
+            self._model_decoder.cancel()
+            self._model_decoder = None
+
     def _processQualityChanges(self, global_stack):
         if self._machine_info.quality_changes_info is None:
             return
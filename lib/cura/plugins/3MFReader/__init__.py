@@ -7,7 +7,7 @@ from UM.Logger import Logger
 try:
     from . import ThreeMFReader
 except ImportError:
-    Logger.log("w", "Could not import ThreeMFReader; libSavitar may be missing")
+    Logger.log("w", "Could not import ThreeMFReader")
 
 from . import ThreeMFWorkspaceReader
 
@@ -0,0 +1,208 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import io
+import os.path
+import sys
+import threading
+import time
+import tracemalloc
+import zipfile
+from unittest.mock import patch
+
+import numpy
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import ThreeMFModelStream #The module we're testing.
+
+test_model = b"""<?xml version="1.0" encoding="UTF-8"?>
+<model unit="centimeter" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">
+    <metadata name="Title">Test</metadata>
+    <resources>
+        <object id="1" type="model">
+            <metadatagroup>
+                <metadata name="cura:infill_sparse_density" preserve="true" type="xs:string">30</metadata>
+                <metadata name="Title" preserve="true" type="xs:string">Cube</metadata>
+                <metadata name="Designer" type="xs:string">Someone</metadata>
+            </metadatagroup>
+            <mesh>
+                <vertices>
+                    <vertex x="0" y="0" z="0" />
+                    <vertex x="1" y="0" z="0" />
+                    <vertex x="0" y="1.5" z="0" />
+                </vertices>
+                <triangles>
+                    <triangle v1="0" v2="1" v3="2" />
+                    <triangle v1="2" v2="1" v3="0" />
+                </triangles>
+            </mesh>
+        </object>
+        <object id="2" type="model">
+            <components>
+                <component objectid="1" transform="1 0 0 0 1 0 0 0 1 5 5 5" />
+            </components>
+        </object>
+    </resources>
+    <build>
+        <item objectid="2" transform="1 0 0 0 1 0 0 0 1 1 2 3" />
+        <item objectid="1" />
+    </build>
+</model>
+"""
+
+
+def test_readNodes():
+    stream = ThreeMFModelStream.ThreeMFModelStream(io.BytesIO(test_model))
+
+    nodes = list(stream.readNodes())
+
+    assert stream.getUnit() == "centimeter"
+    assert len(nodes) == 2
+
+    group, mesh = nodes
+    assert group.vertices is None
+    assert group.transformation == "1 0 0 0 1 0 0 0 1 1 2 3"
+    assert len(group.children) == 1
+    assert group.children[0].transformation == "1 0 0 0 1 0 0 0 1 5 5 5"
+
+    assert mesh.transformation == ""
+    assert mesh.settings == {"infill_sparse_density": "30"}
+    assert mesh.vertices.dtype == numpy.float32
+    assert numpy.array_equal(mesh.vertices, [[0, 0, 0], [1, 0, 0], [0, 1.5, 0], [0, 1.5, 0], [1, 0, 0], [0, 0, 0]])
+    assert mesh.vertices is group.children[0].vertices # Instances of the same object share their vertices.
+
+
+def createProject(directory, model):
+    file_name = os.path.join(str(directory), "test.3mf")
+    with zipfile.ZipFile(file_name, "w") as archive:
+        archive.writestr("3D/3dmodel.model", model)
+    return file_name
+
+def test_decodeInBackground(tmpdir):
+    decoder = ThreeMFModelStream.BackgroundModelDecoder(createProject(tmpdir, test_model))
+    decoder.start()
+    assert decoder.wait(10)
+
+    assert decoder.isFinished()
+    assert decoder.getNodeCount() == 2
+    assert decoder.getDecodeTime() is not None
+    nodes = decoder.takeDecodedNodes()
+    assert [unit for node, unit in nodes] == ["centimeter", "centimeter"]
+    assert nodes[1][0].settings == {"infill_sparse_density": "30"}
+    assert decoder.takeDecodedNodes() == [] # They were already taken.
+
+##  The nodes that were decoded before the callbacks are set are passed to the
+#   callback as well, and all others as soon as they are decoded.
+def test_decodeCallbacks(tmpdir):
+    decoder = ThreeMFModelStream.BackgroundModelDecoder(createProject(tmpdir, createModel(20, 1000)))
+    received = []
+    finished = threading.Event()
+    decoder.start()
+    while decoder.getNodeCount() == 0 and not decoder.isFinished():
+        time.sleep(0.001)
+
+    decoder.setCallbacks(lambda node, unit: received.append(node), finished.set)
+
+    assert finished.wait(10)
+    assert len(received) == 20
+    assert [node.vertices[0][1] for node in received] == list(range(20)) # In the order of the build items.
+    assert decoder.takeDecodedNodes() == []
+
+##  The nodes that were decoded before the callbacks are set still arrive
+#   first, and the finished callback last, even if the decoder continues
+#   while they are passed on.
+def test_decodeCallbacksOrder(tmpdir):
+    decoder = ThreeMFModelStream.BackgroundModelDecoder(createProject(tmpdir, createModel(20, 100)))
+    received = []
+    finished = threading.Event()
+    resume_decoding = threading.Event()
+    read_nodes = ThreeMFModelStream.ThreeMFModelStream.readNodes
+    def readNodes(model_stream): # Pauses after three nodes, until the callbacks are being called.
+        for index, node in enumerate(read_nodes(model_stream)):
+            if index == 3:
+                resume_decoding.wait(10)
+            yield node
+    def onNode(node, unit):
+        received.append(node.vertices[0][1])
+        if threading.current_thread() is threading.main_thread():
+            resume_decoding.set()
+            time.sleep(0.05) # Gives the decoder time to pass on the other nodes.
+    def onFinished():
+        received.append("finished")
+        finished.set()
+
+    with patch.object(ThreeMFModelStream.ThreeMFModelStream, "readNodes", readNodes):
+        decoder.start()
+        while decoder.getNodeCount() < 3:
+            time.sleep(0.001)
+        decoder.setCallbacks(onNode, onFinished)
+        assert finished.wait(10)
+
+    assert received == list(range(20)) + ["finished"]
+
+def test_decodeCallbacksAfterFinished(tmpdir):
+    decoder = ThreeMFModelStream.BackgroundModelDecoder(createProject(tmpdir, test_model))
+    decoder.start()
+    decoder.wait(10)
+    received = []
+    finished = []
+
+    decoder.setCallbacks(lambda node, unit: received.append(node), lambda: finished.append(True))
+
+    assert len(received) == 2
+    assert finished == [True]
+
+def test_decodeCancel(tmpdir):
+    decoder = ThreeMFModelStream.BackgroundModelDecoder(createProject(tmpdir, createModel(20, 1000)))
+    received = []
+    decoder.setCallbacks(lambda node, unit: received.append(node), lambda: received.append("finished"))
+    decoder.cancel()
+    decoder.start()
+
+    assert decoder.wait(10)
+    assert received == []
+    assert decoder.takeDecodedNodes() == []
+
+def test_decodeInvalidFile(tmpdir):
+    decoder = ThreeMFModelStream.BackgroundModelDecoder(createProject(tmpdir, b"<model><resources>"))
+    finished = threading.Event()
+    decoder.setCallbacks(lambda node, unit: None, finished.set)
+    decoder.start()
+
+    assert finished.wait(10) # Still finishes, so the reader isn't left waiting.
+    assert decoder.getNodeCount() == 0
+
+
+def createModel(object_count, vertex_count):
+    parts = [b'<model unit="millimeter" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02"><resources>']
+    for object_id in range(object_count):
+        parts.append(b'<object id="%d" type="model"><mesh><vertices>' % object_id)
+        parts.extend(b'<vertex x="%d.5" y="%d" z="1.25" />' % (i, object_id) for i in range(vertex_count))
+        parts.append(b"</vertices><triangles>")
+        parts.extend(b'<triangle v1="%d" v2="%d" v3="%d" />' % (i, i + 1, i + 2) for i in range(vertex_count - 2))
+        parts.append(b"</triangles></mesh></object>")
+    parts.append(b"</resources><build>")
+    parts.extend(b'<item objectid="%d" />' % object_id for object_id in range(object_count))
+    parts.append(b"</build></model>")
+    return b"".join(parts)
+
+
+##  Benchmark of the peak memory it takes to read large models.
+#
+#   The elements are dropped as soon as they are decoded. Keeping the whole
+#   element tree, as parsing the document at once does, takes several times
+#   the size of the XML.
+@pytest.mark.parametrize("object_count, vertex_count", [(1, 100000), (10, 10000), (100, 1000)])
+def test_benchmarkReadNodes(object_count, vertex_count):
+    model = createModel(object_count, vertex_count)
+
+    tracemalloc.start()
+    nodes = list(ThreeMFModelStream.ThreeMFModelStream(io.BytesIO(model)).readNodes())
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert len(nodes) == object_count
+    assert all(len(node.vertices) == (vertex_count - 2) * 3 for node in nodes)
+    assert peak_memory < 4 * len(model)
@@ -0,0 +1,172 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import importlib
+import io
+import os.path
+import sys
+import threading
+import time
+import zipfile
+from configparser import ConfigParser
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import cura.CuraApplication  # Imported first to avoid circular imports.
+from UM.Settings.SettingDefinition import SettingDefinition
+from UM.Settings.SettingFunction import SettingFunction
+
+ThreeMFWorkspaceReader = importlib.import_module("3MFReader.ThreeMFWorkspaceReader") #The module we're testing. The package name is not a valid identifier.
+
+
+##  An existing container in the registry, with the lookups that are needed to
+#   compare it with a container in a project.
+class ExistingContainer:
+    def __init__(self, container_id, metadata, values):
+        self._metadata = dict(metadata)
+        self._metadata["id"] = container_id
+        self._metadata["container_type"] = MagicMock()
+        self._values = values
+        self._definition = SettingDefinition("machine_settings")
+        self._definition.deserialize({"label": "Machine", "description": "A category.", "type": "category", "children": {
+            "layer_height": {"label": "Layer Height", "description": "A setting.", "type": "float", "default_value": 0.1},
+            "infill_pattern": {"label": "Infill Pattern", "description": "A setting.", "type": "str", "default_value": "grid"},
+            "support_enable": {"label": "Support", "description": "A setting.", "type": "bool", "default_value": False}
+        }})
+
+    def getId(self):
+        return self._metadata["id"]
+
+    def getMetaData(self):
+        return self._metadata
+
+    def getAllKeys(self):
+        return set(self._values.keys())
+
+    def getProperty(self, key, property_name):
+        return self._values.get(key) if property_name == "value" else None
+
+    def getDefinition(self):
+        return self._definition
+
+def serializeContainer(name = "My Profile", metadata = None, values = None):
+    parser = ConfigParser(interpolation = None)
+    parser["general"] = {"version": "4", "name": name, "definition": "fdmprinter"}
+    parser["metadata"] = metadata if metadata is not None else {"type": "quality_changes", "quality_type": "normal", "setting_version": "5"}
+    parser["values"] = values if values is not None else {"layer_height": "0.20", "infill_pattern": "lines", "support_enable": "=layer_height > 0.1"}
+    stream = io.StringIO()
+    parser.write(stream)
+    return stream.getvalue()
+
+def parseContainer(serialized):
+    parser = ConfigParser(interpolation = None)
+    parser.read_string(serialized)
+    return parser
+
+@pytest.fixture
+def reader():
+    with patch("UM.Settings.ContainerRegistry.ContainerRegistry.getInstance"):
+        result = ThreeMFWorkspaceReader.ThreeMFWorkspaceReader()
+    version_upgrade_manager = MagicMock()
+    version_upgrade_manager.updateFilesData.return_value = None # No upgrades needed.
+    with patch("UM.VersionUpgradeManager.VersionUpgradeManager.getInstance", return_value = version_upgrade_manager):
+        yield result
+
+def existingProfile():
+    metadata = {"type": "quality_changes", "quality_type": "normal", "setting_version": 5, "name": "My Profile", "version": 4, "definition": "fdmprinter"}
+    return ExistingContainer("my_profile", metadata, {"layer_height": 0.2, "infill_pattern": "lines", "support_enable": SettingFunction("layer_height > 0.1")})
+
+def test_sameContents(reader):
+    assert reader._hasSameContents(existingProfile(), parseContainer(serializeContainer()))
+
+@pytest.mark.parametrize("name,serialized", [
+    ("name", serializeContainer(name = "Other Profile")),
+    ("metadata", serializeContainer(metadata = {"type": "quality_changes", "quality_type": "draft", "setting_version": "5"})),
+    ("extra metadata", serializeContainer(metadata = {"type": "quality_changes", "quality_type": "normal", "setting_version": "5", "position": "0"})),
+    ("value", serializeContainer(values = {"layer_height": "0.3", "infill_pattern": "lines", "support_enable": "=layer_height > 0.1"})),
+    ("formula", serializeContainer(values = {"layer_height": "0.2", "infill_pattern": "lines", "support_enable": "=layer_height > 0.2"})),
+    ("missing value", serializeContainer(values = {"layer_height": "0.2", "infill_pattern": "lines"})),
+    ("extra value", serializeContainer(values = {"layer_height": "0.2", "infill_pattern": "lines", "support_enable": "True", "infill_sparse_density": "20"}))
+])
+def test_differentContents(reader, name, serialized):
+    assert not reader._hasSameContents(existingProfile(), parseContainer(serialized))
+
+def createArchive(container_count):
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, "w", compression = zipfile.ZIP_DEFLATED) as archive:
+        for index in range(container_count):
+            container_type = "user" if index % 2 == 0 else "quality"
+            metadata = {"type": container_type, "quality_type": "normal", "setting_version": "5"}
+            values = {"setting_{index}".format(index = setting_index): str(index * setting_index) for setting_index in range(100)}
+            archive.writestr("Cura/container_{index}.inst.cfg".format(index = index), serializeContainer(name = "Container {index}".format(index = index), metadata = metadata, values = values))
+    return zipfile.ZipFile(io.BytesIO(stream.getvalue()), "r")
+
+def parseAll(reader, archive):
+    return reader._parseFiles(archive, [(reader._parseInstanceContainerFile, file_name) for file_name in archive.namelist()])
+
+##  Parsing in parallel gives the same results, in the same order.
+def test_parseFilesInParallel(reader):
+    archive = createArchive(40)
+    threads = set()
+    original_parse = reader._parseInstanceContainerFile
+    def parse(archive, file_name):
+        threads.add(threading.current_thread().ident)
+        return original_parse(archive, file_name)
+
+    reader._parse_worker_count = 1
+    sequential = parseAll(reader, archive)
+    reader._parse_worker_count = 4
+    parallel = reader._parseFiles(archive, [(parse, file_name) for file_name in archive.namelist()])
+
+    assert [info.file_name for info in parallel] == archive.namelist()
+    assert [info.serialized for info in parallel] == [info.serialized for info in sequential]
+    assert parallel[3].parser["general"]["name"] == "Container 3"
+    assert parallel[3].parser["values"]["setting_2"] == "6"
+    assert threading.current_thread().ident not in threads
+
+def test_parseFilesError(reader):
+    archive = createArchive(20)
+    reader._parse_worker_count = 4
+    def parse(archive, file_name):
+        if file_name.endswith("_7.inst.cfg"):
+            raise KeyError("metadata")
+        return file_name
+
+    with pytest.raises(KeyError): # Just like when parsing them one by one.
+        reader._parseFiles(archive, [(parse, file_name) for file_name in archive.namelist()])
+
+def test_loadingPhaseTimer():
+    timer = ThreeMFWorkspaceReader.LoadingPhaseTimer()
+    timer.startPhase("Definitions")
+    time.sleep(0.01)
+    timer.startPhase("Materials")
+    timer.endPhase()
+    timer.endPhase() # No phase any more.
+    timer.addPhase("Meshes", 1.5)
+
+    phases = timer.getPhases()
+    assert [name for name, duration in phases] == ["Definitions", "Materials", "Meshes"]
+    assert phases[0][1] >= 0.01
+    assert timer.getReport().endswith("Meshes: 1.500s")
+
+##  Parsing the containers of a big project, one by one and in parallel. The
+#   parsing itself holds the interpreter lock, so the workers can't be much
+#   faster, but they mustn't cost much either where there is only one core.
+def test_benchmarkParseContainers(reader):
+    archive = createArchive(400)
+    times = {}
+    results = {}
+    for worker_count in (1, 4):
+        reader._parse_worker_count = worker_count
+        durations = []
+        for _ in range(3):
+            start_time = time.perf_counter()
+            results[worker_count] = parseAll(reader, archive)
+            durations.append(time.perf_counter() - start_time)
+        times[worker_count] = min(durations)
+
+    assert [info.serialized for info in results[4]] == [info.serialized for info in results[1]]
+    assert times[4] < times[1] * 1.5
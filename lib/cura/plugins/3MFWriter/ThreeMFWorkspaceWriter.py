@@ -33,7 +33,7 @@ class ThreeMFWorkspaceWriter(WorkspaceWriter):
 
         archive = mesh_writer.getArchive()
         if archive is None:  # This happens if there was no mesh data to write.
-            archive = zipfile.ZipFile(stream, "w", compression = zipfile.ZIP_DEFLATED)
+            archive = mesh_writer.createArchive(stream)
 
         global_stack = machine_manager.activeMachine
 
@@ -100,8 +100,6 @@ class ThreeMFWorkspaceWriter(WorkspaceWriter):
             return  # File was already saved, no need to do it again. Uranium guarantees unique ID's, so this should hold.
 
         file_in_archive = zipfile.ZipInfo(file_name)
-        # For some reason we have to set the compress type of each file as well (it doesn't keep the type of the entire archive)
-        file_in_archive.compress_type = zipfile.ZIP_DEFLATED
 
         # Do not include the network authentication keys
         ignore_keys = {"network_authentication_id", "network_authentication_key", "octoprint_api_key"}
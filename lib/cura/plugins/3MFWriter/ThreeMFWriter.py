@@ -11,6 +11,7 @@ from UM.Scene.SceneNode import SceneNode
 from cura.CuraApplication import CuraApplication
 
 import Savitar
+from Charon.ParallelZipFile import ParallelZipFile
 
 import numpy
 
@@ -117,24 +118,29 @@ class ThreeMFWriter(MeshWriter):
     def getArchive(self):
         return self._archive
 
+    ##  Create an archive to write a 3MF file to.
+    #
+    #   The members are compressed in parallel, with the compression level
+    #   from the preferences.
+    #   \param stream The stream to write the archive to.
+    @staticmethod
+    def createArchive(stream):
+        return ParallelZipFile(stream, compression_level = CuraApplication.getInstance().getArchiveCompressionLevel())
+
     def write(self, stream, nodes, mode = MeshWriter.OutputMode.BinaryMode):
         self._archive = None # Reset archive
-        archive = zipfile.ZipFile(stream, "w", compression = zipfile.ZIP_DEFLATED)
+        archive = self.createArchive(stream)
         try:
             model_file = zipfile.ZipInfo("3D/3dmodel.model")
-            # Because zipfile is stupid and ignores archive-level compression settings when writing with ZipInfo.
-            model_file.compress_type = zipfile.ZIP_DEFLATED
 
             # Create content types file
             content_types_file = zipfile.ZipInfo("[Content_Types].xml")
-            content_types_file.compress_type = zipfile.ZIP_DEFLATED
             content_types = ET.Element("Types", xmlns = self._namespaces["content-types"])
             rels_type = ET.SubElement(content_types, "Default", Extension = "rels", ContentType = "application/vnd.openxmlformats-package.relationships+xml")
             model_type = ET.SubElement(content_types, "Default", Extension = "model", ContentType = "application/vnd.ms-package.3dmanufacturing-3dmodel+xml")
 
             # Create _rels/.rels file
             relations_file = zipfile.ZipInfo("_rels/.rels")
-            relations_file.compress_type = zipfile.ZIP_DEFLATED
             relations_element = ET.Element("Relationships", xmlns = self._namespaces["relationships"])
             model_relation_element = ET.SubElement(relations_element, "Relationship", Target = "/3D/3dmodel.model", Id = "rel0", Type = "http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel")
 
@@ -6,7 +6,7 @@ from UM.Logger import Logger
 try:
     from . import ThreeMFWriter
 except ImportError:
-    Logger.log("w", "Could not import ThreeMFWriter; libSavitar may be missing")
+    Logger.log("w", "Could not import ThreeMFWriter; libSavitar or libCharon may be missing")
 from . import ThreeMFWorkspaceWriter
 
 from UM.i18n import i18nCatalog
@@ -0,0 +1,104 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import io
+import random
+import time
+import zipfile
+import zlib
+from unittest.mock import MagicMock
+
+import pytest
+
+from Charon.ParallelZipFile import ParallelZipFile #The archive writer used by the 3MF and UFP writers.
+from cura.CuraApplication import CuraApplication
+
+
+@pytest.mark.parametrize("compression_level", [0, 1, 6, 9])
+def test_writeArchive(compression_level):
+    contents = {
+        "3D/3dmodel.model": b"<vertex x=\"1\" y=\"2\" z=\"3\" />" * 200000, #Multiple chunks.
+        "Cura/preferences.cfg": "[general]\nvisible_settings = ä\n", #Strings are encoded as UTF-8.
+        "Metadata/empty": b"",
+        "Metadata/ü.txt": b"Non-ASCII file name."
+    }
+    stream = io.BytesIO()
+    archive = ParallelZipFile(stream, compression_level = compression_level)
+    for file_name, data in contents.items():
+        if file_name == "Cura/preferences.cfg":
+            archive.writestr(zipfile.ZipInfo(file_name), data)
+        else:
+            archive.writestr(file_name, data)
+    assert archive.namelist() == list(contents.keys())
+    archive.close()
+
+    result = zipfile.ZipFile(io.BytesIO(stream.getvalue()))
+    assert result.testzip() is None #Checks the CRCs.
+    assert result.namelist() == list(contents.keys())
+    for file_name, data in contents.items():
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        assert result.read(file_name) == data
+        expected_type = zipfile.ZIP_STORED if compression_level == 0 else zipfile.ZIP_DEFLATED
+        assert result.getinfo(file_name).compress_type == expected_type
+
+
+def test_writeAfterOtherData():
+    stream = io.BytesIO()
+    stream.write(b"Some data in front of the archive.")
+    with ParallelZipFile(stream) as archive:
+        archive.writestr("test.txt", b"Test")
+
+    assert zipfile.ZipFile(io.BytesIO(stream.getvalue())).read("test.txt") == b"Test"
+
+
+def test_invalidCompressionLevel():
+    with pytest.raises(ValueError):
+        ParallelZipFile(io.BytesIO(), compression_level = 10)
+
+
+##  The writers get the compression level from the preferences, which may be
+#   edited by hand. They must always get a level that the archive accepts.
+@pytest.mark.parametrize("preference_value, compression_level", [(6, 6), ("0", 0), ("9", 9), (12, 9), ("-1", 0), ("fast", 6), ("6.5", 6), (None, 6)])
+def test_archiveCompressionLevel(preference_value, compression_level):
+    application = MagicMock(DefaultArchiveCompressionLevel = CuraApplication.DefaultArchiveCompressionLevel)
+    application.getPreferences().getValue.return_value = preference_value
+
+    result = CuraApplication.getArchiveCompressionLevel(application)
+
+    assert result == compression_level
+    ParallelZipFile(io.BytesIO(), compression_level = result).close()
+
+
+def createGCode(line_count):
+    random.seed(1337)
+    return b"".join(b"G1 X%.3f Y%.3f E%.5f\n" % (random.uniform(0, 300), random.uniform(0, 300), random.uniform(0, 1000)) for _ in range(line_count))
+
+
+##  Benchmark of the time it takes to write a large g-code file and the size
+#   of the result, compared to compressing it in one piece at the same level.
+#
+#   Compressing in chunks may not make the result noticeably bigger, and on a
+#   single CPU it may not make writing noticeably slower.
+@pytest.mark.parametrize("compression_level", [0, 1, 6, 9])
+def test_benchmarkWriteArchive(compression_level):
+    gcode = createGCode(500000)
+
+    start_time = time.time()
+    if compression_level > 0:
+        compressor = zlib.compressobj(compression_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        single_size = len(compressor.compress(gcode) + compressor.flush())
+    else:
+        single_size = len(bytes(gcode))
+    single_time = time.time() - start_time
+
+    start_time = time.time()
+    stream = io.BytesIO()
+    with ParallelZipFile(stream, compression_level = compression_level) as archive:
+        archive.writestr("/3D/model.gcode", gcode)
+    parallel_time = time.time() - start_time
+
+    archive = zipfile.ZipFile(io.BytesIO(stream.getvalue()))
+    assert archive.read("/3D/model.gcode") == gcode
+    assert archive.getinfo("/3D/model.gcode").compress_size <= single_size * 1.01
+    assert parallel_time <= single_time * 1.5 + 0.1
@@ -7,7 +7,7 @@ import os
 from PyQt5.QtCore import QObject, QTimer, pyqtSlot
 import sys
 from time import time
-from typing import Any, cast, Dict, List, Optional, Set, TYPE_CHECKING
+from typing import Any, Callable, cast, Dict, FrozenSet, List, Optional, Set, Tuple, TYPE_CHECKING
 
 from UM.Backend.Backend import Backend, BackendState
 from UM.Scene.SceneNode import SceneNode
@@ -20,13 +20,14 @@ from UM.Platform import Platform
 from UM.Qt.Duration import DurationFormat
 from UM.Scene.Iterator.DepthFirstIterator import DepthFirstIterator
 from UM.Settings.Interfaces import DefinitionContainerInterface
-from UM.Settings.SettingInstance import SettingInstance #For typing.
 from UM.Tool import Tool #For typing.
 from UM.Mesh.MeshData import MeshData #For typing.
 
 from cura.CuraApplication import CuraApplication
 from cura.Settings.ExtruderManager import ExtruderManager
+from .MessageRecording import MessageRecorder, ProtocolSchema
 from .ProcessSlicedLayersJob import ProcessSlicedLayersJob
+from .SliceTelemetry import SliceTelemetry
 from .StartSliceJob import StartSliceJob, StartJobResult
 
 import Arcus
@@ -111,6 +112,14 @@ class CuraEngineBackend(QObject, Backend):
         self._message_handlers["cura.proto.PrintTimeMaterialEstimates"] = self._onPrintTimeMaterialEstimates
         self._message_handlers["cura.proto.SlicingFinished"] = self._onSlicingFinishedMessage
 
+        # To benchmark the slicing pipeline without the engine, the messages of every slice can be recorded to the
+        # file in CURA_ENGINE_RECORDING, and replayed with the ReplayEngine.
+        self._recording_path = os.environ.get("CURA_ENGINE_RECORDING") #type: Optional[str]
+        self._message_recorder = None #type: Optional[MessageRecorder]
+        if self._recording_path:
+            for message_type, handler in list(self._message_handlers.items()):
+                self._message_handlers[message_type] = self._createRecordingHandler(handler)
+
         self._start_slice_job = None #type: Optional[StartSliceJob]
         self._start_slice_job_build_plate = None #type: Optional[int]
         self._slicing = False #type: bool # Are we currently slicing?
@@ -129,6 +138,19 @@ class CuraEngineBackend(QObject, Backend):
         self._slice_start_time = None #type: Optional[float]
         self._is_disabled = False #type: bool
 
+        # Timing of the stages of slicing. The percentiles are logged after every slice, and the trace can be
+        # exported with exportSliceTrace, or automatically after every slice to the file in CURA_SLICE_TRACE.
+        self._telemetry = SliceTelemetry() #type: SliceTelemetry
+        self._slice_trace_path = os.environ.get("CURA_SLICE_TRACE") #type: Optional[str]
+
+        # While slicing, check regularly whether the engine is still sending messages, to log when it seems stuck.
+        self._last_engine_message_time = 0.0 #type: float
+        self._engine_silence_warning = 60 #type: int # Log a warning when the engine didn't send anything for this many seconds.
+        self._engine_silence_logged = False #type: bool
+        self._heartbeat_timer = QTimer() #type: QTimer
+        self._heartbeat_timer.setInterval(5000)
+        self._heartbeat_timer.timeout.connect(self._onHeartbeat)
+
         self._application.getPreferences().addPreference("general/auto_slice", False)
 
         self._use_timer = False #type: bool
@@ -227,6 +249,7 @@ class CuraEngineBackend(QObject, Backend):
     def slice(self) -> None:
         Logger.log("d", "Starting to slice...")
         self._slice_start_time = time()
+        self._telemetry.endSpan("auto-slice delay")
         if not self._build_plates_to_be_sliced:
             self.processingProgress.emit(1.0)
             Logger.log("w", "Slice unnecessary, nothing has changed that needs reslicing.")
@@ -272,8 +295,15 @@ class CuraEngineBackend(QObject, Backend):
 
         self.determineAutoSlicing()  # Switch timer on or off if appropriate
 
+        self._telemetry.resetCounts()
+        self._telemetry.beginSpan("slice", build_plate = build_plate_to_be_sliced)
+        self._telemetry.beginSpan("StartSliceJob")
+        self._last_engine_message_time = self._telemetry.now()
+        self._engine_silence_logged = False
+        self._heartbeat_timer.start()
+
         slice_message = self._socket.createMessage("cura.proto.Slice")
-        self._start_slice_job = StartSliceJob(slice_message)
+        self._start_slice_job = StartSliceJob(slice_message, self._telemetry)
         self._start_slice_job_build_plate = build_plate_to_be_sliced
         self._start_slice_job.setBuildPlate(self._start_slice_job_build_plate)
         self._start_slice_job.start()
@@ -283,6 +313,9 @@ class CuraEngineBackend(QObject, Backend):
     #   Start the engine process by calling _createSocket()
     def _terminate(self) -> None:
         self._slicing = False
+        self._stopRecording()
+        self._heartbeat_timer.stop()
+        self._telemetry.cancelSpans("terminated")
         self._stored_layer_data = []
         if self._start_slice_job_build_plate in self._stored_optimized_layer_data:
             del self._stored_optimized_layer_data[self._start_slice_job_build_plate]
@@ -321,6 +354,10 @@ class CuraEngineBackend(QObject, Backend):
         # Note that cancelled slice jobs can still call this method.
         if self._start_slice_job is job:
             self._start_slice_job = None
+            self._telemetry.endSpan("StartSliceJob", result = str(job.getResult()))
+            if job.getResult() != StartJobResult.Finished:
+                self._heartbeat_timer.stop()
+                self._telemetry.cancelSpans(str(job.getResult()))
 
         if job.isCancelled() or job.getError() or job.getResult() == StartJobResult.Error:
             self.backendStateChange.emit(BackendState.Error)
@@ -422,7 +459,14 @@ class CuraEngineBackend(QObject, Backend):
             return
 
         # Preparation completed, send it to the backend.
+        if self._recording_path:
+            self._startRecording(job.getSliceMessage())
+        send_start_time = self._telemetry.now()
         self._socket.sendMessage(job.getSliceMessage())
+        self._telemetry.addSpan("send slice message", send_start_time, self._telemetry.now(), vertex_bytes = job.getVertexByteCount())
+        self._telemetry.addCount("slice message bytes", job.getVertexByteCount())
+        self._telemetry.beginSpan("engine slicing")
+        self._last_engine_message_time = self._telemetry.now()
 
         # Notify the user that it's now up to the backend to do it's job
         self.backendStateChange.emit(BackendState.Processing)
@@ -573,15 +617,18 @@ class CuraEngineBackend(QObject, Backend):
             # With manually having to slice, we want to clear the old invalid layer data.
             self._clearLayerData()
 
-    ##  A setting has changed, so check if we must reslice.
-    # \param instance The setting instance that has changed.
-    # \param property The property of the setting instance that has changed.
-    def _onSettingChanged(self, instance: SettingInstance, property: str) -> None:
-        if property == "value":  # Only reslice if the value has changed.
+    ##  Settings have changed, so check if we must reslice.
+    #
+    #   This is called once for all settings that changed since the event loop
+    #   last ran, instead of once for every property of every setting.
+    #   \param changes The (key, property name) pairs of the changed settings.
+    def _onSettingsChanged(self, changes: FrozenSet[Tuple[str, str]]) -> None:
+        changed_properties = {property_name for key, property_name in changes}
+        if "value" in changed_properties:  # Only reslice if the value has changed.
             self.needsSlicing()
             self._onChanged()
 
-        elif property == "validationState":
+        elif "validationState" in changed_properties:
             if self._use_timer:
                 self._change_timer.stop()
 
@@ -598,12 +645,14 @@ class CuraEngineBackend(QObject, Backend):
     #
     #   \param message The protobuf message containing sliced layer data.
     def _onLayerMessage(self, message: Arcus.PythonMessage) -> None:
+        self._onEngineMessage("layer message")
         self._stored_layer_data.append(message)
 
     ##  Called when an optimized sliced layer data message is received from the engine.
     #
     #   \param message The protobuf message containing sliced layer data.
     def _onOptimizedLayerMessage(self, message: Arcus.PythonMessage) -> None:
+        self._onEngineMessage("layer message")
         if self._start_slice_job_build_plate is not None:
             if self._start_slice_job_build_plate not in self._stored_optimized_layer_data:
                 self._stored_optimized_layer_data[self._start_slice_job_build_plate] = []
@@ -613,6 +662,7 @@ class CuraEngineBackend(QObject, Backend):
     #
     #   \param message The protobuf message containing the slicing progress.
     def _onProgressMessage(self, message: Arcus.PythonMessage) -> None:
+        self._onEngineMessage("progress message")
         self.processingProgress.emit(message.amount)
         self.backendStateChange.emit(BackendState.Processing)
 
@@ -628,6 +678,92 @@ class CuraEngineBackend(QObject, Backend):
                 self._change_timer.stop()
             else:
                 self._change_timer.start()
+                if not self._telemetry.isSpanOpen("auto-slice delay"):
+                    self._telemetry.beginSpan("auto-slice delay")
+
+    ##  Called for every message from the engine while slicing, to record that
+    #   the engine is still alive.
+    #
+    #   \param message_type The name of the counter to count the message with.
+    #   \param gcode_byte_count The number of bytes of g-code in the message.
+    def _onEngineMessage(self, message_type: str, gcode_byte_count: int = 0) -> None:
+        self._last_engine_message_time = self._telemetry.now()
+        if self._telemetry.getCount(message_type) == 0:
+            self._telemetry.addInstant("first " + message_type)
+        self._telemetry.addCount(message_type)
+        if gcode_byte_count:
+            self._telemetry.addCount("g-code bytes", gcode_byte_count)
+
+    ##  Called regularly while slicing, to log when the engine stopped sending
+    #   messages.
+    def _onHeartbeat(self) -> None:
+        if not self._slicing:
+            self._heartbeat_timer.stop()
+            return
+        silence = self._telemetry.now() - self._last_engine_message_time
+        if silence < self._engine_silence_warning:
+            self._engine_silence_logged = False
+        elif not self._engine_silence_logged:
+            self._engine_silence_logged = True
+            Logger.log("w", "The engine hasn't sent any message for %.0f seconds.", silence)
+            self._telemetry.addInstant("engine silent", seconds = silence)
+
+    ##  Start recording the messages of a slice to the file in
+    #   CURA_ENGINE_RECORDING, replacing the recording of the previous slice.
+    #
+    #   \param slice_message The message that is sent to the engine to start
+    #   slicing.
+    def _startRecording(self, slice_message: Arcus.PythonMessage) -> None:
+        self._stopRecording()
+        try:
+            schema = ProtocolSchema.fromFile(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Cura.proto"))
+            self._message_recorder = MessageRecorder(self._recording_path, schema)
+            self._message_recorder.record(slice_message, "sent")
+        except OSError:
+            Logger.logException("w", "Unable to record the engine messages to %s", self._recording_path)
+            self._message_recorder = None
+
+    def _stopRecording(self) -> None:
+        if self._message_recorder is not None:
+            self._message_recorder.close()
+            self._message_recorder = None
+            Logger.log("d", "Recorded the engine messages to %s", self._recording_path)
+
+    ##  Wrap a message handler, to record the messages from the engine before
+    #   they are handled.
+    def _createRecordingHandler(self, handler: Callable[[Arcus.PythonMessage], None]) -> Callable[[Arcus.PythonMessage], None]:
+        def recordingHandler(message: Arcus.PythonMessage) -> None:
+            if self._message_recorder is not None:
+                self._message_recorder.record(message, "received")
+            handler(message)
+        return recordingHandler
+
+    ##  Export the timing of the recent slices in the Chrome trace event
+    #   format.
+    #
+    #   The file can be opened in chrome://tracing or https://ui.perfetto.dev.
+    #   \param file_path The path of the JSON file to write.
+    @pyqtSlot(str)
+    def exportSliceTrace(self, file_path: str) -> None:
+        try:
+            self._telemetry.writeChromeTrace(file_path)
+        except OSError:
+            Logger.logException("w", "Unable to write the slice trace to %s", file_path)
+            return
+        Logger.log("d", "Wrote the slice trace to %s", file_path)
+
+    ##  Get the percentiles of the durations of the stages of slicing, for
+    #   instance to show in a debug panel.
+    #
+    #   \return For every stage a dictionary with the 50th and 90th percentile
+    #   and the maximum duration in seconds, over the recent slices.
+    @pyqtSlot(result = "QVariantMap")
+    def getSliceTimingPercentiles(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for name in self._telemetry.getSpanNames():
+            percentiles = self._telemetry.getPercentiles(name, (50, 90, 100))
+            result[name] = {"p50": percentiles[50], "p90": percentiles[90], "max": percentiles[100]}
+        return result
 
     ##  Called when the engine sends a message that slicing is finished.
     #
@@ -647,8 +783,15 @@ class CuraEngineBackend(QObject, Backend):
             gcode_list[index] = replaced
 
         self._slicing = False
+        self._stopRecording()
+        self._heartbeat_timer.stop()
+        self._telemetry.endSpan("engine slicing")
+        self._telemetry.endSpan("slice", **self._telemetry.resetCounts())
         if self._slice_start_time:
             Logger.log("d", "Slicing took %s seconds", time() - self._slice_start_time )
+        Logger.log("d", "Slice timing over the recent slices:\n%s", self._telemetry.getSummary())
+        if self._slice_trace_path:
+            self.exportSliceTrace(self._slice_trace_path)
         Logger.log("d", "Number of models per buildplate: %s", dict(self._numObjectsPerBuildPlate()))
 
         # See if we need to process the sliced layers job.
@@ -675,6 +818,7 @@ class CuraEngineBackend(QObject, Backend):
     #
     #   \param message The protobuf message containing g-code, encoded as UTF-8.
     def _onGCodeLayerMessage(self, message: Arcus.PythonMessage) -> None:
+        self._onEngineMessage("g-code message", len(message.data))
         self._scene.gcode_dict[self._start_slice_job_build_plate].append(message.data.decode("utf-8", "replace")) #type: ignore #Because we generate this attribute dynamically.
 
     ##  Called when a g-code prefix message is received from the engine.
@@ -682,6 +826,7 @@ class CuraEngineBackend(QObject, Backend):
     #   \param message The protobuf message containing the g-code prefix,
     #   encoded as UTF-8.
     def _onGCodePrefixMessage(self, message: Arcus.PythonMessage) -> None:
+        self._onEngineMessage("g-code message", len(message.data))
         self._scene.gcode_dict[self._start_slice_job_build_plate].insert(0, message.data.decode("utf-8", "replace")) #type: ignore #Because we generate this attribute dynamically.
 
     ##  Creates a new socket connection.
@@ -717,6 +862,7 @@ class CuraEngineBackend(QObject, Backend):
     #   \param message The protobuf message containing the print time per feature and
     #   material amount per extruder
     def _onPrintTimeMaterialEstimates(self, message: Arcus.PythonMessage) -> None:
+        self._onEngineMessage("estimate message")
         material_amounts = []
         for index in range(message.repeatedMessageCount("materialEstimates")):
             material_amounts.append(message.getRepeatedMessage("materialEstimates", index).material_amount)
@@ -777,7 +923,8 @@ class CuraEngineBackend(QObject, Backend):
             self._onSceneChanged(source)
 
     def _startProcessSlicedLayersJob(self, build_plate_number: int) -> None:
-        self._process_layers_job = ProcessSlicedLayersJob(self._stored_optimized_layer_data[build_plate_number])
+        self._telemetry.beginSpan("ProcessSlicedLayersJob", build_plate = build_plate_number)
+        self._process_layers_job = ProcessSlicedLayersJob(self._stored_optimized_layer_data[build_plate_number], self._telemetry)
         self._process_layers_job.setBuildPlate(build_plate_number)
         self._process_layers_job.finished.connect(self._onProcessLayersFinished)
         self._process_layers_job.start()
@@ -813,26 +960,27 @@ class CuraEngineBackend(QObject, Backend):
     ##  Called when the global container stack changes
     def _onGlobalStackChanged(self) -> None:
         if self._global_container_stack:
-            self._global_container_stack.propertyChanged.disconnect(self._onSettingChanged)
+            self._global_container_stack.batchedPropertiesChanged.disconnect(self._onSettingsChanged)
             self._global_container_stack.containersChanged.disconnect(self._onChanged)
             extruders = list(self._global_container_stack.extruders.values())
 
             for extruder in extruders:
-                extruder.propertyChanged.disconnect(self._onSettingChanged)
+                extruder.batchedPropertiesChanged.disconnect(self._onSettingsChanged)
                 extruder.containersChanged.disconnect(self._onChanged)
 
         self._global_container_stack = self._application.getGlobalContainerStack()
 
         if self._global_container_stack:
-            self._global_container_stack.propertyChanged.connect(self._onSettingChanged)  # Note: Only starts slicing when the value changed.
+            self._global_container_stack.batchedPropertiesChanged.connect(self._onSettingsChanged)  # Note: Only starts slicing when the value changed.
             self._global_container_stack.containersChanged.connect(self._onChanged)
             extruders = list(self._global_container_stack.extruders.values())
             for extruder in extruders:
-                extruder.propertyChanged.connect(self._onSettingChanged)
+                extruder.batchedPropertiesChanged.connect(self._onSettingsChanged)
                 extruder.containersChanged.connect(self._onChanged)
             self._onChanged()
 
     def _onProcessLayersFinished(self, job: ProcessSlicedLayersJob) -> None:
+        self._telemetry.endSpan("ProcessSlicedLayersJob")
         del self._stored_optimized_layer_data[job.getBuildPlate()]
         self._process_layers_job = None
         Logger.log("d", "See if there is more to slice(2)...")
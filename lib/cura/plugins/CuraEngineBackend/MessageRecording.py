@@ -0,0 +1,285 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import base64
+import gzip
+import json
+import re
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from UM.Logger import Logger
+
+
+##  The message types of a protobuf protocol file, such as Cura.proto.
+#
+#   This is a small parser for the subset of the protobuf syntax that the
+#   protocol of the engine uses: messages with scalar, enum and message
+#   fields, which may be repeated. It is used to walk through the fields of
+#   messages to record them, since Arcus messages can't list their fields.
+class ProtocolSchema:
+    _comment_regex = re.compile(r"//[^\n]*")
+    _package_regex = re.compile(r"package\s+([\w.]+)\s*;")
+    _enum_regex = re.compile(r"enum\s+(\w+)\s*\{[^}]*\}")
+    _message_regex = re.compile(r"message\s+(\w+)\s*\{([^}]*)\}")
+    _field_regex = re.compile(r"(repeated\s+)?([\w.]+)\s+(\w+)\s*=\s*\d+\s*;")
+
+    ##  The default values of fields that are not set, by scalar type.
+    _scalar_defaults = {
+        "bytes": b"",
+        "string": "",
+        "bool": False,
+        "float": 0.0,
+        "double": 0.0
+    } #type: Dict[str, Any] # All other scalar types and enums are integers, with default 0.
+
+    ##  \param protocol The contents of the protocol file.
+    def __init__(self, protocol: str) -> None:
+        protocol = self._comment_regex.sub("", protocol)
+        package_match = self._package_regex.search(protocol)
+        self._package = package_match.group(1) + "." if package_match else ""
+
+        enum_names = set(self._enum_regex.findall(protocol))
+        protocol = self._enum_regex.sub("", protocol)
+        message_bodies = self._message_regex.findall(protocol)
+        message_names = {name for name, _ in message_bodies}
+
+        # For every message type, the fields by name, with their type and whether they are repeated.
+        # The types of message fields are full type names, enums are int32.
+        self._messages = {} #type: Dict[str, Dict[str, Tuple[str, bool]]]
+        for name, body in message_bodies:
+            fields = {}
+            for repeated, field_type, field_name in self._field_regex.findall(body):
+                if field_type in message_names:
+                    field_type = self._package + field_type
+                elif field_type in enum_names:
+                    field_type = "int32"
+                fields[field_name] = (field_type, bool(repeated))
+            self._messages[self._package + name] = fields
+
+    ##  Read the message types from a protocol file.
+    @classmethod
+    def fromFile(cls, file_path: str) -> "ProtocolSchema":
+        with open(file_path, encoding = "utf-8") as f:
+            return cls(f.read())
+
+    ##  The full names of all message types, such as "cura.proto.Slice".
+    def getMessageTypes(self) -> List[str]:
+        return list(self._messages.keys())
+
+    ##  The fields of a message type.
+    #
+    #   \return For every field name the type of the field and whether it is
+    #   repeated.
+    def getFields(self, type_name: str) -> Dict[str, Tuple[str, bool]]:
+        return self._messages[type_name]
+
+    def isMessageType(self, type_name: str) -> bool:
+        return type_name in self._messages
+
+    def getDefaultValue(self, field_type: str) -> Any:
+        return self._scalar_defaults.get(field_type, 0)
+
+    ##  Convert a message to data that can be written as JSON.
+    #
+    #   Fields that have their default value are left out.
+    #   \param message An Arcus message, or a RecordedMessage.
+    #   \param type_name The type of the message. Defaults to the type the
+    #   message reports.
+    def serialize(self, message: Any, type_name: Optional[str] = None) -> Dict[str, Any]:
+        if type_name is None:
+            type_name = message.getTypeName()
+        result = {} #type: Dict[str, Any]
+        for field_name, (field_type, repeated) in self._messages[type_name].items():
+            if self.isMessageType(field_type):
+                if repeated:
+                    count = message.repeatedMessageCount(field_name)
+                    if count:
+                        result[field_name] = [self.serialize(message.getRepeatedMessage(field_name, index), field_type) for index in range(count)]
+                else:
+                    sub_message = self.serialize(message.getMessage(field_name), field_type)
+                    if sub_message:
+                        result[field_name] = sub_message
+                continue
+
+            value = getattr(message, field_name)
+            if value == self.getDefaultValue(field_type):
+                continue
+            if field_type == "bytes":
+                value = base64.b64encode(bytes(value)).decode("ascii")
+            result[field_name] = value
+        return result
+
+    ##  Create a message from data that was made with serialize.
+    def deserialize(self, type_name: str, data: Dict[str, Any]) -> "RecordedMessage":
+        message = RecordedMessage(self, type_name)
+        fields = self._messages[type_name]
+        for field_name, value in data.items():
+            field_type, repeated = fields[field_name]
+            if self.isMessageType(field_type):
+                if repeated:
+                    for item in value:
+                        message.addRecordedMessage(field_name, self.deserialize(field_type, item))
+                else:
+                    message.addRecordedMessage(field_name, self.deserialize(field_type, value))
+            elif field_type == "bytes":
+                setattr(message, field_name, base64.b64decode(value))
+            else:
+                setattr(message, field_name, value)
+        return message
+
+
+##  A message that behaves like an Arcus message, but doesn't need a socket.
+#
+#   These are used to replay recorded messages without the engine, and can be
+#   filled by the jobs that would otherwise fill a message for the engine.
+class RecordedMessage:
+    def __init__(self, schema: ProtocolSchema, type_name: str) -> None:
+        self.__dict__["_schema"] = schema
+        self.__dict__["_type_name"] = type_name
+        self.__dict__["_fields"] = schema.getFields(type_name)
+        self.__dict__["_values"] = {}
+
+    def getTypeName(self) -> str:
+        return self._type_name
+
+    def __getattr__(self, name: str) -> Any:
+        values = self.__dict__["_values"]
+        if name in values:
+            return values[name]
+        try:
+            field_type, _ = self.__dict__["_fields"][name]
+        except KeyError:
+            raise AttributeError("Message {type_name} has no field {name}".format(type_name = self.__dict__["_type_name"], name = name))
+        return self._schema.getDefaultValue(field_type)
+
+    ##  Set a scalar field. Like Arcus does, arrays are stored as bytes.
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name not in self._fields:
+            raise AttributeError("Message {type_name} has no field {name}".format(type_name = self._type_name, name = name))
+        if self._fields[name][0] == "bytes" and not isinstance(value, bytes):
+            value = memoryview(value).tobytes()
+        self._values[name] = value
+
+    ##  Get a field that is a single message, creating it if it isn't set.
+    def getMessage(self, name: str) -> "RecordedMessage":
+        if name not in self._values:
+            self._values[name] = RecordedMessage(self._schema, self._fields[name][0])
+        return self._values[name]
+
+    def addRepeatedMessage(self, name: str) -> "RecordedMessage":
+        message = RecordedMessage(self._schema, self._fields[name][0])
+        self.addRecordedMessage(name, message)
+        return message
+
+    def repeatedMessageCount(self, name: str) -> int:
+        return len(self._values.get(name, []))
+
+    def getRepeatedMessage(self, name: str, index: int) -> "RecordedMessage":
+        return self._values[name][index]
+
+    ##  Set a message field, or add to a repeated message field.
+    def addRecordedMessage(self, name: str, message: "RecordedMessage") -> None:
+        if self._fields[name][1]:
+            self._values.setdefault(name, []).append(message)
+        else:
+            self._values[name] = message
+
+
+##  Writes the messages between the front-end and the engine to a file, so
+#   that they can be replayed later without the engine.
+#
+#   The file is a gzip-compressed file with one JSON object per line. Every
+#   object has the time in seconds since the start of the recording, whether
+#   the message was "sent" to or "received" from the engine, the type of the
+#   message and its fields as made by ProtocolSchema.serialize.
+class MessageRecorder:
+    def __init__(self, file_path: str, schema: ProtocolSchema) -> None:
+        self._file = gzip.open(file_path, "wt", encoding = "utf-8")
+        self._schema = schema
+        self._start_time = time.perf_counter()
+
+    ##  \param message The Arcus message or RecordedMessage to record.
+    #   \param direction "sent" for messages to the engine, "received" for
+    #   messages from the engine.
+    def record(self, message: Any, direction: str = "received") -> None:
+        entry = {
+            "time": time.perf_counter() - self._start_time,
+            "direction": direction,
+            "type": message.getTypeName(),
+            "fields": self._schema.serialize(message)
+        }
+        self._file.write(json.dumps(entry))
+        self._file.write("\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+##  The messages that a MessageRecorder wrote to a file.
+class MessageRecording:
+    def __init__(self, schema: ProtocolSchema) -> None:
+        self._schema = schema
+        self._entries = [] #type: List[Tuple[float, str, RecordedMessage]]
+
+    @classmethod
+    def load(cls, file_path: str, schema: ProtocolSchema) -> "MessageRecording":
+        recording = cls(schema)
+        with gzip.open(file_path, "rt", encoding = "utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                recording.addMessage(schema.deserialize(entry["type"], entry["fields"]), entry["direction"], entry["time"])
+        return recording
+
+    def addMessage(self, message: RecordedMessage, direction: str = "received", timestamp: float = 0.0) -> None:
+        self._entries.append((timestamp, direction, message))
+
+    ##  Get the recorded messages, in the order they were recorded.
+    #
+    #   \param direction Only get the messages that were "sent" or "received",
+    #   or None to get both.
+    #   \param type_name Only get the messages of this type, or None to get all
+    #   messages.
+    def getMessages(self, direction: Optional[str] = None, type_name: Optional[str] = None) -> List[RecordedMessage]:
+        return [message for _, message_direction, message in self._entries
+                if (direction is None or message_direction == direction) and (type_name is None or message.getTypeName() == type_name)]
+
+    ##  The slice message that was sent to the engine, with the scene and the
+    #   settings, or None if it wasn't recorded.
+    def getSliceMessage(self) -> Optional[RecordedMessage]:
+        messages = self.getMessages("sent", "cura.proto.Slice")
+        return messages[0] if messages else None
+
+    def __iter__(self) -> Iterator[Tuple[float, str, RecordedMessage]]:
+        return iter(self._entries)
+
+
+##  Plays the part of the engine by replaying the messages that the engine
+#   sent in a recording.
+class ReplayEngine:
+    def __init__(self, recording: MessageRecording) -> None:
+        self._recording = recording
+
+    ##  Pass the received messages of the recording to the message handlers,
+    #   like the back-end passes the messages from the engine to its handlers.
+    #
+    #   \param message_handlers The function to call for every message type.
+    #   \param realtime Whether to wait between the messages as long as the
+    #   engine did when they were recorded.
+    #   \return The number of messages that were replayed.
+    def replay(self, message_handlers: Dict[str, Callable[[Any], None]], realtime: bool = False) -> int:
+        start_time = time.perf_counter()
+        count = 0
+        for timestamp, direction, message in self._recording:
+            if direction != "received":
+                continue
+            if realtime:
+                time.sleep(max(0.0, start_time + timestamp - time.perf_counter()))
+            if message.getTypeName() not in message_handlers:
+                Logger.log("e", "No handler defined for message of type %s", message.getTypeName())
+                continue
+            message_handlers[message.getTypeName()](message)
+            count += 1
+        return count
@@ -24,6 +24,8 @@ from cura import LayerPolygon
 import numpy
 from time import time
 from cura.Settings.ExtrudersModel import ExtrudersModel
+
+from .SliceTelemetry import SliceTelemetry
 catalog = i18nCatalog("cura")
 
 
@@ -42,9 +44,12 @@ def colorCodeToRGBA(color_code):
 
 
 class ProcessSlicedLayersJob(Job):
-    def __init__(self, layers):
+    ##  \param layers The LayerOptimized messages from the engine.
+    #   \param telemetry Where to record how long processing the layers takes.
+    def __init__(self, layers, telemetry = None):
         super().__init__()
         self._layers = layers
+        self._telemetry = telemetry if telemetry is not None else SliceTelemetry()
         self._scene = Application.getInstance().getController().getScene()
         self._progress_message = Message(catalog.i18nc("@info:status", "Processing Layers"), 0, False, -1)
         self._abort_requested = False
@@ -107,6 +112,8 @@ class ProcessSlicedLayersJob(Job):
                 negative_layers += 1
 
         current_layer = 0
+        decode_start_time = self._telemetry.now()
+        message_bytes = 0
 
         for layer in self._layers:
             # Negative layers are offset by the minimum layer number, but the positive layers are just
@@ -154,6 +161,8 @@ class ProcessSlicedLayersJob(Job):
                     new_points[:, 1] = points[:, 2]
                     new_points[:, 2] = -points[:, 1]
 
+                message_bytes += line_types.nbytes + points.nbytes + line_widths.nbytes + line_thicknesses.nbytes + line_feedrates.nbytes
+
                 this_poly = LayerPolygon.LayerPolygon(extruder, line_types, new_points, line_widths, line_thicknesses, line_feedrates)
                 this_poly.buildCache()
 
@@ -173,6 +182,8 @@ class ProcessSlicedLayersJob(Job):
             if self._progress_message:
                 self._progress_message.setProgress(progress)
 
+        self._telemetry.addSpan("decode layers", decode_start_time, self._telemetry.now(), layers = layer_count, bytes = message_bytes)
+
         # We are done processing all the layers we got from the engine, now create a mesh out of the data
 
         # Find out colors per extruder
@@ -202,7 +213,12 @@ class ProcessSlicedLayersJob(Job):
             line_type_brightness = 0.5  # for compatibility mode
         else:
             line_type_brightness = 1.0
-        layer_mesh = layer_data.build(material_color_map, line_type_brightness)
+        preferences = Application.getInstance().getPreferences()
+        compact = bool(preferences.getValue("view/compact_layer_data"))
+        spill_threshold = int(preferences.getValue("view/layer_data_spill_threshold")) * 1024 * 1024
+        build_start_time = self._telemetry.now()
+        layer_mesh = layer_data.build(material_color_map, line_type_brightness, compact = compact, spill_threshold = spill_threshold if spill_threshold >= 0 else None)
+        self._telemetry.addSpan("build layer mesh", build_start_time, self._telemetry.now(), vertices = layer_mesh.getVertexCount())
 
         if self._abort_requested:
             if self._progress_message:
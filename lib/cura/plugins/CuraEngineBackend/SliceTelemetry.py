@@ -0,0 +1,218 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import collections
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy
+
+
+##  Records how long the stages of slicing take.
+#
+#   Stages are recorded as spans with a start and an end time. A span that
+#   starts and ends in different callbacks is opened with beginSpan and closed
+#   with endSpan by its name. A span that starts and ends in the same function
+#   can be recorded with the span context manager instead, also from other
+#   threads. Besides spans, counters (such as the number of bytes received)
+#   and instant events (such as the arrival of the first layer) are recorded.
+#
+#   The events can be exported in the Chrome trace event format, which can be
+#   opened in chrome://tracing or https://ui.perfetto.dev. For every span
+#   name, the durations of the last few spans are kept to compute percentiles
+#   over the recent slices.
+class SliceTelemetry:
+    ##  \param history_size The number of recent durations to keep per span
+    #   name, to compute the percentiles.
+    #   \param max_events The maximum number of events to keep for the trace.
+    #   When there are more, the oldest events are dropped.
+    def __init__(self, history_size: int = 50, max_events: int = 100000) -> None:
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._history_size = history_size
+
+        self._events = collections.deque(maxlen = max_events) #type: collections.deque
+        self._thread_names = {} #type: Dict[int, str]
+        self._open_spans = {} #type: Dict[str, Tuple[float, int, Dict[str, Any]]] # Start time, thread and arguments per span name.
+        self._durations = collections.OrderedDict() #type: Dict[str, collections.deque]
+        self._counters = collections.defaultdict(int) #type: Dict[str, int]
+
+    ##  The current time in seconds, in the time base of the spans.
+    def now(self) -> float:
+        return time.perf_counter()
+
+    ##  Start a span that is ended later with endSpan.
+    #
+    #   If a span with the same name was still open, it is replaced.
+    #   \param name The name of the stage.
+    #   \param args Extra information to show with the span in the trace.
+    def beginSpan(self, name: str, **args: Any) -> None:
+        start_time = self.now()
+        with self._lock:
+            self._open_spans[name] = (start_time, self._getThreadId(), args)
+
+    ##  End a span that was started with beginSpan.
+    #
+    #   \param name The name of the stage.
+    #   \param args Extra information to add to the arguments of the span.
+    #   \return The duration of the span in seconds, or None if no span with
+    #   that name was open.
+    def endSpan(self, name: str, **args: Any) -> Optional[float]:
+        end_time = self.now()
+        with self._lock:
+            if name not in self._open_spans:
+                return None
+            start_time, thread_id, span_args = self._open_spans.pop(name)
+            span_args.update(args)
+            self._addSpanEvent(name, start_time, end_time, thread_id, span_args)
+            self._addDuration(name, end_time - start_time)
+        return end_time - start_time
+
+    def isSpanOpen(self, name: str) -> bool:
+        with self._lock:
+            return name in self._open_spans
+
+    ##  End all open spans without counting them in the percentiles, for
+    #   instance because the slice was aborted.
+    #
+    #   \param reason Why the spans were cancelled, shown in the trace.
+    def cancelSpans(self, reason: str = "cancelled") -> None:
+        end_time = self.now()
+        with self._lock:
+            for name, (start_time, thread_id, span_args) in self._open_spans.items():
+                span_args["cancelled"] = reason
+                self._addSpanEvent(name, start_time, end_time, thread_id, span_args)
+            self._open_spans.clear()
+
+    ##  Record a span around a block of code.
+    #
+    #   The arguments of the span are yielded, so that information that is only
+    #   known at the end can be added to them. If the block raises an
+    #   exception, the span is recorded with the exception, but not counted in
+    #   the percentiles.
+    #   \param name The name of the stage.
+    #   \param args Extra information to show with the span in the trace.
+    @contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[Dict[str, Any]]:
+        start_time = self.now()
+        try:
+            yield args
+        except BaseException as e:
+            args["exception"] = repr(e)
+            with self._lock:
+                self._addSpanEvent(name, start_time, self.now(), self._getThreadId(), args)
+            raise
+        end_time = self.now()
+        with self._lock:
+            self._addSpanEvent(name, start_time, end_time, self._getThreadId(), args)
+            self._addDuration(name, end_time - start_time)
+
+    ##  Record a span of which the start and end time are already known.
+    #
+    #   \param name The name of the stage.
+    #   \param start_time The time the stage started, as given by now().
+    #   \param end_time The time the stage ended, as given by now().
+    #   \param args Extra information to show with the span in the trace.
+    def addSpan(self, name: str, start_time: float, end_time: float, **args: Any) -> None:
+        with self._lock:
+            self._addSpanEvent(name, start_time, end_time, self._getThreadId(), args)
+            self._addDuration(name, end_time - start_time)
+
+    ##  Record an event that has no duration.
+    def addInstant(self, name: str, **args: Any) -> None:
+        timestamp = self.now()
+        with self._lock:
+            self._events.append({"name": name, "ph": "i", "s": "p", "ts": self._toMicroseconds(timestamp), "pid": self._pid, "tid": self._getThreadId(), "args": args})
+
+    ##  Add to a counter, such as the number of bytes received.
+    #
+    #   \param name The name of the counter.
+    #   \param amount The amount to add.
+    def addCount(self, name: str, amount: int = 1) -> None:
+        timestamp = self.now()
+        with self._lock:
+            self._counters[name] += amount
+            self._events.append({"name": name, "ph": "C", "ts": self._toMicroseconds(timestamp), "pid": self._pid, "tid": self._getThreadId(), "args": {"value": self._counters[name]}})
+
+    def getCount(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    ##  Set all counters back to 0, for instance at the start of a slice.
+    #
+    #   \return The values of the counters before they were reset.
+    def resetCounts(self) -> Dict[str, int]:
+        with self._lock:
+            counters = dict(self._counters)
+            self._counters.clear()
+        return counters
+
+    ##  Get percentiles of the recent durations of a stage.
+    #
+    #   \param name The name of the stage.
+    #   \param percentiles The percentiles to compute, from 0 to 100.
+    #   \return The durations in seconds by percentile, or an empty dictionary
+    #   if the stage wasn't recorded yet.
+    def getPercentiles(self, name: str, percentiles: Sequence[float] = (50, 90, 100)) -> Dict[float, float]:
+        with self._lock:
+            durations = list(self._durations.get(name, []))
+        if not durations:
+            return {}
+        return dict(zip(percentiles, (float(value) for value in numpy.percentile(durations, percentiles))))
+
+    ##  The names of all stages that have durations recorded, in the order they
+    #   were first recorded.
+    def getSpanNames(self) -> List[str]:
+        with self._lock:
+            return list(self._durations.keys())
+
+    ##  Summarise the percentiles of all stages, to show in the log.
+    def getSummary(self) -> str:
+        lines = []
+        for name in self.getSpanNames():
+            with self._lock:
+                count = len(self._durations[name])
+            p50, p90, maximum = (self.getPercentiles(name).get(percentile, 0.0) for percentile in (50, 90, 100))
+            lines.append("{name}: p50 {p50:.3f}s, p90 {p90:.3f}s, max {maximum:.3f}s over {count} times".format(name = name, p50 = p50, p90 = p90, maximum = maximum, count = count))
+        return "\n".join(lines)
+
+    ##  Get the recorded events in the Chrome trace event format.
+    def toChromeTrace(self) -> Dict[str, Any]:
+        with self._lock:
+            events = [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": thread_id, "args": {"name": thread_name}} for thread_id, thread_name in self._thread_names.items()]
+            events.extend(self._events)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    ##  Write the recorded events to a file in the Chrome trace event format.
+    #
+    #   \param file_path The path of the JSON file to write.
+    def writeChromeTrace(self, file_path: str) -> None:
+        trace = self.toChromeTrace()
+        with open(file_path, "w", encoding = "utf-8") as f:
+            json.dump(trace, f)
+
+    ##  Should be called with the lock held.
+    def _addSpanEvent(self, name: str, start_time: float, end_time: float, thread_id: int, args: Dict[str, Any]) -> None:
+        self._events.append({"name": name, "ph": "X", "ts": self._toMicroseconds(start_time), "dur": (end_time - start_time) * 1000000, "pid": self._pid, "tid": thread_id, "args": args})
+
+    ##  Should be called with the lock held.
+    def _addDuration(self, name: str, duration: float) -> None:
+        if name not in self._durations:
+            self._durations[name] = collections.deque(maxlen = self._history_size)
+        self._durations[name].append(duration)
+
+    def _toMicroseconds(self, timestamp: float) -> float:
+        return (timestamp - self._origin) * 1000000
+
+    ##  Get the ID of the current thread, and remember its name for the trace.
+    def _getThreadId(self) -> int:
+        thread = threading.current_thread()
+        thread_id = thread.ident
+        if thread_id not in self._thread_names:
+            self._thread_names[thread_id] = thread.name
+        return thread_id
@@ -5,12 +5,13 @@ import numpy
 from string import Formatter
 from enum import IntEnum
 import time
-from typing import Any, cast, Dict, List, Optional, Set
+from typing import Any, cast, Dict, List, Optional, Set, Tuple
 import re
 import Arcus #For typing.
 
 from UM.Job import Job
 from UM.Logger import Logger
+from UM.Mesh.MeshData import MeshData #For typing.
 from UM.Settings.ContainerStack import ContainerStack #For typing.
 from UM.Settings.SettingRelation import SettingRelation #For typing.
 
@@ -22,7 +23,9 @@ from UM.Settings.SettingRelation import RelationType
 from cura.CuraApplication import CuraApplication
 from cura.Scene.CuraSceneNode import CuraSceneNode
 from cura.OneAtATimeIterator import OneAtATimeIterator
-from cura.Settings.ExtruderManager import ExtruderManager
+from cura.Settings.SettingsSnapshot import SettingsSnapshot, StackSnapshot
+
+from .SliceTelemetry import SliceTelemetry
 
 
 NON_PRINTING_MESH_SETTINGS = ["anti_overhang_mesh", "infill_mesh", "cutting_mesh"]
@@ -71,15 +74,32 @@ class GcodeStartEndFormatter(Formatter):
 
 ##  Job class that builds up the message of scene data to send to CuraEngine.
 class StartSliceJob(Job):
-    def __init__(self, slice_message: Arcus.PythonMessage) -> None:
+    ##  \param slice_message The message to fill with the scene and settings.
+    #   \param telemetry Where to record how long building the message takes.
+    def __init__(self, slice_message: Arcus.PythonMessage, telemetry: Optional[SliceTelemetry] = None) -> None:
         super().__init__()
 
         self._scene = CuraApplication.getInstance().getController().getScene() #type: Scene
         self._slice_message = slice_message #type: Arcus.PythonMessage
         self._is_cancelled = False #type: bool
         self._build_plate_number = None #type: Optional[int]
+        self._telemetry = telemetry if telemetry is not None else SliceTelemetry() #type: SliceTelemetry
+        self._vertex_bytes = 0 #type: int # Size of the vertex data in the slice message.
 
         self._all_extruders_settings = None #type: Optional[Dict[str, Any]] # cache for all setting values from all stacks (global & extruder) for the current machine
+        self._mesh_vertices_cache = {} #type: Dict[Tuple[int, bytes], Tuple[MeshData, numpy.ndarray]] # cache for the transformed vertices of meshes shared by multiple nodes
+        self._mesh_node_counts = {} #type: Dict[int, int] # the number of nodes that use each mesh data, by the id of the mesh data
+
+        # The settings are read from a snapshot that is taken here, on the main thread, so that the user can keep
+        # changing them while the job runs without the job seeing half of a change.
+        self._settings = None #type: Optional[SettingsSnapshot]
+        self._initial_extruder_position = None #type: Optional[str] # The first used extruder, of which the start g-code uses the values.
+        global_stack = CuraApplication.getInstance().getGlobalContainerStack()
+        if global_stack:
+            self._settings = SettingsSnapshot(global_stack)
+            used_extruder_stacks = CuraApplication.getInstance().getExtruderManager().getUsedExtruderStacks()
+            if used_extruder_stacks:
+                self._initial_extruder_position = used_extruder_stacks[0].getMetaDataEntry("position")
 
     def getSliceMessage(self) -> Arcus.PythonMessage:
         return self._slice_message
@@ -87,6 +107,11 @@ class StartSliceJob(Job):
     def setBuildPlate(self, build_plate_number: int) -> None:
         self._build_plate_number = build_plate_number
 
+    ##  The number of bytes of vertex data in the slice message, which is most
+    #   of what is sent to the engine.
+    def getVertexByteCount(self) -> int:
+        return self._vertex_bytes
+
     ##  Check if a stack has any errors.
     ##  returns true if it has errors, false otherwise.
     def _checkStackForErrors(self, stack: ContainerStack) -> bool:
@@ -107,10 +132,10 @@ class StartSliceJob(Job):
             self.setResult(StartJobResult.Error)
             return
 
-        stack = CuraApplication.getInstance().getGlobalContainerStack()
-        if not stack:
+        if not self._settings:
             self.setResult(StartJobResult.Error)
             return
+        stack = self._settings.getGlobalStack()
 
         # Don't slice if there is a setting with an error value.
         if CuraApplication.getInstance().getMachineManager().stacksHaveErrors:
@@ -209,9 +234,7 @@ class StartSliceJob(Job):
                 if temp_list:
                     object_groups.append(temp_list)
 
-            global_stack = CuraApplication.getInstance().getGlobalContainerStack()
-            if not global_stack:
-                return
+            global_stack = self._settings.getGlobalStack()
             extruders_enabled = {position: stack.isEnabled for position, stack in global_stack.extruders.items()}
             filtered_object_groups = []
             has_model_with_disabled_extruders = False
@@ -241,48 +264,99 @@ class StartSliceJob(Job):
                 self.setResult(StartJobResult.NothingToSlice)
                 return
 
+            settings_start_time = self._telemetry.now()
             self._buildGlobalSettingsMessage(stack)
             self._buildGlobalInheritsStackMessage(stack)
 
             # Build messages for extruder stacks
-            for extruder_stack in ExtruderManager.getInstance().getMachineExtruders(stack.getId()):
+            for extruder_stack in self._settings.getExtruderStacks():
                 self._buildExtruderMessage(extruder_stack)
 
+            start_time = self._telemetry.now()
+            self._telemetry.addSpan("serialize settings", settings_start_time, start_time)
+            object_count = 0
+            vertex_bytes = 0
+            self._countMeshNodes(filtered_object_groups)
             for group in filtered_object_groups:
                 group_message = self._slice_message.addRepeatedMessage("object_lists")
                 if group[0].getParent() is not None and group[0].getParent().callDecoration("isGroup"):
                     self._handlePerObjectSettings(group[0].getParent(), group_message)
                 for object in group:
-                    mesh_data = object.getMeshData()
-                    rot_scale = object.getWorldTransformation().getTransposed().getData()[0:3, 0:3]
-                    translate = object.getWorldTransformation().getData()[:3, 3]
-
-                    # This effectively performs a limited form of MeshData.getTransformed that ignores normals.
-                    verts = mesh_data.getVertices()
-                    verts = verts.dot(rot_scale)
-                    verts += translate
-
-                    # Convert from Y up axes to Z up axes. Equals a 90 degree rotation.
-                    verts[:, [1, 2]] = verts[:, [2, 1]]
-                    verts[:, 1] *= -1
-
                     obj = group_message.addRepeatedMessage("objects")
                     obj.id = id(object)
 
-                    indices = mesh_data.getIndices()
-                    if indices is not None:
-                        flat_verts = numpy.take(verts, indices.flatten(), axis=0)
-                    else:
-                        flat_verts = numpy.array(verts)
-
+                    flat_verts = self._buildObjectVertices(object)
                     obj.vertices = flat_verts
+                    vertex_bytes += flat_verts.nbytes
+                    object_count += 1
 
                     self._handlePerObjectSettings(object, obj)
 
                     Job.yieldThread()
 
+            end_time = self._telemetry.now()
+            self._telemetry.addSpan("serialize meshes", start_time, end_time, objects = object_count, meshes = len(self._mesh_node_counts), bytes = vertex_bytes)
+            self._vertex_bytes = vertex_bytes
+            Logger.log("d", "Sending %s objects using %s unique meshes (%s bytes of vertex data) took %s seconds", object_count, len(self._mesh_node_counts), vertex_bytes, end_time - start_time)
+            self._mesh_vertices_cache.clear()
+            self._mesh_node_counts.clear()
+
         self.setResult(StartJobResult.Finished)
 
+    ##  Count how many of the nodes to slice use each mesh data.
+    #
+    #   \param object_groups The groups of nodes to slice.
+    def _countMeshNodes(self, object_groups: List[List[CuraSceneNode]]) -> None:
+        for group in object_groups:
+            for node in group:
+                mesh_id = id(node.getMeshData())
+                self._mesh_node_counts[mesh_id] = self._mesh_node_counts.get(mesh_id, 0) + 1
+
+    ##  Get the vertices of a node in the coordinate system of the engine, with
+    #   every face as three separate vertices.
+    #
+    #   Copies of an object (for instance created with "Multiply Selected")
+    #   share their mesh data and usually differ only in translation. The
+    #   rotated, scaled and unindexed vertices of meshes that are used by more
+    #   than one node (see _countMeshNodes) are therefore cached per mesh and
+    #   orientation, so that each copy only costs a single addition. Meshes of
+    #   a single node are not cached, since that would only keep a second copy
+    #   of their vertices in memory.
+    #   \param node The node to get the vertices of.
+    #   \return A numpy array with the vertices of the node.
+    def _buildObjectVertices(self, node: CuraSceneNode) -> numpy.ndarray:
+        mesh_data = node.getMeshData()
+        world_transformation = node.getWorldTransformation().getData()
+        rot_scale = world_transformation[0:3, 0:3].transpose()
+        translate = world_transformation[:3, 3]
+        # The translation, converted from Y up axes to Z up axes.
+        engine_translate = numpy.array([translate[0], -translate[2], translate[1]])
+
+        cache_key = (id(mesh_data), rot_scale.tobytes())
+        if cache_key in self._mesh_vertices_cache:
+            flat_verts = self._mesh_vertices_cache[cache_key][1]
+            return flat_verts + engine_translate.astype(flat_verts.dtype)
+
+        # This effectively performs a limited form of MeshData.getTransformed that ignores normals.
+        verts = mesh_data.getVertices()
+        verts = verts.dot(rot_scale)
+
+        # Convert from Y up axes to Z up axes. Equals a 90 degree rotation.
+        verts[:, [1, 2]] = verts[:, [2, 1]]
+        verts[:, 1] *= -1
+
+        indices = mesh_data.getIndices()
+        if indices is not None:
+            verts = numpy.take(verts, indices.flatten(), axis=0)
+
+        if self._mesh_node_counts.get(id(mesh_data), 0) > 1:
+            # Keep a reference to the mesh data, so its id can't be reused while it is in the cache.
+            self._mesh_vertices_cache[cache_key] = (mesh_data, verts)
+            return verts + engine_translate.astype(verts.dtype)
+
+        verts += engine_translate.astype(verts.dtype)
+        return verts
+
     def cancel(self) -> None:
         super().cancel()
         self._is_cancelled = True
@@ -300,7 +374,7 @@ class StartSliceJob(Job):
     #   with.
     #   \return A dictionary of replacement tokens to the values they should be
     #   replaced with.
-    def _buildReplacementTokens(self, stack: ContainerStack) -> Dict[str, Any]:
+    def _buildReplacementTokens(self, stack: StackSnapshot) -> Dict[str, Any]:
         result = {}
         for key in stack.getAllKeys():
             value = stack.getProperty(key, "value")
@@ -313,25 +387,31 @@ class StartSliceJob(Job):
         result["date"] = time.strftime("%d-%m-%Y")
         result["day"] = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"][int(time.strftime("%w"))]
 
-        initial_extruder_stack = CuraApplication.getInstance().getExtruderManager().getUsedExtruderStacks()[0]
-        initial_extruder_nr = initial_extruder_stack.getProperty("extruder_nr", "value")
-        result["initial_extruder_nr"] = initial_extruder_nr
+        result["initial_extruder_nr"] = self._getInitialExtruderNr()
 
         return result
 
+    ##  Get the extruder number of the first used extruder, of which the start
+    #   g-code uses the values by default.
+    def _getInitialExtruderNr(self) -> Any:
+        initial_extruder_stack = cast(SettingsSnapshot, self._settings).getExtruderStack(cast(str, self._initial_extruder_position))
+        if initial_extruder_stack is None:
+            raise IndexError("There is no used extruder to start the print with.")
+        return initial_extruder_stack.getProperty("extruder_nr", "value")
+
     ##  Replace setting tokens in a piece of g-code.
     #   \param value A piece of g-code to replace tokens in.
     #   \param default_extruder_nr Stack nr to use when no stack nr is specified, defaults to the global stack
     def _expandGcodeTokens(self, value: str, default_extruder_nr: int = -1) -> str:
         if not self._all_extruders_settings:
-            global_stack = cast(ContainerStack, CuraApplication.getInstance().getGlobalContainerStack())
+            settings_snapshot = cast(SettingsSnapshot, self._settings)
 
             # NB: keys must be strings for the string formatter
             self._all_extruders_settings = {
-                "-1": self._buildReplacementTokens(global_stack)
+                "-1": self._buildReplacementTokens(settings_snapshot.getGlobalStack())
             }
 
-            for extruder_stack in ExtruderManager.getInstance().getMachineExtruders(global_stack.getId()):
+            for extruder_stack in settings_snapshot.getExtruderStacks():
                 extruder_nr = extruder_stack.getProperty("extruder_nr", "value")
                 self._all_extruders_settings[str(extruder_nr)] = self._buildReplacementTokens(extruder_stack)
 
@@ -346,14 +426,15 @@ class StartSliceJob(Job):
             return str(value)
 
     ##  Create extruder message from stack
-    def _buildExtruderMessage(self, stack: ContainerStack) -> None:
+    def _buildExtruderMessage(self, stack: StackSnapshot) -> None:
         message = self._slice_message.addRepeatedMessage("extruders")
         message.id = int(stack.getMetaDataEntry("position"))
 
         settings = self._buildReplacementTokens(stack)
 
         # Also send the material GUID. This is a setting in fdmprinter, but we have no interface for it.
-        settings["material_guid"] = stack.material.getMetaDataEntry("GUID", "")
+        material = stack.findContainer({"type": "material"})
+        settings["material_guid"] = material.getMetaDataEntry("GUID", "") if material else ""
 
         # Replace the setting tokens in start and end g-code.
         extruder_nr = stack.getProperty("extruder_nr", "value")
@@ -373,7 +454,7 @@ class StartSliceJob(Job):
     #
     #   The settings are taken from the global stack. This does not include any
     #   per-extruder settings or per-object settings.
-    def _buildGlobalSettingsMessage(self, stack: ContainerStack) -> None:
+    def _buildGlobalSettingsMessage(self, stack: StackSnapshot) -> None:
         settings = self._buildReplacementTokens(stack)
 
         # Pre-compute material material_bed_temp_prepend and material_print_temp_prepend
@@ -387,8 +468,7 @@ class StartSliceJob(Job):
 
         # Replace the setting tokens in start and end g-code.
         # Use values from the first used extruder by default so we get the expected temperatures
-        initial_extruder_stack = CuraApplication.getInstance().getExtruderManager().getUsedExtruderStacks()[0]
-        initial_extruder_nr = initial_extruder_stack.getProperty("extruder_nr", "value")
+        initial_extruder_nr = self._getInitialExtruderNr()
 
         settings["machine_start_gcode"] = self._expandGcodeTokens(settings["machine_start_gcode"], initial_extruder_nr)
         settings["machine_end_gcode"] = self._expandGcodeTokens(settings["machine_end_gcode"], initial_extruder_nr)
@@ -408,7 +488,7 @@ class StartSliceJob(Job):
     #
     #   \param stack The global stack with all settings, from which to read the
     #   limit_to_extruder property.
-    def _buildGlobalInheritsStackMessage(self, stack: ContainerStack) -> None:
+    def _buildGlobalInheritsStackMessage(self, stack: StackSnapshot) -> None:
         for key in stack.getAllKeys():
             extruder_position = int(round(float(stack.getProperty(key, "limit_to_extruder"))))
             if extruder_position >= 0:  # Set to a specific extruder.
@@ -449,7 +529,7 @@ class StartSliceJob(Job):
 
             # Check if limited to a specific extruder, but not overridden by per-object settings.
             if extruder >= 0 and key not in changed_setting_keys:
-                limited_stack = ExtruderManager.getInstance().getActiveExtruderStacks()[extruder]
+                limited_stack = cast(SettingsSnapshot, self._settings).getExtruderStack(str(extruder))
             else:
                 limited_stack = stack
 
@@ -0,0 +1,423 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+##  Benchmarks of the slicing pipeline without the engine.
+#
+#   A recording of the messages of a slice is replayed: the scene and the
+#   settings are rebuilt from the recorded slice message to run the
+#   StartSliceJob, and the messages from the engine are replayed with the
+#   ReplayEngine to run the ProcessSlicedLayersJob and the FlavorParser.
+#
+#   By default a synthetic recording is generated. To benchmark a real slice,
+#   record it by starting Cura with CURA_ENGINE_RECORDING set to a file path,
+#   and run these tests with CURA_REPLAY_RECORDING set to that path. The time
+#   and peak memory of every stage are written as JSON to the file in
+#   CURA_BENCHMARK_REPORT if it is set. The tests check that the peak memory
+#   of the stages stays within a bound relative to the size of their input.
+
+import ast
+import json
+import os.path
+import platform
+import sys
+import time
+import tracemalloc
+from unittest.mock import MagicMock, patch
+
+import numpy
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import UM.Application #Needs to be imported before the plug-ins to prevent a circular import.
+from UM.Application import Application
+from UM.Mesh.MeshData import MeshData
+from UM.Scene.Scene import Scene
+from UM.Scene.SceneNodeDecorator import SceneNodeDecorator
+from UM.View.GL.OpenGLContext import OpenGLContext
+
+from cura.CuraApplication import CuraApplication
+from cura.LayerPolygon import LayerPolygon
+from cura.Scene.BuildPlateDecorator import BuildPlateDecorator
+from cura.Scene.CuraSceneNode import CuraSceneNode
+from cura.Scene.SliceableObjectDecorator import SliceableObjectDecorator
+from cura.Settings.ExtruderManager import ExtruderManager
+
+from CuraEngineBackend.MessageRecording import MessageRecorder, MessageRecording, ProtocolSchema, RecordedMessage, ReplayEngine #The modules we're testing.
+from CuraEngineBackend.ProcessSlicedLayersJob import ProcessSlicedLayersJob
+from CuraEngineBackend.StartSliceJob import StartSliceJob, StartJobResult
+
+schema = ProtocolSchema.fromFile(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Cura.proto"))
+
+
+##  Measures the time and peak memory of the stages of the pipeline, and
+#   reports them in a machine-readable format.
+class BenchmarkReport:
+    def __init__(self):
+        self._stages = []
+
+    ##  Measure a stage.
+    #
+    #   The stage is run twice: once to measure the time, and once to measure
+    #   the peak memory, since tracing the memory slows Python down.
+    #   \param name The name of the stage.
+    #   \param function The function that runs the stage. It must give the
+    #   same result every time.
+    #   \param details Extra information to report, like the size of the input.
+    #   \return The result of the function.
+    def measure(self, name, function, **details):
+        start_time = time.perf_counter()
+        result = function()
+        duration = time.perf_counter() - start_time
+
+        tracemalloc.start()
+        try:
+            function()
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        stage = {"stage": name, "seconds": duration, "peak_memory_bytes": peak_memory}
+        stage.update(details)
+        self._stages.append(stage)
+        return result
+
+    ##  Get the peak memory of a stage that was measured, in bytes.
+    def getPeakMemory(self, name):
+        return next(stage["peak_memory_bytes"] for stage in self._stages if stage["stage"] == name)
+
+    ##  Write the report to the file in CURA_BENCHMARK_REPORT, if it is set.
+    def write(self):
+        file_path = os.environ.get("CURA_BENCHMARK_REPORT")
+        if not file_path:
+            return
+        report = {
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "machine": platform.machine(),
+            "stages": self._stages
+        }
+        with open(file_path, "w", encoding = "utf-8") as f:
+            json.dump(report, f, indent = 2)
+
+@pytest.fixture(scope = "module")
+def report():
+    result = BenchmarkReport()
+    yield result
+    result.write()
+
+##  A container with the setting values of a recorded slice message.
+#
+#   The values are sent to the engine as strings, so they are converted back
+#   to Python values where possible. It serves as the definition of the stack
+#   as well, since there is nothing else to get the settings from.
+class RecordedSettings:
+    def __init__(self, settings, container_id):
+        self._id = container_id
+        self._settings = {}
+        for key, value in settings.items():
+            try:
+                self._settings[key] = ast.literal_eval(value)
+            except (ValueError, SyntaxError):
+                self._settings[key] = value
+
+    def getId(self):
+        return self._id
+
+    def getAllKeys(self):
+        return set(self._settings.keys())
+
+    def findDefinitions(self, key):
+        return [key] if key in self._settings else []
+
+    def getProperty(self, key, property_name, context = None):
+        if property_name == "value":
+            return self._settings.get(key)
+        if property_name == "limit_to_extruder":
+            return "-1"
+        if property_name == "settable_per_extruder":
+            return True
+        return None
+
+    def hasProperty(self, key, property_name):
+        return self.getProperty(key, property_name) is not None
+
+    def getMetaDataEntry(self, key, default = None):
+        return default
+
+    def getMetaData(self):
+        return {}
+
+##  A container stack with the setting values of a recorded slice message.
+class RecordedStack:
+    def __init__(self, settings, position = "0", extruders = None):
+        self.definition = RecordedSettings(settings, "recorded_settings_" + position)
+        self._position = position
+        self.extruders = extruders or {}
+        self.isEnabled = True
+        self.material = MagicMock()
+        self.material.getMetaDataEntry = lambda key, default = None: default
+
+    def getId(self):
+        return "recorded_" + self._position
+
+    def getContainers(self):
+        return [self.definition]
+
+    def getAllKeys(self):
+        return self.definition.getAllKeys()
+
+    def getProperty(self, key, property_name):
+        return self.definition.getProperty(key, property_name)
+
+    def getMetaDataEntry(self, key, default = None):
+        return self._position if key == "position" else default
+
+    def getMetaData(self):
+        return {"position": self._position}
+
+##  Gives every node of a recorded scene the first extruder.
+class ExtruderPositionDecorator(SceneNodeDecorator):
+    def getActiveExtruderPosition(self):
+        return "0"
+
+##  Get the setting values of a setting list message.
+def getSettings(setting_list):
+    settings = {}
+    for index in range(setting_list.repeatedMessageCount("settings")):
+        setting = setting_list.getRepeatedMessage("settings", index)
+        settings[setting.name] = setting.value.decode("utf-8")
+    return settings
+
+##  Create the objects of a recorded slice message as scene nodes.
+#
+#   The vertices are converted back from the coordinate system of the engine,
+#   so that the StartSliceJob makes the same vertices out of them again.
+def createScene(slice_message):
+    scene = Scene()
+    for list_index in range(slice_message.repeatedMessageCount("object_lists")):
+        object_list = slice_message.getRepeatedMessage("object_lists", list_index)
+        for object_index in range(object_list.repeatedMessageCount("objects")):
+            engine_vertices = numpy.frombuffer(object_list.getRepeatedMessage("objects", object_index).vertices, dtype = numpy.float32).reshape((-1, 3))
+            vertices = numpy.empty_like(engine_vertices)
+            vertices[:, 0] = engine_vertices[:, 0]
+            vertices[:, 1] = engine_vertices[:, 2]
+            vertices[:, 2] = -engine_vertices[:, 1]
+
+            node = CuraSceneNode(no_setting_override = True)
+            node.setMeshData(MeshData(vertices = vertices))
+            node.addDecorator(SliceableObjectDecorator())
+            node.addDecorator(BuildPlateDecorator(0))
+            node.addDecorator(ExtruderPositionDecorator())
+            scene.getRoot().addChild(node)
+    return scene
+
+##  Create an application without a window that has the scene and the
+#   settings of a recorded slice message.
+def createApplication(slice_message):
+    extruder_settings = getSettings(slice_message.getRepeatedMessage("extruders", 0).getMessage("settings"))
+    extruder_stack = RecordedStack(extruder_settings)
+    global_stack = RecordedStack(getSettings(slice_message.getMessage("global_settings")), position = "-1", extruders = {"0": extruder_stack})
+
+    preferences = {"view/compact_layer_data": False, "view/layer_data_spill_threshold": -1, "view/force_layer_view_compatibility_mode": False, "gcodereader/show_caution": False}
+    application = MagicMock()
+    application.getController().getScene.return_value = createScene(slice_message)
+    application.getGlobalContainerStack.return_value = global_stack
+    application.getMachineManager().stacksHaveErrors = False
+    application.getMachineManager().variantBuildplateCompatible = True
+    application.getMachineManager().defaultExtruderPosition = "0"
+    application.getBuildVolume().hasErrors.return_value = False
+    application.getMultiBuildPlateModel().activeBuildPlate = 0
+    application.getExtruderManager().getUsedExtruderStacks.return_value = [extruder_stack]
+    application.getPreferences().getValue.side_effect = preferences.get
+
+    extruder_manager = MagicMock()
+    extruder_manager.getMachineExtruders.return_value = [extruder_stack]
+    extruder_manager.getExtruderStacks.return_value = [extruder_stack]
+    return application, extruder_manager
+
+##  Generate a recording of a slice, with a slice message and the messages
+#   that the engine sends back.
+#
+#   \param object_count The number of models in the scene.
+#   \param layer_count The number of layers of the print.
+#   \param segments_per_layer The number of path segments in every layer.
+#   \param lines_per_segment The number of lines in every path segment.
+def createRecording(object_count, layer_count, segments_per_layer, lines_per_segment):
+    random = numpy.random.RandomState(1337)
+    recording = MessageRecording(schema)
+
+    slice_message = RecordedMessage(schema, "cura.proto.Slice")
+    object_list = slice_message.addRepeatedMessage("object_lists")
+    for object_index in range(object_count):
+        vertices = random.uniform(0, 20, (3000, 3)).astype(numpy.float32) #1000 triangles.
+        vertices[:, 0:2] += (object_index % 10) * 20 #Spread them over the build plate.
+        scene_object = object_list.addRepeatedMessage("objects")
+        scene_object.id = object_index
+        scene_object.vertices = vertices
+    settings = {
+        "print_sequence": "all_at_once",
+        "material_bed_temperature": 60,
+        "material_bed_temperature_layer_0": 60,
+        "material_print_temperature": 200,
+        "material_diameter": 1.75,
+        "machine_start_gcode": "G28 ;Home\nM109 S{material_print_temperature}",
+        "machine_end_gcode": "M104 S0\nM140 S0",
+        "machine_extruder_start_code": "",
+        "machine_extruder_end_code": "",
+        "machine_center_is_zero": False,
+        "machine_width": 200,
+        "machine_depth": 200,
+        "machine_acceleration": 3000,
+        "machine_max_jerk_xy": 20,
+        "machine_nozzle_offset_x": 0,
+        "machine_nozzle_offset_y": 0,
+        "extruder_nr": 0
+    }
+    for index in range(600): #About as many settings as a real printer has.
+        settings["setting_{index}".format(index = index)] = index * 0.1
+    for setting_list in [slice_message.getMessage("global_settings"), slice_message.addRepeatedMessage("extruders").getMessage("settings")]:
+        for key, value in settings.items():
+            setting = setting_list.addRepeatedMessage("settings")
+            setting.name = key
+            setting.value = str(value).encode("utf-8")
+    recording.addMessage(slice_message, "sent")
+
+    prefix = RecordedMessage(schema, "cura.proto.GCodePrefix")
+    prefix.data = b";FLAVOR:Marlin\n;Generated for the benchmark\n"
+    recording.addMessage(prefix)
+    types = [LayerPolygon.Inset0Type, LayerPolygon.InsetXType, LayerPolygon.SkinType, LayerPolygon.InfillType]
+    type_names = {LayerPolygon.Inset0Type: "WALL-OUTER", LayerPolygon.InsetXType: "WALL-INNER", LayerPolygon.SkinType: "SKIN", LayerPolygon.InfillType: "FILL"}
+    extrusion = 0.0
+    for layer_number in range(layer_count):
+        layer = RecordedMessage(schema, "cura.proto.LayerOptimized")
+        layer.id = layer_number
+        layer.height = 300 + layer_number * 100
+        layer.thickness = 100
+        gcode = [";LAYER:{layer_number}".format(layer_number = layer_number), "G0 F3000 Z{z:.2f}".format(z = 0.3 + layer_number * 0.1)]
+        for segment_index in range(segments_per_layer):
+            segment_type = types[segment_index % len(types)]
+            points = random.uniform(0, 200, (lines_per_segment + 1, 2)).astype(numpy.float32)
+            segment = layer.addRepeatedMessage("path_segment")
+            segment.extruder = 0
+            segment.point_type = 0
+            segment.points = points
+            segment.line_type = numpy.full(lines_per_segment, segment_type, dtype = numpy.uint8)
+            segment.line_width = numpy.full(lines_per_segment, 0.4, dtype = numpy.float32)
+            segment.line_thickness = numpy.full(lines_per_segment, 0.1, dtype = numpy.float32)
+            segment.line_feedrate = numpy.full(lines_per_segment, 50, dtype = numpy.float32)
+
+            gcode.append(";TYPE:" + type_names[segment_type])
+            gcode.append("G0 X{x:.3f} Y{y:.3f}".format(x = points[0, 0], y = points[0, 1]))
+            for x, y in points[1:]:
+                extrusion += 0.05
+                gcode.append("G1 X{x:.3f} Y{y:.3f} E{e:.5f}".format(x = x, y = y, e = extrusion))
+        recording.addMessage(layer)
+        gcode_message = RecordedMessage(schema, "cura.proto.GCodeLayer")
+        gcode_message.data = ("\n".join(gcode) + "\n").encode("utf-8")
+        recording.addMessage(gcode_message)
+
+    estimates = RecordedMessage(schema, "cura.proto.PrintTimeMaterialEstimates")
+    estimates.time_infill = 1000.0
+    estimates.addRepeatedMessage("materialEstimates").material_amount = extrusion
+    recording.addMessage(estimates)
+    recording.addMessage(RecordedMessage(schema, "cura.proto.SlicingFinished"))
+    return recording
+
+##  The recording to benchmark: the one in CURA_REPLAY_RECORDING, or a
+#   generated one that is written to a file and read back.
+@pytest.fixture(scope = "module")
+def recording(tmpdir_factory, report):
+    file_path = os.environ.get("CURA_REPLAY_RECORDING")
+    if not file_path:
+        file_path = str(tmpdir_factory.mktemp("recording").join("slice.json.gz"))
+        recorder = MessageRecorder(file_path, schema)
+        for _, direction, message in createRecording(object_count = 50, layer_count = 200, segments_per_layer = 20, lines_per_segment = 50):
+            recorder.record(message, direction)
+        recorder.close()
+    return report.measure("load recording", lambda: MessageRecording.load(file_path, schema), file_bytes = os.path.getsize(file_path))
+
+##  The messages of the engine, as the back-end collects them.
+@pytest.fixture(scope = "module")
+def replayed(recording, report):
+    def replay():
+        result = {"layers": [], "gcode": [], "estimates": []}
+        handlers = {
+            "cura.proto.LayerOptimized": result["layers"].append,
+            "cura.proto.Progress": lambda message: None,
+            "cura.proto.GCodeLayer": lambda message: result["gcode"].append(message.data.decode("utf-8", "replace")),
+            "cura.proto.GCodePrefix": lambda message: result["gcode"].insert(0, message.data.decode("utf-8", "replace")),
+            "cura.proto.PrintTimeMaterialEstimates": result["estimates"].append,
+            "cura.proto.SlicingFinished": lambda message: None
+        }
+        result["message_count"] = ReplayEngine(recording).replay(handlers)
+        return result
+    return report.measure("replay engine messages", replay, messages = len(recording.getMessages("received")))
+
+@pytest.fixture(scope = "module")
+def application(recording):
+    application, extruder_manager = createApplication(recording.getSliceMessage())
+    with patch.object(Application, "getInstance", MagicMock(return_value = application)):
+        with patch.object(CuraApplication, "getInstance", MagicMock(return_value = application)):
+            with patch.object(ExtruderManager, "getInstance", MagicMock(return_value = extruder_manager)):
+                with patch.object(OpenGLContext, "isLegacyOpenGL", MagicMock(return_value = False)):
+                    with patch.object(LayerPolygon, "getColorMap", MagicMock(return_value = numpy.ones((11, 4)))): #Instead of the colours from the theme.
+                        with patch("cura.Scene.CuraSceneNode.SettingOverrideDecorator", ExtruderPositionDecorator): #Instead of a per-object stack in the container registry.
+                            yield application
+
+def test_recordingRoundTrip():
+    original = createRecording(object_count = 2, layer_count = 3, segments_per_layer = 2, lines_per_segment = 5)
+    copy = MessageRecording(schema)
+    for _, direction, message in original:
+        copy.addMessage(schema.deserialize(message.getTypeName(), schema.serialize(message)), direction)
+
+    assert [schema.serialize(message) for message in copy.getMessages()] == [schema.serialize(message) for message in original.getMessages()]
+    layer = copy.getMessages("received", "cura.proto.LayerOptimized")[2]
+    assert layer.id == 2
+    assert layer.repeatedMessageCount("path_segment") == 2
+    assert len(layer.getRepeatedMessage("path_segment", 1).points) == 6 * 2 * 4 #6 points of 2 floats.
+    assert copy.getSliceMessage().getMessage("global_settings").repeatedMessageCount("settings") > 600
+
+def test_protocolSchema():
+    assert schema.getFields("cura.proto.Slice")["object_lists"] == ("cura.proto.ObjectList", True)
+    assert schema.getFields("cura.proto.PathSegment")["point_type"] == ("int32", False) #Enums are sent as integers.
+    assert schema.getFields("cura.proto.GCodeLayer") == {"data": ("bytes", False)}
+
+def test_benchmarkStartSliceJob(recording, application, report):
+    recorded_message = recording.getSliceMessage()
+    def startSlice():
+        job = StartSliceJob(RecordedMessage(schema, "cura.proto.Slice"))
+        job.setBuildPlate(0)
+        job.run()
+        return job
+    job = report.measure("StartSliceJob", startSlice, objects = recorded_message.getRepeatedMessage("object_lists", 0).repeatedMessageCount("objects"))
+
+    assert job.getResult() == StartJobResult.Finished
+    recorded_objects = recorded_message.getRepeatedMessage("object_lists", 0)
+    objects = job.getSliceMessage().getRepeatedMessage("object_lists", 0)
+    assert objects.repeatedMessageCount("objects") == recorded_objects.repeatedMessageCount("objects")
+    for index in range(objects.repeatedMessageCount("objects")):
+        assert numpy.frombuffer(objects.getRepeatedMessage("objects", index).vertices, dtype = numpy.float32) == pytest.approx(numpy.frombuffer(recorded_objects.getRepeatedMessage("objects", index).vertices, dtype = numpy.float32))
+    vertex_bytes = sum(len(objects.getRepeatedMessage("objects", index).vertices) for index in range(objects.repeatedMessageCount("objects")))
+    assert report.getPeakMemory("StartSliceJob") < 2 * vertex_bytes #Little more than the vertices that are sent.
+
+def test_benchmarkProcessSlicedLayersJob(replayed, application, report):
+    def processLayers():
+        job = ProcessSlicedLayersJob(replayed["layers"])
+        job.setBuildPlate(0)
+        job.run()
+        return application.getBuildVolume().addChild.call_args[0][0]
+    node = report.measure("ProcessSlicedLayersJob", processLayers, layers = len(replayed["layers"]))
+
+    assert node.callDecoration("getLayerData").getLayer(len(replayed["layers"]) - 1) is not None
+    line_count = sum(len(layer.getRepeatedMessage("path_segment", index).line_type) for layer in replayed["layers"] for index in range(layer.repeatedMessageCount("path_segment")))
+    assert report.getPeakMemory("ProcessSlicedLayersJob") < 500 * line_count #About 270 bytes per line.
+
+def test_benchmarkFlavorParser(replayed, application, report):
+    from GCodeReader.FlavorParser import FlavorParser #Only with the application, since the plug-in creates parsers when it's imported.
+    gcode = "".join(replayed["gcode"])
+    node = report.measure("FlavorParser", lambda: FlavorParser().processGCodeStream(gcode), gcode_bytes = len(gcode))
+
+    layer_data = node.callDecoration("getLayerData")
+    assert len(layer_data.getLayers()) == len(replayed["layers"])
+    assert report.getPeakMemory("FlavorParser") < 20 * len(gcode) #About 14 times the size of the g-code.
@@ -0,0 +1,125 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import json
+import os.path
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import SliceTelemetry #The module we're testing.
+
+
+def test_beginEndSpan():
+    telemetry = SliceTelemetry.SliceTelemetry()
+    telemetry.beginSpan("engine slicing", build_plate = 0)
+    assert telemetry.isSpanOpen("engine slicing")
+    time.sleep(0.01)
+    duration = telemetry.endSpan("engine slicing", layers = 12)
+
+    assert duration >= 0.01
+    assert not telemetry.isSpanOpen("engine slicing")
+    assert telemetry.endSpan("engine slicing") is None #Not open any more.
+    events = [event for event in telemetry.toChromeTrace()["traceEvents"] if event["ph"] == "X"]
+    assert len(events) == 1
+    assert events[0]["name"] == "engine slicing"
+    assert events[0]["dur"] == pytest.approx(duration * 1000000)
+    assert events[0]["args"] == {"build_plate": 0, "layers": 12}
+
+def test_spanContextManager():
+    telemetry = SliceTelemetry.SliceTelemetry()
+    with telemetry.span("serialize meshes") as args:
+        args["bytes"] = 1234
+    with pytest.raises(ValueError):
+        with telemetry.span("serialize meshes"):
+            raise ValueError("Failed!")
+
+    events = [event for event in telemetry.toChromeTrace()["traceEvents"] if event["ph"] == "X"]
+    assert events[0]["args"] == {"bytes": 1234}
+    assert "ValueError" in events[1]["args"]["exception"]
+    assert len(telemetry._durations["serialize meshes"]) == 1 #The failed span doesn't count in the percentiles.
+
+def test_cancelSpans():
+    telemetry = SliceTelemetry.SliceTelemetry()
+    telemetry.beginSpan("slice")
+    telemetry.beginSpan("StartSliceJob")
+    telemetry.cancelSpans("terminated")
+
+    assert not telemetry.isSpanOpen("slice")
+    assert telemetry.getSpanNames() == [] #Cancelled spans have no durations.
+    events = [event for event in telemetry.toChromeTrace()["traceEvents"] if event["ph"] == "X"]
+    assert sorted(event["name"] for event in events) == ["StartSliceJob", "slice"]
+    assert all(event["args"]["cancelled"] == "terminated" for event in events)
+
+def test_counters():
+    telemetry = SliceTelemetry.SliceTelemetry()
+    telemetry.addCount("g-code bytes", 100)
+    telemetry.addCount("g-code bytes", 50)
+    telemetry.addCount("layer message")
+
+    assert telemetry.getCount("g-code bytes") == 150
+    assert telemetry.resetCounts() == {"g-code bytes": 150, "layer message": 1}
+    assert telemetry.getCount("g-code bytes") == 0
+    counter_events = [event for event in telemetry.toChromeTrace()["traceEvents"] if event["ph"] == "C"]
+    assert [event["args"]["value"] for event in counter_events] == [100, 150, 1] #The running total.
+
+def test_percentiles():
+    telemetry = SliceTelemetry.SliceTelemetry(history_size = 10)
+    assert telemetry.getPercentiles("slice") == {}
+    for duration in range(20): #Only the last 10 are kept.
+        telemetry.addSpan("slice", 0, duration)
+
+    percentiles = telemetry.getPercentiles("slice", (50, 90, 100))
+    assert percentiles[50] == pytest.approx(14.5)
+    assert percentiles[90] == pytest.approx(18.1)
+    assert percentiles[100] == 19
+    assert "slice: p50 14.500s, p90 18.100s, max 19.000s over 10 times" in telemetry.getSummary()
+
+def test_maxEvents():
+    telemetry = SliceTelemetry.SliceTelemetry(max_events = 5)
+    for _ in range(10):
+        telemetry.addInstant("first layer message")
+
+    events = [event for event in telemetry.toChromeTrace()["traceEvents"] if event["ph"] != "M"]
+    assert len(events) == 5
+
+##  Spans from different threads get the ID and the name of their thread.
+def test_threads(tmpdir):
+    telemetry = SliceTelemetry.SliceTelemetry()
+    def recordSpan():
+        with telemetry.span("decode layers"):
+            pass
+    thread = threading.Thread(target = recordSpan, name = "ProcessSlicedLayersJob")
+    thread.start()
+    thread.join()
+    telemetry.addInstant("first layer message")
+
+    file_path = str(tmpdir.join("trace.json"))
+    telemetry.writeChromeTrace(file_path)
+    with open(file_path, encoding = "utf-8") as f:
+        trace = json.load(f)
+
+    thread_names = {event["tid"]: event["args"]["name"] for event in trace["traceEvents"] if event["ph"] == "M"}
+    span = next(event for event in trace["traceEvents"] if event["ph"] == "X")
+    instant = next(event for event in trace["traceEvents"] if event["ph"] == "i")
+    assert thread_names[span["tid"]] == "ProcessSlicedLayersJob"
+    assert thread_names[instant["tid"]] == threading.current_thread().name
+
+##  Recording happens for every message from the engine, so it must be cheap.
+#
+#   It takes about 4µs per message. Require less than 20µs, which is still
+#   negligible next to handling the message itself.
+def test_benchmarkCounters():
+    telemetry = SliceTelemetry.SliceTelemetry()
+    count = 100000
+    start_time = time.time()
+    for _ in range(count):
+        telemetry.addCount("g-code bytes", 1000)
+    duration = time.time() - start_time
+
+    assert telemetry.getCount("g-code bytes") == count * 1000
+    assert duration / count < 20e-6
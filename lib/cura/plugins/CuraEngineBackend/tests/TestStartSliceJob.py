@@ -0,0 +1,87 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import os.path
+import sys
+import time
+import tracemalloc
+from unittest.mock import MagicMock, patch
+
+import numpy
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import cura.CuraApplication #Needs to be imported before the plug-in to prevent a circular import.
+from UM.Math.Vector import Vector
+from UM.Mesh.MeshData import MeshData
+from cura.CuraApplication import CuraApplication
+from cura.Scene.CuraSceneNode import CuraSceneNode
+
+from CuraEngineBackend.StartSliceJob import StartSliceJob #The module we're testing.
+
+
+##  Create copies of a model, like "Multiply Selected" makes them.
+#
+#   \param copy_count The number of copies.
+#   \param share_mesh Whether the copies share their mesh data, as copies made
+#   by the MultiplyObjectsJob do, or each have mesh data of their own.
+def createCopies(copy_count, share_mesh):
+    random = numpy.random.RandomState(1337)
+    vertices = random.uniform(0, 10, (5000, 3)).astype(numpy.float32)
+    indices = random.randint(0, 5000, (10000, 3)).astype(numpy.int32) #10000 triangles.
+    mesh_data = MeshData(vertices = vertices, indices = indices)
+
+    nodes = []
+    for copy_index in range(copy_count):
+        node = CuraSceneNode(no_setting_override = True)
+        node.setMeshData(mesh_data if share_mesh else MeshData(vertices = vertices.copy(), indices = indices.copy()))
+        node.setPosition(Vector((copy_index % 15) * 12, 0, (copy_index // 15) * 12))
+        nodes.append(node)
+    return nodes
+
+##  Build the vertices of all nodes, like StartSliceJob.run does.
+def buildVertices(nodes):
+    with patch.object(CuraApplication, "getInstance", MagicMock()):
+        job = StartSliceJob(MagicMock())
+    job._countMeshNodes([nodes])
+    return [job._buildObjectVertices(node) for node in nodes]
+
+##  The vertices of a node are its mesh moved to its position, without
+#   indices, in the coordinate system of the engine.
+def test_buildObjectVertices():
+    nodes = createCopies(2, share_mesh = True)
+    mesh_data = nodes[1].getMeshData()
+
+    vertices = buildVertices(nodes)[1]
+
+    expected = mesh_data.getVertices()[mesh_data.getIndices().flatten()] + numpy.array([12, 0, 0], dtype = numpy.float32)
+    assert vertices.shape == (30000, 3)
+    assert vertices[:, 0] == pytest.approx(expected[:, 0])
+    assert vertices[:, 1] == pytest.approx(-expected[:, 2]) #Z up in the engine.
+    assert vertices[:, 2] == pytest.approx(expected[:, 1])
+
+##  Building the vertices of the objects when a slice starts, for copies that
+#   share their mesh and for the same copies with a mesh each.
+@pytest.mark.parametrize("copy_count", [10, 50, 200])
+def test_benchmarkCopies(copy_count):
+    results = {}
+    for share_mesh in (True, False):
+        nodes = createCopies(copy_count, share_mesh)
+        durations = []
+        for _ in range(3):
+            start_time = time.perf_counter()
+            vertices = buildVertices(nodes)
+            durations.append(time.perf_counter() - start_time)
+        tracemalloc.start()
+        buildVertices(nodes)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[share_mesh] = (min(durations), peak_memory, vertices)
+
+    shared_time, shared_memory, shared_vertices = results[True]
+    separate_time, separate_memory, separate_vertices = results[False]
+    for index in (0, copy_count - 1): #The copies are still sent at their own positions.
+        assert shared_vertices[index] == pytest.approx(separate_vertices[index])
+    assert shared_time < separate_time
+    assert shared_memory <= separate_memory * 1.05 #The cache doesn't keep more than a single extra copy of the mesh.
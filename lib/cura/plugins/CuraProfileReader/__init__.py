@@ -3,18 +3,5 @@
 
 from . import CuraProfileReader
 
-from UM.i18n import i18nCatalog
-catalog = i18nCatalog("cura")
-
-def getMetaData():
-    return {
-        "profile_reader": [
-            {
-                "extension": "curaprofile",
-                "description": catalog.i18nc("@item:inlistbox", "Cura Profile")
-            }
-        ]
-    }
-
 def register(app):
     return { "profile_reader": CuraProfileReader.CuraProfileReader() }
@@ -3,18 +3,5 @@
 
 from . import CuraProfileWriter
 
-from UM.i18n import i18nCatalog
-catalog = i18nCatalog("cura")
-
-def getMetaData():
-    return {
-        "profile_writer": [
-            {
-                "extension": "curaprofile",
-                "description": catalog.i18nc("@item:inlistbox", "Cura Profile")
-            }
-        ]
-    }
-
 def register(app):
     return { "profile_writer": CuraProfileWriter.CuraProfileWriter() }
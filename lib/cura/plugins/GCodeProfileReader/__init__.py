@@ -3,18 +3,5 @@
 
 from . import GCodeProfileReader
 
-from UM.i18n import i18nCatalog
-catalog = i18nCatalog("cura")
-
-def getMetaData():
-    return {
-        "profile_reader": [
-            {
-                "extension": "gcode",
-                "description": catalog.i18nc("@item:inlistbox", "G-code File")
-            }
-        ]
-    }
-
 def register(app):
     return { "profile_reader": GCodeProfileReader.GCodeProfileReader() }
@@ -12,9 +12,11 @@ from UM.i18n import i18nCatalog
 catalog = i18nCatalog("cura")
 
 from cura.CuraApplication import CuraApplication
+from cura.LayerData import LayerData
 from cura.LayerDataBuilder import LayerDataBuilder
 from cura.LayerDataDecorator import LayerDataDecorator
 from cura.LayerPolygon import LayerPolygon
+from cura.PrintTimeMaterialEstimator import PrintTimeMaterialEstimator
 from cura.Scene.GCodeListDecorator import GCodeListDecorator
 from cura.Settings.ExtruderManager import ExtruderManager
 
@@ -269,6 +271,18 @@ class FlavorParser:
     def processMCode(self, M: int, line: str, position: Position, path: List[List[Union[float, int]]]) -> Position:
         pass
 
+    ##  Show the print time and material usage of the g-code, estimated from
+    #   its layer data, as if the engine reported them.
+    def _estimatePrintTime(self, layer_data: LayerData, build_plate_number: int) -> None:
+        backend = CuraApplication.getInstance().getBackend()
+        if backend is None or not hasattr(backend, "printDurationMessage"):
+            return
+        global_stack = CuraApplication.getInstance().getGlobalContainerStack()
+        estimator = PrintTimeMaterialEstimator(acceleration = global_stack.getProperty("machine_acceleration", "value"),
+                                               jerk = global_stack.getProperty("machine_max_jerk_xy", "value"))
+        print_times, material_amounts = estimator.estimate(layer_data, extruder_count = max(len(global_stack.extruders), 1))
+        backend.printDurationMessage.emit(build_plate_number, print_times, material_amounts)
+
     _type_keyword = ";TYPE:"
     _layer_keyword = ";LAYER:"
 
@@ -430,7 +444,10 @@ class FlavorParser:
         material_color_map[5, :] = [0.0, 0.0, 0.7, 1.0]
         material_color_map[6, :] = [0.3, 0.3, 0.3, 1.0]
         material_color_map[7, :] = [0.7, 0.7, 0.7, 1.0]
-        layer_mesh = self._layer_data_builder.build(material_color_map)
+        preferences = CuraApplication.getInstance().getPreferences()
+        compact = bool(preferences.getValue("view/compact_layer_data"))
+        spill_threshold = int(preferences.getValue("view/layer_data_spill_threshold")) * 1024 * 1024
+        layer_mesh = self._layer_data_builder.build(material_color_map, compact = compact, spill_threshold = spill_threshold if spill_threshold >= 0 else None)
         decorator = LayerDataDecorator()
         decorator.setLayerData(layer_mesh)
         scene_node.addDecorator(decorator)
@@ -444,6 +461,8 @@ class FlavorParser:
         gcode_dict = {active_build_plate_id: gcode_list}
         CuraApplication.getInstance().getController().getScene().gcode_dict = gcode_dict #type: ignore #Because gcode_dict is generated dynamically.
 
+        self._estimatePrintTime(layer_mesh, active_build_plate_id)
+
         Logger.log("d", "Finished parsing Gcode")
         self._message.hide()
 
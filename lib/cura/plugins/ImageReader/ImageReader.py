@@ -3,7 +3,7 @@
 
 import numpy
 
-from PyQt5.QtGui import QImage, qRed, qGreen, qBlue
+from PyQt5.QtGui import QImage
 from PyQt5.QtCore import Qt
 
 from UM.Mesh.MeshReader import MeshReader
@@ -86,21 +86,9 @@ class ImageReader(MeshReader):
             height = int(max(round(height * scale_factor), 2))
             img = img.scaled(width, height, Qt.IgnoreAspectRatio)
 
-        width_minus_one = width - 1
-        height_minus_one = height - 1
-
         Job.yieldThread()
 
-        texel_width = 1.0 / (width_minus_one) * scale_vector.x
-        texel_height = 1.0 / (height_minus_one) * scale_vector.z
-
-        height_data = numpy.zeros((height, width), dtype=numpy.float32)
-
-        for x in range(0, width):
-            for y in range(0, height):
-                qrgb = img.pixel(x, y)
-                avg = float(qRed(qrgb) + qGreen(qrgb) + qBlue(qrgb)) / (3 * 255)
-                height_data[y, x] = avg
+        height_data = self._imageToHeightData(img)
 
         Job.yieldThread()
 
@@ -127,88 +115,131 @@ class ImageReader(MeshReader):
         height_data *= scale_vector.y
         height_data += base_height
 
-        heightmap_face_count = 2 * height_minus_one * width_minus_one
-        total_face_count = heightmap_face_count + (width_minus_one * 2) * (height_minus_one * 2) + 2
-
-        mesh.reserveFaceCount(total_face_count)
+        vertices = self._generateHeightmapVertices(height_data, scale_vector.x, scale_vector.z)
 
-        # initialize to texel space vertex offsets.
-        # 6 is for 6 vertices for each texel quad.
-        heightmap_vertices = numpy.zeros((width_minus_one * height_minus_one, 6, 3), dtype = numpy.float32)
-        heightmap_vertices = heightmap_vertices + numpy.array([[
-            [0, base_height, 0],
-            [0, base_height, texel_height],
-            [texel_width, base_height, texel_height],
-            [texel_width, base_height, texel_height],
-            [texel_width, base_height, 0],
-            [0, base_height, 0]
-        ]], dtype = numpy.float32)
+        Job.yieldThread()
 
-        offsetsz, offsetsx = numpy.mgrid[0: height_minus_one, 0: width - 1]
-        offsetsx = numpy.array(offsetsx, numpy.float32).reshape(-1, 1) * texel_width
-        offsetsz = numpy.array(offsetsz, numpy.float32).reshape(-1, 1) * texel_height
+        mesh.setVertices(vertices)
+        mesh.setIndices(numpy.arange(vertices.shape[0], dtype = numpy.int32).reshape(-1, 3))
 
-        # offsets for each texel quad
-        heightmap_vertex_offsets = numpy.concatenate([offsetsx, numpy.zeros((offsetsx.shape[0], offsetsx.shape[1]), dtype=numpy.float32), offsetsz], 1)
-        heightmap_vertices += heightmap_vertex_offsets.repeat(6, 0).reshape(-1, 6, 3)
+        mesh.calculateNormals(fast=True)
 
-        # apply height data to y values
-        heightmap_vertices[:, 0, 1] = heightmap_vertices[:, 5, 1] = height_data[:-1, :-1].reshape(-1)
-        heightmap_vertices[:, 1, 1] = height_data[1:, :-1].reshape(-1)
-        heightmap_vertices[:, 2, 1] = heightmap_vertices[:, 3, 1] = height_data[1:, 1:].reshape(-1)
-        heightmap_vertices[:, 4, 1] = height_data[:-1, 1:].reshape(-1)
+        scene_node.setMeshData(mesh.build())
 
-        heightmap_indices = numpy.array(numpy.mgrid[0:heightmap_face_count * 3], dtype=numpy.int32).reshape(-1, 3)
+        return scene_node
 
-        mesh._vertices[0:(heightmap_vertices.size // 3), :] = heightmap_vertices.reshape(-1, 3)
-        mesh._indices[0:(heightmap_indices.size // 3), :] = heightmap_indices
+    ##  Convert an image to a grayscale height map in one pass over its pixel buffer.
+    #
+    #   The image is converted to 32-bit ARGB so that every pixel can be read
+    #   as a single 0xAARRGGBB word, independent of the byte order of the host.
+    #
+    #   \param img The QImage to convert.
+    #   \return A (height, width) float32 array of the average of the red,
+    #   green and blue channels, normalised to [0, 1].
+    @staticmethod
+    def _imageToHeightData(img):
+        img = img.convertToFormat(QImage.Format_ARGB32)
+        width = img.width()
+        height = img.height()
+
+        bits = img.constBits()
+        bits.setsize(img.bytesPerLine() * height)
+        # Scanlines may be padded, so slice off the padding after reshaping.
+        pixels = numpy.frombuffer(bits, dtype = numpy.uint32).reshape(height, img.bytesPerLine() // 4)[:, :width]
+
+        height_data = ((pixels >> 16) & 0xff).astype(numpy.float32)
+        height_data += (pixels >> 8) & 0xff
+        height_data += pixels & 0xff
+        height_data /= 3 * 255
+        return height_data
+
+    ##  Generate the triangle soup for a height map: the top surface, the
+    #   bottom and the four side walls.
+    #
+    #   Every face gets its own three vertices, so the indices of the result
+    #   are simply 0, 1, 2, ...
+    #
+    #   \param height_data (height, width) array of heights in millimetres.
+    #   \param size_x The size of the mesh in the X direction.
+    #   \param size_z The size of the mesh in the Z direction.
+    #   \return A (face_count * 3, 3) float32 array of vertices.
+    @staticmethod
+    def _generateHeightmapVertices(height_data, size_x, size_z):
+        height, width = height_data.shape
+        width_minus_one = width - 1
+        height_minus_one = height - 1
 
-        mesh._vertex_count = heightmap_vertices.size // 3
-        mesh._face_count = heightmap_indices.size // 3
+        texel_width = 1.0 / width_minus_one * size_x
+        texel_height = 1.0 / height_minus_one * size_z
 
         geo_width = width_minus_one * texel_width
         geo_height = height_minus_one * texel_height
 
-        # bottom
-        mesh.addFaceByPoints(0, 0, 0, 0, 0, geo_height, geo_width, 0, geo_height)
-        mesh.addFaceByPoints(geo_width, 0, geo_height, geo_width, 0, 0, 0, 0, 0)
-
-        # north and south walls
-        for n in range(0, width_minus_one):
-            x = n * texel_width
-            nx = (n + 1) * texel_width
-
-            hn0 = height_data[0, n]
-            hn1 = height_data[0, n + 1]
-
-            hs0 = height_data[height_minus_one, n]
-            hs1 = height_data[height_minus_one, n + 1]
-
-            mesh.addFaceByPoints(x, 0, 0, nx, 0, 0, nx, hn1, 0)
-            mesh.addFaceByPoints(nx, hn1, 0, x, hn0, 0, x, 0, 0)
-
-            mesh.addFaceByPoints(x, 0, geo_height, nx, 0, geo_height, nx, hs1, geo_height)
-            mesh.addFaceByPoints(nx, hs1, geo_height, x, hs0, geo_height, x, 0, geo_height)
-
-        # west and east walls
-        for n in range(0, height_minus_one):
-            y = n * texel_height
-            ny = (n + 1) * texel_height
-
-            hw0 = height_data[n, 0]
-            hw1 = height_data[n + 1, 0]
-
-            he0 = height_data[n, width_minus_one]
-            he1 = height_data[n + 1, width_minus_one]
-
-            mesh.addFaceByPoints(0, 0, y, 0, 0, ny, 0, hw1, ny)
-            mesh.addFaceByPoints(0, hw1, ny, 0, hw0, y, 0, 0, y)
-
-            mesh.addFaceByPoints(geo_width, 0, y, geo_width, 0, ny, geo_width, he1, ny)
-            mesh.addFaceByPoints(geo_width, he1, ny, geo_width, he0, y, geo_width, 0, y)
-
-        mesh.calculateNormals(fast=True)
-
-        scene_node.setMeshData(mesh.build())
-
-        return scene_node
+        heightmap_face_count = 2 * height_minus_one * width_minus_one
+        wall_face_count = 4 * width_minus_one + 4 * height_minus_one
+        vertices = numpy.zeros(((heightmap_face_count + 2 + wall_face_count) * 3, 3), dtype = numpy.float32)
+
+        # Top surface: two triangles (six vertices) per texel quad.
+        heightmap_vertices = vertices[0:heightmap_face_count * 3].reshape(height_minus_one, width_minus_one, 6, 3)
+        xs = numpy.arange(width, dtype = numpy.float32) * texel_width
+        zs = numpy.arange(height, dtype = numpy.float32) * texel_height
+        x0 = xs[:-1].reshape(1, -1)
+        x1 = x0 + texel_width
+        z0 = zs[:-1].reshape(-1, 1)
+        z1 = z0 + texel_height
+        for corner, x, z, y in (
+                (0, x0, z0, height_data[:-1, :-1]),
+                (1, x0, z1, height_data[1:, :-1]),
+                (2, x1, z1, height_data[1:, 1:]),
+                (3, x1, z1, height_data[1:, 1:]),
+                (4, x1, z0, height_data[:-1, 1:]),
+                (5, x0, z0, height_data[:-1, :-1])):
+            heightmap_vertices[:, :, corner, 0] = x
+            heightmap_vertices[:, :, corner, 1] = y
+            heightmap_vertices[:, :, corner, 2] = z
+
+        offset = heightmap_face_count * 3
+
+        # Bottom.
+        vertices[offset:offset + 6] = [
+            [0, 0, 0], [0, 0, geo_height], [geo_width, 0, geo_height],
+            [geo_width, 0, geo_height], [geo_width, 0, 0], [0, 0, 0]
+        ]
+        offset += 6
+
+        # North and south walls, four triangles for each column of texels.
+        walls = vertices[offset:offset + width_minus_one * 12].reshape(width_minus_one, 2, 6, 3)
+        ImageReader._fillWallQuads(walls, xs[:-1], xs[1:], height_data[0], height_data[height_minus_one], 0, 2, (0, geo_height))
+        offset += width_minus_one * 12
+
+        # West and east walls, four triangles for each row of texels.
+        walls = vertices[offset:offset + height_minus_one * 12].reshape(height_minus_one, 2, 6, 3)
+        ImageReader._fillWallQuads(walls, zs[:-1], zs[1:], height_data[:, 0], height_data[:, width_minus_one], 2, 0, (0, geo_width))
+
+        return vertices
+
+    ##  Fill the vertices of two opposite walls of the height map.
+    #
+    #   Each wall segment is a quad between (a, 0), (b, 0), (b, h1) and (a, h0)
+    #   along the wall, split into two triangles.
+    #
+    #   \param walls (segment_count, 2, 6, 3) view to write the vertices to.
+    #   \param starts The start coordinate of each segment along the wall.
+    #   \param ends The end coordinate of each segment along the wall.
+    #   \param near_heights The heights along the first wall.
+    #   \param far_heights The heights along the second wall.
+    #   \param along_axis The axis along which the walls run.
+    #   \param across_axis The axis in which the two walls are offset.
+    #   \param positions The coordinate of both walls on the across axis.
+    @staticmethod
+    def _fillWallQuads(walls, starts, ends, near_heights, far_heights, along_axis, across_axis, positions):
+        for side, heights in enumerate((near_heights, far_heights)):
+            h0 = heights[:-1]
+            h1 = heights[1:]
+            wall = walls[:, side]
+            wall[:, :, across_axis] = positions[side]
+            for corner, along, y in (
+                    (0, starts, 0), (1, ends, 0), (2, ends, h1),
+                    (3, ends, h1), (4, starts, h0), (5, starts, 0)):
+                wall[:, corner, along_axis] = along
+                wall[:, corner, 1] = y
@@ -0,0 +1,88 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import os.path
+import sys
+import time
+
+import numpy
+import pytest
+
+from PyQt5.QtGui import QImage, qRgb, qRed, qGreen, qBlue
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import cura.CuraApplication #Needs to be imported before the mesh reader to prevent a circular import.
+from ImageReader.ImageReader import ImageReader #The module we're testing.
+
+
+def createImage(width, height):
+    image = QImage(width, height, QImage.Format_RGB32)
+    values = numpy.random.RandomState(width).randint(0, 256, size = (height, width, 3))
+    for y in range(height):
+        for x in range(width):
+            image.setPixel(x, y, qRgb(*values[y, x]))
+    return image
+
+
+##  The height data must be the same as reading the image pixel by pixel.
+@pytest.mark.parametrize("width, height", [(2, 2), (7, 5), (33, 17)])
+def test_imageToHeightData(width, height):
+    image = createImage(width, height)
+
+    height_data = ImageReader._imageToHeightData(image)
+
+    assert height_data.shape == (height, width)
+    for y in range(height):
+        for x in range(width):
+            qrgb = image.pixel(x, y)
+            assert height_data[y, x] == pytest.approx((qRed(qrgb) + qGreen(qrgb) + qBlue(qrgb)) / (3 * 255))
+
+
+##  The mesh must be closed: every wall segment has to match the edge of the top surface.
+def test_generateHeightmapVertices():
+    height_data = numpy.array([[1, 2, 3], [4, 5, 6]], dtype = numpy.float32)
+
+    vertices = ImageReader._generateHeightmapVertices(height_data, 20, 10)
+
+    # 2 * 2 faces on top, 2 on the bottom, 4 * 2 on the north/south walls and 4 * 1 on the west/east walls.
+    assert vertices.shape == ((4 + 2 + 8 + 4) * 3, 3)
+    assert vertices[:, 0].min() == 0 and vertices[:, 0].max() == 20
+    assert vertices[:, 2].min() == 0 and vertices[:, 2].max() == 10
+    top = vertices[0:12]
+    assert set(top[:, 1]) == {1, 2, 3, 4, 5, 6}
+    walls = vertices[18:]
+    assert set(walls[:, 1]) == {0, 1, 2, 3, 4, 5, 6}
+
+
+##  Benchmark of converting an image to the vertices of the height map.
+#
+#   Like the reader itself, the mesh is generated from the image scaled down to
+#   at most 512 pixels, so the big images mostly measure reading the pixels.
+#   Reading the pixels must beat reading them one by one, as the reader used to.
+@pytest.mark.parametrize("size", [256, 1024, 4096])
+def test_benchmarkHeightmap(size):
+    image = QImage(size, size, QImage.Format_RGB32)
+    image.fill(qRgb(128, 64, 32))
+
+    start_time = time.time()
+    ImageReader._imageToHeightData(image)
+    conversion_time = time.time() - start_time
+
+    sample_size = min(size, 128) #Reading a big image one pixel at a time takes too long, so extrapolate from a sample.
+    start_time = time.time()
+    for y in range(sample_size):
+        for x in range(sample_size):
+            qrgb = image.pixel(x, y)
+            (qRed(qrgb) + qGreen(qrgb) + qBlue(qrgb)) / (3 * 255)
+    pixel_time = (time.time() - start_time) * (size / sample_size) ** 2
+
+    mesh_size = min(size, 512)
+    height_data = ImageReader._imageToHeightData(image.scaled(mesh_size, mesh_size))
+    start_time = time.time()
+    vertices = ImageReader._generateHeightmapVertices(height_data, 120, 120)
+    mesh_time = time.time() - start_time
+
+    assert vertices.shape[0] == (2 * (mesh_size - 1) * (mesh_size - 1) + 2 + 8 * (mesh_size - 1)) * 3
+    assert conversion_time < pixel_time
+    assert mesh_time < 2 #Half a million faces, generated in well under a second.
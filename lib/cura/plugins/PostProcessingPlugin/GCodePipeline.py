@@ -0,0 +1,194 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# The PostProcessingPlugin is released under the terms of the AGPLv3 or higher.
+
+import re
+from typing import Dict, Iterator, List, Optional, Union
+
+from UM.Logger import Logger
+
+
+##  A line of g-code in a GCodeLayer.
+#
+#   The parameters of the line are only parsed when they are first asked for,
+#   and then remembered, so that all scripts that look at the line share the
+#   work. Lines are never changed; to modify the g-code, a GCodeLayer replaces
+#   them with new lines.
+class GCodeLine:
+    __slots__ = ("text", "_parameters")
+
+    # A letter followed by an optional number, like Script.getValue parses them.
+    _parameter_regex = re.compile(r"([A-Za-z])(-?[0-9]+\.?[0-9]*)?")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self._parameters = None  # type: Optional[Dict[str, str]]
+
+    ##  Find the value of a parameter in the line.
+    #
+    #   This is the same as Script.getValue, but only for parameters with a
+    #   single letter, like "G" or "X". When requesting key = X from line
+    #   "G1 X100" the value 100 is returned. Comments are ignored.
+    #   \param key The letter of the parameter.
+    #   \param default The value to return if the line doesn't have the
+    #   parameter, or if it has no number.
+    def getValue(self, key: str, default = None) -> Union[int, float, None]:
+        if self._parameters is None:
+            code = self.text.split(";", 1)[0]
+            # Reversed, so that the first occurrence of every letter wins.
+            self._parameters = dict(reversed(self._parameter_regex.findall(code)))
+        value = self._parameters.get(key)
+        if not value:
+            return default
+        if "." in value:  # The regex only allows digits besides the point and sign.
+            return float(value)
+        return int(value)
+
+
+##  One layer of g-code, as it is passed through the post-processing scripts.
+#
+#   The layer is only split into lines when a script asks for them, and the
+#   lines are shared by all scripts that process the layer in a row. When the
+#   layer is converted back to text, the text of the lines that weren't
+#   changed is re-used, and if nothing was changed at all, the original text
+#   is returned as is.
+class GCodeLayer:
+    def __init__(self, text: str, index: int) -> None:
+        self._text = text  # type: Optional[str] # None if the lines were changed since the text was last made.
+        self._lines = None  # type: Optional[List[GCodeLine]]
+        self._index = index
+        self._modified = False
+
+    ##  The position of this layer in the list of g-code of the print.
+    #
+    #   The first layers contain the start g-code and the settings, so this is
+    #   not the same as the layer number.
+    def getIndex(self) -> int:
+        return self._index
+
+    def getText(self) -> str:
+        if self._text is None:
+            self._text = "\n".join([line.text for line in self._lines])
+        return self._text
+
+    ##  Replace all g-code of the layer.
+    def setText(self, text: str) -> None:
+        self._text = text
+        self._lines = None
+        self._modified = True
+
+    ##  The lines of the layer.
+    #
+    #   Don't change this list. Use replaceLine, insertLines and removeLine
+    #   instead, so that the layer knows it was modified.
+    def getLines(self) -> List[GCodeLine]:
+        if self._lines is None:
+            self._lines = [GCodeLine(text) for text in self.getText().split("\n")]
+        return self._lines
+
+    ##  Iterate over the lines of the layer.
+    #
+    #   Unlike getLines, this doesn't split the whole layer into lines if that
+    #   wasn't done yet, so it is much cheaper for scripts that only look at
+    #   the first few lines of a layer. Stop iterating when modifying the
+    #   layer.
+    def iterLines(self) -> Iterator[GCodeLine]:
+        if self._lines is not None:
+            yield from self._lines
+            return
+        text = self._text
+        start = 0
+        end = text.find("\n")
+        while end >= 0:
+            yield GCodeLine(text[start:end])
+            start = end + 1
+            end = text.find("\n", start)
+        yield GCodeLine(text[start:])
+
+    def replaceLine(self, index: int, text: str) -> None:
+        self.getLines()[index] = GCodeLine(text)
+        self._onLinesChanged()
+
+    ##  Insert lines before the line at an index, like list.insert does.
+    def insertLines(self, index: int, texts: List[str]) -> None:
+        self.getLines()[index:index] = [GCodeLine(text) for text in texts]
+        self._onLinesChanged()
+
+    def removeLine(self, index: int) -> None:
+        del self.getLines()[index]
+        self._onLinesChanged()
+
+    ##  Whether any script changed the layer.
+    def isModified(self) -> bool:
+        return self._modified
+
+    def _onLinesChanged(self) -> None:
+        self._text = None
+        self._modified = True
+
+
+##  Runs a list of post-processing scripts on the g-code of a print.
+#
+#   Scripts that process the g-code one layer at a time (see
+#   Script.isLayerStage) are run as stages: every layer is passed through all
+#   consecutive stages before the next layer is, so the layers are only split
+#   into lines and joined again once for all of those scripts, instead of once
+#   per script. Other scripts get the complete list of g-code through their
+#   execute function, as before. The stages before such a script are finished
+#   first, so every script sees the g-code as all scripts before it left it.
+class GCodePipeline:
+    ##  \param scripts The scripts to run, in order.
+    def __init__(self, scripts) -> None:
+        self._scripts = list(scripts)
+
+    ##  Run all scripts.
+    #
+    #   If a script raises an exception, it is logged and the script is
+    #   skipped, but the other scripts are still run.
+    #   \param data The list of g-code strings of the print.
+    #   \return The modified list of g-code.
+    def execute(self, data: List[str]) -> List[str]:
+        index = 0
+        while index < len(self._scripts):
+            if not self._scripts[index].isLayerStage():
+                try:
+                    data = self._scripts[index].execute(data)
+                except Exception:
+                    Logger.logException("e", "Exception in post-processing script.")
+                index += 1
+                continue
+
+            end = index + 1
+            while end < len(self._scripts) and self._scripts[end].isLayerStage():
+                end += 1
+            data = self._processLayers(self._scripts[index:end], data)
+            index = end
+        return data
+
+    ##  Pass all layers through a list of stages.
+    def _processLayers(self, stages, data: List[str]) -> List[str]:
+        active_stages = []
+        for stage in stages:
+            try:
+                stage.beginLayers(len(data))
+            except Exception:
+                Logger.logException("e", "Exception in post-processing script.")
+                continue
+            active_stages.append(stage)
+
+        for layer_index, text in enumerate(data):
+            layer = GCodeLayer(text, layer_index)
+            for stage in active_stages:
+                try:
+                    stage.processLayer(layer)
+                except Exception:
+                    Logger.logException("e", "Exception in post-processing script.")
+                    active_stages = [other for other in active_stages if other is not stage]  # Copy, since we're iterating over it.
+            if layer.isModified():
+                data[layer_index] = layer.getText()
+
+        for stage in active_stages:
+            try:
+                stage.endLayers()
+            except Exception:
+                Logger.logException("e", "Exception in post-processing script.")
+        return data
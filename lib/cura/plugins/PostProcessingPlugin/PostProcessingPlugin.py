@@ -16,6 +16,9 @@ import sys
 import importlib.util
 
 from UM.i18n import i18nCatalog
+
+from .GCodePipeline import GCodePipeline
+
 i18n_catalog = i18nCatalog("cura")
 
 
@@ -72,11 +75,7 @@ class PostProcessingPlugin(QObject, Extension):
             return
 
         if ";POSTPROCESSED" not in gcode_list[0]:
-            for script in self._script_list:
-                try:
-                    gcode_list = script.execute(gcode_list)
-                except Exception:
-                    Logger.logException("e", "Exception in post-processing script.")
+            gcode_list = GCodePipeline(self._script_list).execute(gcode_list)
             if len(self._script_list):  # Add comment to g-code if any changes were made.
                 gcode_list[0] += ";POSTPROCESSED\n"
             gcode_dict[active_build_plate_id] = gcode_list
@@ -272,11 +271,11 @@ class PostProcessingPlugin(QObject, Extension):
         self._view.show()
 
     ##  Property changed: trigger re-slice
-    #   To do this we use the global container stack propertyChanged.
+    #   To do this we report a property change on the global container stack.
     #   Re-slicing is necessary for setting changes in this plugin, because the changes
     #   are applied only once per "fresh" gcode
     def _propertyChanged(self):
         global_container_stack = Application.getInstance().getGlobalContainerStack()
-        global_container_stack.propertyChanged.emit("post_processing_plugin", "value")
+        global_container_stack.notifyPropertyChanged("post_processing_plugin", "value")
 
 
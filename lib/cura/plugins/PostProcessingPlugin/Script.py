@@ -12,6 +12,8 @@ from UM.Settings.InstanceContainer import InstanceContainer
 from UM.Settings.DefinitionContainer import DefinitionContainer
 from UM.Settings.ContainerRegistry import ContainerRegistry
 
+from .GCodePipeline import GCodePipeline
+
 import re
 import json
 import collections
@@ -62,11 +64,11 @@ class Script:
             self.valueChanged.emit()
 
             # Property changed: trigger reslice
-            # To do this we use the global container stack propertyChanged.
+            # To do this we report a property change on the global container stack.
             # Reslicing is necessary for setting changes in this plugin, because the changes
             # are applied only once per "fresh" gcode
             global_container_stack = Application.getInstance().getGlobalContainerStack()
-            global_container_stack.propertyChanged.emit(key, property_name)
+            global_container_stack.notifyPropertyChanged(key, property_name)
 
     ##  Needs to return a dict that can be used to construct a settingcategory file.
     #   See the example script for an example.
@@ -164,7 +166,37 @@ class Script:
 
         return result
 
+    ##  Whether the script processes the g-code one layer at a time.
+    #
+    #   Such scripts override processLayer instead of execute, and can then
+    #   process the layers together with other scripts in a single pass. See
+    #   GCodePipeline.
+    def isLayerStage(self):
+        return type(self).processLayer is not Script.processLayer
+
+    ##  Called before the first layer is processed with processLayer. This is
+    #   the place to get the values of the settings.
+    #   \param layer_count The number of layers that will be processed,
+    #   including those with the start g-code.
+    def beginLayers(self, layer_count):
+        pass
+
+    ##  Process one layer of g-code, modifying the GCodeLayer in place.
+    #
+    #   The layers are processed in order. Other scripts may have processed
+    #   the layers after this one only partially yet, and those before it
+    #   further, so only the layer that is passed may be looked at.
+    def processLayer(self, layer):
+        raise NotImplementedError()
+
+    ##  Called after the last layer was processed with processLayer.
+    def endLayers(self):
+        pass
+
     ##  This is called when the script is executed. 
     #   It gets a list of g-code strings and needs to return a (modified) list.
+    #   Scripts that implement processLayer don't need to override this.
     def execute(self, data):
-        raise NotImplementedError()
+        if not self.isLayerStage():
+            raise NotImplementedError()
+        return GCodePipeline([self]).execute(data)
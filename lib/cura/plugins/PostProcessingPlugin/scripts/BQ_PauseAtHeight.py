@@ -22,27 +22,24 @@ class BQ_PauseAtHeight(Script):
             }
         }"""
 
-    def execute(self, data):
-        x = 0.
-        y = 0.
-        current_z = 0.
-        pause_z = self.getSettingValueByKey("pause_height")
-        for layer in data: 
-            lines = layer.split("\n")
-            for line in lines:
-                if self.getValue(line, 'G') == 1 or self.getValue(line, 'G') == 0:
-                    current_z = self.getValue(line, 'Z')
-                    if current_z != None:
-                        if current_z >= pause_z:
-                            prepend_gcode = ";TYPE:CUSTOM\n"
-                            prepend_gcode += "; -- Pause at height (%.2f mm) --\n" % pause_z
+    def beginLayers(self, layer_count):
+        self._pause_z = self.getSettingValueByKey("pause_height")
+        self._paused = False
 
-                            # Insert Pause gcode
-                            prepend_gcode += "M25        ; Pauses the print and waits for the user to resume it\n"
-                            
-                            index = data.index(layer) 
-                            layer = prepend_gcode + layer
-                            data[index] = layer # Override the data of this layer with the modified data
-                            return data
-                        break
-        return data
+    def processLayer(self, layer):
+        if self._paused: #Only pause once.
+            return
+        for line in layer.iterLines():
+            if line.getValue('G') == 1 or line.getValue('G') == 0:
+                current_z = line.getValue('Z')
+                if current_z != None:
+                    if current_z >= self._pause_z:
+                        prepend_gcode = ";TYPE:CUSTOM\n"
+                        prepend_gcode += "; -- Pause at height (%.2f mm) --\n" % self._pause_z
+
+                        # Insert Pause gcode
+                        prepend_gcode += "M25        ; Pauses the print and waits for the user to resume it\n"
+
+                        layer.setText(prepend_gcode + layer.getText()) # Override the data of this layer with the modified data
+                        self._paused = True
+                    break
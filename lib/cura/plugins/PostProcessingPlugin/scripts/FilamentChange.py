@@ -1,6 +1,7 @@
 # This PostProcessing Plugin script is released 
 # under the terms of the AGPLv3 or higher
-from typing import Optional, Tuple
+import collections
+from typing import Dict
 
 from UM.Logger import Logger
 from ..Script import Script
@@ -48,9 +49,7 @@ class FilamentChange(Script):
             }
         }"""
 
-    def execute(self, data: list):
-
-        """data is a list. Each index contains a layer"""
+    def beginLayers(self, layer_count: int):
         layer_nums = self.getSettingValueByKey("layer_number")
         initial_retract = self.getSettingValueByKey("initial_retract")
         later_retract = self.getSettingValueByKey("later_retract")
@@ -64,31 +63,27 @@ class FilamentChange(Script):
             color_change = color_change + (" L-%.2f" % later_retract)
         
         color_change = color_change + " ; Generated by FilamentChange plugin"
+        self._color_change = color_change
         
+        # For the layer number of each target layer, how many times to insert the color change in it.
+        self._pending_layers = collections.Counter()  # type: Dict[str, int]
         layer_targets = layer_nums.split(",")
         if len(layer_targets) > 0:
             for layer_num in layer_targets:
                 layer_num = int(layer_num.strip())
-                if layer_num <= len(data):
-                    index, layer_data = self._searchLayerData(data, layer_num - 1)
-                    if layer_data is None:
-                        Logger.log("e", "Could not found the layer")
-                        continue
-                    lines = layer_data.split("\n")
-                    lines.insert(2, color_change)
-                    final_line = "\n".join(lines)
-                    data[index] = final_line
+                if layer_num <= layer_count:
+                    self._pending_layers[str(layer_num - 1)] += 1
 
-        return data
+    ##  Inserts the color change in the first layer that has the number of a
+    #   target layer.
+    def processLayer(self, layer):
+        first_line = next(layer.iterLines()).text
+        # The first line should contain the layer number at the beginning.
+        if first_line[:len(self._layer_keyword)] == self._layer_keyword:
+            count = self._pending_layers.pop(first_line[len(self._layer_keyword):], 0)
+            for _ in range(count):
+                layer.insertLines(2, [self._color_change])
 
-    ##  This method returns the data corresponding with the indicated layer number, looking in the gcode for
-    #   the occurrence of this layer number.
-    def _searchLayerData(self, data: list, layer_num: int) -> Tuple[int, Optional[str]]:
-        for index, layer_data in enumerate(data):
-            first_line = layer_data.split("\n")[0]
-            # The first line should contain the layer number at the beginning.
-            if first_line[:len(self._layer_keyword)] == self._layer_keyword:
-                # If found the layer that we are looking for, then return the data
-                if first_line[len(self._layer_keyword):] == str(layer_num):
-                    return index, layer_data
-        return 0, None
\ No newline at end of file
+    def endLayers(self):
+        for _ in self._pending_layers.elements():
+            Logger.log("e", "Could not found the layer")
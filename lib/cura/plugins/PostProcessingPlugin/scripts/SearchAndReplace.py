@@ -42,15 +42,15 @@ class SearchAndReplace(Script):
             }
         }"""
 
-    def execute(self, data):
+    def beginLayers(self, layer_count):
         search_string = self.getSettingValueByKey("search")
         if not self.getSettingValueByKey("is_regex"):
             search_string = re.escape(search_string) #Need to search for the actual string, not as a regex.
-        search_regex = re.compile(search_string)
+        self._search_regex = re.compile(search_string)
 
-        replace_string = self.getSettingValueByKey("replace")
+        self._replace_string = self.getSettingValueByKey("replace")
 
-        for layer_number, layer in enumerate(data):
-            data[layer_number] = re.sub(search_regex, replace_string, layer) #Replace all.
-
-        return data
\ No newline at end of file
+    def processLayer(self, layer):
+        replaced, count = self._search_regex.subn(self._replace_string, layer.getText()) #Replace all.
+        if count > 0:
+            layer.setText(replaced)
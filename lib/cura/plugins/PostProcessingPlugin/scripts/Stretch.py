@@ -8,27 +8,22 @@ See the original description in https://github.com/electrocbd/post_stretch
 WARNING This script has never been tested with several extruders
 """
 from ..Script import Script
+from ..GCodePipeline import GCodeLine
 import numpy as np
 from UM.Logger import Logger
 from UM.Application import Application
-import re
 from cura.Settings.ExtruderManager import ExtruderManager
 
 def _getValue(line, key, default=None):
     """
-    Convenience function that finds the value in a line of g-code.
-    When requesting key = x from line "G1 X100" the value 100 is returned.
-    It is a copy of Stript's method, so it is no DontRepeatYourself, but
-    I split the class into setup part (Stretch) and execution part (Strecher)
-    and only the setup part inherits from Script
+    Convenience function that finds the value in a GCodeLine.
+    When requesting key = x from line "G1 X100" the value 100.0 is returned.
+    The values are always floats, unlike those of GCodeLine.getValue.
     """
-    if not key in line or (";" in line and line.find(key) > line.find(";")):
+    value = line.getValue(key, None)
+    if value is None:
         return default
-    sub_part = line[line.find(key) + 1:]
-    number = re.search(r"^-?[0-9]+\.?[0-9]*", sub_part)
-    if number is None:
-        return default
-    return float(number.group(0))
+    return float(value)
 
 class GCodeStep():
     """
@@ -49,7 +44,7 @@ class GCodeStep():
 
     def readStep(self, line):
         """
-        Reads gcode from line into self
+        Reads gcode from a GCodeLine into self
         """
         if not self.in_relative_movement:
             self.step_x = _getValue(line, "X", self.step_x)
@@ -69,16 +64,12 @@ class GCodeStep():
             self.step_e += delta_step_e
             self.step_f = _getValue(line, "F", self.step_f)  # the feedrate is not relative
 
-    def copyPosFrom(self, step):
+    def toList(self, step, comment):
         """
-        Copies positions of step into self
+        Returns a list of the step type, the positions and the comment,
+        which is how the steps of a layer are stored by the Stretcher
         """
-        self.step_x = step.step_x
-        self.step_y = step.step_y
-        self.step_z = step.step_z
-        self.step_e = step.step_e
-        self.step_f = step.step_f
-        self.comment = step.comment
+        return [step, self.step_x, self.step_y, self.step_z, self.step_e, self.step_f, comment]
 
     def setInRelativeMovement(self, value: bool) -> None:
         self.in_relative_movement = value
@@ -88,6 +79,11 @@ class GCodeStep():
 class Stretcher():
     """
     Execution part of the stretch algorithm
+
+    The steps of a layer are lists of the step type (0 for G0, 1 for G1
+    and -1 for everything else), the X, Y, Z, E and F positions,
+    and the g-code to output for other steps.
+    The points of each layer are processed together with numpy.
     """
     def __init__(self, line_width, wc_stretch, pw_stretch):
         self.line_width = line_width
@@ -115,40 +111,37 @@ class Stretcher():
         layer_steps = []
         in_relative_movement = False
         current = GCodeStep(0, in_relative_movement)
+        onestep = None
         self.layer_z = 0.
         current_e = 0.
         for layer in data:
             lines = layer.rstrip("\n").split("\n")
             for line in lines:
-                current.comment = ""
-                if line.find(";") >= 0:
-                    current.comment = line[line.find(";"):]
-                if _getValue(line, "G") == 0:
-                    current.readStep(line)
-                    onestep = GCodeStep(0, in_relative_movement)
-                    onestep.copyPosFrom(current)
-                elif _getValue(line, "G") == 1:
-                    current.readStep(line)
-                    onestep = GCodeStep(1, in_relative_movement)
-                    onestep.copyPosFrom(current)
+                gcode_line = GCodeLine(line)
+                command = _getValue(gcode_line, "G")
+                if command == 0:
+                    current.readStep(gcode_line)
+                    onestep = current.toList(0, "")
+                elif command == 1:
+                    current.readStep(gcode_line)
+                    onestep = current.toList(1, "")
 
                 # end of relative movement
-                elif _getValue(line, "G") == 90:
+                elif command == 90:
                     in_relative_movement = False
                     current.setInRelativeMovement(in_relative_movement)
                 # start of relative movement
-                elif _getValue(line, "G") == 91:
+                elif command == 91:
                     in_relative_movement = True
                     current.setInRelativeMovement(in_relative_movement)
 
-                elif _getValue(line, "G") == 92:
-                    current.readStep(line)
-                    onestep = GCodeStep(-1, in_relative_movement)
-                    onestep.copyPosFrom(current)
+                elif command == 92:
+                    current.readStep(gcode_line)
+                    onestep = current.toList(-1, line[line.find(";"):] if line.find(";") >= 0 else "")
                 else:
-                    onestep = GCodeStep(-1, in_relative_movement)
-                    onestep.copyPosFrom(current)
-                    onestep.comment = line
+                    onestep = current.toList(-1, line)
+                if onestep is None: # Relative movement before any other step
+                    onestep = current.toList(-1, line)
 
                 if line.find(";LAYER:") >= 0 and len(layer_steps):
                     # Previous plugin "forgot" to separate two layers...
@@ -156,6 +149,8 @@ class Stretcher():
                                + " " + str(len(layer_steps)) + " steps")
                     retdata.append(self.processLayer(layer_steps))
                     layer_steps = []
+                # G90 and G91 don't add a step of their own, but repeat the previous step.
+                # It is the same list, so it gets the stretched position of that step if it was in a previous layer.
                 layer_steps.append(onestep)
                 # self.layer_z is the z position of the last extrusion move (not travel move)
                 if current.step_z != self.layer_z and current.step_e != current_e:
@@ -170,25 +165,18 @@ class Stretcher():
         retdata.append(";Push wall stretch distance " + str(self.pw_stretch) + "\n")
         return retdata
 
-    def extrusionBreak(self, layer_steps, i_pos):
+    def extrusionBreaks(self, positions, extrusions):
         """
-        Returns true if the command layer_steps[i_pos] breaks the extruded filament
-        i.e. it is a travel move
+        Returns for each step whether it breaks the extruded filament
+        if it is a move, i.e. whether it is a travel move
         """
-        if i_pos == 0:
-            return True # Begining a layer always breaks filament (for simplicity)
-        step = layer_steps[i_pos]
-        prev_step = layer_steps[i_pos - 1]
-        if step.step_e != prev_step.step_e:
-            return False
-        delta_x = step.step_x - prev_step.step_x
-        delta_y = step.step_y - prev_step.step_y
-        if delta_x * delta_x + delta_y * delta_y < self.line_width * self.line_width / 4:
-            # This is a very short movement, less than 0.5 * line_width
-            # It does not break filament, we should stay in the same extrusion sequence
-            return False
-        return True # New sequence
-
+        breaks = np.ones(len(positions), dtype = bool) # Begining a layer always breaks filament (for simplicity)
+        delta = positions[1:] - positions[:-1]
+        # A very short movement, less than 0.5 * line_width, does not break filament,
+        # we should stay in the same extrusion sequence
+        is_short = delta[:, 0] * delta[:, 0] + delta[:, 1] * delta[:, 1] < self.line_width * self.line_width / 4
+        breaks[1:] = (extrusions[1:] == extrusions[:-1]) & ~is_short
+        return breaks
 
     def processLayer(self, layer_steps):
         """
@@ -197,30 +185,29 @@ class Stretcher():
         """
         self.outpos.step_x = -1000 # Force output of X and Y coordinates
         self.outpos.step_y = -1000 # at each start of layer
-        self.layergcode = ""
-        self.vd1 = np.empty((0, 2))
-        self.vd2 = np.empty((0, 2))
-        orig_seq = np.empty((0, 2))
-        modif_seq = np.empty((0, 2))
-        iflush = 0
-        for i, step in enumerate(layer_steps):
-            if step.step == 0 or step.step == 1:
-                if self.extrusionBreak(layer_steps, i):
-                    # No extrusion since the previous step, so it is a travel move
-                    # Let process steps accumulated into orig_seq,
-                    # which are a sequence of continuous extrusion
-                    modif_seq = np.copy(orig_seq)
-                    if len(orig_seq) >= 2:
-                        self.workOnSequence(orig_seq, modif_seq)
-                    self.generate(layer_steps, iflush, i, modif_seq)
-                    iflush = i
-                    orig_seq = np.empty((0, 2))
-                orig_seq = np.concatenate([orig_seq, np.array([[step.step_x, step.step_y]])])
-        if len(orig_seq):
+        step_types, step_x, step_y, _, step_e, _, _ = zip(*layer_steps)
+        positions = np.column_stack((step_x, step_y)).astype(np.float64)
+        # The deposited segments of the layer are collected in these, see workOnSequence.
+        self._vd1_buffer = np.empty((len(positions), 2))
+        self._vd2_buffer = np.empty((len(positions), 2))
+        self.vd1 = self._vd1_buffer[:0]
+        self.vd2 = self._vd2_buffer[:0]
+
+        moves = np.flatnonzero(np.array(step_types) >= 0)
+        breaks = self.extrusionBreaks(positions, np.array(step_e, dtype = np.float64))
+        # The moves between two breaks are a sequence of continuous extrusion.
+        sequence_starts = np.flatnonzero(breaks[moves])
+        if len(moves) and (len(sequence_starts) == 0 or sequence_starts[0] != 0):
+            sequence_starts = np.concatenate(([0], sequence_starts))
+        sequence_ends = np.append(sequence_starts[1:], len(moves))
+        for sequence_start, sequence_end in zip(sequence_starts, sequence_ends):
+            sequence = moves[sequence_start:sequence_end]
+            orig_seq = positions[sequence]
             modif_seq = np.copy(orig_seq)
-        if len(orig_seq) >= 2:
-            self.workOnSequence(orig_seq, modif_seq)
-        self.generate(layer_steps, iflush, len(layer_steps), modif_seq)
+            if len(orig_seq) >= 2:
+                self.workOnSequence(orig_seq, modif_seq)
+            positions[sequence] = modif_seq
+        self.generate(layer_steps, positions)
         return self.layergcode
 
     def stepToGcode(self, onestep):
@@ -230,49 +217,42 @@ class Stretcher():
         the parameter is written only if its value changed since the
         previous g-code step.
         """
+        _, step_x, step_y, step_z, step_e, step_f, _ = onestep
         sout = ""
-        if onestep.step_f != self.outpos.step_f:
-            self.outpos.step_f = onestep.step_f
+        if step_f != self.outpos.step_f:
+            self.outpos.step_f = step_f
             sout += " F{:.0f}".format(self.outpos.step_f).rstrip(".")
-        if onestep.step_x != self.outpos.step_x or onestep.step_y != self.outpos.step_y:
-            assert onestep.step_x >= -1000 and onestep.step_x < 1000 # If this assertion fails,
-                                                           # something went really wrong !
-            self.outpos.step_x = onestep.step_x
+        if step_x != self.outpos.step_x or step_y != self.outpos.step_y:
+            assert step_x >= -1000 and step_x < 1000 # If this assertion fails,
+                                                     # something went really wrong !
+            self.outpos.step_x = step_x
             sout += " X{:.3f}".format(self.outpos.step_x).rstrip("0").rstrip(".")
-            assert onestep.step_y >= -1000 and onestep.step_y < 1000 # If this assertion fails,
-                                                           # something went really wrong !
-            self.outpos.step_y = onestep.step_y
+            assert step_y >= -1000 and step_y < 1000 # If this assertion fails,
+                                                     # something went really wrong !
+            self.outpos.step_y = step_y
             sout += " Y{:.3f}".format(self.outpos.step_y).rstrip("0").rstrip(".")
-        if onestep.step_z != self.outpos.step_z or onestep.step_z != self.layer_z:
-            self.outpos.step_z = onestep.step_z
+        if step_z != self.outpos.step_z or step_z != self.layer_z:
+            self.outpos.step_z = step_z
             sout += " Z{:.3f}".format(self.outpos.step_z).rstrip("0").rstrip(".")
-        if onestep.step_e != self.outpos.step_e:
-            self.outpos.step_e = onestep.step_e
+        if step_e != self.outpos.step_e:
+            self.outpos.step_e = step_e
             sout += " E{:.5f}".format(self.outpos.step_e).rstrip("0").rstrip(".")
         return sout
 
-    def generate(self, layer_steps, ibeg, iend, orig_seq):
+    def generate(self, layer_steps, positions):
         """
-        Appends g-code lines to the plugin's returned string
-        starting from step ibeg included and until step iend excluded
+        Sets the g-code of the layer, moving the G0 and G1 steps
+        to their new positions
         """
-        ipos = 0
-        for i in range(ibeg, iend):
-            if layer_steps[i].step == 0:
-                layer_steps[i].step_x = orig_seq[ipos][0]
-                layer_steps[i].step_y = orig_seq[ipos][1]
-                sout = "G0" + self.stepToGcode(layer_steps[i])
-                self.layergcode = self.layergcode + sout + "\n"
-                ipos = ipos + 1
-            elif layer_steps[i].step == 1:
-                layer_steps[i].step_x = orig_seq[ipos][0]
-                layer_steps[i].step_y = orig_seq[ipos][1]
-                sout = "G1" + self.stepToGcode(layer_steps[i])
-                self.layergcode = self.layergcode + sout + "\n"
-                ipos = ipos + 1
+        lines = []
+        for onestep, (position_x, position_y) in zip(layer_steps, positions.tolist()):
+            if onestep[0] == 0 or onestep[0] == 1:
+                onestep[1] = position_x
+                onestep[2] = position_y
+                lines.append(("G0" if onestep[0] == 0 else "G1") + self.stepToGcode(onestep) + "\n")
             else:
-                self.layergcode = self.layergcode + layer_steps[i].comment + "\n"
-
+                lines.append(onestep[6] + "\n")
+        self.layergcode = "".join(lines)
 
     def workOnSequence(self, orig_seq, modif_seq):
         """
@@ -293,8 +273,57 @@ class Stretcher():
         if len(orig_seq) > 6: # Don't try push wall on a short sequence
             self.pushWall(orig_seq, modif_seq)
         if len(orig_seq):
-            self.vd1 = np.concatenate([self.vd1, np.array(orig_seq[:-1])])
-            self.vd2 = np.concatenate([self.vd2, np.array(orig_seq[1:])])
+            count = len(self.vd1)
+            self._vd1_buffer[count:count + len(orig_seq) - 1] = orig_seq[:-1]
+            self._vd2_buffer[count:count + len(orig_seq) - 1] = orig_seq[1:]
+            self.vd1 = self._vd1_buffer[:count + len(orig_seq) - 1]
+            self.vd2 = self._vd2_buffer[:count + len(orig_seq) - 1]
+
+    def findTrianglePoints(self, orig_seq, points, direction, limits, dmin_tri):
+        """
+        For each of the points, finds the nearest point of the sequence
+        that is at least dmin_tri away from it, going forward (direction 1)
+        or backward (direction -1) through the sequence.
+        Returns the indices of those points, or -1 where
+        no such point is found within limits steps.
+        Indices wrap around the end of the sequence.
+        """
+        found_points = np.full(len(points), -1, dtype = np.int64)
+        pending = np.arange(len(points)) # Points of which no far enough point was found yet
+        offset = 1
+        while len(pending):
+            pending = pending[limits[pending] >= offset]
+            candidates = (points[pending] + direction * offset) % len(orig_seq)
+            dist_from_point = ((orig_seq[points[pending]] - orig_seq[candidates]) ** 2).sum(1)
+            far_enough = dist_from_point >= dmin_tri * dmin_tri
+            found_points[pending[far_enough]] = candidates[far_enough]
+            pending = pending[~far_enough]
+            offset += 1
+        return found_points
+
+    def stretchPoints(self, orig_seq, modif_seq, points, ibeg, iend, dmin_proj):
+        """
+        Moves points away from the base of the triangles they form with
+        the points at ibeg and iend, which is towards the outside of the turn
+
+        See https://github.com/electrocbd/post_stretch for explanations
+        """
+        step = orig_seq[points]
+        base = orig_seq[iend] - orig_seq[ibeg]
+        # relpos is the relative position of the projection of the second point
+        # of the triangle on the segment from the first to the third point
+        # 0 means the position of the first point, 1 means the position of the third,
+        # intermediate values are positions between
+        length_base = (base ** 2).sum(1)
+        relpos = ((step - orig_seq[ibeg]) * base).sum(1)
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            # To avoid division by zero or precision loss
+            relpos = np.where(np.fabs(relpos) < 1000.0 * np.fabs(length_base), relpos / length_base, 0.5)
+        projection = orig_seq[ibeg] + relpos[:, np.newaxis] * base
+        dist_from_proj = np.sqrt(((projection - step) ** 2).sum(1))
+        move = dist_from_proj > dmin_proj # Move central point only if points are not aligned
+        modif_seq[points[move]] = (step[move] - (self.wc_stretch / dist_from_proj[move])[:, np.newaxis]
+                                   * (projection[move] - step[move]))
 
     def wideCircle(self, orig_seq, modif_seq):
         """
@@ -313,53 +342,17 @@ class Stretcher():
         of an acceptable triangle
         """
         dmin_tri = 0.5
-        iextra_base = np.floor_divide(len(orig_seq), 3) # Nb of extra points
-        ibeg = 0 # Index of first point of the triangle
-        iend = 0 # Index of the third point of the triangle
-        for i, step in enumerate(orig_seq):
-            if i == 0 or i == len(orig_seq) - 1:
-                # First and last point of the sequence are the same,
-                # so it is necessary to skip one of these two points
-                # when creating a triangle containing the first or the last point
-                iextra = iextra_base + 1
-            else:
-                iextra = iextra_base
-            # i is the index of the second point of the triangle
-            # pos_after is the array of positions of the original sequence
-            # after the current point
-            pos_after = np.resize(np.roll(orig_seq, -i-1, 0), (iextra, 2))
-            # Vector of distances between the current point and each following point
-            dist_from_point = ((step - pos_after) ** 2).sum(1)
-            if np.amax(dist_from_point) < dmin_tri * dmin_tri:
-                continue
-            iend = np.argmax(dist_from_point >= dmin_tri * dmin_tri)
-            # pos_before is the array of positions of the original sequence
-            # before the current point
-            pos_before = np.resize(np.roll(orig_seq, -i, 0)[::-1], (iextra, 2))
-            # This time, vector of distances between the current point and each preceding point
-            dist_from_point = ((step - pos_before) ** 2).sum(1)
-            if np.amax(dist_from_point) < dmin_tri * dmin_tri:
-                continue
-            ibeg = np.argmax(dist_from_point >= dmin_tri * dmin_tri)
-            # See https://github.com/electrocbd/post_stretch for explanations
-            # relpos is the relative position of the projection of the second point
-            # of the triangle on the segment from the first to the third point
-            # 0 means the position of the first point, 1 means the position of the third,
-            # intermediate values are positions between
-            length_base = ((pos_after[iend] - pos_before[ibeg]) ** 2).sum(0)
-            relpos = ((step - pos_before[ibeg])
-                      * (pos_after[iend] - pos_before[ibeg])).sum(0)
-            if np.fabs(relpos) < 1000.0 * np.fabs(length_base):
-                relpos /= length_base
-            else:
-                relpos = 0.5 # To avoid division by zero or precision loss
-            projection = (pos_before[ibeg] + relpos * (pos_after[iend] - pos_before[ibeg]))
-            dist_from_proj = np.sqrt(((projection - step) ** 2).sum(0))
-            if dist_from_proj > 0.0003: # Move central point only if points are not aligned
-                modif_seq[i] = (step - (self.wc_stretch / dist_from_proj)
-                                * (projection - step))
-
-        return
+        points = np.arange(len(orig_seq)) # The second point of each triangle
+        iextra = np.full(len(orig_seq), np.floor_divide(len(orig_seq), 3)) # Nb of extra points
+        # First and last point of the sequence are the same,
+        # so it is necessary to skip one of these two points
+        # when creating a triangle containing the first or the last point
+        iextra[0] += 1
+        iextra[-1] += 1
+        iend = self.findTrianglePoints(orig_seq, points, 1, iextra, dmin_tri)
+        ibeg = self.findTrianglePoints(orig_seq, points, -1, iextra, dmin_tri)
+        found = (iend >= 0) & (ibeg >= 0)
+        self.stretchPoints(orig_seq, modif_seq, points[found], ibeg[found], iend[found], 0.0003)
 
     def wideTurn(self, orig_seq, modif_seq):
         '''
@@ -368,29 +361,11 @@ class Stretcher():
         a reliable estimation of the orientation of the current turn
         '''
         dmin_tri = self.line_width / 2.0
-        ibeg = 0
-        iend = 2
-        for i in range(1, len(orig_seq) - 1):
-            dist_from_point = ((orig_seq[i] - orig_seq[i+1:]) ** 2).sum(1)
-            if np.amax(dist_from_point) < dmin_tri * dmin_tri:
-                continue
-            iend = i + 1 + np.argmax(dist_from_point >= dmin_tri * dmin_tri)
-            dist_from_point = ((orig_seq[i] - orig_seq[i-1::-1]) ** 2).sum(1)
-            if np.amax(dist_from_point) < dmin_tri * dmin_tri:
-                continue
-            ibeg = i - 1 - np.argmax(dist_from_point >= dmin_tri * dmin_tri)
-            length_base = ((orig_seq[iend] - orig_seq[ibeg]) ** 2).sum(0)
-            relpos = ((orig_seq[i] - orig_seq[ibeg]) * (orig_seq[iend] - orig_seq[ibeg])).sum(0)
-            if np.fabs(relpos) < 1000.0 * np.fabs(length_base):
-                relpos /= length_base
-            else:
-                relpos = 0.5
-            projection = orig_seq[ibeg] + relpos * (orig_seq[iend] - orig_seq[ibeg])
-            dist_from_proj = np.sqrt(((projection - orig_seq[i]) ** 2).sum(0))
-            if dist_from_proj > 0.001:
-                modif_seq[i] = (orig_seq[i] - (self.wc_stretch / dist_from_proj)
-                                * (projection - orig_seq[i]))
-        return
+        points = np.arange(1, len(orig_seq) - 1)
+        iend = self.findTrianglePoints(orig_seq, points, 1, len(orig_seq) - 1 - points, dmin_tri)
+        ibeg = self.findTrianglePoints(orig_seq, points, -1, points, dmin_tri)
+        found = (iend >= 0) & (ibeg >= 0)
+        self.stretchPoints(orig_seq, modif_seq, points[found], ibeg[found], iend[found], 0.001)
 
     def pushWall(self, orig_seq, modif_seq):
         """
@@ -408,40 +383,57 @@ class Stretcher():
         """
         dist_palp = self.line_width # Palpation distance to seek for a wall
         mrot = np.array([[0, -1], [1, 0]]) # Rotation matrix for a quarter turn
-        for i in range(len(orig_seq)):
-            ibeg = i # Index of the first point of the segment
-            iend = i + 1 # Index of the last point of the segment
-            if iend == len(orig_seq):
-                iend = i - 1
-            xperp = np.dot(mrot, orig_seq[iend] - orig_seq[ibeg])
-            xperp = xperp / np.sqrt((xperp ** 2).sum(-1))
-            testleft = orig_seq[ibeg] + xperp * dist_palp
-            materialleft = False # Is there already extruded material at the left of the segment
-            testright = orig_seq[ibeg] - xperp * dist_palp
-            materialright = False # Is there already extruded material at the right of the segment
-            if self.vd1.shape[0]:
-                relpos = np.clip(((testleft - self.vd1) * (self.vd2 - self.vd1)).sum(1)
-                                 / ((self.vd2 - self.vd1) * (self.vd2 - self.vd1)).sum(1), 0., 1.)
-                nearpoints = self.vd1 + relpos[:, np.newaxis] * (self.vd2 - self.vd1)
-                # nearpoints is the array of the nearest points of each segment
-                # from the point testleft
-                dist = ((testleft - nearpoints) * (testleft - nearpoints)).sum(1)
-                # dist is the array of the squares of the distances between testleft
-                # and each segment
-                if np.amin(dist) <= dist_palp * dist_palp:
-                    materialleft = True
-                # Now the same computation with the point testright at the other side of the
-                # current segment
-                relpos = np.clip(((testright - self.vd1) * (self.vd2 - self.vd1)).sum(1)
-                                 / ((self.vd2 - self.vd1) * (self.vd2 - self.vd1)).sum(1), 0., 1.)
-                nearpoints = self.vd1 + relpos[:, np.newaxis] * (self.vd2 - self.vd1)
-                dist = ((testright - nearpoints) * (testright - nearpoints)).sum(1)
-                if np.amin(dist) <= dist_palp * dist_palp:
-                    materialright = True
-            if materialleft and not materialright:
-                modif_seq[ibeg] = modif_seq[ibeg] + xperp * self.pw_stretch
-            elif not materialleft and materialright:
-                modif_seq[ibeg] = modif_seq[ibeg] - xperp * self.pw_stretch
+        iend = np.arange(1, len(orig_seq) + 1) # Index of the last point of each segment
+        iend[-1] = len(orig_seq) - 2
+        xperp = np.dot(orig_seq[iend] - orig_seq, mrot.T)
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            xperp = xperp / np.sqrt((xperp ** 2).sum(-1))[:, np.newaxis]
+        materialleft = self.materialNear(orig_seq + xperp * dist_palp, dist_palp) # Is there already extruded material at the left of the segment
+        materialright = self.materialNear(orig_seq - xperp * dist_palp, dist_palp) # Is there already extruded material at the right of the segment
+        push_left = materialleft & ~materialright
+        modif_seq[push_left] = modif_seq[push_left] + xperp[push_left] * self.pw_stretch
+        push_right = ~materialleft & materialright
+        modif_seq[push_right] = modif_seq[push_right] - xperp[push_right] * self.pw_stretch
+
+    def materialNear(self, test_points, dist_palp):
+        """
+        Returns for each of the test points whether there is
+        already deposited material within dist_palp of it
+        """
+        material = np.zeros(len(test_points), dtype = bool)
+        if not self.vd1.shape[0]:
+            return material
+        segments = self.vd2 - self.vd1
+        lengths = (segments * segments).sum(1)
+        if not lengths.all():
+            # A segment without length makes all distances NaN, so no material is found
+            return material
+
+        # Only compute the distances to the segments near each block of test points.
+        # The margin keeps rounding errors from excluding segments that are just close enough.
+        margin = dist_palp + 0.001
+        segments_min = np.minimum(self.vd1, self.vd2) - margin
+        segments_max = np.maximum(self.vd1, self.vd2) + margin
+        block_size = 64
+        for block_start in range(0, len(test_points), block_size):
+            block = test_points[block_start:block_start + block_size]
+            finite = np.isfinite(block).all(1) # Points of segments without length are NaN, and never near
+            if not finite.any():
+                continue
+            near = np.flatnonzero((segments_max >= block[finite].min(0)).all(1) & (segments_min <= block[finite].max(0)).all(1))
+            if not len(near):
+                continue
+            starts = self.vd1[near]
+            relpos = np.clip(((block[:, np.newaxis] - starts) * segments[near]).sum(2)
+                             / lengths[near], 0., 1.)
+            nearpoints = starts + relpos[:, :, np.newaxis] * segments[near]
+            # nearpoints is the array of the nearest points of each segment
+            # from each test point
+            dist = ((block[:, np.newaxis] - nearpoints) * (block[:, np.newaxis] - nearpoints)).sum(2)
+            # dist is the array of the squares of the distances between the test points
+            # and each segment
+            material[block_start:block_start + block_size] = dist.min(1) <= dist_palp * dist_palp
+        return material
 
 # Setup part of the stretch plugin
 class Stretch(Script):
@@ -0,0 +1,205 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# The PostProcessingPlugin is released under the terms of the AGPLv3 or higher.
+
+import os.path
+import re
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import UM.Application #Needs to be imported before the plug-in to prevent a circular import.
+from PostProcessingPlugin.GCodePipeline import GCodeLayer, GCodeLine, GCodePipeline #The module we're testing.
+from PostProcessingPlugin.Script import Script
+from PostProcessingPlugin.scripts.BQ_PauseAtHeight import BQ_PauseAtHeight
+from PostProcessingPlugin.scripts.FilamentChange import FilamentChange
+from PostProcessingPlugin.scripts.SearchAndReplace import SearchAndReplace
+
+
+##  Create a script without the container stack for its settings.
+#
+#   \param settings The values of the settings of the script.
+def createScript(script_class, **settings):
+    with patch.object(Script, "__init__", lambda self: None):
+        script = script_class()
+    script.getSettingValueByKey = settings.get
+    return script
+
+##  A script that processes all g-code at once, like the scripts that were
+#   written before layer stages existed.
+class AppendToLayers(Script):
+    def __init__(self, suffix):
+        self._suffix = suffix
+
+    def execute(self, data):
+        return [layer + self._suffix for layer in data]
+
+class FailingStage(Script):
+    def __init__(self):
+        pass
+
+    def processLayer(self, layer):
+        raise ValueError("Something went wrong.")
+
+##  The previous implementations of the scripts, which process the whole list
+#   of g-code at once. These serve as baseline for the benchmark.
+def referenceSearchAndReplace(data, search, replace):
+    search_regex = re.compile(re.escape(search))
+    for layer_number, layer in enumerate(data):
+        data[layer_number] = re.sub(search_regex, replace, layer)
+    return data
+
+def referenceFilamentChange(data, layer_number, initial_retract, later_retract):
+    color_change = "M600 E-%.2f L-%.2f ; Generated by FilamentChange plugin" % (initial_retract, later_retract)
+    for layer_num in layer_number.split(","):
+        layer_num = int(layer_num.strip())
+        if layer_num <= len(data):
+            for index, layer_data in enumerate(data):
+                first_line = layer_data.split("\n")[0]
+                if first_line == ";LAYER:" + str(layer_num - 1):
+                    lines = layer_data.split("\n")
+                    lines.insert(2, color_change)
+                    data[index] = "\n".join(lines)
+                    break
+    return data
+
+def referencePauseAtHeight(data, pause_height):
+    with patch.object(Script, "__init__", lambda self: None):
+        script = Script()
+    for index, layer in enumerate(data):
+        for line in layer.split("\n"):
+            if script.getValue(line, "G") == 1 or script.getValue(line, "G") == 0:
+                current_z = script.getValue(line, "Z")
+                if current_z != None:
+                    if current_z >= pause_height:
+                        data[index] = ";TYPE:CUSTOM\n; -- Pause at height (%.2f mm) --\nM25        ; Pauses the print and waits for the user to resume it\n" % pause_height + layer
+                        return data
+                    break
+    return data
+
+##  The g-code of a print, like the front-end produces it.
+def createGCode(layer_count, lines_per_layer):
+    data = [";FLAVOR:Marlin\n;LAYER_COUNT:{layer_count}\n".format(layer_count = layer_count), "M190 S60\nM109 S200\nG28 ;Home\n"]
+    for layer_number in range(layer_count):
+        z = 0.3 + layer_number * 0.1
+        lines = [";LAYER:{layer_number}".format(layer_number = layer_number), "M106 S255", "G0 F3000 X10 Y10 Z{z:.1f}".format(z = z), ";TYPE:WALL-OUTER"]
+        for line_number in range(lines_per_layer):
+            lines.append("G1 X{x:.3f} Y{y:.3f} E{e:.5f}".format(x = 10 + line_number % 100, y = 10 + line_number // 100, e = line_number * 0.03))
+        data.append("\n".join(lines) + "\n")
+    data.append("M104 S0\nM140 S0\nM84\n")
+    return data
+
+@pytest.mark.parametrize("line", [
+    "G1 X100 Y-2.5 E0.03",
+    "G0 F3000 X10. Z0.3",
+    "M117 Printing... ;G1 X5",
+    "G1 X5 X6", #The first occurrence wins.
+    "M117 Going up",
+    "X-",
+    ";LAYER:2",
+    ""
+])
+@pytest.mark.parametrize("key", ["G", "M", "X", "Y", "Z", "E", "F", "P"])
+def test_lineGetValue(line, key):
+    with patch.object(Script, "__init__", lambda self: None):
+        script = Script()
+    assert GCodeLine(line).getValue(key, "default") == script.getValue(line, key, "default")
+
+def test_layerUnmodified():
+    text = ";LAYER:0\nG1 X1 Y2\n"
+    layer = GCodeLayer(text, 2)
+    assert layer.getLines()[1].getValue("Y") == 2
+    assert not layer.isModified()
+    assert layer.getText() is text #Not re-serialised at all.
+
+def test_layerModifyLines():
+    layer = GCodeLayer(";LAYER:0\nG1 X1 Y2\nG1 X3 Y4", 2)
+    layer.insertLines(1, ["M600", "M117 Changed"])
+    layer.replaceLine(3, "G1 X10 Y20")
+    layer.removeLine(4)
+    assert layer.isModified()
+    assert layer.getText() == ";LAYER:0\nM600\nM117 Changed\nG1 X10 Y20"
+    assert layer.getIndex() == 2
+
+##  Running the scripts in one pipeline must give the same result as running
+#   them one after another.
+def test_pipelineSameAsSequential():
+    def createScripts():
+        return [
+            createScript(SearchAndReplace, search = "M106 S255", replace = "M106 S127", is_regex = False),
+            createScript(FilamentChange, layer_number = "3,7", initial_retract = 30.0, later_retract = 300.0),
+            AppendToLayers(";Legacy\n"), #Stages after this must see its changes.
+            createScript(SearchAndReplace, search = ";Legacy", replace = ";Replaced", is_regex = False),
+            createScript(BQ_PauseAtHeight, pause_height = 0.6)
+        ]
+
+    sequential = createGCode(10, 5)
+    for script in createScripts():
+        sequential = script.execute(sequential)
+    piped = GCodePipeline(createScripts()).execute(createGCode(10, 5))
+
+    assert piped == sequential
+    assert "M106 S127" in piped[2]
+    assert "M600 E-30.00 L-300.00" in piped[4] #Layer numbers start at 1 in the setting, and the first two layers are the header and start g-code.
+    assert piped[5].startswith(";TYPE:CUSTOM\n; -- Pause at height (0.60 mm) --") #Layer 3 is at 0.6mm.
+    assert all(layer.endswith(";Replaced\n") for layer in piped)
+
+##  A script that fails is skipped, without stopping the others.
+def test_pipelineFailingStage():
+    scripts = [FailingStage(), createScript(SearchAndReplace, search = "M84", replace = "M18", is_regex = False)]
+
+    result = GCodePipeline(scripts).execute(createGCode(3, 5))
+
+    assert result[-1] == "M104 S0\nM140 S0\nM18\n"
+
+def test_iterLines():
+    layer = GCodeLayer(";LAYER:0\nG1 X1 Y2\n", 2)
+    assert [line.text for line in layer.iterLines()] == [";LAYER:0", "G1 X1 Y2", ""]
+    assert layer._lines is None #Not split into lines.
+    layer.insertLines(1, ["M600"])
+    assert [line.text for line in layer.iterLines()] == [";LAYER:0", "M600", "G1 X1 Y2", ""]
+
+##  Compare running a chain of scripts in a single pass to the previous
+#   implementations of the scripts, which each went through all layers.
+#
+#   A single script may take a bit longer, for wrapping the layers, but with
+#   several scripts the pipeline has to be faster.
+@pytest.mark.parametrize("script_count", [1, 3, 6])
+def test_benchmarkPipeline(script_count):
+    def createScripts():
+        scripts = []
+        for index in range(script_count):
+            if index % 3 == 0:
+                scripts.append(createScript(SearchAndReplace, search = "M106 S255", replace = "M106 S127", is_regex = False))
+            elif index % 3 == 1:
+                scripts.append(createScript(FilamentChange, layer_number = "50,100", initial_retract = 30.0, later_retract = 300.0))
+            else:
+                scripts.append(createScript(BQ_PauseAtHeight, pause_height = 10.0))
+        return scripts
+    reference_scripts = [
+        lambda data: referenceSearchAndReplace(data, "M106 S255", "M106 S127"),
+        lambda data: referenceFilamentChange(data, "50,100", 30.0, 300.0),
+        lambda data: referencePauseAtHeight(data, 10.0)
+    ]
+
+    reference_time = piped_time = float("inf")
+    for _ in range(3):
+        reference = createGCode(500, 2000)
+        start_time = time.time()
+        for index in range(script_count):
+            reference = reference_scripts[index % 3](reference)
+        reference_time = min(reference_time, time.time() - start_time)
+
+        piped = createGCode(500, 2000)
+        start_time = time.time()
+        piped = GCodePipeline(createScripts()).execute(piped)
+        piped_time = min(piped_time, time.time() - start_time)
+
+    assert piped == reference
+    if script_count > 1:
+        assert piped_time < reference_time
+    else:
+        assert piped_time < reference_time * 2
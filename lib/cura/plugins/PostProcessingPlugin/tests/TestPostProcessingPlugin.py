@@ -0,0 +1,77 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# The PostProcessingPlugin is released under the terms of the AGPLv3 or higher.
+
+import os.path
+import sys
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import cura.CuraApplication #Needs to be imported before the plug-ins to prevent a circular import.
+from UM.Application import Application
+from UM.Settings.ContainerStack import ContainerStack
+from UM.Signal import Signal
+
+from CuraEngineBackend.CuraEngineBackend import CuraEngineBackend
+from PostProcessingPlugin.PostProcessingPlugin import PostProcessingPlugin #The modules we're testing.
+from PostProcessingPlugin.Script import Script
+
+
+##  An application that runs the events when asked, with a global stack.
+class EventLoop:
+    def __init__(self):
+        self.events = []
+        self.global_stack = ContainerStack("global")
+
+    def functionEvent(self, event):
+        self.events.append(event)
+
+    def callLater(self, function, *args, **kwargs):
+        self.functionEvent(MagicMock(call = lambda: function(*args, **kwargs)))
+
+    def getMainThread(self):
+        return threading.current_thread()
+
+    def getGlobalContainerStack(self):
+        return self.global_stack
+
+    ##  Runs all events, including the ones that they add.
+    def run(self):
+        while self.events:
+            self.events.pop(0).call()
+
+@pytest.fixture
+def application():
+    result = EventLoop()
+    with patch.object(Signal, "_app", result), patch.object(Application, "getInstance", MagicMock(return_value = result)):
+        yield result
+
+##  A back-end that listens to the global stack like the CuraEngineBackend.
+@pytest.fixture
+def backend(application):
+    result = MagicMock()
+    def onSettingsChanged(changes):
+        CuraEngineBackend._onSettingsChanged(result, changes)
+    result.onSettingsChanged = onSettingsChanged #Keep a reference, since signals only keep weak references.
+    application.global_stack.batchedPropertiesChanged.connect(onSettingsChanged)
+    return result
+
+##  Adding or removing a script must make the back-end reslice.
+def test_scriptListChangedReslices(application, backend):
+    plugin = MagicMock()
+    PostProcessingPlugin._propertyChanged(plugin)
+    application.run()
+
+    backend.needsSlicing.assert_called_once_with()
+
+##  Changing a setting of a script must make the back-end reslice.
+def test_scriptSettingChangedReslices(application, backend):
+    with patch.object(Script, "__init__", lambda self: None):
+        script = Script()
+    script._onPropertyChanged("pause_height", "value")
+    application.run()
+
+    backend.needsSlicing.assert_called_once_with()
@@ -0,0 +1,122 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# The PostProcessingPlugin is released under the terms of the AGPLv3 or higher.
+
+import hashlib
+import math
+import os.path
+import sys
+import time
+
+import numpy
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import cura.CuraApplication #Needs to be imported before the plug-in to prevent a circular import.
+from PostProcessingPlugin.scripts.Stretch import Stretcher #The module we're testing.
+
+
+##  Creates the g-code of a print with holes, cylinders, infill and curves.
+#
+#   \param retract Whether to retract and unretract around travel moves.
+#   Unretracting adds moves without length to the extrusion sequences, after
+#   which the push wall stretch finds no material anymore.
+def createGCode(layer_count, seed, circles_per_layer = 6, infill_lines = 40, retract = True):
+    random = numpy.random.RandomState(seed)
+    data = [";FLAVOR:Marlin\n;LAYER_COUNT:{layer_count}\n".format(layer_count = layer_count),
+            ";Generated with Cura_SteamEngine\nM140 S60\nM109 S200\nG28 ;Home\nG91 ;Relative\nG1 Z15.0 F6000\nG90 ;Absolute\nG92 E0\nG1 F200 E3\nG92 E0\n"]
+    e = 0.0
+    for layer_number in range(layer_count):
+        z = 0.2 * (layer_number + 1)
+        lines = [";LAYER:{0}".format(layer_number), "M106 S{0}".format(min(255, layer_number * 85))]
+        for _ in range(circles_per_layer):
+            centre = random.uniform(20, 180, 2)
+            radius = random.uniform(0.5, 15)
+            segments = random.randint(6, 90)
+            angles = numpy.linspace(0, 2 * math.pi, segments + 1) + random.uniform(0, math.pi)
+            points = centre + radius * numpy.column_stack((numpy.cos(angles), numpy.sin(angles)))
+            points += random.normal(0, 0.01, points.shape)
+            lines.append("G0 F7200 X{0:.3f} Y{1:.3f} Z{2:.3f}".format(points[0][0], points[0][1], z))
+            lines.append(";TYPE:WALL-OUTER" if radius > 5 else ";TYPE:WALL-INNER")
+            if retract:
+                lines.append("G1 F2700 E{0:.5f}".format(e))
+            for previous, point in zip(points[:-1], points[1:]):
+                e += numpy.linalg.norm(point - previous) * 0.033
+                lines.append("G1 F1800 X{0:.3f} Y{1:.3f} E{2:.5f}".format(point[0], point[1], e))
+            if retract:
+                lines.append("G1 F2700 E{0:.5f}".format(e - 6.5))
+        # Infill of parallel lines next to each other, which pushes walls, with short connections.
+        start = random.uniform(30, 150, 2)
+        lines.append(";TYPE:FILL")
+        lines.append("G0 F7200 X{0:.3f} Y{1:.3f}".format(start[0], start[1]))
+        if retract:
+            lines.append("G1 F2700 E{0:.5f}".format(e))
+        x, y = start
+        for index in range(infill_lines):
+            x += 20 if index % 2 == 0 else -20
+            e += 20 * 0.033
+            lines.append("G1 X{0:.3f} Y{1:.3f} E{2:.5f}".format(x, y, e))
+            y += 0.4
+            e += 0.4 * 0.033
+            lines.append("G1 X{0:.3f} Y{1:.3f} E{2:.5f}".format(x, y, e))
+        # An open curve.
+        lines.append(";TYPE:SKIN")
+        angles = numpy.linspace(0, random.uniform(0.5, 3), random.randint(3, 40))
+        for angle in angles:
+            e += 0.05
+            lines.append("G1 X{0:.3f} Y{1:.3f} E{2:.5f}".format(100 + 10 * math.cos(angle), 100 + 10 * math.sin(angle), e))
+        if layer_number % 3 == 2: # A Z-hop in relative coordinates.
+            lines.extend(["G91", "G1 Z0.5", "G90", "G92 E0 ;Reset"])
+            e = 0.0
+        if layer_number % 4 == 3 and len(data) > 3: # The previous layer in the same list item.
+            data[-1] += "\n".join(lines) + "\n"
+        else:
+            data.append("\n".join(lines) + "\n")
+    data.append("G91\nG1 E-2 F2700\nG1 E-2 Z0.2 F2400 ;Retract and raise Z\nG1 X5 Y5 F3000\nG90\nM140 S0\nM84\n")
+    return data
+
+##  The SHA-256 of the output of the stretch script for some prints, from
+#   before the script was vectorised. The output must stay exactly the same.
+regression_corpus = [
+    ((5, 1), 0.1, 0.1, "ef9dd5b3c7b563b4712ea23b03228c21b8335849b43a53c4560e84005f667a7b"),
+    ((5, 1), 0.08, 0.05, "8fd612a0ab4cd48d1e0895576771021fcd55d97f397d84568aa829b9dd07516d"),
+    ((20, 2), 0.1, 0.1, "ddb8f5fb34ea2eb6f25521dec44a6dc035835239e2fb95c73770de75b8c850e1"),
+    ((20, 2), 0.08, 0.05, "3e1be9be24e734fdcc5b8bd59d8063eb7e68ee6f906ac71db7c2996d7c06e8c6"),
+    ((40, 3, 10, 60), 0.1, 0.1, "6ed8f1b95ed53f46f7f50343c28c3956b17943f336c0eb7dec3f64b96d3b6e57"),
+    ((40, 3, 10, 60), 0.08, 0.05, "2399dc4e7758c8c0eb3e70da13b7e61aae919de1fb0adbe95ec63722291fe73c"),
+    ((5, 4, 6, 40, False), 0.1, 0.1, "b920e8a3265257be022ce383ce814a64cb24075eac6ee3b4d62d6a39950d8528"),
+    ((5, 4, 6, 40, False), 0.08, 0.05, "fa9c80147e6835db877f15b25497c82a8edc4997aa6422f5a28d6cbb957f75b2"),
+    ((20, 5, 10, 60, False), 0.1, 0.1, "04e481d33e2ab6e594065bee0ceebda3d42172f71797fcf37559358b040227f5"),
+    ((20, 5, 10, 60, False), 0.08, 0.05, "a2de5b5a2b1d34387f7a95c556f2a1077957cce22501cdaf7c4df67751b8dfc3")
+]
+
+@pytest.mark.parametrize("print_parameters, wc_stretch, pw_stretch, digest", regression_corpus)
+def test_regressionCorpus(print_parameters, wc_stretch, pw_stretch, digest):
+    result = Stretcher(0.4, wc_stretch, pw_stretch).execute(createGCode(*print_parameters))
+    assert hashlib.sha256("".join(result).encode("utf-8")).hexdigest() == digest
+
+def test_settingsComments():
+    data = createGCode(1, 1)
+    result = Stretcher(0.4, 0.1, 0.3).execute(data)
+
+    assert len(result) == len(data) + 2
+    assert result[0] == data[0] #Nothing to stretch in the header.
+    assert result[-2:] == [";Wide circle stretch distance 0.1\n", ";Push wall stretch distance 0.1\n"] #Push wall stretch is limited to a quarter of the line width.
+
+##  Measure how fast a larger print is stretched.
+#
+#   The previous implementation stretched about 4000 lines per second, and
+#   this one about 55000 on the same machine. Require at least 20000 to leave
+#   room for slower machines.
+def test_benchmarkStretch():
+    data = createGCode(100, 6, circles_per_layer = 10, infill_lines = 60, retract = False)
+    line_count = sum(layer.count("\n") for layer in data)
+    original_data = list(data)
+
+    start_time = time.time()
+    result = Stretcher(0.4, 0.1, 0.1).execute(data)
+    duration = time.time() - start_time
+
+    assert result[0] == original_data[0]
+    assert result[-2:] == [";Wide circle stretch distance 0.1\n", ";Push wall stretch distance 0.1\n"]
+    assert line_count / duration > 20000
@@ -341,30 +341,23 @@ class SimulationView(View):
                 continue
 
             self.setActivity(True)
-            min_layer_number = sys.maxsize
-            max_layer_number = -sys.maxsize
-            for layer_id in layer_data.getLayers():
-
-                # If a layer doesn't contain any polygons, skip it (for infill meshes taller than print objects
-                if len(layer_data.getLayer(layer_id).polygons) < 1:
-                    continue
-
-                # Store the max and min feedrates and thicknesses for display purposes
-                for p in layer_data.getLayer(layer_id).polygons:
-                    self._max_feedrate = max(float(p.lineFeedrates.max()), self._max_feedrate)
-                    self._min_feedrate = min(float(p.lineFeedrates.min()), self._min_feedrate)
-                    self._max_thickness = max(float(p.lineThicknesses.max()), self._max_thickness)
-                    try:
-                        self._min_thickness = min(float(p.lineThicknesses[numpy.nonzero(p.lineThicknesses)].min()), self._min_thickness)
-                    except:
-                        # Sometimes, when importing a GCode the line thicknesses are zero and so the minimum (avoiding
-                        # the zero) can't be calculated
-                        Logger.log("i", "Min thickness can't be calculated because all the values are zero")
-                if max_layer_number < layer_id:
-                    max_layer_number = layer_id
-                if min_layer_number > layer_id:
-                    min_layer_number = layer_id
-            layer_count = max_layer_number - min_layer_number
+            layer_index = layer_data.getLayerIndex()
+            if layer_index.getMinLayer() is None:  # No layer contains any polygons.
+                continue
+
+            # Store the max and min feedrates and thicknesses for display purposes
+            if layer_index.getMaxFeedrate() is not None:
+                self._max_feedrate = max(layer_index.getMaxFeedrate(), self._max_feedrate)
+                self._min_feedrate = min(layer_index.getMinFeedrate(), self._min_feedrate)
+            if layer_index.getMaxThickness() is not None:
+                self._max_thickness = max(layer_index.getMaxThickness(), self._max_thickness)
+            if layer_index.getMinThickness() is not None:
+                self._min_thickness = min(layer_index.getMinThickness(), self._min_thickness)
+            else:
+                # Sometimes, when importing a GCode the line thicknesses are zero and so the minimum (avoiding
+                # the zero) can't be calculated
+                Logger.log("i", "Min thickness can't be calculated because all the values are zero")
+            layer_count = layer_index.getMaxLayer() - layer_index.getMinLayer()
 
             if new_max_layers < layer_count:
                 new_max_layers = layer_count
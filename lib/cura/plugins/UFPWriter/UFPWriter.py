@@ -12,6 +12,7 @@ from UM.Mesh.MeshWriter import MeshWriter #The writer we need to implement.
 from UM.PluginRegistry import PluginRegistry #To get the g-code writer.
 from PyQt5.QtCore import QBuffer
 
+from cura.CuraApplication import CuraApplication
 from cura.Snapshot import Snapshot
 
 from UM.i18n import i18nCatalog
@@ -31,7 +32,8 @@ class UFPWriter(MeshWriter):
 
     def write(self, stream, nodes, mode = MeshWriter.OutputMode.BinaryMode):
         archive = VirtualFile()
-        archive.openStream(stream, "application/x-ufp", OpenMode.WriteOnly)
+        compression_level = CuraApplication.getInstance().getArchiveCompressionLevel()
+        archive.openStream(stream, "application/x-ufp", OpenMode.WriteOnly, compression_level = compression_level)
 
         #Store the g-code from the scene.
         archive.addContentType(extension = "gcode", mime_type = "text/x-gcode")
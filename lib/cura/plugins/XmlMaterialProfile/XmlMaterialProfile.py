@@ -14,6 +14,7 @@ from typing import Iterator
 from UM.Resources import Resources
 from UM.Logger import Logger
 from cura.CuraApplication import CuraApplication
+from cura.Settings.MetadataInterner import MetadataInterner
 import UM.Dictionary
 from UM.Settings.InstanceContainer import InstanceContainer
 from UM.Settings.ContainerRegistry import ContainerRegistry
@@ -878,6 +879,11 @@ class XmlMaterialProfile(InstanceContainer):
         except StopIteration: #No 'hardware compatible' setting.
             common_compatibility = True
         base_metadata["compatible"] = common_compatibility
+
+        # Many materials have the same properties, brands, descriptions, etc. Share those values with other materials,
+        # and the values of the base material with all machine- and variant-specific materials that are derived from it.
+        interner = cls.__metadata_interner
+        base_metadata = interner.internMetadata(base_metadata)
         result_metadata.append(base_metadata)
 
         # Map machine human-readable names to IDs
@@ -903,7 +909,7 @@ class XmlMaterialProfile(InstanceContainer):
 
                     definition_metadata = definition_metadatas[0]
 
-                    machine_manufacturer = identifier.get("manufacturer", definition_metadata.get("manufacturer", "Unknown")) #If the XML material doesn't specify a manufacturer, use the one in the actual printer definition.
+                    machine_manufacturer = interner.intern(identifier.get("manufacturer", definition_metadata.get("manufacturer", "Unknown"))) #If the XML material doesn't specify a manufacturer, use the one in the actual printer definition.
 
                     # Always create the instance of the material even if it is not compatible, otherwise it will never
                     # show as incompatible if the material profile doesn't define hotends in the machine - CURA-5444
@@ -953,11 +959,13 @@ class XmlMaterialProfile(InstanceContainer):
 
                         buildplate_map["buildplate_compatible"][buildplate_id] = buildplate_compatibility
                         buildplate_map["buildplate_recommended"][buildplate_id] = buildplate_recommended
+                    buildplate_map = interner.intern(buildplate_map)
 
                     for hotend in machine.iterfind("./um:hotend", cls.__namespaces):
                         hotend_name = hotend.get("id")
                         if hotend_name is None:
                             continue
+                        hotend_name = interner.intern(hotend_name)
 
                         hotend_compatibility = machine_compatibility
                         for entry in hotend.iterfind("./um:setting", cls.__namespaces):
@@ -1061,14 +1069,22 @@ class XmlMaterialProfile(InstanceContainer):
     ##  Gets a mapping from product names in the XML files to their definition
     #   IDs.
     #
-    #   This loads the mapping from a file.
+    #   This loads the mapping from a file the first time it is needed. The
+    #   mapping is shared, so it must not be modified.
     @classmethod
     def getProductIdMap(cls) -> Dict[str, List[str]]:
-        product_to_id_file = os.path.join(os.path.dirname(sys.modules[cls.__module__].__file__), "product_to_id.json")
-        with open(product_to_id_file, encoding = "utf-8") as f:
-            product_to_id_map = json.load(f)
-        product_to_id_map = {key: [value] for key, value in product_to_id_map.items()}
-        return product_to_id_map
+        if cls.__product_id_map is None:
+            product_to_id_file = os.path.join(os.path.dirname(sys.modules[cls.__module__].__file__), "product_to_id.json")
+            with open(product_to_id_file, encoding = "utf-8") as f:
+                product_to_id_map = json.load(f)
+            XmlMaterialProfile.__product_id_map = {key: [value] for key, value in product_to_id_map.items()}
+        return cls.__product_id_map
+
+    ##  Gets the interner that shares equal metadata values between the
+    #   metadata of all materials.
+    @classmethod
+    def getMetadataInterner(cls) -> MetadataInterner:
+        return cls.__metadata_interner
 
     ##  Parse the value of the "material compatible" property.
     @classmethod
@@ -1109,6 +1125,11 @@ class XmlMaterialProfile(InstanceContainer):
         "cura": "http://www.ultimaker.com/cura"
     }
 
+    __product_id_map = None # type: Optional[Dict[str, List[str]]]
+
+    # Shares equal metadata values between the metadata of all materials.
+    __metadata_interner = MetadataInterner()
+
 ##  Helper function for pretty-printing XML because ETree is stupid
 def _indent(elem, level = 0):
     i = "\n" + level * "  "
@@ -0,0 +1,118 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import glob
+import os.path
+import sys
+import time
+import tracemalloc
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import cura.CuraApplication  # Imported first to avoid circular imports.
+from cura.Settings.MetadataInterner import MetadataInterner
+
+from XmlMaterialProfile.XmlMaterialProfile import XmlMaterialProfile #The module we're testing.
+
+materials_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "..", "..", "share", "cura", "resources", "materials")
+
+##  The serialized material profiles that ship with Cura, by container ID.
+def loadMaterialFiles():
+    result = {}
+    for file_path in sorted(glob.glob(os.path.join(materials_directory, "*.xml.fdm_material"))):
+        with open(file_path, encoding = "utf-8") as f:
+            result[os.path.basename(file_path)[:-len(".xml.fdm_material")]] = f.read()
+    return result
+
+##  A container registry in which every machine and build plate exists.
+#
+#   This doesn't record the calls like a mock would, so that it doesn't take
+#   memory during the benchmark.
+class Registry:
+    def findDefinitionContainersMetadata(self, id):
+        return [{"id": id, "manufacturer": "Ultimaker B.V."}]
+
+    def findInstanceContainersMetadata(self, **kwargs):
+        return [{"id": kwargs.get("id", kwargs.get("name"))}]
+
+@pytest.fixture
+def registry():
+    result = Registry()
+    version_upgrade_manager = MagicMock()
+    version_upgrade_manager.updateFilesData.return_value = None # No upgrades needed.
+    with patch("UM.Settings.ContainerRegistry.ContainerRegistry.getInstance", return_value = result), \
+         patch("UM.VersionUpgradeManager.VersionUpgradeManager.getInstance", return_value = version_upgrade_manager):
+        yield result
+
+class NoInterning(MetadataInterner):
+    def intern(self, value):
+        return value
+
+    def internMetadata(self, metadata):
+        return metadata
+
+def deserializeAll(material_files, copies = 1):
+    result = []
+    for copy_index in range(copies):
+        for container_id, serialized in material_files.items():
+            result.extend(XmlMaterialProfile.deserializeMetadata(serialized, "{container_id}_{copy_index}".format(container_id = container_id, copy_index = copy_index)))
+    return result
+
+def test_sameMetadataWithInterning(registry):
+    material_files = loadMaterialFiles()
+    assert material_files
+
+    interned = deserializeAll(material_files)
+    with patch.object(XmlMaterialProfile, "_XmlMaterialProfile__metadata_interner", NoInterning()):
+        reference = deserializeAll(material_files)
+
+    assert interned == reference
+
+def test_sharedValues(registry):
+    material_files = loadMaterialFiles()
+    with patch.object(XmlMaterialProfile, "_XmlMaterialProfile__metadata_interner", MetadataInterner()):
+        metadata_list = XmlMaterialProfile.deserializeMetadata(material_files["ultimaker_pla_black"], "pla_black") + \
+                        XmlMaterialProfile.deserializeMetadata(material_files["ultimaker_pla_blue"], "pla_blue")
+
+    pla_black = metadata_list[0]
+    pla_blue = next(metadata for metadata in metadata_list if metadata["id"] == "pla_blue")
+    assert pla_black["properties"] == pla_blue["properties"]
+    assert pla_black["properties"] is not pla_blue["properties"] # Each material can change its own properties.
+    assert all(pla_black["properties"][key] is pla_blue["properties"][key] for key in pla_black["properties"]) # From different files, but the same contents.
+    assert pla_black["brand"] is pla_blue["brand"]
+    machine_metadata = [metadata for metadata in metadata_list if metadata["base_file"] == "pla_blue" and "variant_name" in metadata]
+    assert machine_metadata
+    assert all(metadata["definition"] is machine_metadata[0]["definition"] for metadata in machine_metadata if metadata["definition"] == machine_metadata[0]["definition"])
+
+def test_productIdMapLoadedOnce(registry):
+    XmlMaterialProfile.getProductIdMap()
+    with patch("builtins.open") as mock_open:
+        product_id_map = XmlMaterialProfile.getProductIdMap()
+    mock_open.assert_not_called()
+    assert product_id_map["Ultimaker 3"] == ["ultimaker3"]
+
+##  Loading the metadata of a library of materials, five times the size of the
+#   materials that ship with Cura, with and without sharing equal values.
+def test_benchmarkMaterialMetadata(registry):
+    material_files = loadMaterialFiles()
+    results = {}
+    XmlMaterialProfile.getProductIdMap() # Loaded once, before the benchmark.
+    interner = MetadataInterner()
+    for name, metadata_interner in (("without interning", NoInterning()), ("with interning", interner)):
+        with patch.object(XmlMaterialProfile, "_XmlMaterialProfile__metadata_interner", metadata_interner):
+            tracemalloc.start()
+            start_time = time.perf_counter()
+            metadata_list = deserializeAll(material_files, copies = 5)
+            duration = time.perf_counter() - start_time
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+        results[name] = (metadata_list, duration, memory)
+
+    statistics = interner.getStatistics()
+    assert statistics["shared_count"] > statistics["lookup_count"] * 0.9 # Most values are the same in every material.
+    assert results["with interning"][0] == results["without interning"][0]
+    assert results["with interning"][1] < results["without interning"][1] * 1.5
+    assert results["with interning"][2] < results["without interning"][2] * 0.95
@@ -0,0 +1,298 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import gc
+import multiprocessing
+import os
+import time
+import tracemalloc
+from unittest.mock import patch
+
+import numpy
+import pytest
+
+from cura.Layer import Layer
+from cura.LayerData import LayerIndex
+from cura.LayerDataBuilder import LayerDataBuilder
+from cura.LayerDataSpillFile import LayerDataSpillFile
+from cura.LayerPolygon import LayerPolygon
+
+color_map = numpy.random.RandomState(1337).uniform(0, 1, (11, 4)) #Instead of the colours from the theme.
+material_color_map = numpy.array([[1, 0, 0, 1], [0, 1, 0, 1]], dtype = numpy.float32)
+
+
+##  Just the part of a LayerPolygon that the layer index looks at.
+class FakePolygon:
+    def __init__(self, point_count, offset):
+        self.data = numpy.arange(offset, offset + point_count * 3, dtype = numpy.float32).reshape((-1, 3))
+
+def createLayers(layer_count, polygons_per_layer):
+    random = numpy.random.RandomState(1337)
+    layers = {}
+    element_counts = {}
+    for layer_id in range(layer_count):
+        layers[layer_id] = Layer(layer_id)
+        for polygon_nr in range(polygons_per_layer):
+            layers[layer_id].polygons.append(FakePolygon(random.randint(2, 20), polygon_nr * 1000))
+        element_counts[layer_id] = int(random.randint(0, 1000))
+    return layers, element_counts
+
+
+##  How the layer view used to find the position of the head, by walking
+#   through the polygons.
+def findPathPointReference(layer, path_index):
+    offset = 0
+    for polygon in layer.polygons:
+        if path_index >= polygon.data.size // 3 - offset:
+            path_index -= polygon.data.size // 3 - offset
+            offset = 1
+            continue
+        return polygon.data[path_index + offset]
+    return None
+
+def test_elementOffsets():
+    layers, element_counts = createLayers(20, 3)
+    del element_counts[5] # A gap in the layer numbers.
+    index = LayerIndex(layers, element_counts)
+
+    for layer_id in range(-1, 22):
+        assert index.getElementOffset(layer_id) == sum(count for other_id, count in element_counts.items() if other_id < layer_id)
+        assert index.hasLayer(layer_id) == (layer_id in element_counts)
+    assert index.getElementCount() == sum(element_counts.values())
+
+def test_findPathPoint():
+    layers, element_counts = createLayers(3, 5)
+    index = LayerIndex(layers, element_counts)
+
+    for layer_id, layer in layers.items():
+        for path_index in range(sum(len(polygon.data) for polygon in layer.polygons) + 2):
+            expected = findPathPointReference(layer, path_index)
+            result = index.findPathPoint(layer_id, path_index)
+            if expected is None:
+                assert result is None
+            else:
+                polygon, point_index = result
+                assert numpy.array_equal(polygon.data[point_index], expected)
+    assert index.findPathPoint(10, 0) is None
+
+def test_statistics():
+    layers, element_counts = createLayers(5, 1)
+    layers[7] = Layer(7) # Empty layers don't count.
+    index = LayerIndex(layers, element_counts, feedrates = numpy.array([30, 10, 50], numpy.float32), thicknesses = numpy.array([0, 0.2, 0.1], numpy.float32))
+
+    assert index.getMinLayer() == 0
+    assert index.getMaxLayer() == 4
+    assert index.getMinFeedrate() == 10
+    assert index.getMaxFeedrate() == 50
+    assert index.getMinThickness() == pytest.approx(0.1)
+    assert index.getMaxThickness() == pytest.approx(0.2)
+
+    index = LayerIndex(layers, element_counts, feedrates = numpy.array([30], numpy.float32), thicknesses = numpy.array([0], numpy.float32))
+    assert index.getMinThickness() is None
+
+
+##  Benchmark of the lookups that the layer view does for every frame, for a
+#   print with many layers. With the index, they have to be faster than
+#   before, even when building the index is counted as well.
+def test_benchmarkLookups():
+    layers, element_counts = createLayers(3000, 50)
+
+    start_time = time.time()
+    index = LayerIndex(layers, element_counts)
+    build_time = time.time() - start_time
+
+    reference_offsets = []
+    start_time = time.time()
+    for layer_id in range(0, 3000, 10):
+        end = 0
+        for other_id in sorted(element_counts.keys()):
+            if other_id == layer_id:
+                break
+            end += element_counts[other_id]
+        reference_offsets.append(end)
+        findPathPointReference(layers[layer_id], 300)
+    reference_time = time.time() - start_time
+
+    offsets = []
+    start_time = time.time()
+    for layer_id in range(0, 3000, 10):
+        offsets.append(index.getElementOffset(layer_id))
+        index.findPathPoint(layer_id, 300)
+    index_time = time.time() - start_time
+
+    assert offsets == reference_offsets
+    assert index_time < reference_time
+    assert build_time + index_time < reference_time * 3 #Building it once doesn't take much more than the lookups of a few frames.
+
+
+##  Fill a builder with polygons of random lines, like a sliced print.
+def createBuilder(layer_count, polygons_per_layer, lines_per_polygon):
+    random = numpy.random.RandomState(1337)
+    builder = LayerDataBuilder()
+    for layer_id in range(layer_count):
+        builder.addLayer(layer_id)
+        layer = builder.getLayer(layer_id)
+        for _ in range(polygons_per_layer):
+            line_types = random.randint(0, 11, (lines_per_polygon, 1)).astype(numpy.uint8)
+            line_types[random.uniform(0, 1, lines_per_polygon) < 0.8] = LayerPolygon.InfillType #Long runs of the same type.
+            points = random.uniform(0, 200, (lines_per_polygon + 1, 3)).astype(numpy.float32)
+            line_widths = random.uniform(0.2, 0.6, (lines_per_polygon, 1)).astype(numpy.float32)
+            line_thicknesses = random.uniform(0.05, 0.3, (lines_per_polygon, 1)).astype(numpy.float32)
+            line_feedrates = random.uniform(10, 150, (lines_per_polygon, 1)).astype(numpy.float32)
+            polygon = LayerPolygon(random.randint(0, 2), line_types, points, line_widths, line_thicknesses, line_feedrates)
+            polygon.buildCache()
+            layer.polygons.append(polygon)
+    return builder
+
+@patch.object(LayerPolygon, "getColorMap", lambda: color_map)
+def test_compactLayerData():
+    full = createBuilder(5, 4, 50).build(material_color_map, 0.5)
+    compact = createBuilder(5, 4, 50).build(material_color_map, 0.5, compact = True)
+
+    assert numpy.array_equal(compact.getVertices(), full.getVertices())
+    assert numpy.array_equal(compact.getIndices(), full.getIndices())
+    assert compact.getColors() == pytest.approx(full.getColors())
+    assert len(compact.getColorsAsByteArray()) == compact.getVertexCount() * 4 * 4 #Four 32-bit floats per vertex, like OpenGL expects.
+    assert compact.attributeNames() == full.attributeNames()
+    for attribute_name in full.attributeNames():
+        full_value = numpy.frombuffer(full.getAttributeAsByteArray(attribute_name), dtype = numpy.float32)
+        compact_value = numpy.frombuffer(compact.getAttributeAsByteArray(attribute_name), dtype = numpy.float32)
+        assert compact_value == pytest.approx(full_value, rel = 1e-3) #Half precision.
+
+    #The polygons released their own data, but give the same values.
+    for layer_id, layer in full.getLayers().items():
+        for full_polygon, compact_polygon in zip(layer.polygons, compact.getLayer(layer_id).polygons):
+            assert compact_polygon._data is None
+            assert numpy.array_equal(compact_polygon.data, full_polygon.data)
+            assert numpy.array_equal(compact_polygon.types, full_polygon.types)
+            assert numpy.array_equal(compact_polygon.jumpMask, full_polygon.jumpMask)
+            assert numpy.array_equal(compact_polygon.getColors(), full_polygon.getColors())
+            assert numpy.array_equal(compact_polygon.getNormals(), full_polygon.getNormals())
+            assert compact_polygon.lineWidths == pytest.approx(full_polygon.lineWidths, rel = 1e-3)
+            assert compact_polygon.lineThicknesses == pytest.approx(full_polygon.lineThicknesses, rel = 1e-3)
+            assert compact_polygon.lineFeedrates == pytest.approx(full_polygon.lineFeedrates, rel = 1e-3)
+
+    assert compact.getLayerIndex().getMaxFeedrate() == pytest.approx(full.getLayerIndex().getMaxFeedrate(), rel = 1e-3)
+
+
+##  Measure the memory that building the layer data of a large print takes.
+#
+#   \return A tuple of the memory the layer data takes and the peak memory
+#   while building it, in bytes.
+def measureLayerDataMemory(compact):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start_memory = tracemalloc.get_traced_memory()[0]
+        builder = createBuilder(200, 20, 200)
+        layer_data = builder.build(material_color_map, compact = compact)
+        assert layer_data.getVertexCount() > 0
+        del builder
+        gc.collect()
+        memory, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return memory - start_memory, peak_memory - start_memory
+
+##  Benchmark of the memory that the layer data of a large print takes, with
+#   and without compacting it. The compacted result has to take less than a
+#   third of the memory. The peak, which includes the polygons it is built
+#   from, has to be clearly lower as well.
+@patch.object(LayerPolygon, "getColorMap", lambda: color_map)
+def test_benchmarkMemory():
+    full_memory, full_peak_memory = measureLayerDataMemory(compact = False)
+    compact_memory, compact_peak_memory = measureLayerDataMemory(compact = True)
+
+    assert compact_memory < full_memory / 3
+    assert compact_peak_memory < full_peak_memory * 0.6
+
+
+def test_spillFile():
+    spill_file = LayerDataSpillFile()
+    vertices = numpy.arange(30, dtype = numpy.float32).reshape((-1, 3))
+    line_types = numpy.array([1, 2, 3], dtype = numpy.uint8)
+    stored_vertices = spill_file.store(vertices)
+    stored_line_types = spill_file.store(line_types)
+    assert spill_file.store(vertices) is stored_vertices #Stored only once.
+    assert spill_file.store(None) is None
+    assert len(spill_file.store(numpy.empty((0, 3), numpy.float32))) == 0
+    spill_file.close()
+
+    #Still readable after closing the file.
+    assert isinstance(stored_vertices, numpy.memmap)
+    assert numpy.array_equal(stored_vertices, vertices)
+    assert stored_line_types.dtype == numpy.uint8
+    assert numpy.array_equal(stored_line_types, line_types)
+    assert not stored_vertices.flags.writeable
+
+@patch.object(LayerPolygon, "getColorMap", lambda: color_map)
+@pytest.mark.parametrize("compact", [False, True])
+def test_spillLayerData(compact):
+    in_memory = createBuilder(5, 4, 50).build(material_color_map, compact = compact, spill_threshold = 1000000000)
+    spilled = createBuilder(5, 4, 50).build(material_color_map, compact = compact, spill_threshold = 0)
+
+    assert isinstance(spilled.getVertices(), numpy.memmap)
+    assert numpy.array_equal(spilled.getVertices(), in_memory.getVertices())
+    assert numpy.array_equal(spilled.getIndices(), in_memory.getIndices())
+    assert numpy.array_equal(spilled.getColors(), in_memory.getColors())
+    for attribute_name in in_memory.attributeNames():
+        assert isinstance(spilled.getAttribute(attribute_name)["value"], numpy.memmap)
+        assert spilled.getAttributeAsByteArray(attribute_name) == in_memory.getAttributeAsByteArray(attribute_name)
+
+    for layer_id, layer in in_memory.getLayers().items():
+        for in_memory_polygon, spilled_polygon in zip(layer.polygons, spilled.getLayer(layer_id).polygons):
+            assert spilled_polygon._data is None #Read from the file.
+            assert numpy.array_equal(spilled_polygon.data, in_memory_polygon.data)
+            assert numpy.array_equal(spilled_polygon.types, in_memory_polygon.types)
+            assert numpy.array_equal(spilled_polygon.jumpMask, in_memory_polygon.jumpMask)
+            assert numpy.array_equal(spilled_polygon.lineWidths, in_memory_polygon.lineWidths)
+
+
+##  The resident memory of this process in bytes, on Linux.
+def getResidentMemory():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+##  Build layer data in a fresh process and measure how much its resident
+#   memory grows.
+def measureResidentMemory(layer_count, spill_threshold, results):
+    with patch.object(LayerPolygon, "getColorMap", lambda: color_map):
+        gc.collect()
+        start_memory = getResidentMemory()
+        builder = createBuilder(layer_count, 20, 200)
+        layer_data = builder.build(material_color_map, spill_threshold = spill_threshold)
+        del builder
+        gc.collect()
+        memory = getResidentMemory() - start_memory
+
+        #Render one layer in compatibility mode, like the simulation view does.
+        layer_data.getLayer(layer_count // 2).createMesh()
+        gc.collect()
+        results.put((memory, getResidentMemory() - start_memory))
+
+##  Build layer data in a fresh process and measure how much its resident
+#   memory grows.
+#
+#   \return A tuple of the growth after building the layer data and after
+#   rendering a layer as well, in bytes.
+def measureResidentMemoryInProcess(layer_count, spill_threshold):
+    context = multiprocessing.get_context("spawn") #Memory that the tests before freed would make the measurements unreliable.
+    results = context.Queue()
+    process = context.Process(target = measureResidentMemory, args = (layer_count, spill_threshold, results))
+    process.start()
+    result = results.get(timeout = 300)
+    process.join()
+    return result
+
+##  Benchmark of the resident memory that the layer data takes, depending on
+#   the number of layers, when it's kept in memory or moved to the disk.
+#   Moving it to the disk has to save at least a quarter of the memory, even
+#   after a layer is rendered from it.
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason = "Measuring the resident memory needs /proc.")
+@pytest.mark.parametrize("layer_count", [100, 200, 400])
+def test_benchmarkResidentMemory(layer_count):
+    memory, after_render = measureResidentMemoryInProcess(layer_count, spill_threshold = None)
+    spilled_memory, spilled_after_render = measureResidentMemoryInProcess(layer_count, spill_threshold = 0)
+
+    assert spilled_memory < memory * 0.75
+    assert spilled_after_render < after_render * 0.75
@@ -0,0 +1,86 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import threading
+
+from cura.Settings.MetadataInterner import MetadataInterner
+
+
+def test_internStrings():
+    interner = MetadataInterner()
+    first = "".join(["Generic", " PLA"]) # Not a constant, so not interned by Python itself.
+    second = "".join(["Generic ", "PLA"])
+    assert first is not second
+
+    assert interner.intern(first) is first
+    assert interner.intern(second) is first
+
+def test_internTypes():
+    interner = MetadataInterner()
+    interner.intern(1)
+    interner.intern("1")
+
+    assert interner.intern(True) is True # Not replaced by 1, even though they are equal.
+    assert type(interner.intern(1.0)) is float
+    assert interner.intern(None) is None
+    assert interner.getStatistics()["distinct_count"] == 5
+
+def test_internDictionaries():
+    interner = MetadataInterner()
+    first = interner.intern({"density": "1.24", "diameter": "".join(["2.", "85"])})
+    second = interner.intern({"diameter": "".join(["2", ".85"]), "density": "1.24"})
+
+    assert second == first
+    assert second is not first # Each gets its own dictionary, since the metadata can be changed in place.
+    assert second["diameter"] is first["diameter"] # But the values in it are shared.
+
+def test_internNestedDictionaries():
+    interner = MetadataInterner()
+    first = interner.intern({"compatible": {"plate": True, "glass": False}})
+    second = interner.intern({"compatible": {"plate": True, "glass": False}})
+    other = interner.intern({"compatible": {"plate": True, "glass": 0}})
+
+    assert second == first
+    assert second["compatible"] is not first["compatible"]
+    second["compatible"]["glass"] = True
+    assert first["compatible"]["glass"] is False # Changing one doesn't change the other.
+    assert type(other["compatible"]["glass"]) is int # False and 0 are equal, but they are different values.
+
+def test_unhashableValues():
+    interner = MetadataInterner()
+    value = ["a", "list"]
+    assert interner.intern(value) is value
+    dictionary = {"key": value}
+    assert interner.intern(dictionary) == dictionary
+    assert interner.intern(dictionary)["key"] is value # Can't be shared.
+
+def test_internMetadata():
+    interner = MetadataInterner()
+    base = {"id": "generic_pla", "brand": "Generic", "properties": {"density": "1.24"}}
+    derived = {"id": "generic_pla_ultimaker3", "brand": "".join(["Gen", "eric"]), "properties": {"density": "".join(["1.", "24"])}}
+
+    interned_base = interner.internMetadata(base)
+    interned_derived = interner.internMetadata(derived)
+
+    assert interned_base == base
+    assert interned_derived == derived
+    assert interned_derived is not derived # The metadata itself is not shared, since it can change.
+    assert interned_derived["brand"] is interned_base["brand"]
+    assert interned_derived["properties"] is not interned_base["properties"]
+    assert interned_derived["properties"]["density"] is interned_base["properties"]["density"]
+    statistics = interner.getStatistics()
+    assert statistics["lookup_count"] == 14 # Three keys, two values and the entry of the properties, twice.
+    assert statistics["shared_count"] == 6 # All but the ID.
+
+def test_concurrentInterning():
+    interner = MetadataInterner()
+    results = []
+    def intern():
+        results.append([interner.intern({"index": "index " + str(index % 10)}) for index in range(1000)])
+    threads = [threading.Thread(target = intern) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(value["index"]) for result in results for value in result}) == 10
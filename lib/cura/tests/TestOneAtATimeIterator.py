@@ -0,0 +1,110 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import time
+
+import numpy
+import pytest
+
+from UM.Math.Polygon import Polygon
+from UM.Math.Vector import Vector
+from UM.Scene.SceneNode import SceneNode
+from UM.Scene.SceneNodeDecorator import SceneNodeDecorator
+
+from cura.OneAtATimeIterator import OneAtATimeIterator
+
+
+##  Gives an object a square footprint and a head hull that extends to the
+#   back and left of it, like the print head would sweep when printing it.
+class HullDecorator(SceneNodeDecorator):
+    def __init__(self, x, z, size, head_back, head_left):
+        super().__init__()
+        self._boundary = Polygon(numpy.array([[x, z], [x, z + size], [x + size, z + size], [x + size, z]], numpy.float32))
+        self._head = Polygon(numpy.array([[x - head_left, z - head_back], [x - head_left, z + size], [x + size, z + size], [x + size, z - head_back]], numpy.float32))
+
+    def getConvexHull(self):
+        return self._boundary
+
+    def getConvexHullBoundary(self):
+        return self._boundary
+
+    def getConvexHullHeadFull(self):
+        return self._head
+
+    def __deepcopy__(self, memo):
+        return self
+
+def createScene(positions, size = 10, head_back = 15, head_left = 15):
+    root = SceneNode()
+    for x, z in positions:
+        node = SceneNode(parent = root)
+        node.setPosition(Vector(x + size / 2, 0, z + size / 2))
+        node.addDecorator(HullDecorator(x, z, size, head_back, head_left))
+    return root
+
+
+def test_singleObject():
+    root = createScene([(0, 0)])
+    assert list(OneAtATimeIterator(root)) == root.getChildren()
+
+def test_order():
+    # The head sweeps over the back (-Z) and left (-X) of each object, so objects there have to be printed later.
+    root = createScene([(0, 0), (0, 20), (20, 20)])
+    back, front_left, front_right = root.getChildren()
+
+    assert list(OneAtATimeIterator(root)) == [front_right, front_left, back]
+
+def test_independentObjectsFrontFirst():
+    root = createScene([(0, 0), (0, 100), (100, 50)], head_back = 1, head_left = 1)
+    back, front, middle = root.getChildren()
+
+    assert list(OneAtATimeIterator(root)) == [front, middle, back]
+
+def test_noSolution():
+    # These objects overlap, so the head would hit either of them while printing the other.
+    root = createScene([(0, 0), (5, 5)])
+    assert list(OneAtATimeIterator(root)) == []
+
+##  A head that just touches another object hits it, like it did before the
+#   hits were computed for all objects at once.
+def test_touchingIsHit():
+    root = createScene([(0, 0), (0, 25), (0, 50.5)]) # The head of the second object reaches to Z = 10, that of the third to Z = 35.5.
+    back, middle, front = root.getChildren()
+
+    hit_map = OneAtATimeIterator(root)._calculateHitMap([back, middle, front])
+
+    assert middle.callDecoration("getConvexHullBoundary").intersectsPolygon(front.callDecoration("getConvexHullHeadFull")) is None
+    assert back.callDecoration("getConvexHullBoundary").intersectsPolygon(middle.callDecoration("getConvexHullHeadFull")) == (0, 0)
+    assert hit_map == [[False, True, False], [False, False, False], [False, False, False]]
+
+
+##  Benchmark of ordering grids of objects where every object has to be
+#   printed before the objects behind and to the left of it.
+#
+#   Computing the hits has to be faster than testing each pair of objects on
+#   its own, as was done before.
+@pytest.mark.parametrize("object_count", [10, 50, 200])
+def test_benchmarkOrder(object_count):
+    columns = int(numpy.ceil(numpy.sqrt(object_count)))
+    root = createScene([(20 * (index % columns), 20 * (index // columns)) for index in range(object_count)])
+    nodes = root.getChildren()
+    iterator = OneAtATimeIterator(root)
+
+    hit_map_time = float("inf")
+    for _ in range(3):
+        start_time = time.time()
+        hit_map = iterator._calculateHitMap(nodes)
+        hit_map_time = min(hit_map_time, time.time() - start_time)
+
+    start_time = time.time()
+    pairwise_hit_map = [[a is not b and a.callDecoration("getConvexHullBoundary").intersectsPolygon(b.callDecoration("getConvexHullHeadFull")) is not None for b in nodes] for a in nodes]
+    pairwise_time = time.time() - start_time
+
+    assert hit_map == pairwise_hit_map
+    assert hit_map_time < pairwise_time
+
+    order = list(OneAtATimeIterator(root))
+    assert len(order) == object_count
+    positions = [(node.getPosition().x, node.getPosition().z) for node in order]
+    for index, (x, z) in enumerate(positions): # Nothing in front or to the right may come later.
+        assert not any(later_x >= x and later_z >= z for later_x, later_z in positions[index + 1:])
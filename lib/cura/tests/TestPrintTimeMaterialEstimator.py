@@ -0,0 +1,132 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import math
+import time
+from unittest.mock import patch
+
+import numpy
+import pytest
+
+from cura.LayerDataBuilder import LayerDataBuilder
+from cura.LayerPolygon import LayerPolygon
+from cura.PrintTimeMaterialEstimator import PrintTimeMaterialEstimator
+
+color_map = numpy.ones((11, 4)) #Instead of the colours from the theme.
+material_color_map = numpy.ones((2, 4), dtype = numpy.float32)
+
+
+##  Build layer data from a list of polygons.
+#
+#   \param polygons For each polygon a tuple of the extruder, the points, and
+#   for each line the type, width, thickness and feedrate.
+@patch.object(LayerPolygon, "getColorMap", lambda: color_map)
+def createLayerData(polygons):
+    builder = LayerDataBuilder()
+    builder.addLayer(0)
+    for extruder, points, line_types, widths, thicknesses, feedrates in polygons:
+        polygon = LayerPolygon(extruder,
+                               numpy.array(line_types, dtype = numpy.uint8).reshape((-1, 1)),
+                               numpy.array(points, dtype = numpy.float32),
+                               numpy.array(widths, dtype = numpy.float32).reshape((-1, 1)),
+                               numpy.array(thicknesses, dtype = numpy.float32).reshape((-1, 1)),
+                               numpy.array(feedrates, dtype = numpy.float32).reshape((-1, 1)))
+        polygon.buildCache()
+        builder.getLayer(0).polygons.append(polygon)
+    return builder.build(material_color_map)
+
+##  A print of random lines, where one polygon continues where the previous one ended.
+def createRandomLayerData(polygon_count, lines_per_polygon):
+    random = numpy.random.RandomState(1337)
+    polygons = []
+    position = numpy.zeros(3)
+    for _ in range(polygon_count):
+        steps = random.uniform(-5, 5, (lines_per_polygon, 3))
+        steps[:, 1] = 0 #Stay in the layer.
+        steps[random.uniform(0, 1, lines_per_polygon) < 0.5] *= 0.1 #Some short lines that don't reach full speed.
+        points = position + numpy.concatenate(([numpy.zeros(3)], numpy.cumsum(steps, axis = 0)))
+        position = points[-1]
+        line_types = random.choice([LayerPolygon.Inset0Type, LayerPolygon.InfillType, LayerPolygon.MoveCombingType], lines_per_polygon)
+        feedrates = random.choice([30, 60, 150], lines_per_polygon)
+        polygons.append((random.randint(0, 2), points, line_types, [0.4] * lines_per_polygon, [0.2] * lines_per_polygon, feedrates))
+    return createLayerData(polygons)
+
+##  A planner like that of the printer firmware, which propagates the
+#   junction speeds with a backward and a forward pass through all lines.
+def estimateReference(layer_data, acceleration, jerk):
+    indices = layer_data.getIndices().reshape((-1, 2))
+    vertices = layer_data.getVertices().astype(numpy.float64)
+    feedrates = layer_data.getAttribute("feedrates")["value"]
+    lines = []
+    for start, end in indices:
+        direction = vertices[end] - vertices[start]
+        length = math.sqrt(direction.dot(direction))
+        lines.append((direction / length if length > 0 else direction, length, max(float(feedrates[end]), 1.0)))
+
+    junctions = [min(lines[0][2], jerk)]
+    for (previous_direction, _, previous_feedrate), (direction, _, feedrate) in zip(lines[:-1], lines[1:]):
+        speed = min(previous_feedrate, feedrate)
+        change = speed * numpy.linalg.norm(direction - previous_direction)
+        junctions.append(speed * jerk / change if change > jerk else speed)
+    junctions.append(min(lines[-1][2], jerk))
+    for index in range(len(lines) - 1, -1, -1):
+        junctions[index] = min(junctions[index], math.sqrt(junctions[index + 1] ** 2 + 2 * acceleration * lines[index][1]))
+    for index in range(len(lines)):
+        junctions[index + 1] = min(junctions[index + 1], math.sqrt(junctions[index] ** 2 + 2 * acceleration * lines[index][1]))
+
+    total = 0
+    for index, (_, length, feedrate) in enumerate(lines):
+        entry, exit = junctions[index], junctions[index + 1]
+        peak = min(feedrate, math.sqrt((2 * acceleration * length + entry ** 2 + exit ** 2) / 2))
+        cruise = length - (peak ** 2 - entry ** 2) / (2 * acceleration) - (peak ** 2 - exit ** 2) / (2 * acceleration)
+        total += (peak - entry) / acceleration + (peak - exit) / acceleration + cruise / feedrate
+    return total
+
+def test_straightLine():
+    layer_data = createLayerData([(0, [[0, 0, 0], [100, 0, 0]], [LayerPolygon.InfillType], [0.4], [0.2], [50])])
+
+    times, material_amounts = PrintTimeMaterialEstimator(acceleration = 1000, jerk = 0).estimate(layer_data)
+    assert times["infill"] == pytest.approx(100 / 50 + 50 / 1000) #Accelerating and decelerating take 0.05s extra.
+    assert times["travel"] == 0
+    assert material_amounts == pytest.approx([100 * 0.4 * 0.2])
+
+    times, _ = PrintTimeMaterialEstimator(acceleration = 0).estimate(layer_data)
+    assert times["infill"] == pytest.approx(2)
+
+def test_shortLine():
+    layer_data = createLayerData([(0, [[0, 0, 0], [1, 0, 0]], [LayerPolygon.InfillType], [0.4], [0.2], [50])])
+
+    times, _ = PrintTimeMaterialEstimator(acceleration = 1000, jerk = 0).estimate(layer_data)
+    assert times["infill"] == pytest.approx(2 * math.sqrt(0.5 * 2 / 1000)) #Accelerates for half the line, then decelerates.
+
+def test_featuresAndExtruders():
+    layer_data = createLayerData([
+        (0, [[0, 0, 0], [10, 0, 0], [10, 0, 10]], [LayerPolygon.Inset0Type, LayerPolygon.MoveCombingType], [0.4, 0.1], [0.2, 0], [10, 10]),
+        (1, [[10, 0, 10], [0, 0, 10]], [LayerPolygon.SkinType], [0.5], [0.1], [10])
+    ])
+
+    times, material_amounts = PrintTimeMaterialEstimator(acceleration = 0).estimate(layer_data, extruder_count = 3)
+    assert times["inset_0"] == pytest.approx(1)
+    assert times["travel"] == pytest.approx(1)
+    assert times["skin"] == pytest.approx(1)
+    assert times["infill"] == 0
+    assert material_amounts == pytest.approx([10 * 0.4 * 0.2, 10 * 0.5 * 0.1, 0]) #Travels don't extrude.
+
+##  Compares the estimate to a planner that propagates the speeds through all
+#   lines, and benchmarks both. The estimate has to be within 2% of the
+#   planner and at least ten times as fast.
+@pytest.mark.parametrize("acceleration, jerk", [(500, 10), (3000, 20), (10000, 30)])
+def test_benchmarkAccuracy(acceleration, jerk):
+    layer_data = createRandomLayerData(200, 500)
+
+    start_time = time.time()
+    reference_total = estimateReference(layer_data, acceleration, jerk)
+    reference_time = time.time() - start_time
+
+    start_time = time.time()
+    times, _ = PrintTimeMaterialEstimator(acceleration = acceleration, jerk = jerk).estimate(layer_data)
+    estimate_time = time.time() - start_time
+    total = sum(times.values())
+
+    assert total == pytest.approx(reference_total, rel = 0.02)
+    assert estimate_time < reference_time / 10
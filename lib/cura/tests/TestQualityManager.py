@@ -0,0 +1,266 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import configparser
+import glob
+import os.path
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import cura.CuraApplication  # Imported first to avoid circular imports.
+from cura.Machines.MaterialManager import MaterialManager
+from cura.Machines.QualityManager import QualityManager
+
+resources_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "share", "cura", "resources")
+
+##  The metadata of the quality profiles that ship with Cura.
+def loadQualityMetadata():
+    result = []
+    for file_path in sorted(glob.glob(os.path.join(resources_directory, "quality", "**", "*.inst.cfg"), recursive = True)):
+        parser = configparser.ConfigParser(interpolation = None)
+        parser.read(file_path, encoding = "utf-8")
+        metadata = dict(parser["metadata"])
+        metadata["id"] = os.path.basename(file_path)[:-len(".inst.cfg")]
+        metadata["name"] = parser["general"]["name"]
+        metadata["definition"] = parser["general"]["definition"]
+        result.append(metadata)
+    return result
+
+quality_metadata = loadQualityMetadata()
+
+##  The metadata of the materials that ship with Cura, for all machines and
+#   nozzles that there are qualities for.
+def loadMaterialMetadata():
+    result = []
+    machine_variants = {}
+    for metadata in quality_metadata:
+        machine_variants.setdefault(metadata["definition"], set()).add(metadata.get("variant"))
+    for file_path in sorted(glob.glob(os.path.join(resources_directory, "materials", "*.xml.fdm_material"))):
+        root_material_id = os.path.basename(file_path)[:-len(".xml.fdm_material")]
+        base_metadata = {"id": root_material_id, "type": "material", "base_file": root_material_id, "definition": "fdmprinter", "GUID": root_material_id,
+                         "name": root_material_id, "brand": root_material_id.split("_")[0], "color": "Generic",
+                         "material": root_material_id.split("_")[1].upper() if "_" in root_material_id else "PLA",
+                         "approximate_diameter": "2" if root_material_id.endswith("_175") else "3"}
+        result.append(base_metadata)
+        if base_metadata["approximate_diameter"] != "3":
+            continue
+        for definition_id, variant_names in sorted(machine_variants.items()):
+            if definition_id == "fdmprinter":
+                continue
+            for variant_name in sorted(variant_names, key = str):
+                metadata = dict(base_metadata)
+                metadata["definition"] = definition_id
+                metadata["id"] = "_".join(part for part in (root_material_id, definition_id, variant_name) if part)
+                if variant_name is not None:
+                    metadata["variant_name"] = variant_name
+                result.append(metadata)
+    return result
+
+material_metadata = loadMaterialMetadata()
+
+##  A signal that is emitted right away, without an application.
+class Signal:
+    def __init__(self):
+        self._callbacks = []
+
+    def connect(self, callback):
+        self._callbacks.append(callback)
+
+    def emit(self, *args):
+        for callback in self._callbacks:
+            callback(*args)
+
+##  A container registry with the quality profiles and materials that ship
+#   with Cura.
+class Registry:
+    def __init__(self):
+        self.containerMetaDataChanged = Signal()
+        self.containerAdded = Signal()
+        self.containerRemoved = Signal()
+        self.metadata = quality_metadata + material_metadata
+
+    def findContainersMetadata(self, type):
+        return [metadata for metadata in self.metadata if metadata["type"] == type]
+
+    def isReadOnly(self, container_id):
+        return True
+
+##  A container or a container stack, with only metadata.
+class Container:
+    def __init__(self, metadata):
+        self.metadata = metadata
+
+    def getId(self):
+        return self.metadata["id"]
+
+    def getName(self):
+        return self.metadata["name"]
+
+    def getMetaDataEntry(self, key, default = None):
+        return self.metadata.get(key, default)
+
+class ExtruderStack:
+    def __init__(self, variant_name, root_material_id, material_type = "PLA"):
+        if variant_name is None:
+            self.variant = Container({"id": "empty_variant", "name": "empty"})
+        else:
+            self.variant = Container({"id": variant_name, "name": variant_name})
+        if root_material_id is None:
+            self.material = Container({"id": "empty_material"})
+        else:
+            self.material = Container({"id": root_material_id, "base_file": root_material_id, "material": material_type})
+        self.isEnabled = True
+        self.approximateMaterialDiameter = 3
+
+class GlobalStack(Container):
+    def __init__(self, definition_id, extruders):
+        super().__init__({"has_variant_materials": False})
+        self.definition = Container({"id": definition_id, "has_machine_quality": definition_id != "fdmprinter"})
+        self.extruders = {str(position): extruder for position, extruder in enumerate(extruders)}
+
+    def getProperty(self, key, property_name):
+        return len(self.extruders)
+
+@pytest.fixture
+def quality_manager():
+    registry = Registry()
+    application = MagicMock()
+    with patch("UM.Application.Application.getInstance", return_value = application):
+        material_manager = MaterialManager(registry)
+        application.getMaterialManager.return_value = material_manager
+        material_manager.initialize()
+        result = QualityManager(registry)
+    result.initialize()
+    return result
+
+def qualityGroupIds(quality_group_dict):
+    result = {}
+    for quality_type, quality_group in quality_group_dict.items():
+        global_id = quality_group.node_for_global.metadata["id"] if quality_group.node_for_global else None
+        extruder_ids = {position: node.metadata["id"] for position, node in quality_group.nodes_for_extruders.items()}
+        result[quality_type] = (global_id, extruder_ids, quality_group.is_available)
+    return result
+
+##  All machines with two extruders, with the variants and materials that
+#   there are qualities for.
+def machineConfigurations():
+    result = []
+    for definition_id in sorted({metadata["definition"] for metadata in quality_metadata}):
+        combinations = sorted({(metadata.get("variant"), metadata.get("material")) for metadata in quality_metadata if metadata["definition"] == definition_id}, key = str)
+        for variant_name, root_material_id in combinations:
+            result.append(GlobalStack(definition_id, [ExtruderStack(variant_name, root_material_id), ExtruderStack(variant_name, "generic_pla")]))
+    return result
+
+##  Adds a container to the registry, and updates the lookup tables like the
+#   update timer would.
+def addContainer(quality_manager, metadata):
+    quality_manager._container_registry.metadata.append(metadata)
+    quality_manager._container_registry.containerAdded.emit(Container(metadata))
+    quality_manager._material_manager._updateMaps()
+    quality_manager._updateMaps()
+
+def removeContainer(quality_manager, metadata):
+    quality_manager._container_registry.metadata.remove(metadata)
+    quality_manager._container_registry.containerRemoved.emit(Container(metadata))
+    quality_manager._material_manager._updateMaps()
+    quality_manager._updateMaps()
+
+def test_qualityGroups(quality_manager):
+    machine = GlobalStack("ultimaker3", [ExtruderStack("AA 0.4", "generic_pla"), ExtruderStack("BB 0.4", "generic_pva", "PVA")])
+
+    quality_groups = quality_manager.getQualityGroups(machine)
+
+    assert quality_groups["normal"].node_for_global.metadata["id"] == "um3_global_Normal_Quality"
+    assert quality_groups["normal"].nodes_for_extruders["0"].metadata["id"] == "um3_aa0.4_PLA_Normal_Quality"
+    assert quality_groups["normal"].is_available
+    assert qualityGroupIds(quality_manager.getQualityGroups(machine)) == qualityGroupIds(quality_groups) # Now from the index.
+
+def test_qualityGroupsFallback(quality_manager):
+    machine = GlobalStack("ultimaker3", [ExtruderStack("AA 0.4", "ultimaker_pla_blue")]) # Falls back to the qualities of generic PLA.
+    assert quality_manager.getQualityGroups(machine)["normal"].nodes_for_extruders["0"].metadata["id"] == "um3_aa0.4_PLA_Normal_Quality"
+
+    machine = GlobalStack("fdmprinter", [ExtruderStack(None, None)])
+    assert set(quality_manager.getQualityGroups(machine)) == {metadata["quality_type"] for metadata in quality_metadata if metadata["definition"] == "fdmprinter"}
+
+def test_newQualityGroups(quality_manager):
+    machine = GlobalStack("ultimaker3", [ExtruderStack("AA 0.4", "generic_pla")])
+    quality_groups = quality_manager.getQualityGroups(machine)
+    assert quality_manager.getQualityGroups(machine)["normal"] is not quality_groups["normal"] # The caller may change them.
+
+##  Only the entries of the machine of a new quality are removed from the index.
+def test_qualityIndexUpdatedForChangedMachine(quality_manager):
+    ultimaker3 = GlobalStack("ultimaker3", [ExtruderStack("AA 0.4", "generic_pla")])
+    ultimaker2 = GlobalStack("ultimaker2_plus", [ExtruderStack("0.4 mm", "generic_pla")])
+    assert "test" not in quality_manager.getQualityGroups(ultimaker3)
+    quality_manager.getQualityGroups(ultimaker2)
+    ultimaker2_index = {key: node for key, node in quality_manager._quality_node_index.items() if key[0] == "ultimaker2_plus"}
+    assert ultimaker2_index
+
+    addContainer(quality_manager, {"id": "um3_aa0.4_PLA_Test_Quality", "name": "Test", "definition": "ultimaker3", "type": "quality", "quality_type": "test", "material": "generic_pla", "variant": "AA 0.4"})
+
+    assert not any(key[0] == "ultimaker3" for key in quality_manager._quality_node_index)
+    assert {key: node for key, node in quality_manager._quality_node_index.items() if key[0] == "ultimaker2_plus"} == ultimaker2_index
+    assert quality_manager.getQualityGroups(ultimaker3)["test"].nodes_for_extruders["0"].metadata["id"] == "um3_aa0.4_PLA_Test_Quality"
+
+def test_qualityIndexUpdatedForChangedGenericQuality(quality_manager):
+    for machine in machineConfigurations()[:20]:
+        quality_manager.getQualityGroups(machine)
+
+    removeContainer(quality_manager, next(metadata for metadata in quality_metadata if metadata["definition"] == "fdmprinter"))
+
+    assert quality_manager._quality_node_index == {} # The generic qualities are used by every machine.
+
+def test_availableMaterials(quality_manager):
+    material_manager = quality_manager._material_manager
+    machine = GlobalStack("ultimaker3", [ExtruderStack("AA 0.4", "generic_pla")])
+
+    available_materials = material_manager.getAvailableMaterialsForMachineExtruder(machine, machine.extruders["0"])
+    assert available_materials["generic_pla"].metadata["id"] == "generic_pla_ultimaker3_AA 0.4"
+    assert "generic_pla_175" not in available_materials
+    available_materials["test"] = None
+    assert "test" not in material_manager.getAvailableMaterialsForMachineExtruder(machine, machine.extruders["0"]) # The index can't be changed.
+
+##  Only the entries of the machine of a new material are removed from the index.
+def test_materialIndexUpdatedForChangedMachine(quality_manager):
+    material_manager = quality_manager._material_manager
+    ultimaker3 = GlobalStack("ultimaker3", [ExtruderStack("AA 0.6", "generic_pla")])
+    ultimaker2 = GlobalStack("ultimaker2_plus", [ExtruderStack("0.4 mm", "generic_pla")])
+    assert material_manager.getAvailableMaterialsForMachineExtruder(ultimaker3, ultimaker3.extruders["0"])["generic_pla"].metadata["id"] == "generic_pla_ultimaker3"
+    ultimaker2_materials = material_manager.getAvailableMaterialsForMachineExtruder(ultimaker2, ultimaker2.extruders["0"])
+
+    addContainer(quality_manager, {"id": "generic_pla_ultimaker3_AA 0.6", "type": "material", "base_file": "generic_pla", "definition": "ultimaker3", "variant_name": "AA 0.6",
+                                   "GUID": "generic_pla", "name": "generic_pla", "brand": "generic", "color": "Generic", "material": "PLA", "approximate_diameter": "3"})
+
+    assert ("ultimaker3", "AA 0.6", "3") not in material_manager._available_materials_index
+    assert material_manager._available_materials_index[("ultimaker2_plus", "0.4 mm", "3")] == ultimaker2_materials
+    assert material_manager.getAvailableMaterialsForMachineExtruder(ultimaker3, ultimaker3.extruders["0"])["generic_pla"].metadata["id"] == "generic_pla_ultimaker3_AA 0.6"
+
+##  Finds the qualities and materials for a machine, like when switching to it.
+def switchMachine(quality_manager, machine):
+    quality_manager.getQualityGroups(machine)
+    for extruder in machine.extruders.values():
+        quality_manager._material_manager.getAvailableMaterialsForMachineExtruder(machine, extruder)
+
+##  Switching between all machines, nozzles and materials that there are
+#   qualities for, a number of times, with and without the indices.
+def test_benchmarkMachineSwitch(quality_manager):
+    machines = machineConfigurations()
+    rounds = 5
+    times = {}
+
+    for name, use_indices in (("without the indices", False), ("with the indices", True)):
+        durations = []
+        for _ in range(3):
+            start_time = time.perf_counter()
+            for _ in range(rounds):
+                for machine in machines:
+                    if not use_indices:
+                        quality_manager._quality_node_index.clear()
+                        quality_manager._material_manager._available_materials_index.clear()
+                    switchMachine(quality_manager, machine)
+            durations.append(time.perf_counter() - start_time)
+        times[name] = min(durations)
+
+    assert times["with the indices"] < times["without the indices"]
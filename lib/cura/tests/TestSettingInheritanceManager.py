@@ -0,0 +1,249 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import cura.CuraApplication  # Imported first to avoid circular imports.
+from cura.Settings.SettingInheritanceManager import SettingInheritanceManager
+from UM.Settings.SettingDefinition import SettingDefinition
+from UM.Settings.SettingFunction import SettingFunction
+from UM.Settings.SettingInstance import InstanceState
+from UM.Signal import Signal
+
+
+##  A container with only setting values.
+class ValueContainer:
+    def __init__(self, values = None):
+        self.values = values if values is not None else {}
+
+    def getProperty(self, key, property_name):
+        if property_name == "value":
+            return self.values.get(key)
+        return None
+
+##  The setting definitions, with the same lookups as a definition container.
+class Definitions:
+    def __init__(self, categories):
+        self._definitions = categories
+        self._definition_cache = {}
+        for category in categories:
+            for definition in category.findDefinitions():
+                self._definition_cache[definition.key] = definition
+            self._definition_cache[category.key] = category
+
+    def findDefinitions(self, **kwargs):
+        if len(kwargs) == 1 and "key" in kwargs:
+            definition = self._definition_cache.get(kwargs["key"])
+            return [definition] if definition is not None else []
+        result = []
+        for definition in self._definitions:
+            result.extend(definition.findDefinitions(**kwargs))
+        return result
+
+    def getAllKeys(self):
+        return set(self._definition_cache.keys())
+
+##  A stack of value containers. The setting values of the top container are
+#   the ones that the user changed.
+class Stack:
+    def __init__(self, stack_id, definition, containers, next_stack = None):
+        self.propertyChanged = Signal()
+        self.containersChanged = Signal()
+        self.definition = definition
+        self._id = stack_id
+        self._containers = containers
+        self._next_stack = next_stack
+        if next_stack is not None: # Like container stacks, pass on the changes of the next stack.
+            next_stack.propertyChanged.connect(self.propertyChanged)
+            self.containersChanged.connect(next_stack.containersChanged)
+
+    def getId(self):
+        return self._id
+
+    def getContainers(self):
+        return self._containers[:]
+
+    def getNextStack(self):
+        return self._next_stack
+
+    def getTop(self):
+        return self._containers[0]
+
+    def getAllKeys(self):
+        return self.definition.getAllKeys()
+
+    def getProperty(self, key, property_name):
+        if property_name == "state":
+            return InstanceState.User if key in self.getTop().values else InstanceState.Default
+        if property_name == "enabled":
+            return True
+        return None
+
+    def setUserValue(self, key, value):
+        if value is None:
+            self.getTop().values.pop(key, None)
+        else:
+            self.getTop().values[key] = value
+        self.propertyChanged.emit(key, "value")
+
+##  Creates categories with settings that all inherit their value from the
+#   first setting in their category.
+def createDefinitions(category_count, setting_count):
+    categories = []
+    for category_index in range(category_count):
+        parent_key = "setting_{category}".format(category = category_index)
+        children = {}
+        for setting_index in range(setting_count):
+            children["setting_{category}_{setting}".format(category = category_index, setting = setting_index)] = {"label": "Child", "description": "A setting.", "type": "float", "default_value": 1}
+        category = SettingDefinition("category_{category}".format(category = category_index))
+        category.deserialize({"label": "Category", "description": "A category.", "type": "category", "children": {parent_key: {"label": "Parent", "description": "A setting.", "type": "float", "default_value": 1, "children": children}}})
+        categories.append(category)
+    return Definitions(categories)
+
+##  The definition values: every child setting is calculated from its parent.
+def createDefinitionValues(definitions):
+    values = {}
+    for category in definitions.findDefinitions(type = "category"):
+        parent = category.children[0]
+        for child in parent.children:
+            values[child.key] = SettingFunction(parent.key)
+        values[parent.key] = 50
+    return ValueContainer(values)
+
+class Machine:
+    def __init__(self, category_count = 3, setting_count = 5):
+        self.definitions = createDefinitions(category_count, setting_count)
+        self.global_stack = Stack("global", self.definitions, [ValueContainer(), createDefinitionValues(self.definitions)])
+        self.extruders = [Stack("extruder_{index}".format(index = index), self.definitions, [ValueContainer()], self.global_stack) for index in range(2)]
+        self.active_extruder = self.extruders[0]
+        self.application = MagicMock()
+        self.application.globalContainerStackChanged = Signal()
+        self.application.getGlobalContainerStack.return_value = self.global_stack
+        self.application.getMainThread.return_value = threading.current_thread()
+        self.extruder_manager = MagicMock()
+        self.extruder_manager.activeExtruderChanged = Signal()
+        self.extruder_manager.getActiveExtruderStack.side_effect = lambda: self.active_extruder
+
+    def setActiveExtruder(self, index):
+        self.active_extruder = self.extruders[index]
+        self.extruder_manager.activeExtruderChanged.emit()
+
+@pytest.fixture
+def machine():
+    result = Machine()
+    with patch("UM.Application.Application.getInstance", return_value = result.application):
+        with patch("cura.Settings.ExtruderManager.ExtruderManager.getInstance", return_value = result.extruder_manager):
+            with patch.object(Signal, "_app", result.application):
+                yield result
+
+def test_initialState(machine):
+    machine.extruders[0].getTop().values["setting_0_1"] = 20
+
+    manager = SettingInheritanceManager()
+
+    assert sorted(manager.settingsWithInheritanceWarning) == ["category_0", "setting_0_1"]
+    assert manager.getUpdateStatistics()["full_update_count"] == 1
+
+def test_changeSetting(machine):
+    manager = SettingInheritanceManager()
+
+    machine.extruders[0].setUserValue("setting_1_2", 20)
+    machine.extruders[0].setUserValue("setting_1_3", 30)
+
+    assert sorted(manager.settingsWithInheritanceWarning) == ["category_1", "setting_1_2", "setting_1_3"]
+    assert manager.getChildrenKeysWithOverride("setting_1") == ["setting_1_2", "setting_1_3"] or manager.getChildrenKeysWithOverride("setting_1") == ["setting_1_3", "setting_1_2"]
+    statistics = manager.getUpdateStatistics()
+    assert statistics["full_update_count"] == 1 # Only the settings that changed were checked again.
+    assert statistics["key_update_count"] == 2
+
+    machine.extruders[0].setUserValue("setting_1_2", None)
+    assert sorted(manager.settingsWithInheritanceWarning) == ["category_1", "setting_1_3"] # Another setting in the category still overwrites its inheritance.
+    machine.extruders[0].setUserValue("setting_1_3", None)
+    assert manager.settingsWithInheritanceWarning == []
+
+##  Setting the value of the parent restores its inheritance, so changing it
+#   doesn't cause a warning.
+def test_changeParent(machine):
+    manager = SettingInheritanceManager()
+
+    machine.extruders[0].setUserValue("setting_2", 60)
+
+    assert manager.settingsWithInheritanceWarning == []
+
+def test_switchExtruder(machine):
+    manager = SettingInheritanceManager()
+    machine.extruders[0].setUserValue("setting_0_0", 20)
+    machine.setActiveExtruder(1)
+    assert manager.settingsWithInheritanceWarning == []
+
+    machine.extruders[0].setUserValue("setting_0_0", None) # While the extruder isn't active.
+    machine.extruders[0].setUserValue("setting_2_0", 20)
+    machine.global_stack.setUserValue("setting_1_1", 20) # Changes the setting in both extruders.
+    assert manager.settingsWithInheritanceWarning == []
+    key_update_count = manager.getUpdateStatistics()["key_update_count"]
+
+    machine.setActiveExtruder(0)
+
+    assert sorted(manager.settingsWithInheritanceWarning) == ["category_2", "setting_2_0"]
+    statistics = manager.getUpdateStatistics()
+    assert statistics["full_update_count"] == 2 # Once for each extruder, not when switching back.
+    assert statistics["key_update_count"] - key_update_count == 3 # Only the settings that changed in the meanwhile.
+
+def test_containersChanged(machine):
+    manager = SettingInheritanceManager()
+    machine.setActiveExtruder(1)
+    machine.setActiveExtruder(0)
+    assert manager.getUpdateStatistics()["full_update_count"] == 2
+
+    machine.extruders[1].getTop().values["setting_0_0"] = 20
+    machine.global_stack.containersChanged.emit(machine.global_stack.getTop())
+    assert manager._update_timer.isActive()
+    manager.forceUpdate() # What the timer does.
+    machine.setActiveExtruder(1)
+
+    assert sorted(manager.settingsWithInheritanceWarning) == ["category_0", "setting_0_0"]
+    assert manager.getUpdateStatistics()["full_update_count"] == 4 # All settings are checked again for the other extruder as well.
+
+def test_manualRemoveOverride(machine):
+    manager = SettingInheritanceManager()
+    machine.extruders[0].setUserValue("setting_0_0", 20)
+
+    manager.manualRemoveOverride("category_0")
+
+    assert manager.settingsWithInheritanceWarning == ["setting_0_0"]
+
+##  Toggling 100 settings one by one on a machine with many settings, compared
+#   with checking all settings again for every change.
+def test_benchmarkToggleSettings():
+    machine = Machine(category_count = 20, setting_count = 30)
+    with patch("UM.Application.Application.getInstance", return_value = machine.application), \
+         patch("cura.Settings.ExtruderManager.ExtruderManager.getInstance", return_value = machine.extruder_manager), \
+         patch.object(Signal, "_app", machine.application):
+        manager = SettingInheritanceManager()
+        keys = ["setting_{category}_{setting}".format(category = index % 20, setting = index // 20) for index in range(100)]
+        extruder = machine.extruders[0]
+
+        start_time = time.perf_counter()
+        for key in keys:
+            extruder.setUserValue(key, 20)
+        for key in keys:
+            extruder.setUserValue(key, None)
+        incremental_time = time.perf_counter() - start_time
+        assert manager.settingsWithInheritanceWarning == []
+
+        start_time = time.perf_counter()
+        for key in keys:
+            extruder.getTop().values[key] = 20
+            manager.forceUpdate()
+        for key in keys:
+            del extruder.getTop().values[key]
+            manager.forceUpdate()
+        full_time = time.perf_counter() - start_time
+        assert manager.settingsWithInheritanceWarning == []
+
+    assert manager.getUpdateStatistics()["key_update_count"] == 200
+    assert incremental_time < full_time / 10
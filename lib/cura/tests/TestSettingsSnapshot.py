@@ -0,0 +1,250 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import cura.CuraApplication  # Imported first to avoid circular imports.
+from cura.Settings.ExtruderManager import ExtruderManager
+from cura.Settings.ExtruderStack import ExtruderStack
+from cura.Settings.GlobalStack import GlobalStack
+from cura.Settings.SettingsSnapshot import SettingsSnapshot
+from UM.Settings.DefinitionContainer import DefinitionContainer
+from UM.Settings.SettingDefinition import DefinitionPropertyType, SettingDefinition
+from UM.Settings.InstanceContainer import InstanceContainer
+from UM.Settings.SettingFunction import SettingFunction
+from UM.Settings.Validator import ValidatorState
+from UM.Signal import Signal
+from UM.VersionUpgradeManager import VersionUpgradeManager
+
+settings = {
+    "machine_extruder_count": {"type": "int", "default_value": 2, "settable_per_extruder": False},
+    "extruder_nr": {"type": "str", "default_value": "0", "settable_per_extruder": True},
+    "layer_height": {"type": "float", "default_value": 0.1, "minimum_value": "0.01", "maximum_value": "1", "settable_per_extruder": False},
+    "material_print_temperature": {"type": "float", "default_value": 200, "maximum_value": "300", "settable_per_extruder": True},
+    "print_temperature_max": {"type": "float", "default_value": 0, "value": "max(extruderValues('material_print_temperature'))", "settable_per_extruder": False},
+    "infill_density": {"type": "float", "default_value": 20, "settable_per_extruder": True},
+    "infill_line_distance": {"type": "float", "default_value": 1, "value": "0 if infill_density == 0 else 40 / infill_density", "settable_per_extruder": True},
+    "support_extruder_nr": {"type": "int", "default_value": 1, "settable_per_extruder": False},
+    "support_temperature": {"type": "float", "default_value": 0, "value": "extruderValue(support_extruder_nr, 'material_print_temperature')", "settable_per_extruder": False},
+    "adhesion_extruder_nr": {"type": "str", "default_value": "-1", "value": "defaultExtruderPosition()", "settable_per_extruder": False},
+    "wall_extruder_nr": {"type": "int", "default_value": 1, "settable_per_extruder": False},
+    "wall_speed": {"type": "float", "default_value": 30, "limit_to_extruder": "wall_extruder_nr", "settable_per_extruder": True},
+    "travel_speed": {"type": "float", "default_value": 100, "resolve": "max(extruderValues('travel_speed'))", "settable_per_extruder": True}
+}
+for setting in settings.values():
+    setting.update({"label": "Setting", "description": "A setting."})
+
+##  Creates a machine with a global stack and two extruders, each with only a
+#   user changes container and the definition.
+class Machine:
+    def __init__(self):
+        self.definition = DefinitionContainer("test_machine")
+        self.definition.deserialize(json.dumps({"version": DefinitionContainer.Version, "name": "Test machine", "metadata": {}, "settings": settings}))
+        self.containers = {"test_machine": self.definition}
+
+        self.global_stack = self._createStack(GlobalStack, "global")
+        self.extruders = []
+        for position in ["0", "1"]:
+            extruder = self._createStack(ExtruderStack, "extruder_" + position)
+            extruder.setMetaDataEntry("position", position)
+            material = InstanceContainer("material_" + position)
+            material.setMetaDataEntry("type", "material")
+            material.setMetaDataEntry("GUID", "guid_" + position)
+            extruder.setMaterial(material)
+            extruder.setNextStack(self.global_stack)
+            self.extruders.append(extruder)
+
+    def _createStack(self, stack_type, stack_id):
+        stack = stack_type(stack_id)
+        user_changes = InstanceContainer(stack_id + "_user")
+        user_changes.setMetaDataEntry("type", "user")
+        user_changes.setDefinition("test_machine")
+        self.containers[user_changes.getId()] = user_changes
+        stack.setUserChanges(user_changes)
+        stack.setDefinition(self.definition)
+        return stack
+
+    def setValue(self, stack, key, value):
+        stack.userChanges.setProperty(key, "value", value)
+
+    def getExtruderStack(self, position):
+        for extruder in self.extruders:
+            if extruder.getMetaDataEntry("position") == str(position):
+                return extruder
+        return None
+
+@pytest.fixture
+def machine():
+    empty_containers = {container_id: InstanceContainer(container_id) for container_id in ["empty", "empty_quality_changes", "empty_quality", "empty_material", "empty_variant"]}
+    registry = MagicMock()
+    registry.getEmptyInstanceContainer.return_value = empty_containers["empty"]
+    registry.findInstanceContainers.side_effect = lambda id: [empty_containers[id]]
+    application = MagicMock()
+    application.getMainThread.return_value = threading.current_thread()
+    application.getMachineManager().defaultExtruderPosition = "0"
+    extruder_manager = MagicMock()
+
+    with patch("UM.Settings.ContainerRegistry.ContainerRegistry.getInstance", return_value = registry), \
+         patch("UM.Application.Application.getInstance", return_value = application), \
+         patch("cura.CuraApplication.CuraApplication.getInstance", return_value = application), \
+         patch.object(ExtruderManager, "getInstance", return_value = extruder_manager), \
+         patch.object(VersionUpgradeManager, "getInstance", return_value = MagicMock(**{"updateFilesData.return_value": None})), \
+         patch.object(Signal, "_app", application), \
+         patch.dict(SettingDefinition._SettingDefinition__property_definitions): # The properties that the application adds.
+        SettingDefinition.addSupportedProperty("settable_per_extruder", DefinitionPropertyType.Any, default = True, read_only = True)
+        SettingDefinition.addSupportedProperty("limit_to_extruder", DefinitionPropertyType.Function, default = "-1", depends_on = "value")
+        SettingDefinition.addSupportedProperty("resolve", DefinitionPropertyType.Function, default = None, depends_on = "value")
+        result = Machine()
+        registry.findDefinitionContainers.side_effect = lambda id: [result.containers[id]] if id in result.containers else []
+        application.getGlobalContainerStack.return_value = result.global_stack
+        extruder_manager.getMachineExtruders.return_value = result.extruders
+        extruder_manager.getExtruderStack.side_effect = result.getExtruderStack
+        with patch("UM.Settings.InstanceContainer._containerRegistry", registry):
+            # The operators of the live stacks, as the application registers them.
+            with patch.dict(SettingFunction._SettingFunction__operators, {
+                "extruderValues": ExtruderManager.getExtruderValues,
+                "extruderValue": ExtruderManager.getExtruderValue,
+                "resolveOrValue": ExtruderManager.getResolveOrValue,
+                "defaultExtruderPosition": ExtruderManager.getDefaultExtruderPosition
+            }):
+                yield result
+
+##  The values of all settings of the global stack and the extruders.
+def getAllValues(stacks, property_name = "value"):
+    return [{key: stack.getProperty(key, property_name) for key in sorted(stacks[0].getAllKeys())} for stack in stacks]
+
+def getStacks(snapshot):
+    return [snapshot.getGlobalStack()] + snapshot.getExtruderStacks()
+
+def test_sameAsStacks(machine):
+    machine.setValue(machine.extruders[0], "material_print_temperature", 210)
+    machine.setValue(machine.extruders[1], "material_print_temperature", 240)
+    machine.setValue(machine.extruders[1], "infill_density", 10)
+    machine.setValue(machine.extruders[0], "wall_speed", 20) # Ignored, since the walls are printed with the second extruder.
+    machine.setValue(machine.extruders[1], "wall_speed", 50)
+    machine.setValue(machine.extruders[1], "travel_speed", 150)
+    machine.setValue(machine.global_stack, "layer_height", 2) # Too high.
+    stacks = [machine.global_stack] + machine.extruders
+
+    snapshot = SettingsSnapshot(machine.global_stack)
+
+    assert getAllValues(getStacks(snapshot)) == getAllValues(stacks)
+    assert getAllValues(getStacks(snapshot), "validationState") == getAllValues(stacks, "validationState")
+    assert getAllValues(getStacks(snapshot), "state") == getAllValues(stacks, "state")
+    assert snapshot.getGlobalStack().getProperty("print_temperature_max", "value") == 240
+    assert snapshot.getGlobalStack().getProperty("support_temperature", "value") == 240
+    assert snapshot.getGlobalStack().getProperty("wall_speed", "value") == 50
+    assert snapshot.getGlobalStack().getProperty("travel_speed", "value") == 150 # Resolved from the extruders.
+    assert snapshot.getGlobalStack().getProperty("layer_height", "validationState") == ValidatorState.MaximumError
+    assert snapshot.getGlobalStack().getProperty("unknown_setting", "value") is None
+
+def test_metadata(machine):
+    machine.extruders[1].setEnabled(False)
+
+    snapshot = SettingsSnapshot(machine.global_stack)
+
+    assert [extruder.getMetaDataEntry("position") for extruder in snapshot.getExtruderStacks()] == ["0", "1"]
+    assert [extruder.isEnabled for extruder in snapshot.getExtruderStacks()] == [True, False]
+    assert snapshot.getExtruderStack("1").findContainer({"type": "material"}).getMetaDataEntry("GUID") == "guid_1"
+    assert snapshot.getExtruderStack("1").getNextStack() is snapshot.getGlobalStack()
+    assert snapshot.getGlobalStack().getId() == "global"
+    assert snapshot.getDefaultExtruderPosition() == "0"
+
+##  Changes after the snapshot was taken don't change the snapshot, also not
+#   through the extruder operators of setting functions.
+def test_unchangedBySettings(machine):
+    snapshot = SettingsSnapshot(machine.global_stack)
+    before = getAllValues(getStacks(snapshot))
+
+    machine.setValue(machine.extruders[1], "material_print_temperature", 250)
+    machine.setValue(machine.global_stack, "support_extruder_nr", 0)
+    machine.setValue(machine.extruders[0], "infill_density", 40)
+    machine.extruders[0].material.setMetaDataEntry("GUID", "other_guid")
+
+    assert getAllValues(getStacks(snapshot)) == before
+    assert machine.global_stack.getProperty("print_temperature_max", "value") == 250
+    assert snapshot.getGlobalStack().getProperty("print_temperature_max", "value") == 200
+    assert snapshot.getExtruderStack("0").findContainer({"type": "material"}).getMetaDataEntry("GUID") == "guid_0"
+
+def test_noSignals(machine):
+    snapshot = SettingsSnapshot(machine.global_stack)
+    emitted = []
+    for stack in [machine.global_stack] + machine.extruders:
+        stack.propertyChanged.connect(lambda key, property_name: emitted.append(key))
+    machine.global_stack.userChanges.setProperty("layer_height", "value", 0.2)
+    emitted.clear()
+
+    getAllValues(getStacks(snapshot))
+    getAllValues(getStacks(snapshot), "validationState")
+
+    assert emitted == []
+
+##  Prepares a slice again and again in a background thread, like the
+#   StartSliceJob, while the main thread keeps changing the settings, like the
+#   user does.
+def test_concurrentEdits(machine):
+    machine.setValue(machine.extruders[1], "material_print_temperature", 240)
+    snapshot = SettingsSnapshot(machine.global_stack)
+    expected = getAllValues(getStacks(snapshot))
+    results = []
+    errors = []
+    done = threading.Event()
+
+    def prepareSlice():
+        try:
+            for _ in range(50):
+                results.append(getAllValues(getStacks(snapshot)))
+        except Exception as e:
+            errors.append(e)
+        done.set()
+    thread = threading.Thread(target = prepareSlice)
+    thread.start()
+
+    edit_count = 0
+    while not done.is_set():
+        stack = [machine.global_stack] + machine.extruders
+        stack = stack[edit_count % 3]
+        machine.setValue(stack, "material_print_temperature", 180 + edit_count % 50)
+        machine.setValue(stack, "infill_density", 5 + edit_count % 10)
+        machine.setValue(machine.global_stack, "support_extruder_nr", edit_count % 2)
+        if edit_count % 7 == 0:
+            stack.userChanges.removeInstance("material_print_temperature")
+        edit_count += 1
+    thread.join()
+
+    assert errors == []
+    assert len(results) == 50
+    assert all(result == expected for result in results)
+    assert edit_count > 0
+
+##  Taking a snapshot, and evaluating all settings of a snapshot compared to
+#   evaluating them on the stacks.
+def test_benchmarkSnapshot(machine):
+    for key in ["material_print_temperature", "infill_density", "wall_speed"]:
+        for stack in machine.extruders:
+            machine.setValue(stack, key, 42)
+    count = 100
+
+    start_time = time.perf_counter()
+    for _ in range(count):
+        snapshot = SettingsSnapshot(machine.global_stack)
+    snapshot_time = (time.perf_counter() - start_time) / count
+
+    start_time = time.perf_counter()
+    for _ in range(count):
+        getAllValues(getStacks(snapshot))
+    evaluate_snapshot_time = (time.perf_counter() - start_time) / count
+
+    start_time = time.perf_counter()
+    for _ in range(count):
+        getAllValues([machine.global_stack] + machine.extruders)
+    evaluate_stacks_time = (time.perf_counter() - start_time) / count
+
+    assert getAllValues(getStacks(snapshot)) == getAllValues([machine.global_stack] + machine.extruders)
+    assert snapshot_time < evaluate_stacks_time / 10
+    assert snapshot_time + evaluate_snapshot_time < evaluate_stacks_time # Taking a snapshot pays off when slicing evaluates everything once.
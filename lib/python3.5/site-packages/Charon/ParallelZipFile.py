@@ -0,0 +1,225 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# libCharon is released under the terms of the LGPLv3 or higher.
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import struct
+import time
+import zipfile
+import zlib
+from typing import IO, List, Optional, Union
+
+
+##  A member of the archive that is being compressed.
+class _PendingMember:
+    def __init__(self, info: zipfile.ZipInfo, file_size: int, crc: "Future[int]", chunks: List["Future[bytes]"]) -> None:
+        self.info = info
+        self.file_size = file_size
+        self.crc = crc
+        self.chunks = chunks
+
+
+##  Compress one chunk of a member into raw deflate data.
+#
+#   Every chunk but the last one ends with a sync flush, which ends on a byte
+#   boundary without ending the deflate stream. That way the compressed chunks
+#   can simply be concatenated. The end of the previous chunk is used as the
+#   dictionary, so the compression ratio barely suffers from the chunking.
+#   zlib releases the GIL while compressing, so chunks are compressed in
+#   parallel by the threads of the pool.
+def _deflateChunk(data: memoryview, start: int, end: int, level: int, is_last: bool) -> bytes:
+    dictionary_start = max(start - ParallelZipFile.dictionary_size, 0)
+    if dictionary_start < start:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict = bytes(data[dictionary_start:start]))
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    result = compressor.compress(data[start:end])
+    return result + compressor.flush(zlib.Z_FINISH if is_last else zlib.Z_SYNC_FLUSH)
+
+
+##  A write-only ZIP archive that compresses its members in a thread pool.
+#
+#   This implements the part of the interface of zipfile.ZipFile that is
+#   needed to write archives: writestr, namelist, infolist and close. Members
+#   are split into chunks that are deflated in parallel, and they are written
+#   to the stream in the order in which they were added as soon as their
+#   compression is done. The result is a normal ZIP file (using the ZIP64
+#   extensions when it gets too big for the original format).
+#
+#   Unlike zipfile.ZipFile, the compression is a property of the archive. The
+#   compress_type of a ZipInfo that is passed to writestr is ignored.
+class ParallelZipFile:
+    chunk_size = 1 << 20  # Size of the pieces that large members are compressed in.
+    dictionary_size = 1 << 15  # Maximum window size of deflate.
+
+    ##  Creates a new archive.
+    #   \param stream The binary stream to write the archive to.
+    #   \param compression_level The zlib compression level, from 1 (fastest)
+    #   to 9 (smallest). Use 0 to store the members without compression.
+    #   \param thread_count The number of threads to compress with. By default
+    #   one thread per CPU is used.
+    def __init__(self, stream: IO[bytes], compression_level: int = 6, thread_count: Optional[int] = None) -> None:
+        if not 0 <= compression_level <= 9:
+            raise ValueError("Compression level must be between 0 and 9, not {level}.".format(level = compression_level))
+        self._stream = stream
+        self._compression_level = compression_level
+        self._compress_type = zipfile.ZIP_DEFLATED if compression_level > 0 else zipfile.ZIP_STORED
+        self._executor = ThreadPoolExecutor(max_workers = thread_count or os.cpu_count() or 1)
+
+        try:
+            self._offset = stream.tell()
+        except (AttributeError, OSError):  # Unseekable streams. All offsets are counted from the start of our own data.
+            self._offset = 0
+        self._pending = []  # type: List[_PendingMember] # Members that are not written to the stream yet, in order.
+        self._written = []  # type: List[zipfile.ZipInfo] # Members that are written, with their sizes and offsets filled in.
+        self._closed = False
+
+    ##  Adds a member to the archive.
+    #
+    #   The data is compressed in the background. This may block to write
+    #   earlier members to the stream.
+    #   \param zinfo_or_arcname The name of the member, or a ZipInfo describing it.
+    #   \param data The contents of the member. Strings are encoded as UTF-8.
+    def writestr(self, zinfo_or_arcname: Union[str, zipfile.ZipInfo], data: Union[str, bytes]) -> None:
+        if self._closed:
+            raise ValueError("Attempt to write to a closed archive.")
+        if isinstance(zinfo_or_arcname, zipfile.ZipInfo):
+            source_info = zinfo_or_arcname
+            info = zipfile.ZipInfo(source_info.filename, source_info.date_time)
+            info.external_attr = source_info.external_attr
+        else:
+            info = zipfile.ZipInfo(zinfo_or_arcname, time.localtime(time.time())[:6])
+            info.external_attr = 0o600 << 16  # Same permissions as zipfile gives them.
+        info.compress_type = self._compress_type
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        view = memoryview(data)
+
+        crc = self._executor.submit(zlib.crc32, view)
+        if self._compress_type == zipfile.ZIP_STORED:
+            stored = Future()  # type: Future[bytes]
+            stored.set_result(bytes(view))
+            chunks = [stored]
+        else:
+            starts = range(0, max(len(view), 1), self.chunk_size)
+            chunks = [self._executor.submit(_deflateChunk, view, start, min(start + self.chunk_size, len(view)), self._compression_level, start + self.chunk_size >= len(view)) for start in starts]
+        self._pending.append(_PendingMember(info, len(view), crc, chunks))
+
+        self._writePending(block = False)
+
+    ##  Gets the names of the members in the archive, in order.
+    def namelist(self) -> List[str]:
+        return [info.filename for info in self.infolist()]
+
+    ##  Gets the ZipInfo of the members in the archive, in order.
+    #
+    #   The sizes are only filled in for members that are already written.
+    def infolist(self) -> List[zipfile.ZipInfo]:
+        return self._written + [member.info for member in self._pending]
+
+    ##  Waits for all members to be compressed and finishes the archive.
+    #
+    #   The stream itself is not closed.
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._writePending(block = True)
+            self._writeCentralDirectory()
+        finally:
+            self._executor.shutdown()
+
+    def __enter__(self) -> "ParallelZipFile":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    ##  Writes the members that are done compressing to the stream.
+    #   \param block Whether to wait for all members to be compressed, or to
+    #   stop at the first member that is not done yet.
+    def _writePending(self, block: bool) -> None:
+        while self._pending:
+            member = self._pending[0]
+            if not block and not all(chunk.done() for chunk in member.chunks):
+                return
+            self._pending.pop(0)
+            self._writeMember(member)
+
+    def _writeMember(self, member: _PendingMember) -> None:
+        chunks = [chunk.result() for chunk in member.chunks]
+        info = member.info
+        info.CRC = member.crc.result()
+        info.file_size = member.file_size
+        info.compress_size = sum(len(chunk) for chunk in chunks)
+        info.header_offset = self._offset
+
+        zip64 = info.file_size > zipfile.ZIP64_LIMIT or info.compress_size > zipfile.ZIP64_LIMIT
+        extra = b""
+        if zip64:
+            extra = struct.pack("<HHQQ", 1, 16, info.file_size, info.compress_size)
+        filename, flags = self._encodeFilename(info.filename)
+        header = struct.pack("<IHHHHHIIIHH", 0x04034b50, 45 if zip64 else 20, flags, info.compress_type,
+                             *self._dosDateTime(info), info.CRC,
+                             0xffffffff if zip64 else info.compress_size, 0xffffffff if zip64 else info.file_size,
+                             len(filename), len(extra))
+        self._write(header + filename + extra)
+        for chunk in chunks:
+            self._write(chunk)
+        self._written.append(info)
+
+    def _writeCentralDirectory(self) -> None:
+        central_directory_offset = self._offset
+        for info in self._written:
+            zip64_fields = []
+            file_size = info.file_size
+            compress_size = info.compress_size
+            header_offset = info.header_offset
+            if file_size > zipfile.ZIP64_LIMIT:
+                zip64_fields.append(file_size)
+                file_size = 0xffffffff
+            if compress_size > zipfile.ZIP64_LIMIT:
+                zip64_fields.append(compress_size)
+                compress_size = 0xffffffff
+            if header_offset > zipfile.ZIP64_LIMIT:
+                zip64_fields.append(header_offset)
+                header_offset = 0xffffffff
+            extra = b""
+            if zip64_fields:
+                extra = struct.pack("<HH" + "Q" * len(zip64_fields), 1, 8 * len(zip64_fields), *zip64_fields)
+            version = 45 if zip64_fields else 20
+            filename, flags = self._encodeFilename(info.filename)
+            header = struct.pack("<IHHHHHHIIIHHHHHII", 0x02014b50, version, version, flags, info.compress_type,
+                                 *self._dosDateTime(info), info.CRC, compress_size, file_size,
+                                 len(filename), len(extra), 0, 0, 0, info.external_attr, header_offset)
+            self._write(header + filename + extra)
+
+        count = len(self._written)
+        central_directory_size = self._offset - central_directory_offset
+        if count > zipfile.ZIP_FILECOUNT_LIMIT or central_directory_offset > zipfile.ZIP64_LIMIT or central_directory_size > zipfile.ZIP64_LIMIT:
+            zip64_end_offset = self._offset
+            self._write(struct.pack("<IQHHIIQQQQ", 0x06064b50, 44, 45, 45, 0, 0, count, count, central_directory_size, central_directory_offset))
+            self._write(struct.pack("<IIQI", 0x07064b50, 0, zip64_end_offset, 1))
+            count = min(count, 0xffff)
+            central_directory_offset = min(central_directory_offset, 0xffffffff)
+            central_directory_size = min(central_directory_size, 0xffffffff)
+        self._write(struct.pack("<IHHHHIIH", 0x06054b50, 0, 0, count, count, central_directory_size, central_directory_offset, 0))
+        self._stream.flush()
+
+    def _write(self, data: bytes) -> None:
+        self._stream.write(data)
+        self._offset += len(data)
+
+    ##  Encodes a file name, like zipfile does: ASCII if possible, otherwise
+    #   UTF-8 with the flag that indicates that.
+    @staticmethod
+    def _encodeFilename(filename: str):
+        try:
+            return filename.encode("ascii"), 0
+        except UnicodeEncodeError:
+            return filename.encode("utf-8"), 0x800
+
+    @staticmethod
+    def _dosDateTime(info: zipfile.ZipInfo):
+        year, month, day, hour, minute, second = info.date_time
+        return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
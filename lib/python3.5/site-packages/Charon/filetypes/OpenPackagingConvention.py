@@ -4,12 +4,13 @@ from collections import OrderedDict  # To specify the aliases in order.
 from io import BytesIO
 import json  # The metadata format.
 import re  # To find the path aliases.
-from typing import Any, Dict, List, IO, Optional
+from typing import Any, Dict, List, IO, Optional, Union
 import xml.etree.ElementTree as ET  # For writing XML manifest files.
 import zipfile
 
 from Charon.FileInterface import FileInterface  # The interface we're implementing.
 from Charon.OpenMode import OpenMode  # To detect whether we want to read and/or write to the file.
+from Charon.ParallelZipFile import ParallelZipFile  # To compress the resources in parallel when writing.
 from Charon.ReadOnlyError import ReadOnlyError  # To be thrown when trying to write while in read-only mode.
 from Charon.WriteOnlyError import WriteOnlyError  # To be thrown when trying to read while in write-only mode.
 from Charon.filetypes.GCodeFile import GCodeFile  # Required for fallback G-Code header parsing.
@@ -33,21 +34,28 @@ class OpenPackagingConvention(FileInterface):
     def __init__(self) -> None:
         self._mode = None  # type: Optional[OpenMode]        # Whether we're in read or write mode.
         self._stream = None  # type: Optional[IO[bytes]]       # The currently open stream.
-        self._zipfile = None  # type: Optional[zipfile.ZipFile] # The zip interface to the currently open stream.
+        self._zipfile = None  # type: Optional[Union[zipfile.ZipFile, ParallelZipFile]] # The zip interface to the currently open stream.
         self._metadata = {}  # type: Dict[str, Any]            # The metadata in the currently open file.
         self._content_types_element = None  # type: Optional[ET.Element] # An XML element holding all the content types.
         self._relations = {}  # type: Dict[str, ET.Element]     # For each virtual path, a relations XML element (which is left out of the file if empty).
-        self._open_bytes_streams = {}  # type: Dict[str, IO[bytes]] # With old Python versions, the currently open BytesIO streams that need to be flushed, by their virtual path.
+        self._open_bytes_streams = {}  # type: Dict[str, IO[bytes]] # In write mode, the currently open BytesIO streams that need to be flushed, by their virtual path.
 
         # The zipfile module may only have one write stream open at a time. So when you open a new stream, close the previous one.
         self._last_open_path = None  # type: Optional[str]
         self._last_open_stream = None  # type: Optional[IO[bytes]]
 
+    ##  Opens a stream for reading or writing.
+    #   \param compression_level When writing, the zlib compression level to
+    #   compress the resources with, from 1 (fastest) to 9 (smallest), or 0 to
+    #   store them without compression.
     def openStream(self, stream: IO[bytes], mime: str = "application/x-opc",
-                   mode: OpenMode = OpenMode.ReadOnly) -> None:
+                   mode: OpenMode = OpenMode.ReadOnly, compression_level: int = 6) -> None:
         self._mode = mode
         self._stream = stream  # A copy in case we need to rewind for toByteArray. We should mostly be reading via self._zipfile.
-        self._zipfile = zipfile.ZipFile(self._stream, self._mode.value, compression=zipfile.ZIP_DEFLATED)
+        if self._mode == OpenMode.WriteOnly:  # Compress the resources in parallel when writing.
+            self._zipfile = ParallelZipFile(self._stream, compression_level=compression_level)
+        else:
+            self._zipfile = zipfile.ZipFile(self._stream, self._mode.value, compression=zipfile.ZIP_DEFLATED)
 
         self._readContentTypes()  # Load or create the content types element.
         self._readRels()  # Load or create the relations.
@@ -73,7 +81,7 @@ class OpenPackagingConvention(FileInterface):
         if self._last_open_stream is not None and self._last_open_path not in self._open_bytes_streams:
             self._last_open_stream.close()
 
-        # If using old Python versions (<= 3.5), the write streams were kept in memory to be written all at once when flushing.
+        # The write streams were kept in memory to be written all at once when flushing.
         for virtual_path, stream in self._open_bytes_streams.items():
             stream.seek(0)
             self._zipfile.writestr(virtual_path, stream.read())
@@ -194,11 +202,11 @@ class OpenPackagingConvention(FileInterface):
                 return self._resizeImage(png_file, dimensions[0], dimensions[1])
 
         self._last_open_path = virtual_path
-        try:  # If it happens to match some existing PNG file, we have to rescale that file and return the result.
-            self._last_open_stream = self._zipfile.open(virtual_path, self._mode.value)
-        except RuntimeError:  # Python 3.5 and before couldn't open resources in the archive in write mode.
+        if self._mode == OpenMode.WriteOnly:  # Resources are written in one go when flushing, so that they can be compressed in parallel.
             self._last_open_stream = BytesIO()
             self._open_bytes_streams[virtual_path] = self._last_open_stream  # Save this for flushing later.
+        else:
+            self._last_open_stream = self._zipfile.open(virtual_path, self._mode.value)
         return self._last_open_stream
 
     def toByteArray(self, offset: int = 0, count: int = -1) -> bytes:
@@ -18,6 +18,7 @@ import UM.Settings.ContainerStack
 import UM.Settings.InstanceContainer
 from UM.Settings.ContainerRegistry import ContainerRegistry
 from UM.Signal import Signal, signalemitter
+from UM.StartupProfiler import StartupProfiler
 from UM.Logger import Logger
 from UM.Preferences import Preferences
 from UM.View.Renderer import Renderer #For typing.
@@ -95,6 +96,8 @@ class Application:
 
         self._app_install_dir = self.getInstallPrefix() #type: str
 
+        self._startup_profiler = StartupProfiler() #type: StartupProfiler
+
     # Adds the command line options that can be parsed by the command line parser.
     # Can be overridden to add additional command line options to the parser.
     def addCommandLineOptions(self) -> None:
@@ -154,6 +157,7 @@ class Application:
         self._preferences.addPreference("general/visible_settings", "")
         self._preferences.addPreference("general/plugins_to_remove", "")
         self._preferences.addPreference("general/disabled_plugins", "")
+        self._preferences.addPreference("general/lazy_plugin_activation", True)
 
         self._controller = Controller(self)
         self._output_device_manager = OutputDeviceManager()
@@ -201,6 +205,7 @@ class Application:
     #   This method should be re-implemented by subclasses to start the main event loop.
     #   \exception NotImplementedError
     def run(self):
+        self._startup_profiler.startPhase("Initializing")
         self.addCommandLineOptions()
         self.parseCliOptions()
         self.initialize()
@@ -208,6 +213,26 @@ class Application:
         self.startSplashWindowPhase()
         self.startPostSplashWindowPhase()
 
+    ##  Get the profiler that records how long the phases of the start-up and
+    #   the loading of every plug-in take.
+    def getStartupProfiler(self) -> StartupProfiler:
+        return self._startup_profiler
+
+    ##  Mark the start-up as finished and log how long it took.
+    #
+    #   If the URANIUM_STARTUP_TRACE environment variable is set, the recorded
+    #   times are written to that file as a Chrome trace.
+    def finishStartupProfile(self) -> None:
+        duration = self._startup_profiler.finish()
+        Logger.log("d", "Start-up took %s seconds:\n%s", duration, self._startup_profiler.getSummary())
+
+        trace_path = os.environ.get("URANIUM_STARTUP_TRACE")
+        if trace_path:
+            try:
+                self._startup_profiler.writeChromeTrace(trace_path)
+            except EnvironmentError:
+                Logger.logException("w", "Unable to write the start-up trace to %s", trace_path)
+
     def getContainerRegistry(self):
         return self._container_registry
 
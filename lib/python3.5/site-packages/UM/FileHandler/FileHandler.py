@@ -9,6 +9,7 @@ from PyQt5.QtCore import QObject, pyqtProperty, pyqtSlot, QUrl
 
 from UM.Logger import Logger
 from UM.Platform import Platform
+from UM.PluginError import PluginNotFoundError
 from UM.PluginRegistry import PluginRegistry
 
 from UM.i18n import i18nCatalog
@@ -35,8 +36,9 @@ class FileHandler(QObject):
         self._writer_type = writer_type # type: str
         self._reader_type = reader_type # type: str
 
-        PluginRegistry.addType(self._writer_type, self.addWriter)
-        PluginRegistry.addType(self._reader_type, self.addReader)
+        # Readers and writers are only needed when a file is read or written, so they may be loaded when first used.
+        PluginRegistry.addType(self._writer_type, self.addWriter, lazy = True)
+        PluginRegistry.addType(self._reader_type, self.addReader, lazy = True)
 
     @pyqtProperty("QStringList", constant = True)
     def supportedReadFileTypes(self) -> List[str]:
@@ -136,12 +138,14 @@ class FileHandler(QObject):
         for entry in writer_data:
             for output in entry[self._writer_type].get("output", []):
                 if mime == output["mime_type"]:
-                    return self._writers[entry["id"]]
+                    return self.getWriter(entry["id"])
 
         return None
 
     ##  Get an instance of a mesh writer by ID
     def getWriter(self, writer_id: str) -> Optional["FileWriter"]:
+        if writer_id not in self._writers:
+            self._loadDeferredPlugin(writer_id)
         if writer_id not in self._writers:
             return None
 
@@ -151,6 +155,17 @@ class FileHandler(QObject):
     #   \param file_name The name of file to load.
     #   \returns Reader that accepts the given file name. If no acceptable Reader is found None is returned.
     def getReaderForFile(self, file_name: str) -> Optional["FileReader"]:
+        # Load the readers that weren't used yet, but might accept this file.
+        plugin_registry = PluginRegistry.getInstance()
+        for entry in plugin_registry.getAllMetaData(filter = {self._reader_type: {}}, active_only = True):
+            if not plugin_registry.isDeferredPlugin(entry["id"]):
+                continue
+            for input_type in entry[self._reader_type]:
+                extension = input_type.get("extension", None)
+                if extension and file_name.lower().endswith("." + extension.lower()):
+                    self._loadDeferredPlugin(entry["id"])
+                    break
+
         for id, reader in self._readers.items():
             try:
                 if reader.acceptsFile(file_name):
@@ -160,6 +175,18 @@ class FileHandler(QObject):
 
         return None
 
+    ##  Load a reader or writer plug-in that was deferred until it's used.
+    #
+    #   It registers itself with this file handler when it's loaded.
+    def _loadDeferredPlugin(self, plugin_id: str) -> None:
+        plugin_registry = PluginRegistry.getInstance()
+        if not plugin_registry.isDeferredPlugin(plugin_id):
+            return
+        try:
+            plugin_registry.getPluginObject(plugin_id)
+        except PluginNotFoundError:
+            Logger.log("e", "Unable to load plug-in %s", plugin_id)
+
     __instance = None   # type: FileHandler
 
     @classmethod
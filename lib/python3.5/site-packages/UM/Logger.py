@@ -1,17 +1,45 @@
 # Copyright (c) 2018 Ultimaker B.V.
 # Uranium is released under the terms of the LGPLv3 or higher.
 
+import atexit
+import collections
+import sys
 import threading
+import time
 import traceback
-import inspect
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 
 from UM.PluginObject import PluginObject
 
 
 ##  Static class used for logging purposes. This class is only meant to be used as a static class.
+#
+#   Messages are formatted on the thread that logs them, but written to the
+#   log outputs by a background thread, so that logging doesn't wait for the
+#   disk. The writer thread writes the messages in batches, and asks the
+#   outputs to flush once per batch. Critical messages are written before
+#   Logger.log returns, since the application may be about to crash.
+#
+#   To keep logging cheap in hot code paths, messages below the level set with
+#   setLevel are dropped before they are formatted, and every line of code can
+#   log at most a limited number of messages per second (see setRateLimit).
 class Logger:
-    __loggers = []  # type: List[Logger]
+    __loggers = []  # type: List[LogOutput]
+
+    ##  The log types from least to most important.
+    __type_levels = {"d": 0, "i": 1, "w": 2, "e": 3, "c": 4}  # type: Dict[str, int]
+    __level = 0  # type: int # Messages with a lower level than this are dropped.
+
+    # Messages waiting for the writer thread. Appending to and popping from a deque is thread-safe, so logging doesn't
+    # need to take a lock. The write lock only makes sure that one thread at a time writes to the outputs.
+    __queue = collections.deque()  # type: collections.deque
+    __queue_event = threading.Event()
+    __write_lock = threading.RLock()
+    __writer_thread = None  # type: Optional[threading.Thread]
+    __asynchronous = True  # type: bool
+
+    __rate_limit = 100  # type: int # Maximum number of messages per line of code per second, or 0 for no limit.
+    __rate_windows = {}  # type: Dict[Tuple[Any, int], List[Any]] # Per line of code: start time of the second, message count and suppressed count.
 
     def __init__(self):
         raise Exception("This class is static only")
@@ -19,15 +47,53 @@ class Logger:
     ##  Add a logger to the list.
     #   \param logger \type{Logger}
     @classmethod
-    def addLogger(cls, logger: "Logger"):
+    def addLogger(cls, logger: "LogOutput"):
         cls.__loggers.append(logger)
 
     ##  Get all loggers
     #   \returns \type{list} List of Loggers
     @classmethod
-    def getLoggers(cls) -> List["Logger"]:
+    def getLoggers(cls) -> List["LogOutput"]:
         return cls.__loggers
 
+    ##  Set the least important type of message that is logged.
+    #
+    #   Messages of less important types are dropped before they are formatted.
+    #   \param log_type One of "d" (debug, the default), "i" (info), "w"
+    #   (warning), "e" (error) or "c" (critical).
+    @classmethod
+    def setLevel(cls, log_type: str) -> None:
+        cls.__level = cls.__type_levels[log_type]
+
+    ##  Whether messages of a type are logged.
+    #
+    #   This can be used to skip computing the arguments of a debug message in
+    #   code that runs often.
+    @classmethod
+    def isEnabledFor(cls, log_type: str) -> bool:
+        return cls.__type_levels.get(log_type, 4) >= cls.__level
+
+    ##  Set how many messages every line of code may log per second.
+    #
+    #   Further messages from that line are dropped until the second is over.
+    #   The next message from that line then tells how many were dropped.
+    #   Errors and critical messages are never dropped.
+    #   \param messages_per_second The maximum number of messages, or 0 to log
+    #   all messages.
+    @classmethod
+    def setRateLimit(cls, messages_per_second: int) -> None:
+        cls.__rate_limit = messages_per_second
+        cls.__rate_windows.clear()
+
+    ##  Set whether messages are written by a background thread.
+    #
+    #   When disabled, every message is written and flushed before Logger.log
+    #   returns.
+    @classmethod
+    def setAsynchronous(cls, asynchronous: bool) -> None:
+        cls.flush()
+        cls.__asynchronous = asynchronous
+
     ##  Send a message of certain type to all loggers to be handled.
     #
     #   This method supports placeholders in either str.format() style or % style. For more details see
@@ -43,11 +109,53 @@ class Logger:
     #   \param **kwargs \type{dict} List of placeholder replacements that will be passed to str.format().
     @classmethod
     def log(cls, log_type: str, message: str, *args, **kwargs):
-        current_frame = inspect.currentframe()
-        if current_frame is None:   # Avoid crash if the inspect module returns None (it should never happen)
+        if cls.__type_levels.get(log_type, 4) < cls.__level:
             return
-        caller_frame = current_frame.f_back
-        frame_info = inspect.getframeinfo(caller_frame)
+        cls.__log(log_type, message, args, kwargs, sys._getframe(1), rate_limited = True)
+
+    ##  Logs that an exception occurs.
+    #
+    #   It'll include the traceback of the exception in the log message. The
+    #   traceback is obtained from the current execution state.
+    #
+    #   \param log_type The importance level of the log (warning, info, etc.).
+    #   \param message The message to go along with the exception.
+    @classmethod
+    def logException(cls, log_type: str, message: str, *args):
+        if cls.__type_levels.get(log_type, 4) < cls.__level:
+            return
+        caller_frame = sys._getframe(1)
+        cls.__log(log_type, "Exception: " + message, args, {}, caller_frame, rate_limited = True)
+        # The function traceback.format_exception gives a list of strings, but those are not properly split on newlines.
+        # traceback.format_exc only gives back a single string, but we can properly split that. It does add an extra newline at the end, so strip that.
+        for line in traceback.format_exc().rstrip().split("\n"):
+            cls.__log(log_type, line, (), {}, caller_frame, rate_limited = False)
+
+    ##  Wait until all messages are written to the outputs, and flush them.
+    @classmethod
+    def flush(cls) -> None:
+        cls.__writeQueue()
+
+    @classmethod
+    def __log(cls, log_type: str, message: str, args: tuple, kwargs: Dict[str, Any], caller_frame, rate_limited: bool) -> None:
+        # Take the location from the frame, without looking up the source code like inspect.getframeinfo does.
+        code = caller_frame.f_code
+        line = caller_frame.f_lineno
+
+        suppressed = 0
+        if rate_limited and cls.__rate_limit > 0 and log_type not in ("e", "c"):
+            now = time.monotonic()
+            window = cls.__rate_windows.get((code, line))
+            if window is None or now - window[0] >= 1.0:
+                if window is not None:
+                    suppressed = window[2]
+                cls.__rate_windows[(code, line)] = [now, 1, 0]
+            elif window[1] >= cls.__rate_limit:
+                window[2] += 1
+                return
+            else:
+                window[1] += 1
+
         try:
             if args or kwargs: # Only format the message if there are args
                 new_message = message.format(*args, **kwargs)
@@ -56,36 +164,65 @@ class Logger:
                     new_message = message % args # Replace all the %s with the variables. Python formatting is magic.
 
                 message = new_message
+            if suppressed:
+                message += " ({suppressed} more messages from here were suppressed)".format(suppressed = suppressed)
 
             current_thread = threading.current_thread()
             message = "[{thread}] {class_name}.{function} [{line}]: {message}".format(thread = current_thread.name,
-                                                                                      class_name = caller_frame.f_globals["__name__"],
-                                                                                      function = frame_info.function,
-                                                                                      line = frame_info.lineno,
+                                                                                      class_name = caller_frame.f_globals.get("__name__"),
+                                                                                      function = code.co_name,
+                                                                                      line = line,
                                                                                       message = message)
-
-            for logger in cls.__loggers:
-                logger.log(log_type, message)
         except Exception as e:
             print("FAILED TO LOG: ", log_type, message, e)
+            return
 
         if not cls.__loggers:
             print(message)
+            return
+
+        cls.__queue.append((log_type, message))
+        if not cls.__asynchronous or log_type == "c":
+            cls.__writeQueue()
+            return
+        if cls.__writer_thread is None:
+            cls.__startWriterThread()
+        cls.__queue_event.set()
 
-    ##  Logs that an exception occurs.
-    #
-    #   It'll include the traceback of the exception in the log message. The
-    #   traceback is obtained from the current execution state.
-    #
-    #   \param log_type The importance level of the log (warning, info, etc.).
-    #   \param message The message to go along with the exception.
     @classmethod
-    def logException(cls, log_type: str, message: str, *args):
-        cls.log(log_type, "Exception: " + message, *args)
-        # The function traceback.format_exception gives a list of strings, but those are not properly split on newlines.
-        # traceback.format_exc only gives back a single string, but we can properly split that. It does add an extra newline at the end, so strip that.
-        for line in traceback.format_exc().rstrip().split("\n"):
-            cls.log(log_type, line)
+    def __startWriterThread(cls) -> None:
+        with cls.__write_lock:
+            if cls.__writer_thread is not None:
+                return
+            cls.__writer_thread = threading.Thread(target = cls.__runWriterThread, name = "LogWriter", daemon = True)
+            cls.__writer_thread.start()
+            atexit.register(cls.flush)
+
+    @classmethod
+    def __runWriterThread(cls) -> None:
+        while True:
+            cls.__queue_event.wait()
+            cls.__queue_event.clear()
+            cls.__writeQueue()
+
+    ##  Write all queued messages to the outputs, and flush them once.
+    @classmethod
+    def __writeQueue(cls) -> None:
+        with cls.__write_lock:
+            if not cls.__queue:
+                return
+            while cls.__queue:
+                log_type, message = cls.__queue.popleft()
+                for logger in cls.__loggers:
+                    try:
+                        logger.log(log_type, message)
+                    except Exception as e:
+                        print("FAILED TO LOG: ", log_type, message, e)
+            for logger in cls.__loggers:
+                try:
+                    logger.flush()
+                except Exception as e:
+                    print("FAILED TO FLUSH LOG: ", e)
 
 
 ##  Abstract base class for log output classes.
@@ -111,3 +248,10 @@ class LogOutput(PluginObject):
     #   \exception NotImplementedError
     def log(self, log_type: str, message: str):
         raise NotImplementedError("Logger was not correctly implemented")
+
+    ##  Write the messages that were logged to their destination.
+    #
+    #   The Logger calls this after every batch of messages, so outputs don't
+    #   need to flush after every message.
+    def flush(self) -> None:
+        pass
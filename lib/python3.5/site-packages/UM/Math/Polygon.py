@@ -75,15 +75,8 @@ class Polygon:
     #   \return A tuple describing the line segment of this Polygon projected on to the infinite line described by normal.
     #           The first element is the minimum value, the second the maximum.
     def project(self, normal):
-        projection_min = numpy.dot(normal, self._points[0])
-
-        projection_max = projection_min
-        for point in self._points:
-            projection = numpy.dot(normal, point)
-            projection_min = min(projection_min, projection)
-            projection_max = max(projection_max, projection)
-
-        return (projection_min, projection_max)
+        projections = numpy.dot(self._points, normal)
+        return (projections.min(), projections.max())
 
     ##  Moves the polygon by a fixed offset.
     #
@@ -248,6 +241,9 @@ class Polygon:
 
     ##  Check to see whether this polygon intersects with another polygon.
     #
+    #   This uses the separating axis theorem, projecting both polygons on the
+    #   normals of all their edges at once.
+    #
     #   \param other \type{Polygon} The polygon to check for intersection.
     #   \return A tuple of the x and y distance of intersection, or None if no intersection occured.
     def intersectsPolygon(self, other):
@@ -256,56 +252,106 @@ class Polygon:
         if len(self._points) < 2 or len(other.getPoints()) < 2:  # Polygon has not enough points, so it cant intersect.
             return None
 
-        retSize = 10000000.0
-        ret = None
-        for n in range(0, len(self._points)):
-            p0 = self._points[n-1]
-            p1 = self._points[n]
-
-            normal = (p1 - p0)[::-1]
-            normal[1] = -normal[1]
-            normal /= numpy.linalg.norm(normal)
-
-            aMin, aMax = self.project(normal)
-            bMin, bMax = other.project(normal)
-            if aMin > bMax:
-                return None
-            if bMin > aMax:
-                return None
-            size = min(aMax, bMax) - max(aMin, bMin)
-            if size < retSize:
-                if aMin < bMin:
-                    ret = normal * -size
-                else:
-                    ret = normal * size
-                retSize = size
-
-        for n in range(0, len(other._points)):
-            p0 = other._points[n-1]
-            p1 = other._points[n]
-
-            normal = (p1 - p0)[::-1]
-            normal[1] = -normal[1]
-            normal /= numpy.linalg.norm(normal)
-
-            aMin, aMax = self.project(normal)
-            bMin, bMax = other.project(normal)
-            if aMin > bMax:
-                return None
-            if bMin > aMax:
-                return None
-            size = min(aMax, bMax) - max(aMin, bMin)
-            if size < retSize:
-                if aMin < bMin:
-                    ret = normal * -size
-                else:
-                    ret = normal * size
-                retSize = size
+        normals = numpy.concatenate((self._getEdgeNormals(), other._getEdgeNormals()))
+        own_projections = numpy.dot(self._points, normals.T)
+        other_projections = numpy.dot(other.getPoints(), normals.T)
+        return self._getProjectionOverlap(own_projections.min(axis = 0), own_projections.max(axis = 0), other_projections.min(axis = 0), other_projections.max(axis = 0), normals)
 
-        if ret is not None:
-            return (ret[0], ret[1])
-        else:
+    ##  Check to see whether this polygon intersects with each of a list of
+    #   other polygons.
+    #
+    #   This gives the same results as calling intersectsPolygon for each of
+    #   the polygons, but first projects all polygons with the same few matrix
+    #   operations to rule out the ones that are clearly apart, so it is much
+    #   faster when testing against many polygons. Only the polygons that are
+    #   left are tested with intersectsPolygon itself.
+    #
+    #   \param others A list of \type{Polygon}s to check for intersection.
+    #   \return A list with for each polygon a tuple of the x and y distance of
+    #   intersection, or None if they don't intersect.
+    def intersectsPolygons(self, others):
+        results = [None] * len(others)
+        if len(self._points) < 2:  # Polygon has not enough points, so it cant intersect.
+            return results
+        indices = [index for index, other in enumerate(others) if other is not None and len(other.getPoints()) >= 2]
+        if not indices:
+            return results
+
+        # Stack the points of all other polygons, and remember where each polygon starts.
+        own_points = self._points.astype(numpy.float64)
+        other_points = numpy.concatenate([others[index].getPoints() for index in indices]).astype(numpy.float64)
+        counts = numpy.array([len(others[index].getPoints()) for index in indices])
+        starts = numpy.concatenate(([0], numpy.cumsum(counts)[:-1]))
+        owners = numpy.repeat(numpy.arange(len(indices)), counts)  # For each stacked point and edge, which polygon it belongs to.
+        own_normals = self._getNormals(own_points - numpy.roll(own_points, 1, axis = 0))
+        previous_points = numpy.arange(-1, len(other_points) - 1)
+        previous_points[starts] = starts + counts - 1  # The first edge of each polygon starts at its last point.
+        other_normals = self._getNormals(other_points - other_points[previous_points])
+
+        # Project all polygons on the normals of this polygon.
+        own_projections = numpy.dot(own_points, own_normals.T)
+        own_min_on_own = own_projections.min(axis = 0)
+        own_max_on_own = own_projections.max(axis = 0)
+        other_projections = numpy.dot(other_points, own_normals.T)
+        other_min_on_own = numpy.minimum.reduceat(other_projections, starts, axis = 0)
+        other_max_on_own = numpy.maximum.reduceat(other_projections, starts, axis = 0)
+
+        # Project this polygon on the normals of all other polygons.
+        own_projections = numpy.dot(own_points, other_normals.T)
+        own_min_on_other = own_projections.min(axis = 0)
+        own_max_on_other = own_projections.max(axis = 0)
+
+        # Project every other polygon on its own normals. This pairs each edge normal with all points of the same polygon.
+        pair_counts = counts[owners]
+        pair_normals = numpy.repeat(numpy.arange(len(other_points)), pair_counts)
+        pair_starts = numpy.concatenate(([0], numpy.cumsum(pair_counts)[:-1]))
+        pair_points = numpy.arange(len(pair_normals)) - numpy.repeat(pair_starts, pair_counts) + numpy.repeat(starts[owners], pair_counts)
+        pair_projections = numpy.einsum("ij,ij->i", other_normals[pair_normals], other_points[pair_points])
+        other_min_on_other = numpy.minimum.reduceat(pair_projections, pair_starts)
+        other_max_on_other = numpy.maximum.reduceat(pair_projections, pair_starts)
+
+        # Most polygons usually don't intersect. Find those at once. The projections are rounded differently than those
+        # of intersectsPolygon, so only polygons that are apart by more than the rounding errors are ruled out here.
+        margin = 1e-5 * max(1.0, numpy.abs(own_points).max(), numpy.abs(other_points).max())
+        separated = ((own_min_on_own > other_max_on_own + margin) | (other_min_on_own > own_max_on_own + margin)).any(axis = 1)
+        separated |= numpy.logical_or.reduceat((own_min_on_other > other_max_on_other + margin) | (other_min_on_other > own_max_on_other + margin), starts)
+        for position in numpy.flatnonzero(~separated):
+            index = indices[position]
+            results[index] = self.intersectsPolygon(others[index])
+        return results
+
+    ##  Get the normalised normals of all edges of this polygon.
+    #
+    #   The normal of the edge from point n - 1 to point n is in row n.
+    #   Degenerate edges give NaN normals.
+    def _getEdgeNormals(self):
+        return self._getNormals(self._points - numpy.roll(self._points, 1, axis = 0))
+
+    ##  Get the normalised normals of a list of edge directions.
+    @staticmethod
+    def _getNormals(directions):
+        normals = numpy.stack((directions[:, 1], -directions[:, 0]), axis = 1)
+        with numpy.errstate(invalid = "ignore", divide = "ignore"):
+            return normals / numpy.linalg.norm(normals, axis = 1)[:, numpy.newaxis]
+
+    ##  Find the smallest overlap of two polygons from their projections on a
+    #   set of normals.
+    #
+    #   \return A tuple of the x and y distance to move the first polygon to
+    #   resolve the overlap, or None if the projections don't overlap on one
+    #   of the normals.
+    @staticmethod
+    def _getProjectionOverlap(a_min, a_max, b_min, b_max, normals):
+        if (a_min > b_max).any() or (b_min > a_max).any():  # Found a separating axis.
             return None
+        sizes = numpy.minimum(a_max, b_max) - numpy.maximum(a_min, b_min)
+        sizes[numpy.isnan(sizes)] = numpy.inf  # Degenerate edges have no normal, so skip those.
+        best = numpy.argmin(sizes)
+        size = sizes[best]
+        if not size < 10000000.0:
+            return None
+        result = normals[best] * (-size if a_min[best] < b_min[best] else size)
+        return (result[0], result[1])
 
     ##  Calculate the convex hull around the set of points of this polygon.
     #
@@ -364,23 +410,44 @@ class Polygon:
     #   \param other The polygon to perform a Minkowski sum with.
     #   \return \type{Polygon} The Minkowski sum of this polygon with other.
     def getMinkowskiSum(self, other):
-        points = numpy.zeros((len(self._points) * len(other._points), 2))
-        for n in range(0, len(self._points)):
-            for m in range(0, len(other._points)):
-                points[n * len(other._points) + m] = self._points[n] + other._points[m]
-
-        return Polygon(points)
+        points = self._points[:, numpy.newaxis, :].astype(numpy.float64) + other._points[numpy.newaxis, :, :]
+        return Polygon(points.reshape((-1, 2)))
 
     ##  Create a Minkowski hull from this polygon and another polygon.
     #
     #   The Minkowski hull is the convex hull around the Minkowski sum of this
-    #   polygon with other.
+    #   polygon with other. It is the Minkowski sum of the convex hulls of both
+    #   polygons. Unless the polygons are small, that is found by merging the
+    #   edges of both hulls in order of their angle, rather than by taking the
+    #   hull of all sums of points.
     #
     #   \param other \type{Polygon} The Polygon to do a Minkowski addition with.
     #   \return The convex hull around the Minkowski sum of this Polygon with other
     def getMinkowskiHull(self, other):
-        sum = self.getMinkowskiSum(other)
-        return sum.getConvexHull()
+        if len(self._points) * len(other._points) <= 400:  # For small polygons, the few operations on all sums are faster.
+            return self.getMinkowskiSum(other).getConvexHull()
+
+        me_points = self._getConvexHullCounterClockwise()
+        him_points = other._getConvexHullCounterClockwise()
+        if me_points is None or him_points is None:  # No surface area, so the edges have no sensible order.
+            return self.getMinkowskiSum(other).getConvexHull()
+
+        me_edges = numpy.roll(me_points, -1, axis = 0) - me_points
+        him_edges = numpy.roll(him_points, -1, axis = 0) - him_points
+        edges = numpy.concatenate((me_edges, him_edges))
+        # Starting from the bottom, the angles of the edges of both polygons increase from 0 to 2 pi.
+        angles = numpy.arctan2(edges[:, 1], edges[:, 0]) % (2 * numpy.pi)
+        edges = edges[numpy.argsort(angles, kind = "mergesort")]  # Merging two sorted lists, so this is linear.
+
+        # Leave out the vertices between parallel edges, like the convex hull would.
+        next_edges = numpy.roll(edges, -1, axis = 0)
+        cross = edges[:, 0] * next_edges[:, 1] - edges[:, 1] * next_edges[:, 0]
+        scale = numpy.linalg.norm(edges, axis = 1) * numpy.linalg.norm(next_edges, axis = 1)
+        corners = numpy.abs(cross) > 1e-9 * scale
+        corners = numpy.roll(corners, 1)  # The vertex after each edge is the start of the next edge.
+        vertices = me_points[0] + him_points[0] + numpy.concatenate(([[0, 0]], numpy.cumsum(edges[:-1], axis = 0)))
+
+        return Polygon(vertices[corners][::-1])  # Clockwise, like getConvexHull gives it.
 
     ##  Whether the specified point is inside this polygon.
     #
@@ -390,10 +457,61 @@ class Polygon:
     #   \param point The point to check of whether it is inside.
     #   \return True if it is inside, or False otherwise.
     def isInside(self, point):
-        for i in range(0,len(self._points)):
-            if self._isRightTurn(self._points[i], self._points[(i + 1) % len(self._points)], point) == -1: #Outside this halfplane!
-                return False
-        return True
+        return bool(self.areInside(numpy.array([point]))[0])
+
+    ##  For each of a set of points, whether it is inside this polygon.
+    #
+    #   This is the same test as isInside, but for all points at once.
+    #
+    #   \param points An array of points, with shape (n, 2).
+    #   \return An array of n booleans, True for the points that are inside.
+    def areInside(self, points):
+        points = numpy.asarray(points)
+        p = self._points
+        q = numpy.roll(self._points, -1, axis = 0)
+        r = points[:, numpy.newaxis, :]  # Broadcast every point against every edge.
+        sum1 = q[:, 0] * r[..., 1] + p[:, 0] * q[:, 1] + r[..., 0] * p[:, 1]
+        sum2 = q[:, 0] * p[:, 1] + r[..., 0] * q[:, 1] + p[:, 0] * r[..., 1]
+        # A point is inside if it is not left of any of the edges, like _isRightTurn tests it.
+        return ((sum1 - sum2 < 0) | (sum1 == sum2)).all(axis = 1)
+
+    ##  Get the convex hull of this polygon in counter-clockwise order,
+    #   starting with the bottom-most (and then left-most) point.
+    #
+    #   Polygons that are already strictly convex, like most hulls that are
+    #   passed around, are used as they are.
+    #
+    #   \return The points of the hull, or None if the hull has no surface.
+    def _getConvexHullCounterClockwise(self):
+        if self._points is not None and len(self._points) >= 3:
+            points = self._getCounterClockwiseFromBottom(self._points)
+            edges = numpy.roll(points, -1, axis = 0) - points
+            next_edges = numpy.roll(edges, -1, axis = 0)
+            if (edges[:, 0] * next_edges[:, 1] - edges[:, 1] * next_edges[:, 0] > 0).all():  # Only left turns.
+                angles = numpy.arctan2(edges[:, 1], edges[:, 0]) % (2 * numpy.pi)
+                if (numpy.diff(angles) > 0).all():  # Turns around only once, so it doesn't intersect itself.
+                    return points
+
+        hull = self.getConvexHull().getPoints()
+        if len(hull) < 3:
+            return None
+        return self._getCounterClockwiseFromBottom(hull)
+
+    ##  Order the points of a convex polygon counter-clockwise, starting with
+    #   the bottom-most (and then left-most) point.
+    @staticmethod
+    def _getCounterClockwiseFromBottom(points):
+        if Polygon._getSignedArea(points) < 0:
+            points = points[::-1]
+        bottom = numpy.lexsort((points[:, 0], points[:, 1]))[0]
+        return numpy.roll(points, -bottom, axis = 0).astype(numpy.float64)
+
+    ##  The area of a polygon, which is negative if its points are in clockwise
+    #   order.
+    @staticmethod
+    def _getSignedArea(points):
+        next_points = numpy.roll(points, -1, axis = 0)
+        return (numpy.dot(points[:, 0], next_points[:, 1]) - numpy.dot(next_points[:, 0], points[:, 1])) / 2
 
     def _isRightTurn(self, p, q, r):
         sum1 = q[0] * r[1] + p[0] * q[1] + r[0] * p[1]
@@ -43,7 +43,7 @@ Reuse = object()
 #   attributes: a dict with {"value", "opengl_type", "opengl_name"} type in vector2f, vector3f, uniforms, ...
 class MeshData:
     def __init__(self, vertices=None, normals=None, indices=None, colors=None, uvs=None, file_name=None,
-                 center_position=None, zero_position=None, type = MeshType.faces, attributes=None):
+                 center_position=None, zero_position=None, type = MeshType.faces, attributes=None, convex_hull_vertices=None):
         self._application = None  # Initialize this later otherwise unit tests break
 
         self._vertices = NumPyUtil.immutableNDArray(vertices)
@@ -63,7 +63,7 @@ class MeshData:
         else:
             self._zero_position = Vector(0, 0, 0) # type: Vector
         self._convex_hull = None    # type: Optional[scipy.spatial.ConvexHull]
-        self._convex_hull_vertices = None  # type: Optional[numpy.ndarray]
+        self._convex_hull_vertices = NumPyUtil.immutableNDArray(convex_hull_vertices)  # type: Optional[numpy.ndarray]
         self._convex_hull_lock = threading.Lock()
 
         self._attributes = {}
@@ -274,6 +274,19 @@ class MeshData:
         else:
             return None
 
+    ##  Get the value of an attribute as bytes, the way OpenGL reads it.
+    #
+    #   The value may be stored in a smaller data type than the 32-bit floats
+    #   (or ints, for "int" attributes) that OpenGL gets, or as indices in the
+    #   rows of a "palette" array of the attribute. It is converted here.
+    def getAttributeAsByteArray(self, key: str) -> bytes:
+        attribute = self._attributes[key]
+        value = attribute["value"]
+        if "palette" in attribute:
+            value = attribute["palette"][value]
+        data_type = numpy.int32 if attribute["opengl_type"] == "int" else numpy.float32
+        return value.astype(data_type, copy = False).tobytes()
+
     def hasAttribute(self, key: str) -> bool:
         return key in self._attributes
 
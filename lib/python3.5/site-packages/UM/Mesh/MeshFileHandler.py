@@ -2,12 +2,15 @@
 # Uranium is released under the terms of the LGPLv3 or higher.
 
 import os
+import time
 from PyQt5.QtCore import QObject #For typing.
 
 from UM.Logger import Logger
 from UM.Math.Matrix import Matrix
 from UM.Math.Vector import Vector
 from UM.FileHandler.FileHandler import FileHandler
+from UM.Mesh.MeshReader import MeshReader
+from UM.Mesh.MeshReadProcessPool import MeshReadProcessPool
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from UM.Qt.QtApplication import QtApplication
@@ -29,6 +32,25 @@ class MeshFileHandler(FileHandler):
     # \returns MeshData if it was able to read the file, None otherwise.
     def readerRead(self, reader, file_name, **kwargs):
         try:
+            worker_read_function = None
+            if kwargs.get("center", True) and isinstance(reader, MeshReader) and MeshReadProcessPool.isSupported():
+                worker_read_function = reader.getWorkerReadFunction()
+            if worker_read_function is not None:
+                # Read, center and compute the hull in a worker process. Only the node is created here.
+                try:
+                    result = MeshReadProcessPool.getInstance().read(worker_read_function, file_name)
+                except Exception:
+                    # The worker process could not be started, could not read the file or timed out, so read it here instead.
+                    Logger.logException("w", "Unable to read file %s in a worker process", file_name)
+                else:
+                    if result is not None:
+                        start_time = time.time()
+                        node = reader.createNodeFromWorkerResult(file_name, result)
+                        Logger.log("d", "Creating the node for %s took %0.3f seconds", file_name, time.time() - start_time)
+                        return [node]
+                    Logger.log("w", "Unable to read file %s", file_name)
+                    return None
+
             results = reader.read(file_name)
             if results is not None:
                 if type(results) is not list:
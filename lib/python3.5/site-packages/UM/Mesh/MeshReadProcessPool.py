@@ -0,0 +1,141 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Uranium is released under the terms of the LGPLv3 or higher.
+
+import multiprocessing
+import multiprocessing.context
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from UM.Logger import Logger
+from UM.Platform import Platform
+import UM.Mesh.MeshReadWorker
+
+_main_module_lock = threading.Lock()
+
+
+##  A spawned process that imports MeshReadWorker as its main module.
+#
+#   The main module is what the parent process has in sys.modules["__main__"]
+#   at the moment the process is started, so it is swapped for as long as it
+#   takes to start the process. Workers that the pool restarts are started
+#   this way as well.
+class _WorkerProcess(multiprocessing.context.SpawnProcess):
+    @staticmethod
+    def _Popen(process_obj):
+        with _main_module_lock:
+            main_module = sys.modules["__main__"]
+            sys.modules["__main__"] = UM.Mesh.MeshReadWorker
+            try:
+                return multiprocessing.context.SpawnProcess._Popen(process_obj)
+            finally:
+                sys.modules["__main__"] = main_module
+
+
+class _WorkerContext(multiprocessing.context.SpawnContext):
+    Process = _WorkerProcess
+
+
+##  A pool of worker processes to parse mesh files in.
+#
+#   Mesh readers run in jobs on the JobQueue, which is limited by the GIL when
+#   many files are loaded at once. Readers that provide a worker read function
+#   (see MeshReader.getWorkerReadFunction) can have their parsing, centering
+#   and convex hull computation done in one of these processes instead. Only
+#   plain numpy arrays are sent back; the scene nodes are still created in the
+#   application process.
+#
+#   The processes are started on first use and are started with the "spawn"
+#   method, since forking a process with a running Qt application is unsafe.
+#   They run MeshReadWorker as main module rather than the application script.
+#
+#   A read that doesn't finish within the time-out raises an exception and
+#   the pool is restarted, so that the caller can read the file itself.
+class MeshReadProcessPool:
+    def __init__(self, process_count: Optional[int] = None, timeout: float = 60) -> None:
+        if process_count is None:
+            try:
+                process_count = multiprocessing.cpu_count()
+            except NotImplementedError:
+                process_count = 2
+        self._process_count = max(process_count, 1)
+        self._timeout = timeout
+        self._pool = None  # type: Optional[multiprocessing.pool.Pool]
+        self._pool_lock = threading.Lock()
+
+    ##  Read a file with a read function in one of the worker processes.
+    #
+    #   This blocks until the file is read, so it should be called from a job.
+    #
+    #   \param function A module-level function that takes the file name.
+    #   \param file_name The file to read.
+    #   \return The result of the read function.
+    #   \exception multiprocessing.TimeoutError The worker didn't return the
+    #   result in time, for instance because it died while starting up.
+    def read(self, function: Callable[[str], Optional[Dict[str, Any]]], file_name: str) -> Optional[Dict[str, Any]]:
+        start_time = time.time()
+        pool = self._getPool()
+        pending_result = pool.apply_async(UM.Mesh.MeshReadWorker.runReadFunction, (self._getSearchPath(function), function.__module__, function.__name__, file_name))
+        try:
+            result, parse_time = pending_result.get(self._timeout)
+        except multiprocessing.TimeoutError:
+            # The task may have been lost with a worker, so don't leave the pool to future reads.
+            self._terminatePool(pool)
+            raise
+        total_time = time.time() - start_time
+        Logger.log("d", "Reading %s in a worker process took %0.3f seconds: %0.3f seconds reading, %0.3f seconds waiting and transferring data", file_name, total_time, parse_time, total_time - parse_time)
+        return result
+
+    ##  Stop all worker processes.
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool = None
+
+    ##  Whether files can be read in worker processes on this system.
+    #
+    #   Frozen builds start the workers with the application executable. Only
+    #   on Windows does multiprocessing.freeze_support in the application
+    #   script turn those into workers; elsewhere they would start the whole
+    #   application again.
+    @staticmethod
+    def isSupported() -> bool:
+        return not hasattr(sys, "frozen") or Platform.isWindows()
+
+    def _getPool(self) -> "multiprocessing.pool.Pool":
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = _WorkerContext().Pool(self._process_count)
+            return self._pool
+
+    ##  Stop the worker processes of a pool, unless it was already replaced.
+    def _terminatePool(self, pool: "multiprocessing.pool.Pool") -> None:
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool.terminate()
+                self._pool = None
+
+    ##  Get the directory from which the top-level package of a function can be imported.
+    #
+    #   Plug-ins are loaded from their own plug-in folders, which are not on
+    #   the module search path of a new process.
+    def _getSearchPath(self, function: Callable) -> List[str]:
+        package = sys.modules.get(function.__module__.split(".")[0])
+        package_file = getattr(package, "__file__", None)
+        if package_file is None:
+            return []
+        package_path = os.path.dirname(os.path.abspath(package_file))
+        if os.path.basename(package_file).startswith("__init__."):
+            package_path = os.path.dirname(package_path)
+        return [package_path]
+
+    __instance = None  # type: MeshReadProcessPool
+
+    @classmethod
+    def getInstance(cls) -> "MeshReadProcessPool":
+        if cls.__instance is None:
+            cls.__instance = cls()
+        return cls.__instance
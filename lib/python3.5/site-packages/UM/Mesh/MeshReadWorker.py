@@ -0,0 +1,40 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Uranium is released under the terms of the LGPLv3 or higher.
+
+##  \file MeshReadWorker.py
+#   The main module of the worker processes of MeshReadProcessPool.
+#
+#   A process started with the "spawn" method imports the main module of the
+#   process that started it. The workers are started with this module as main
+#   module instead of the script of the application, so that they don't parse
+#   the command line, redirect the log files or load the application. Keep the
+#   imports of this module to a minimum for the same reason.
+
+import importlib
+import sys
+import time
+from typing import List
+
+
+##  Run a read function in a worker process.
+#
+#   The function is passed by name rather than pickled directly, so that the
+#   module it lives in (usually a plug-in) can be made importable first.
+#
+#   \param search_path Directories to add to the module search path.
+#   \param module_name The module that defines the read function.
+#   \param function_name The name of the read function.
+#   \param file_name The file to read.
+#   \return A tuple of the result of the read function and the time it took.
+def runReadFunction(search_path: List[str], module_name: str, function_name: str, file_name: str):
+    # Put the directories in front, so that a module with the same name elsewhere on the search path can't shadow them.
+    for path in reversed(search_path):
+        if path in sys.path:
+            sys.path.remove(path)
+        sys.path.insert(0, path)
+    import UM.Application # Needs to be imported before the readers to prevent a circular import.
+    function = getattr(importlib.import_module(module_name), function_name)
+
+    start_time = time.time()
+    result = function(file_name)
+    return result, time.time() - start_time
@@ -1,9 +1,11 @@
 # Copyright (c) 2015 Ultimaker B.V.
 # Uranium is released under the terms of the LGPLv3 or higher.
-from typing import Union, List
+from typing import Any, Callable, Dict, Optional, Union, List
 
 import UM.Application
 from UM.FileHandler.FileReader import FileReader
+from UM.Math.Vector import Vector
+from UM.Mesh.MeshData import MeshData
 from UM.Scene.SceneNode import SceneNode
 
 
@@ -22,3 +24,33 @@ class MeshReader(FileReader):
 
     def _read(self, file_name: str) -> Union[SceneNode, List[SceneNode]]:
         raise NotImplementedError("MeshReader plugin was not correctly implemented, no read was specified")
+
+    ##  Get a function that reads a file in a worker process.
+    #
+    #   Readers that can read a file into a single mesh without needing the
+    #   application can implement this to let MeshReadProcessPool do the work.
+    #   The function must be defined at module level. It gets the file name and
+    #   returns None if nothing could be read, or a dictionary with the numpy
+    #   arrays "vertices" and optionally "normals", "indices" and
+    #   "convex_hull_vertices" of the mesh centered around (0, 0, 0), plus the
+    #   original "center" of the mesh.
+    #
+    #   \return The read function, or None if this reader has to read in the
+    #   application process.
+    def getWorkerReadFunction(self) -> Optional[Callable[[str], Optional[Dict[str, Any]]]]:
+        return None
+
+    ##  Create a scene node from the result of the worker read function.
+    #
+    #   \param file_name The file that was read.
+    #   \param result The dictionary returned by the worker read function.
+    #   \return node \type{SceneNode} A node with the mesh data of the file.
+    def createNodeFromWorkerResult(self, file_name: str, result: Dict[str, Any]) -> SceneNode:
+        center = Vector(*result["center"])
+        mesh = MeshData(vertices = result["vertices"], normals = result.get("normals"), indices = result.get("indices"),
+                        file_name = file_name, center_position = center, zero_position = -center,
+                        convex_hull_vertices = result.get("convex_hull_vertices"))
+        node = SceneNode()
+        node.setMeshData(mesh)
+        UM.Application.Application.getInstance().getController().getScene().addWatchedFile(file_name)
+        return node
@@ -11,7 +11,7 @@ import zipfile
 from UM.Preferences import Preferences
 from UM.PluginError import PluginNotFoundError, InvalidMetaDataError
 from UM.Logger import Logger
-from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
 import types
 
 from PyQt5.QtCore import QObject, pyqtSlot, QUrl, pyqtProperty, pyqtSignal
@@ -35,6 +35,11 @@ if TYPE_CHECKING:
 #   The PluginRegistry class can load modules dynamically and use
 #   them as plugins. Each plugin module is expected to be a directory with
 #   and `__init__` file defining a `getMetaData` and a `register` function.
+#   Instead of the `getMetaData` function, the metadata may be given in the
+#   "metadata" entry of the `plugin.json` file of the plugin. Such plugins
+#   don't need to be imported until they are loaded, so if all the types they
+#   register can be loaded lazily, they are only loaded when they are first
+#   used (see setLazyActivation).
 #
 #   For more details, see the [plugins] file.
 #
@@ -69,6 +74,11 @@ class PluginRegistry(QObject):
 
         self._plugins = {}            # type: Dict[str, types.ModuleType]
         self._plugin_objects = {}     # type: Dict[str, PluginObject]
+        self._plugin_modules = {}     # type: Dict[str, types.ModuleType] # Imported modules, also of plugins that are not loaded (yet).
+
+        # Plugins that were registered from the metadata in their plugin.json, but are only imported when first used.
+        self._deferred_plugins = []   # type: List[str]
+        self._lazy_activation = False # type: bool
 
         self._plugin_locations = []  # type: List[str]
         self._folder_cache = {}      # type: Dict[str, List[Tuple[str, str]]]
@@ -319,6 +329,33 @@ class PluginRegistry(QObject):
             return True
         return False
 
+    #   Check by ID if a plugin is imported and registered. Plugins that are
+    #   deferred are active, but not loaded until they are first used.
+    def isLoadedPlugin(self, plugin_id: str) -> bool:
+        return plugin_id in self._plugins
+
+    #   Check by ID if a plugin was registered from its metadata only, and will
+    #   be loaded when it is first used:
+    def isDeferredPlugin(self, plugin_id: str) -> bool:
+        return plugin_id in self._deferred_plugins
+
+    #   Get a list of plugins that are registered from their metadata only:
+    def getDeferredPlugins(self) -> List[str]:
+        return self._deferred_plugins
+
+    ##  Set whether plugins of which all types can be loaded lazily are only
+    #   loaded when they are first used.
+    #
+    #   Such plugins must provide their metadata in their plugin.json, so that
+    #   they don't need to be imported to know what they do. This must be set
+    #   before the plugins are loaded.
+    #   \sa addType
+    def setLazyActivation(self, lazy_activation: bool) -> None:
+        self._lazy_activation = lazy_activation
+
+    def getLazyActivation(self) -> bool:
+        return self._lazy_activation
+
     #   Check by ID if a plugin is available:
     def isAvailablePlugin(self, plugin_id: str) -> bool:
         return plugin_id in self._plugins_available
@@ -361,7 +398,12 @@ class PluginRegistry(QObject):
             # Save all metadata to the metadata dictionary:
             self._metadata[plugin_id] = plugin_metadata
             if metadata is None or self._subsetInDict(self._metadata[plugin_id], metadata):
-                #
+                if self._canDeferPlugin(plugin_id):
+                    self._deferred_plugins.append(plugin_id)
+                    self._all_plugins.append(plugin_id)
+                    self._plugins_installed.append(plugin_id)
+                    Logger.log("d", "Deferred loading plugin %s until it is used", plugin_id)
+                    continue
                 try:
                     self.loadPlugin(plugin_id)
                     # Add the plugin to the list after actually load the plugin:
@@ -382,6 +424,11 @@ class PluginRegistry(QObject):
             Logger.log("d", "Plugin %s was disabled", plugin_id)
             return
 
+        # A deferred plugin is loaded once, when it's first used. If that fails, it's not deferred any more.
+        if plugin_id in self._deferred_plugins:
+            self._deferred_plugins.remove(plugin_id)
+            Logger.log("d", "Loading deferred plugin %s on first use", plugin_id)
+
         # Find the actual plugin on drive:
         plugin = self._findPlugin(plugin_id)
 
@@ -409,6 +456,8 @@ class PluginRegistry(QObject):
             Logger.log("e", "Plugin OctoPrintPlugin version {version} was disabled because it was using an old API for network connection.".format(version = version))
             return
 
+        profiler = self._application.getStartupProfiler()
+        start_time = profiler.now()
         try:
             to_register = plugin.register(self._application) #type: ignore #We catch AttributeError on this in case register() doesn't exist.
             if not to_register:
@@ -432,6 +481,8 @@ class PluginRegistry(QObject):
             Logger.log("e", "Unknown plugin type: %s", str(e))
         except Exception as e:
             Logger.logException("e", "Error loading plugin %s:", plugin_id)
+        finally:
+            profiler.addPluginTime(plugin_id, "register", start_time, profiler.now())
 
     #   Uninstall a plugin with a given ID:
     @pyqtSlot(str, result="QVariantMap")
@@ -534,6 +585,10 @@ class PluginRegistry(QObject):
     #   \param plugin_id The name of the plugin to find
     #   \returns module if it was found None otherwise
     def _findPlugin(self, plugin_id: str) -> Optional[types.ModuleType]:
+        # The module is imported once, also when its metadata was needed before it was loaded.
+        if plugin_id in self._plugin_modules:
+            return self._plugin_modules[plugin_id]
+
         location = None
         for folder in self._plugin_locations:
             location = self._locatePlugin(plugin_id, folder)
@@ -549,6 +604,8 @@ class PluginRegistry(QObject):
             Logger.logException("e", "Import error when importing %s", plugin_id)
             return None
 
+        profiler = self._application.getStartupProfiler()
+        start_time = profiler.now()
         try:
             module = imp.load_module(plugin_id, file, path, desc) #type: ignore #MyPy gets the wrong output type from imp.find_module for some reason.
         except Exception:
@@ -557,7 +614,9 @@ class PluginRegistry(QObject):
         finally:
             if file:
                 os.close(file) #type: ignore #MyPy gets the wrong output type from imp.find_module for some reason.
+            profiler.addPluginTime(plugin_id, "import", start_time, profiler.now())
 
+        self._plugin_modules[plugin_id] = module
         return module
 
     def _locatePlugin(self, plugin_id: str, folder: str) -> Optional[str]:
@@ -588,11 +647,6 @@ class PluginRegistry(QObject):
     #   \param plugin_id \type{string}
     #   \return
     def _populateMetaData(self, plugin_id: str) -> bool:
-        plugin = self._findPlugin(plugin_id)
-        if not plugin:
-            Logger.log("w", "Could not find plugin %s", plugin_id)
-            return False
-
         location = None
         for folder in self._plugin_locations:
             location = self._locatePlugin(plugin_id, folder)
@@ -604,41 +658,50 @@ class PluginRegistry(QObject):
             return False
         location = os.path.join(location, plugin_id)
 
+        metadata_file = os.path.join(location, "plugin.json")
         try:
-            meta_data = plugin.getMetaData() #type: ignore #We catch the AttributeError that this would raise if the module has no getMetaData function.
-
-            metadata_file = os.path.join(location, "plugin.json")
-            try:
-                with open(metadata_file, "r", encoding = "utf-8") as f:
-                    try:
-                        meta_data["plugin"] = json.loads(f.read())
-                    except json.decoder.JSONDecodeError:
-                        Logger.logException("e", "Failed to parse plugin.json for plugin %s", plugin_id)
-                        raise InvalidMetaDataError(plugin_id)
-
-                    # Check if metadata is valid;
-                    if "version" not in meta_data["plugin"]:
-                        Logger.log("e", "Version must be set!")
-                        raise InvalidMetaDataError(plugin_id)
-
-                    if "i18n-catalog" in meta_data["plugin"]:
-                        # A catalog was set, try to translate a few strings
-                        i18n_catalog = i18nCatalog(meta_data["plugin"]["i18n-catalog"])
-                        if "name" in meta_data["plugin"]:
-                             meta_data["plugin"]["name"] = i18n_catalog.i18n(meta_data["plugin"]["name"])
-                        if "description" in meta_data["plugin"]:
-                            meta_data["plugin"]["description"] = i18n_catalog.i18n(meta_data["plugin"]["description"])
-
-            except FileNotFoundError:
-                Logger.logException("e", "Unable to find the required plugin.json file for plugin %s", plugin_id)
-                raise InvalidMetaDataError(plugin_id)
+            with open(metadata_file, "r", encoding = "utf-8") as f:
+                try:
+                    plugin_info = json.loads(f.read())
+                except json.decoder.JSONDecodeError:
+                    Logger.logException("e", "Failed to parse plugin.json for plugin %s", plugin_id)
+                    raise InvalidMetaDataError(plugin_id)
+        except FileNotFoundError:
+            Logger.logException("e", "Unable to find the required plugin.json file for plugin %s", plugin_id)
+            raise InvalidMetaDataError(plugin_id)
 
-        except AttributeError as e:
-            Logger.log("e", "An error occurred getting metadata from plugin %s: %s", plugin_id, str(e))
+        # Check if metadata is valid;
+        if "version" not in plugin_info:
+            Logger.log("e", "Version must be set!")
             raise InvalidMetaDataError(plugin_id)
 
-        if not meta_data:
+        i18n_catalog = i18nCatalog(plugin_info["i18n-catalog"]) if "i18n-catalog" in plugin_info else None
+        if i18n_catalog is not None:
+            # A catalog was set, try to translate a few strings
+            if "name" in plugin_info:
+                plugin_info["name"] = i18n_catalog.i18n(plugin_info["name"])
+            if "description" in plugin_info:
+                plugin_info["description"] = i18n_catalog.i18n(plugin_info["description"])
+
+        if "metadata" in plugin_info:
+            # The plugin describes what it provides in its plugin.json, so it doesn't need to be imported for that.
+            meta_data = plugin_info.pop("metadata")
+            if i18n_catalog is not None:
+                meta_data = self._translateMetaData(meta_data, i18n_catalog)
+        else:
+            plugin = self._findPlugin(plugin_id)
+            if not plugin:
+                Logger.log("w", "Could not find plugin %s", plugin_id)
+                return False
+
+            try:
+                meta_data = plugin.getMetaData() #type: ignore #We catch the AttributeError that this would raise if the module has no getMetaData function.
+            except AttributeError as e:
+                Logger.log("e", "An error occurred getting metadata from plugin %s: %s", plugin_id, str(e))
+                raise InvalidMetaDataError(plugin_id)
+        if meta_data is None:
             raise InvalidMetaDataError(plugin_id)
+        meta_data["plugin"] = plugin_info
 
         meta_data["id"] = plugin_id
         meta_data["location"] = location
@@ -652,6 +715,42 @@ class PluginRegistry(QObject):
         self._metadata[plugin_id] = meta_data
         return True
 
+    ##  Translate the descriptions in metadata that was read from plugin.json,
+    #   such as the descriptions of file types.
+    #
+    #   \param meta_data The metadata, or a part of it.
+    #   \param catalog The catalog to translate the descriptions with.
+    #   \return A copy of the metadata, with the descriptions translated.
+    def _translateMetaData(self, meta_data: Any, catalog: i18nCatalog) -> Any:
+        if isinstance(meta_data, dict):
+            result = {}
+            for key, value in meta_data.items():
+                if key == "description" and isinstance(value, str):
+                    result[key] = catalog.i18nc("@item:inlistbox", value)
+                else:
+                    result[key] = self._translateMetaData(value, catalog)
+            return result
+        if isinstance(meta_data, list):
+            return [self._translateMetaData(item, catalog) for item in meta_data]
+        return meta_data
+
+    ##  Whether a plugin can be registered from its metadata alone, to be
+    #   loaded when it's first used.
+    #
+    #   This is the case when lazy activation is enabled, the metadata of the
+    #   plugin came from its plugin.json and all of the types that the plugin
+    #   registers can be loaded lazily.
+    def _canDeferPlugin(self, plugin_id: str) -> bool:
+        if not self._lazy_activation or plugin_id in self._disabled_plugins or plugin_id in self._plugins:
+            return False
+        if plugin_id in self._plugin_modules: # Already imported to get its metadata, so there is nothing to gain.
+            return False
+        metadata = self._metadata.get(plugin_id, {})
+        if metadata.get("plugin", {}).get("api", 0) != self.APIVersion: # Let loadPlugin report this.
+            return False
+        plugin_types = set(metadata.keys()) - {"plugin", "id", "location"}
+        return bool(plugin_types) and plugin_types <= self._lazy_types
+
     #   Check if a certain dictionary contains a certain subset of key/value pairs
     #   \param dictionary \type{dict} The dictionary to search
     #   \param subset \type{dict} The subset to search for
@@ -726,6 +825,9 @@ class PluginRegistry(QObject):
     #   \param plugin_id \type{string} The ID of the plugin.
     #   \return \type{string} The absolute path to the plugin or an empty string if the plugin could not be found.
     def getPluginPath(self, plugin_id: str) -> Optional[str]:
+        if plugin_id in self._deferred_plugins: # Don't import it just to find where it is.
+            return self._metadata[plugin_id]["location"]
+
         if plugin_id in self._plugins:
             plugin = self._plugins.get(plugin_id)
         else:
@@ -734,7 +836,7 @@ class PluginRegistry(QObject):
         if not plugin:
             return None
 
-        path = os.path.dirname(self._plugins[plugin_id].__file__)
+        path = os.path.dirname(plugin.__file__)
         if os.path.isdir(path):
             return path
 
@@ -754,9 +856,17 @@ class PluginRegistry(QObject):
     #
     #   \param type \type{string} The name of the plugin type to add.
     #   \param register_function \type{callable} A callable that takes an object as parameter.
+    #   \param lazy Whether plugins of this type can be loaded when they are
+    #   first used instead of at start-up. Whoever uses the plugins of this type
+    #   is then responsible for loading them, for instance with
+    #   getPluginObject.
     @classmethod
-    def addType(cls, plugin_type: str, register_function: Callable[[Any], None]) -> None:
+    def addType(cls, plugin_type: str, register_function: Callable[[Any], None], lazy: bool = False) -> None:
         cls._type_register_map[plugin_type] = register_function
+        if lazy:
+            cls._lazy_types.add(plugin_type)
+        else:
+            cls._lazy_types.discard(plugin_type)
 
     ##  Remove a plugin type.
     #
@@ -765,8 +875,10 @@ class PluginRegistry(QObject):
     def removeType(cls, plugin_type: str) -> None:
         if plugin_type in cls._type_register_map:
             del cls._type_register_map[plugin_type]
+        cls._lazy_types.discard(plugin_type)
 
     _type_register_map = {}  # type: Dict[str, Callable[[Any], None]]
+    _lazy_types = set()  # type: Set[str]
     __instance = None    # type: PluginRegistry
 
     @classmethod
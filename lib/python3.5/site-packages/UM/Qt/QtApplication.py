@@ -18,6 +18,7 @@ from UM.ConfigurationErrorMessage import ConfigurationErrorMessage
 from UM.FileHandler.ReadFileJob import ReadFileJob
 from UM.FileHandler.WriteFileJob import WriteFileJob
 from UM.Mesh.MeshFileHandler import MeshFileHandler
+from UM.Mesh.MeshReadProcessPool import MeshReadProcessPool
 from UM.Qt.Bindings.Theme import Theme
 from UM.Workspace.WorkspaceFileHandler import WorkspaceFileHandler
 from UM.Application import Application
@@ -150,6 +151,7 @@ class QtApplication(QApplication, Application):
     def startSplashWindowPhase(self) -> None:
         super().startSplashWindowPhase()
 
+        self._startup_profiler.startPhase("Initializing package manager")
         self._package_manager.initialize()
 
         # Read preferences here (upgrade won't work) to get the language in use, so the splash window can be shown in
@@ -173,13 +175,16 @@ class QtApplication(QApplication, Application):
               )
         # Remove, install, and then loading plugins
         self.showSplashMessage(i18n_catalog.i18nc("@info:progress", "Loading plugins..."))
+        self._startup_profiler.startPhase("Loading plugins")
         # Remove and install the plugins that have been scheduled
         self._plugin_registry.initializeBeforePluginsAreLoaded()
+        self._plugin_registry.setLazyActivation(self._preferences.getValue("general/lazy_plugin_activation"))
         self._loadPlugins()
         self._plugin_registry.checkRequiredPlugins(self.getRequiredPlugins())
         self.pluginsLoaded.emit()
 
         self.showSplashMessage(i18n_catalog.i18nc("@info:progress", "Updating configuration..."))
+        self._startup_profiler.startPhase("Updating configuration")
         with self._container_registry.lockFile():
             VersionUpgradeManager.getInstance().upgrade()
 
@@ -198,6 +203,7 @@ class QtApplication(QApplication, Application):
 
         # Force the configuration file to be written again since the list of plugins to remove maybe changed
         self.showSplashMessage(i18n_catalog.i18nc("@info:progress", "Loading preferences..."))
+        self._startup_profiler.startPhase("Loading preferences")
         try:
             self._preferences_filename = Resources.getPath(Resources.Preferences, self._app_name + ".cfg")
             self._preferences.readFromFile(self._preferences_filename)
@@ -432,6 +438,8 @@ class QtApplication(QApplication, Application):
         except Exception as e:
             Logger.log("e", "Exception while closing backend: %s", repr(e))
 
+        MeshReadProcessPool.getInstance().shutdown()
+
         self.quit()
 
     def checkWindowMinimizedState(self) -> bool:
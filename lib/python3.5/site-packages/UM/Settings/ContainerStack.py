@@ -269,6 +269,14 @@ class ContainerStack(QObject, ContainerInterface, PluginObject):
     propertyChanged = Signal(Signal.Queued)
     propertiesChanged = Signal(Signal.Queued)
 
+    ##  Emitted once for all property changes that were collected until the
+    #   event loop could run, with a frozenset of (key, property name) pairs.
+    #
+    #   Receivers that only need to know what changed should connect to this
+    #   instead of propertyChanged, which is emitted for every pair and delivers
+    #   every pair as a separate event.
+    batchedPropertiesChanged = Signal(Signal.Queued)
+
     ##  \copydoc ContainerInterface::serialize
     #
     #   Reimplemented from ContainerInterface
@@ -642,6 +650,17 @@ class ContainerStack(QObject, ContainerInterface, PluginObject):
             self._next_stack.propertyChanged.connect(self._collectPropertyChanges)
             self.containersChanged.connect(self._next_stack.containersChanged)
 
+    ##  Report a change of a property that did not change in the containers
+    #   of this stack, for instance to make the listeners reslice.
+    #
+    #   The change is collected with the changes of the containers, so it is
+    #   emitted with propertyChanged, propertiesChanged and
+    #   batchedPropertiesChanged when the event loop runs.
+    #   \param key The key of the setting that changed.
+    #   \param property_name The name of the property that changed.
+    def notifyPropertyChanged(self, key: str, property_name: str) -> None:
+        self._collectPropertyChanges(key, property_name)
+
     ##  Send postponed emits
     #   These emits are collected from the option postpone_emit.
     #   Note: the option can be implemented for all functions modifying the stack.
@@ -709,6 +728,9 @@ class ContainerStack(QObject, ContainerInterface, PluginObject):
 
     # Perform the emission of the change signals that were collected in a previous step.
     def _emitCollectedPropertyChanges(self) -> None:
+        if self._property_changes:
+            self.batchedPropertiesChanged.emit(frozenset((key, property_name) for key, property_names in self._property_changes.items() for property_name in property_names))
+
         for key, property_names in self._property_changes.items():
             self.propertiesChanged.emit(key, property_names)
 
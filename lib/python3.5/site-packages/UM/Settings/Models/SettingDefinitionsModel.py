@@ -1,6 +1,7 @@
 # Copyright (c) 2018 Ultimaker B.V.
 # Uranium is released under the terms of the LGPLv3 or higher.
 
+import bisect
 import collections
 import os.path
 
@@ -23,6 +24,13 @@ from UM.Settings.SettingDefinition import SettingDefinition
 #   settings. This list can be quite a bit shorter than the list of definitions since all visibility criteria
 #   are applied.
 #
+#   Next to the list of definitions, the model keeps the tree structure in flat lists: the index of the parent of
+#   each definition and the index after its last descendant, so that the descendants of a definition are the
+#   definitions in between. The texts that can be searched for are kept in lower case per definition. This way the
+#   visible rows can be determined in a single pass over the definitions, and when typing a search text only the
+#   definitions that matched the previous text need to be searched again. Only the rows that are added or removed
+#   are reported to the view, in blocks of consecutive rows.
+#
 class SettingDefinitionsModel(QAbstractListModel):
     KeyRole = Qt.UserRole + 1
     DepthRole = Qt.UserRole + 2
@@ -42,6 +50,19 @@ class SettingDefinitionsModel(QAbstractListModel):
         self._definition_list = []
         self._row_index_list = []
 
+        # The tree of definitions, flattened in the same order as _definition_list.
+        self._index_by_key = {}  # Index of each definition by its key.
+        self._parent_indices = []  # Index of the parent of each definition, or -1 for the top level.
+        self._descendant_ends = []  # Index after the last descendant of each definition.
+        self._is_category = []
+        self._search_texts = {}  # For each property that can be searched for, the lower case text of each definition.
+        self._labels = []  # The translated label of each definition.
+
+        self._filter_matches = None  # Whether each definition matches the filter, or None if there is no filter.
+        self._search_filter = {}  # The filters on searchable texts that _filter_matches was determined with.
+        self._property_filter = {}  # The filters on other properties that _property_filter_matches was determined with.
+        self._property_filter_matches = None  # Whether each definition matches _property_filter.
+
         self._expanded = set()
         self._visible = set()
         self._exclude = set()
@@ -351,16 +372,15 @@ class SettingDefinitionsModel(QAbstractListModel):
     def getIndex(self, key):
         if not self._container:
             return -1
-        definitions = self._container.findDefinitions(key = key)
-        if not definitions:
+        index = self._index_by_key.get(key)
+        if index is None:
             return -1
 
-        index = self._definition_list.index(definitions[0])
-
-        try:
-            return self._row_index_list.index(index)
-        except ValueError:
-            return -1
+        # The rows are in the same order as the definitions.
+        row = bisect.bisect_left(self._row_index_list, index)
+        if row < len(self._row_index_list) and self._row_index_list[row] == index:
+            return row
+        return -1
 
     @pyqtSlot(str, str, result = "QVariantList")
     def getRequires(self, key, role = None):
@@ -476,8 +496,8 @@ class SettingDefinitionsModel(QAbstractListModel):
     def _onVisibilityChanged(self):
         self._visible = self._visibility_handler.getVisible()
 
-        for row in range(len(self._row_index_list)):
-            self.dataChanged.emit(self.index(row, 0), self.index(row, 0), [self.VisibleRole])
+        if self._row_index_list:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self._row_index_list) - 1, 0), [self.VisibleRole])
 
         self._updateVisibleRows()
 
@@ -509,133 +529,219 @@ class SettingDefinitionsModel(QAbstractListModel):
             self._definition_list = self._root.findDefinitions()
         else:
             self._definition_list = self._container.findDefinitions()
+        self._buildTree()
 
-        self._updateVisibleRows()
+        self._row_index_list = self._findVisibleRows()
 
         self.endResetModel()
+        self.visibleCountChanged.emit()
+
+    # Flatten the tree of definitions and build the index of texts to search in.
+    def _buildTree(self):
+        self._index_by_key = {definition.key: index for index, definition in enumerate(self._definition_list)}
+        self._parent_indices = []
+        self._descendant_ends = list(range(1, len(self._definition_list) + 1))
+        self._is_category = []
+        self._labels = []
+        keys = []
+        descriptions = []
+        for index, definition in enumerate(self._definition_list):
+            parent = definition.parent
+            parent_index = self._index_by_key.get(parent.key, -1) if parent is not None else -1
+            self._parent_indices.append(parent_index)
+            self._is_category.append(definition.type == "category")
+
+            label = getattr(definition, "label", None)
+            if self._i18n_catalog and isinstance(label, str):
+                label = self._i18n_catalog.i18nc(definition.key + " label", label)
+            self._labels.append(label)
+            description = getattr(definition, "description", None)
+            keys.append(definition.key.lower())
+            descriptions.append(description.lower() if isinstance(description, str) else None)
+
+        # The definitions are in depth-first order, so a definition ends where the last of its descendants ends.
+        for index in range(len(self._definition_list) - 1, -1, -1):
+            parent_index = self._parent_indices[index]
+            if parent_index >= 0:
+                self._descendant_ends[parent_index] = max(self._descendant_ends[parent_index], self._descendant_ends[index])
+
+        self._search_texts = {
+            "key": keys,
+            "i18n_label": [label.lower() if isinstance(label, str) else None for label in self._labels],
+            "description": descriptions
+        }
+        self._filter_matches = None
+        self._search_filter = {}
+        self._property_filter = {}
+        self._property_filter_matches = None
 
     # Update the list of visible rows.
     #
     # This will compute the difference between the old state and the new state and
-    # insert/remove rows as appropriate.
+    # insert/remove rows as appropriate, as few at a time as possible.
     def _updateVisibleRows(self):
-        currently_visible = set(self._row_index_list) # A set of currently visible items
-
-        new_visible = set() # A new set of visible items
-        for index in range(len(self._definition_list)):
-            if self._isDefinitionVisible(self._definition_list[index]):
-                new_visible.add(index)
-
-        # Calculate the difference between the sets. The items that are in new_visible and
-        # not in currently_visible are items that need to be added, the items that are in
-        # currently_visible and not in new_visible are items that should be removed.
-        to_add = new_visible - currently_visible
-        to_remove = currently_visible - new_visible
-
-        # Add the new items. Currently doing this one by one since that proved fast enough.
-        for index in sorted(list(to_add)):
-            row = self._findRowToInsert(index)
-            self.beginInsertRows(QModelIndex(), row, row)
-            self._row_index_list.insert(row, index)
-            self.endInsertRows()
-
-        # Remove items. Also doing this one by one currently.
-        for index in sorted(list(to_remove)):
-            row = self._row_index_list.index(index)
-            self.beginRemoveRows(QModelIndex(), row, row)
-            del self._row_index_list[row]
+        new_rows = self._findVisibleRows()
+        new_indices = set(new_rows)
+
+        # Remove items. Starting at the end, so that the rows of the items that are still to be removed stay the same.
+        row = len(self._row_index_list) - 1
+        while row >= 0:
+            if self._row_index_list[row] in new_indices:
+                row -= 1
+                continue
+            last_row = row
+            while row >= 0 and self._row_index_list[row] not in new_indices:
+                row -= 1
+            self.beginRemoveRows(QModelIndex(), row + 1, last_row)
+            del self._row_index_list[row + 1:last_row + 1]
             self.endRemoveRows()
 
-        self.visibleCountChanged.emit()
-
-    # Helper function to determine if a setting(row) should be visible or not.
-    def _isDefinitionVisible(self, definition, **kwargs):
-        key = definition.key
+        # Add the new items. The remaining rows are in the same order as the new rows, so each block of new rows can
+        # be inserted at the same row it will end up at.
+        current_indices = set(self._row_index_list)
+        row = 0
+        while row < len(new_rows):
+            if new_rows[row] in current_indices:
+                row += 1
+                continue
+            first_row = row
+            while row < len(new_rows) and new_rows[row] not in current_indices:
+                row += 1
+            self.beginInsertRows(QModelIndex(), first_row, row - 1)
+            self._row_index_list[first_row:first_row] = new_rows[first_row:row]
+            self.endInsertRows()
 
-        # If it is in the list of things to exclude it is never going to be visible.
-        if key in self._exclude:
-            return False
+        self.visibleCountChanged.emit()
 
-        # If any of its ancestors is in the list of things to exclude it also should never be visible.
-        if definition.getAncestors() & self._exclude:
-            return False
+    # Determine which definitions should be shown.
+    #
+    # \return The indices of the definitions to show, in order.
+    def _findVisibleRows(self):
+        self._updateFilterMatches()
+        filter_matches = self._filter_matches
+        count = len(self._definition_list)
+
+        # If a setting or any of its ancestors is in the list of things to exclude it is never going to be visible.
+        excluded = [False] * count
+        if self._exclude:
+            for index, definition in enumerate(self._definition_list):
+                parent_index = self._parent_indices[index]
+                excluded[index] = definition.key in self._exclude or (parent_index >= 0 and excluded[parent_index])
+
+        # Whether any descendant of a definition matches the filter, to still show its ancestors.
+        descendant_matches = None
+        if filter_matches is not None and self._show_ancestors:
+            descendant_matches = [False] * count
+            for index in range(count - 1, -1, -1):
+                parent_index = self._parent_indices[index]
+                if parent_index >= 0 and (filter_matches[index] or descendant_matches[index]):
+                    descendant_matches[parent_index] = True
+
+        global_stack = None
+        rows = []
+        for index, definition in enumerate(self._definition_list):
+            if excluded[index]:
+                continue
 
-        # If its parent is not expanded we should not show the setting.
-        if definition.parent and not definition.parent.key in self._expanded:
-            return False
+            # If its parent is not expanded we should not show the setting.
+            parent_index = self._parent_indices[index]
+            if parent_index >= 0 and self._definition_list[parent_index].key not in self._expanded:
+                continue
 
-        # If it is not marked as visible we do not have to show it.
-        if not self._show_all and key not in self._visible:
-            return False
+            # If it is not marked as visible we do not have to show it.
+            if not self._show_all and definition.key not in self._visible:
+                continue
 
-        # If it does not match the current filter, it should not be shown.
-        filter = self._filter_dict.copy()
-        filter["i18n_catalog"] = self._i18n_catalog
+            # If it does not match the current filter, it should not be shown.
+            if filter_matches is not None and not filter_matches[index]:
+                if descendant_matches is not None and descendant_matches[index]:
+                    rows.append(index)
+                continue
 
-        if self._filter_dict and not definition.matchesFilter(**filter):
-            if self._show_ancestors:
-                if self._isAnyDescendantFiltered(definition):
-                    return True
-            return False
+            # We should not show categories that are empty
+            if self._is_category[index] and not self._show_all:
+                if global_stack is None:
+                    global_stack = Application.getInstance().getGlobalContainerStack()
+                if not self._isAnyDescendantVisible(index, excluded, global_stack):
+                    continue
 
-        # We should not show categories that are empty
-        if definition.type == "category":
-            if not self._isAnyDescendantVisible(definition):
-                return False
+            rows.append(index)
+        return rows
 
-        return True
+    # Determines if any descendant of a definition is visible.
+    #
+    # Descendants of settings that are excluded or that don't match the filter are skipped.
+    def _isAnyDescendantVisible(self, index, excluded, global_stack):
+        filter_matches = self._filter_matches
+        descendant = index + 1
+        end = self._descendant_ends[index]
+        while descendant < end:
+            if excluded[descendant] or (filter_matches is not None and not filter_matches[descendant]):
+                descendant = self._descendant_ends[descendant]
+                continue
 
-    def _isAnyDescendantFiltered(self, definition):
-        filter = self._filter_dict.copy()
-        filter["i18n_catalog"] = self._i18n_catalog
-        for child in definition.children:
-            if self._isAnyDescendantFiltered(child):
-                return True
-            if self._filter_dict and child.matchesFilter(**filter):
+            key = self._definition_list[descendant].key
+            if key in self._visible and global_stack.getProperty(key, "enabled"):
                 return True
+            descendant += 1
         return False
 
+    # Determine which definitions match the filter.
+    #
+    # Filters on texts that are searched in with a wildcard use the search index. If the new search text contains
+    # the previous one, only the definitions that matched the previous text can match. Other filters are checked
+    # with SettingDefinition.matchesFilter.
+    def _updateFilterMatches(self):
+        search_filter = {}
+        property_filter = {}
+        for key, value in self._filter_dict.items():
+            if key in self._search_texts and isinstance(value, str) and "*" in value:
+                search_filter[key] = value
+            else:
+                property_filter[key] = value
 
-    # Determines if any child of a definition is visible.
-    def _isAnyDescendantVisible(self, definition):
-        if self._show_all:
-            return True
+        if not search_filter and not property_filter:
+            self._filter_matches = None
+            self._search_filter = {}
+            return
 
-        filter = self._filter_dict.copy()
+        property_filter_changed = property_filter != self._property_filter or self._property_filter_matches is None
+        if property_filter_changed:
+            self._property_filter = property_filter
+            self._property_filter_matches = self._matchPropertyFilter(property_filter)
+
+        candidates = None
+        if self._filter_matches is not None and not property_filter_changed and self._search_filter.keys() == search_filter.keys():
+            if all(self._searchText(search_filter[key]).find(self._searchText(previous_value)) >= 0 for key, previous_value in self._search_filter.items()):
+                candidates = [index for index, matches in enumerate(self._filter_matches) if matches]
+        if candidates is None:
+            candidates = [index for index, matches in enumerate(self._property_filter_matches) if matches] if property_filter else range(len(self._definition_list))
+
+        filter_matches = [False] * len(self._definition_list)
+        for index in candidates:
+            filter_matches[index] = self._matchesSearchFilter(index, search_filter) and (not property_filter or self._property_filter_matches[index])
+        self._filter_matches = filter_matches
+        self._search_filter = search_filter
+
+    def _matchPropertyFilter(self, property_filter):
+        if not property_filter:
+            return [True] * len(self._definition_list)
+        filter = property_filter.copy()
         filter["i18n_catalog"] = self._i18n_catalog
-        for child in definition.children:
-            if child.key in self._exclude:
-                continue
+        return [definition.matchesFilter(**filter) for definition in self._definition_list]
 
-            if self._filter_dict and not child.matchesFilter(**filter):
+    def _matchesSearchFilter(self, index, search_filter):
+        for key, value in search_filter.items():
+            text = self._search_texts[key][index]
+            if text is None:
+                return False
+            if key == "i18n_label" and value == self._labels[index]:
                 continue
+            if self._searchText(value) not in text:
+                return False
+        return True
 
-            if child.key in self._visible:
-                if Application.getInstance().getGlobalContainerStack().getProperty(child.key, "enabled"):
-                    return True
-
-            if self._isAnyDescendantVisible(child):
-                return True
-
-        return False
-
-    # Find the row where we should insert a certain index.
-    def _findRowToInsert(self, index):
-        parent = self._definition_list[index].parent
-        parent_row = 0
-        while parent:
-            parent_index = self._definition_list.index(parent)
-            try:
-                parent_row = self._row_index_list.index(parent_index)
-                break
-            except ValueError:
-                parent = parent.parent
-
-        insert_row = parent_row
-
-        # Since indexes are by definition ordered, we can greatly simplify this bit since we can just assume
-        # any setting with an index < the index to insert should come before this index.
-        while insert_row < len(self._row_index_list) and self._row_index_list[insert_row] < index:
-            insert_row += 1
-
-        return insert_row
+    # The text to search for from a filter value with a wildcard.
+    @staticmethod
+    def _searchText(value):
+        return value.strip("* ").lower()
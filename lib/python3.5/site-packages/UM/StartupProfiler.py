@@ -0,0 +1,136 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Uranium is released under the terms of the LGPLv3 or higher.
+
+import collections
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+##  Records how long the phases of starting the application take, and how long
+#   every plug-in took to import and to register.
+#
+#   The phases are sequential: starting a phase ends the previous one. The
+#   plug-in times are recorded in whatever phase they were loaded in, so that
+#   the cost of a plug-in that is loaded only when it's first used shows up
+#   after the start-up.
+#
+#   Set the environment variable URANIUM_STARTUP_TRACE to a file path to write
+#   the recorded times to that file in the Chrome trace event format when the
+#   start-up is finished. The file can be opened in chrome://tracing or
+#   https://ui.perfetto.dev.
+class StartupProfiler:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+        self._phases = [] #type: List[Tuple[str, float, float]] # Name, start time and end time of every finished phase.
+        self._current_phase = None #type: Optional[Tuple[str, float]] # Name and start time.
+        self._plugin_times = collections.OrderedDict() #type: Dict[str, Dict[str, float]] # Duration per stage ("import" or "register") per plug-in.
+        self._events = [] #type: List[Dict[str, Any]]
+        self._finish_time = None #type: Optional[float]
+
+    ##  The current time in seconds, in the time base of the profiler.
+    def now(self) -> float:
+        return time.perf_counter()
+
+    ##  End the current phase and start a new one.
+    #
+    #   \param name The name of the phase, such as "Loading plugins".
+    def startPhase(self, name: str) -> None:
+        start_time = self.now()
+        with self._lock:
+            self._endPhase(start_time)
+            self._current_phase = (name, start_time)
+
+    ##  End the current phase, if any.
+    def endPhase(self) -> None:
+        end_time = self.now()
+        with self._lock:
+            self._endPhase(end_time)
+
+    ##  End the last phase and mark the start-up as finished.
+    #
+    #   \return The time from the creation of the profiler until now, in
+    #   seconds.
+    def finish(self) -> float:
+        end_time = self.now()
+        with self._lock:
+            self._endPhase(end_time)
+            self._finish_time = end_time
+        return end_time - self._origin
+
+    def isFinished(self) -> bool:
+        return self._finish_time is not None
+
+    ##  Record a stage of loading a plug-in.
+    #
+    #   \param plugin_id The ID of the plug-in.
+    #   \param stage What was done, such as "import" or "register".
+    #   \param start_time The time the stage started, as given by now().
+    #   \param end_time The time the stage ended, as given by now().
+    def addPluginTime(self, plugin_id: str, stage: str, start_time: float, end_time: float) -> None:
+        with self._lock:
+            stages = self._plugin_times.setdefault(plugin_id, collections.OrderedDict())
+            stages[stage] = stages.get(stage, 0.0) + end_time - start_time
+            self._addEvent("{plugin_id} ({stage})".format(plugin_id = plugin_id, stage = stage), "plugin", start_time, end_time, {"plugin_id": plugin_id, "after_startup": self._finish_time is not None})
+
+    ##  The finished phases with their durations in seconds, in the order they
+    #   were started.
+    def getPhases(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            return [(name, end_time - start_time) for name, start_time, end_time in self._phases]
+
+    ##  The time every plug-in took per stage, such as "import" and "register",
+    #   in the order the plug-ins were loaded.
+    def getPluginTimes(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return collections.OrderedDict((plugin_id, dict(stages)) for plugin_id, stages in self._plugin_times.items())
+
+    ##  Summarise the phases and the slowest plug-ins, to show in the log.
+    #
+    #   \param plugin_count The number of slowest plug-ins to list.
+    def getSummary(self, plugin_count: int = 10) -> str:
+        lines = []
+        for name, duration in self.getPhases():
+            lines.append("{name}: {duration:.3f}s".format(name = name, duration = duration))
+
+        plugin_times = self.getPluginTimes()
+        totals = sorted(((sum(stages.values()), plugin_id) for plugin_id, stages in plugin_times.items()), reverse = True)
+        lines.append("Loaded {count} plug-ins in {total:.3f}s, the slowest were:".format(count = len(plugin_times), total = sum(total for total, _ in totals)))
+        for total, plugin_id in totals[:plugin_count]:
+            stages = ", ".join("{stage} {duration:.3f}s".format(stage = stage, duration = duration) for stage, duration in plugin_times[plugin_id].items())
+            lines.append("    {plugin_id}: {total:.3f}s ({stages})".format(plugin_id = plugin_id, total = total, stages = stages))
+        return "\n".join(lines)
+
+    ##  Get the recorded phases and plug-in times in the Chrome trace event
+    #   format.
+    def toChromeTrace(self) -> Dict[str, Any]:
+        with self._lock:
+            events = list(self._events)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    ##  Write the recorded phases and plug-in times to a file in the Chrome
+    #   trace event format.
+    #
+    #   \param file_path The path of the JSON file to write.
+    def writeChromeTrace(self, file_path: str) -> None:
+        trace = self.toChromeTrace()
+        with open(file_path, "w", encoding = "utf-8") as f:
+            json.dump(trace, f)
+
+    ##  Should be called with the lock held.
+    def _endPhase(self, end_time: float) -> None:
+        if self._current_phase is None:
+            return
+        name, start_time = self._current_phase
+        self._phases.append((name, start_time, end_time))
+        self._addEvent(name, "phase", start_time, end_time, {})
+        self._current_phase = None
+
+    ##  Should be called with the lock held.
+    def _addEvent(self, name: str, category: str, start_time: float, end_time: float, args: Dict[str, Any]) -> None:
+        self._events.append({"name": name, "cat": category, "ph": "X", "ts": (start_time - self._origin) * 1000000, "dur": (end_time - start_time) * 1000000, "pid": self._pid, "tid": threading.current_thread().ident, "args": args})
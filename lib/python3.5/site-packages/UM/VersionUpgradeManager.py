@@ -2,6 +2,7 @@
 # Uranium is released under the terms of the LGPLv3 or higher.
 
 import collections  # For deque, for breadth-first search and to track tasks, and namedtuple.
+import json  # To store the versions of the files between runs.
 import os  # To get the configuration file names and to rename files.
 import traceback
 import ntpath
@@ -52,7 +53,14 @@ FilesDataUpdateResult = collections.namedtuple("FilesDataUpdateResult",
 #   Old versions of the configuration are not deleted, but put in a folder next
 #   to the current (upgraded) versions, where they are never loaded again unless
 #   the user manually retrieves the files.
+#
+#   To not have to read every configuration file on every start-up, the
+#   versions of the files are stored in a manifest along with their modification
+#   time and size. On the next start-up, only the files that were changed or
+#   added since then are read to get their versions.
 class VersionUpgradeManager:
+    ##  The version of the format of the manifest file.
+    ManifestVersion = 1
 
     ##  Initialises the version upgrade manager.
     #
@@ -86,6 +94,11 @@ class VersionUpgradeManager:
         # Files that should not be checked, such as log files
         self._ignored_files = ["uranium.lock", "plugins.json"]  # type: List[str]
 
+        # For each configuration type, for each file path the modification time in nanoseconds, the size and the
+        # version of the file, as found during the last search for files to upgrade.
+        self._manifest = {}  # type: Dict[str, Dict[str, List[Any]]]
+        self._manifest_file_path = None  # type: Optional[str] # Defaults to a file in the cache storage path.
+
     ##  Registers a file to be ignored by version upgrade checks (eg log files).
     #   \param file_name The base file name of the file to be ignored.
 
@@ -111,6 +124,16 @@ class VersionUpgradeManager:
     def setCurrentVersions(self, current_versions) -> None:
         self._current_versions = current_versions
 
+    ##  Gets the path of the file in which the versions of the configuration
+    #   files are stored between runs.
+    def getManifestFilePath(self) -> str:
+        if self._manifest_file_path is None:
+            return os.path.join(Resources.getCacheStoragePath(), "upgrade_manifest.json")
+        return self._manifest_file_path
+
+    def setManifestFilePath(self, file_path: str) -> None:
+        self._manifest_file_path = file_path
+
     def registerCurrentVersion(self, version_info: Tuple[str, int], type_info: Any) -> None:
         if version_info in self._current_versions:
             Logger.log("d", "Overwriting current version info: %s", repr(version_info))
@@ -133,6 +156,7 @@ class VersionUpgradeManager:
         while self._upgrade_tasks:
             upgrade_task = self._upgrade_tasks.popleft()
             self._upgradeFile(upgrade_task.storage_path, upgrade_task.file_name, upgrade_task.configuration_type)  # Upgrade this file.
+        self._saveManifest()
 
         if upgraded:
             message = UM.Message.Message(text=catalogue.i18nc("@info:version-upgrade", "A configuration from an older version of {0} was imported.", Application.getInstance().getApplicationName()), title = catalogue.i18nc("@info:title", "Version Upgrade"))
@@ -247,10 +271,107 @@ class VersionUpgradeManager:
                 relative_path = os.path.relpath(path, directory)
                 yield os.path.join(relative_path, filename)
 
+    ##  Get the filenames and the status of all files in a specified directory.
+    #
+    #   \param directory The directory to read the files from.
+    #   \param directory_contents The files that were already found per
+    #   directory, to not list the same directory more than once.
+    #   \return The filename of each file relative to the specified directory,
+    #   with the result of os.stat for that file.
+    def _getFileStats(self, directory: str, directory_contents: Dict[str, List[Tuple[str, os.stat_result]]]) -> List[Tuple[str, os.stat_result]]:
+        if directory not in directory_contents:
+            file_stats = []
+            for configuration_file in self._getFilesInDirectory(directory):
+                try:
+                    file_stats.append((configuration_file, os.stat(os.path.join(directory, configuration_file))))
+                except OSError:  # Removed in the meanwhile.
+                    continue
+            directory_contents[directory] = file_stats
+        return directory_contents[directory]
+
+    ##  Gets the version of a configuration file, from the manifest of the
+    #   previous run if the file didn't change since then.
+    #
+    #   The version is added to the new manifest, so that the file isn't read
+    #   again in the same search either.
+    #   \param configuration_type The type of the configuration file.
+    #   \param file_path The absolute path to the file.
+    #   \param file_stat The result of os.stat for the file.
+    #   \param old_manifest The manifest of the previous run.
+    #   \return The version of the file. If it can't be read or it has no valid
+    #   version, an exception is raised.
+    def _getFileVersionFromManifest(self, configuration_type: str, file_path: str, file_stat: os.stat_result, old_manifest: Dict[str, Dict[str, List[Any]]]) -> Any:
+        file_status = [file_stat.st_mtime_ns, file_stat.st_size]
+        entry = self._manifest.get(configuration_type, {}).get(file_path)  # Already read for another version in this search.
+        if entry is None:
+            entry = old_manifest.get(configuration_type, {}).get(file_path)
+        if entry is not None and entry[:2] == file_status:
+            version = entry[2]
+        else:
+            with open(file_path, "r", encoding = "utf-8") as f:
+                version = self._get_version_functions[configuration_type](f.read())
+        self._manifest.setdefault(configuration_type, {})[file_path] = file_status + [version]
+        return version
+
+    ##  Identifies what the versions in the manifest are valid for.
+    #
+    #   If another version of the application, or other functions are used to
+    #   get the versions of files, the versions in the manifest can't be used.
+    def _getManifestKey(self) -> str:
+        version_functions = []
+        for configuration_type, get_version in sorted(self._get_version_functions.items()):
+            version_functions.append("{configuration_type}:{module}.{name}".format(configuration_type = configuration_type,
+                                                                                   module = getattr(get_version, "__module__", ""),
+                                                                                   name = getattr(get_version, "__qualname__", "")))
+        return "{version} {functions}".format(version = self._application.getVersion(), functions = ";".join(version_functions))
+
+    ##  Reads the manifest that was written in the previous run.
+    #
+    #   \return For each configuration type and each file path, the
+    #   modification time, size and version of the file. If there is no valid
+    #   manifest, this is empty.
+    def _loadManifest(self) -> Dict[str, Dict[str, List[Any]]]:
+        manifest_file_path = self.getManifestFilePath()
+        try:
+            with open(manifest_file_path, "r", encoding = "utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (EnvironmentError, ValueError):
+            Logger.logException("w", "Unable to read the version upgrade manifest %s.", manifest_file_path)
+            return {}
+
+        if manifest.get("manifest_version") != self.ManifestVersion or manifest.get("key") != self._getManifestKey():
+            Logger.log("i", "The version upgrade manifest is outdated. Checking the versions of all configuration files.")
+            return {}
+        return manifest.get("files", {})
+
+    ##  Writes the versions of the files that were found during the last search
+    #   for files to upgrade, so that they don't have to be read on the next
+    #   start-up.
+    def _saveManifest(self) -> None:
+        manifest_file_path = self.getManifestFilePath()
+        manifest = {
+            "manifest_version": self.ManifestVersion,
+            "key": self._getManifestKey(),
+            "files": self._manifest
+        }
+        try:
+            os.makedirs(os.path.dirname(manifest_file_path), exist_ok = True)
+            with open(manifest_file_path, "w", encoding = "utf-8") as f:
+                json.dump(manifest, f)
+        except EnvironmentError:
+            Logger.logException("w", "Unable to write the version upgrade manifest %s.", manifest_file_path)
+
     ##  Gets all files that need to be upgraded.
     #
+    #   Only the files that changed since the manifest was written are read.
     #   \return A sequence of UpgradeTasks of files to upgrade.
     def _getUpgradeTasks(self) -> Iterator[UpgradeTask]:
+        old_manifest = self._loadManifest()
+        self._manifest = {}
+        directory_contents = {}  # type: Dict[str, List[Tuple[str, os.stat_result]]]
+
         storage_path_prefixes = set()
         storage_path_prefixes.add(Resources.getConfigStoragePath())
         storage_path_prefixes.add(Resources.getDataStoragePath())
@@ -265,18 +386,17 @@ class VersionUpgradeManager:
                 for prefix in storage_path_prefixes:
                     for storage_path in storage_paths:
                         path = os.path.join(prefix, storage_path)
-                        for configuration_file in self._getFilesInDirectory(path):
+                        for configuration_file, file_stat in self._getFileStats(path, directory_contents):
                             # Get file version. Only add this upgrade task if the current file version matches with
                             # the defined version that scans through this folder.
                             if ntpath.basename(configuration_file) in self._ignored_files:
                                 continue
                             try:
-                                with open(os.path.join(path, configuration_file), "r", encoding = "utf-8") as f:
-                                    current_version = self._get_version_functions[old_configuration_type](f.read())
-                                    if current_version != src_version:
-                                        Logger.log("d", "Config file [%s] is of version [%s], which is different from the defined version [%s], no upgrade task for it from type [%s].",
-                                                   configuration_file, current_version, src_version, old_configuration_type)
-                                        continue
+                                current_version = self._getFileVersionFromManifest(old_configuration_type, os.path.join(path, configuration_file), file_stat, old_manifest)
+                                if current_version != src_version:
+                                    Logger.log("d", "Config file [%s] is of version [%s], which is different from the defined version [%s], no upgrade task for it from type [%s].",
+                                               configuration_file, current_version, src_version, old_configuration_type)
+                                    continue
                             except:
                                 Logger.log("w", "Failed to get file version: %s, skip it", configuration_file)
                                 continue
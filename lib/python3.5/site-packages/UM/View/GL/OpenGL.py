@@ -240,8 +240,7 @@ class OpenGL:
             offset += len(uvs)
 
         for attribute_name in mesh.attributeNames():
-            attribute = mesh.getAttribute(attribute_name)
-            attribute_byte_array = attribute["value"].tostring()
+            attribute_byte_array = mesh.getAttributeAsByteArray(attribute_name)
             buffer.write(offset, attribute_byte_array, len(attribute_byte_array))
             offset += len(attribute_byte_array)
 
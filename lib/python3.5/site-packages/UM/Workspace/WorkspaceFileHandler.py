@@ -8,9 +8,11 @@ from UM.Logger import Logger
 from UM.FileHandler.FileHandler import FileHandler
 from UM.FileHandler.FileReader import FileReader #For typing.
 from UM.FileHandler.ReadFileJob import ReadFileJob #For typing.
+from UM.Workspace.WorkspaceReader import WorkspaceReader
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from UM.Qt.QtApplication import QtApplication
+    from UM.Scene.SceneNode import SceneNode
 
 
 ##  Central class for reading and writing workspaces.
@@ -50,8 +52,13 @@ class WorkspaceFileHandler(FileHandler):
             # Add the loaded nodes to the scene.
             nodes = job.getResult()
             for node in nodes:
-                # We need to prevent circular dependency, so do some just in time importing.
-                from UM.Operations.AddSceneNodeOperation import AddSceneNodeOperation
-                op = AddSceneNodeOperation(node, self._application.getController().getScene().getRoot())
-                op.push()
-                self._application.getController().getScene().sceneChanged.emit(node)
+                self._addNode(node)
+            if isinstance(self.workspace_reader, WorkspaceReader):
+                self.workspace_reader.addRemainingNodes(self._addNode)
+
+    def _addNode(self, node: "SceneNode") -> None:
+        # We need to prevent circular dependency, so do some just in time importing.
+        from UM.Operations.AddSceneNodeOperation import AddSceneNodeOperation
+        op = AddSceneNodeOperation(node, self._application.getController().getScene().getRoot())
+        op.push()
+        self._application.getController().getScene().sceneChanged.emit(node)
@@ -1,8 +1,13 @@
 # Copyright (c) 2016 Ultimaker B.V.
 # Uranium is released under the terms of the LGPLv3 or higher.
 
+from typing import Callable, TYPE_CHECKING
+
 from UM.FileHandler.FileReader import FileReader
 
+if TYPE_CHECKING:
+    from UM.Scene.SceneNode import SceneNode
+
 
 class WorkspaceReader(FileReader):
     def __init__(self):
@@ -13,6 +18,17 @@ class WorkspaceReader(FileReader):
     def read(self, file_name):
         pass
 
+    ##  Add the nodes that were still being loaded when read() returned.
+    #
+    #   This is called on the main thread after the nodes that read() returned
+    #   were added to the scene. Readers that return before all nodes of a
+    #   workspace are loaded pass the remaining nodes to the callback, on the
+    #   main thread, as soon as each of them is ready. By default read()
+    #   returns all nodes, so there are none left.
+    #   \param add_node_callback Adds a node to the scene.
+    def addRemainingNodes(self, add_node_callback: Callable[["SceneNode"], None]) -> None:
+        pass
+
     def workspaceName(self):
         return self.workspace_name
 
@@ -34,13 +34,13 @@ class AutoSave:
 
     def _onGlobalStackChanged(self):
         if self._global_stack:
-            self._global_stack.propertyChanged.disconnect(self._triggerTimer)
+            self._global_stack.batchedPropertiesChanged.disconnect(self._triggerTimer)
             self._global_stack.containersChanged.disconnect(self._triggerTimer)
 
         self._global_stack = self._application.getGlobalContainerStack()
 
         if self._global_stack:
-            self._global_stack.propertyChanged.connect(self._triggerTimer)
+            self._global_stack.batchedPropertiesChanged.connect(self._triggerTimer)
             self._global_stack.containersChanged.connect(self._triggerTimer)
 
     def _onTimeout(self):
@@ -25,7 +25,7 @@ import numpy
 import math
 import copy
 
-from typing import List, Optional
+from typing import FrozenSet, List, Optional, Tuple
 
 # Setting for clearance around the prime
 PRIME_CLEARANCE = 6.5
@@ -133,7 +133,7 @@ class BuildVolume(SceneNode):
             for node in self._scene_objects - new_scene_objects: #Nodes that were removed from the scene.
                 per_mesh_stack = node.callDecoration("getStack")
                 if per_mesh_stack:
-                    per_mesh_stack.propertyChanged.disconnect(self._onSettingPropertyChanged)
+                    per_mesh_stack.batchedPropertiesChanged.disconnect(self._onSettingPropertiesChanged)
                 active_extruder_changed = node.callDecoration("getActiveExtruderChangedSignal")
                 if active_extruder_changed is not None:
                     node.callDecoration("getActiveExtruderChangedSignal").disconnect(self._updateDisallowedAreasAndRebuild)
@@ -149,7 +149,7 @@ class BuildVolume(SceneNode):
     def _updateNodeListeners(self, node: SceneNode):
         per_mesh_stack = node.callDecoration("getStack")
         if per_mesh_stack:
-            per_mesh_stack.propertyChanged.connect(self._onSettingPropertyChanged)
+            per_mesh_stack.batchedPropertiesChanged.connect(self._onSettingPropertiesChanged)
         active_extruder_changed = node.callDecoration("getActiveExtruderChangedSignal")
         if active_extruder_changed is not None:
             active_extruder_changed.connect(self._updateDisallowedAreasAndRebuild)
@@ -518,18 +518,18 @@ class BuildVolume(SceneNode):
     ##  Update the build volume visualization
     def _onStackChanged(self):
         if self._global_container_stack:
-            self._global_container_stack.propertyChanged.disconnect(self._onSettingPropertyChanged)
+            self._global_container_stack.batchedPropertiesChanged.disconnect(self._onSettingPropertiesChanged)
             extruders = ExtruderManager.getInstance().getMachineExtruders(self._global_container_stack.getId())
             for extruder in extruders:
-                extruder.propertyChanged.disconnect(self._onSettingPropertyChanged)
+                extruder.batchedPropertiesChanged.disconnect(self._onSettingPropertiesChanged)
 
         self._global_container_stack = self._application.getGlobalContainerStack()
 
         if self._global_container_stack:
-            self._global_container_stack.propertyChanged.connect(self._onSettingPropertyChanged)
+            self._global_container_stack.batchedPropertiesChanged.connect(self._onSettingPropertiesChanged)
             extruders = ExtruderManager.getInstance().getMachineExtruders(self._global_container_stack.getId())
             for extruder in extruders:
-                extruder.propertyChanged.connect(self._onSettingPropertyChanged)
+                extruder.batchedPropertiesChanged.connect(self._onSettingPropertiesChanged)
 
             self._width = self._global_container_stack.getProperty("machine_width", "value")
             machine_height = self._global_container_stack.getProperty("machine_height", "value")
@@ -620,6 +620,13 @@ class BuildVolume(SceneNode):
         # We just did a rebuild, reset the list.
         self._changed_settings_since_last_rebuild = []
 
+    ##  Called once for all settings that changed since the event loop last ran.
+    #
+    #   \param changes The (key, property name) pairs of the changed settings.
+    def _onSettingPropertiesChanged(self, changes: FrozenSet[Tuple[str, str]]) -> None:
+        for setting_key, property_name in changes:
+            self._onSettingPropertyChanged(setting_key, property_name)
+
     def _onSettingPropertyChanged(self, setting_key: str, property_name: str):
         if property_name != "value":
             return
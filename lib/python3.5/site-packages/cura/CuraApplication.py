@@ -130,6 +130,9 @@ class CuraApplication(QtApplication):
     # changes of the settings.
     SettingVersion = 5
 
+    # zlib level that saved projects and UFP files are compressed with, unless the preference says otherwise.
+    DefaultArchiveCompressionLevel = 6
+
     Created = False
 
     class ResourceTypes:
@@ -466,6 +469,7 @@ class CuraApplication(QtApplication):
         self.getCuraSceneController().activeBuildPlateChanged.connect(self.updatePlatformActivityDelayed)
 
         self.showSplashMessage(self._i18n_catalog.i18nc("@info:progress", "Loading machines..."))
+        self._startup_profiler.startPhase("Loading machines")
 
         with self._container_registry.lockFile():
             self._container_registry.loadAllMetadata()
@@ -491,9 +495,12 @@ class CuraApplication(QtApplication):
 
         preferences.addPreference("cura/currency", "€")
         preferences.addPreference("cura/material_settings", "{}")
+        preferences.addPreference("cura/archive_compression_level", self.DefaultArchiveCompressionLevel)  # zlib level of saved projects and UFP files. 0 stores them uncompressed.
 
         preferences.addPreference("view/invert_zoom", False)
         preferences.addPreference("view/filter_current_build_plate", False)
+        preferences.addPreference("view/compact_layer_data", False)  # Store the layer view data in less memory, with less precision.
+        preferences.addPreference("view/layer_data_spill_threshold", 1024)  # MB of layer view data above which it is kept in a file on the disk. -1 to always keep it in memory.
         preferences.addPreference("cura/sidebar_collapsed", False)
 
         self._need_to_show_user_agreement = not self.getPreferences().getValue("general/accepted_user_agreement")
@@ -647,8 +654,9 @@ class CuraApplication(QtApplication):
     ##  Handle loading of all plugin types (and the backend explicitly)
     #   \sa PluginRegistry
     def _loadPlugins(self):
-        self._plugin_registry.addType("profile_reader", self._addProfileReader)
-        self._plugin_registry.addType("profile_writer", self._addProfileWriter)
+        # Profile readers and writers are looked up through the plug-in registry when they are used, so they can be loaded lazily.
+        self._plugin_registry.addType("profile_reader", self._addProfileReader, lazy = True)
+        self._plugin_registry.addType("profile_writer", self._addProfileWriter, lazy = True)
 
         if Platform.isLinux():
             lib_suffixes = {"", "64", "32", "x32"} #A few common ones on different distributions.
@@ -672,6 +680,7 @@ class CuraApplication(QtApplication):
         super().run()
         container_registry = self._container_registry
 
+        self._startup_profiler.startPhase("Initializing managers")
         Logger.log("i", "Initializing variant manager")
         self._variant_manager = VariantManager(container_registry)
         self._variant_manager.initialize()
@@ -716,6 +725,7 @@ class CuraApplication(QtApplication):
         self.getPreferences().setDefault("general/visible_settings", ";".join(default_visibility_profile["settings"]))
 
         # Detect in which mode to run and execute that mode
+        self._startup_profiler.startPhase("Setting up scene and interface")
         if self._is_headless:
             self.runWithoutGUI()
         else:
@@ -724,6 +734,7 @@ class CuraApplication(QtApplication):
         self.started = True
         self.initializationFinished.emit()
         Logger.log("d", "Booting Cura took %s seconds", time.time() - self._boot_loading_time)
+        self.finishStartupProfile()
 
         # For now use a timer to postpone some things that need to be done after the application and GUI are
         # initialized, for example opening files because they may show dialogs which can be closed due to incomplete
@@ -810,6 +821,19 @@ class CuraApplication(QtApplication):
     def getSettingVisibilityPresetsModel(self, *args) -> SettingVisibilityPresetsModel:
         return self._setting_visibility_presets_model
 
+    ##  Get the zlib compression level to write projects and UFP files with.
+    #
+    #   The preference can be edited by hand, so a value that is not a number
+    #   falls back to the default and other values are clamped to 0 - 9.
+    def getArchiveCompressionLevel(self) -> int:
+        value = self.getPreferences().getValue("cura/archive_compression_level")
+        try:
+            compression_level = int(value)
+        except (TypeError, ValueError):
+            Logger.log("w", "Invalid archive compression level %s, using %s instead.", value, self.DefaultArchiveCompressionLevel)
+            return self.DefaultArchiveCompressionLevel
+        return min(max(compression_level, 0), 9)
+
     def getMachineErrorChecker(self, *args) -> MachineErrorChecker:
         return self._machine_error_checker
 
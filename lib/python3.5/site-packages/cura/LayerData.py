@@ -2,16 +2,27 @@
 # Cura is released under the terms of the LGPLv3 or higher.
 from UM.Mesh.MeshData import MeshData
 
+import numpy
+
 
 ##  Class to holds the layer mesh and information about the layers.
 # Immutable, use LayerDataBuilder to create one of these.
+#
+# Besides the layers, this holds an index of them which is computed once by
+# the builder, so that the render and slider code can find the elements of a
+# layer or a point on a path without going through all layers and polygons.
+#
+# In compact layer data, the colors are indices in a palette of colors. See
+# LayerDataBuilder._buildCompact.
 class LayerData(MeshData):
     def __init__(self, vertices = None, normals = None, indices = None, colors = None, uvs = None, file_name = None,
-                 center_position = None, layers=None, element_counts=None, attributes=None):
+                 center_position = None, layers=None, element_counts=None, attributes=None, layer_index=None, color_palette=None):
         super().__init__(vertices=vertices, normals=normals, indices=indices, colors=colors, uvs=uvs,
                          file_name=file_name, center_position=center_position, attributes=attributes)
+        self._color_palette = color_palette
         self._layers = layers
         self._element_counts = element_counts
+        self._layer_index = layer_index if layer_index is not None else LayerIndex(layers if layers is not None else {}, element_counts if element_counts is not None else {})
 
     def getLayer(self, layer):
         if layer in self._layers:
@@ -24,3 +35,118 @@ class LayerData(MeshData):
 
     def getElementCounts(self):
         return self._element_counts
+
+    def getLayerIndex(self):
+        return self._layer_index
+
+    def getColors(self):
+        if self._color_palette is None:
+            return super().getColors()
+        return self._color_palette[self._colors]
+
+    def getColorsAsByteArray(self):
+        if self._color_palette is None:
+            return super().getColorsAsByteArray()
+        return self.getColors().tobytes()
+
+
+##  Pre-computed lookup tables and statistics of the layers of a LayerData.
+class LayerIndex:
+    ##  Build the index.
+    #
+    #   \param layers The layers by their ID.
+    #   \param element_counts The number of elements of each layer, by ID.
+    #   \param feedrates The feedrates of all vertices, if known.
+    #   \param thicknesses The line thicknesses of all vertices, if known.
+    def __init__(self, layers, element_counts, feedrates = None, thicknesses = None):
+        self._layers = layers
+        self._layer_ids = numpy.array(sorted(element_counts.keys()), dtype = numpy.int64)
+        # The number of elements in all layers before each layer, plus the total at the end.
+        self._element_offsets = numpy.zeros(len(self._layer_ids) + 1, dtype = numpy.int64)
+        numpy.cumsum([element_counts[layer_id] for layer_id in self._layer_ids], out = self._element_offsets[1:])
+
+        # For each layer, the path index at which each polygon ends.
+        # Subsequent polygons of a layer share their first point with the last point of the previous polygon.
+        self._path_ends = {}
+        non_empty_layers = []
+        for layer_id, layer in layers.items():
+            if not layer.polygons:
+                continue
+            non_empty_layers.append(layer_id)
+            point_counts = numpy.array([len(polygon.data) for polygon in layer.polygons], dtype = numpy.int64)
+            point_counts[1:] -= 1
+            self._path_ends[layer_id] = numpy.cumsum(point_counts)
+        self._min_layer = min(non_empty_layers) if non_empty_layers else None
+        self._max_layer = max(non_empty_layers) if non_empty_layers else None
+
+        self._min_feedrate = None
+        self._max_feedrate = None
+        if feedrates is not None and len(feedrates) > 0:
+            self._min_feedrate = float(feedrates.min())
+            self._max_feedrate = float(feedrates.max())
+        self._min_thickness = None
+        self._max_thickness = None
+        if thicknesses is not None and len(thicknesses) > 0:
+            self._max_thickness = float(thicknesses.max())
+            non_zero_thicknesses = thicknesses[numpy.nonzero(thicknesses)]
+            if len(non_zero_thicknesses) > 0:  # When importing g-code, the line thicknesses can all be zero.
+                self._min_thickness = float(non_zero_thicknesses.min())
+
+    ##  The IDs of all layers, sorted.
+    def getLayerIds(self):
+        return self._layer_ids
+
+    ##  The number of elements in the layers before a certain layer.
+    #
+    #   \param layer_id The ID of the layer. It doesn't need to exist.
+    def getElementOffset(self, layer_id):
+        return int(self._element_offsets[numpy.searchsorted(self._layer_ids, layer_id)])
+
+    ##  The number of elements in all layers.
+    def getElementCount(self):
+        return int(self._element_offsets[-1])
+
+    def hasLayer(self, layer_id):
+        position = numpy.searchsorted(self._layer_ids, layer_id)
+        return position < len(self._layer_ids) and self._layer_ids[position] == layer_id
+
+    ##  Find a point on the path through the polygons of a layer.
+    #
+    #   \param layer_id The ID of the layer.
+    #   \param path_index The index of the point on the path.
+    #   \return The polygon and the index of the point in that polygon, or
+    #   None if the layer doesn't have that many points.
+    def findPathPoint(self, layer_id, path_index):
+        path_ends = self._path_ends.get(layer_id)
+        if path_ends is None:
+            return None
+        polygon_index = int(numpy.searchsorted(path_ends, path_index, side = "right"))
+        if polygon_index >= len(path_ends):
+            return None
+        polygon = self._layers[layer_id].polygons[polygon_index]
+        if polygon_index == 0:
+            return polygon, path_index
+        return polygon, int(path_index - path_ends[polygon_index - 1] + 1)  # Skip the first point, which is shared with the previous polygon.
+
+    ##  The lowest and highest IDs of the layers that have polygons, or None
+    #   if there are none.
+    def getMinLayer(self):
+        return self._min_layer
+
+    def getMaxLayer(self):
+        return self._max_layer
+
+    ##  The range of the feedrates of all lines, or None if there are no lines.
+    def getMinFeedrate(self):
+        return self._min_feedrate
+
+    def getMaxFeedrate(self):
+        return self._max_feedrate
+
+    ##  The range of the thicknesses of all lines. The minimum excludes lines
+    #   with a thickness of zero, and is None if there are no other lines.
+    def getMinThickness(self):
+        return self._min_thickness
+
+    def getMaxThickness(self):
+        return self._max_thickness
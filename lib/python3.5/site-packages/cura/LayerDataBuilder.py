@@ -4,7 +4,9 @@
 from .Layer import Layer
 from .LayerPolygon import LayerPolygon
 from UM.Mesh.MeshBuilder import MeshBuilder
-from .LayerData import LayerData
+from .LayerData import LayerData, LayerIndex
+from .LayerDataSpillFile import LayerDataSpillFile
+from UM.Logger import Logger
 
 import numpy
 
@@ -53,7 +55,12 @@ class LayerDataBuilder(MeshBuilder):
     #
     #   \param material_color_map: [r, g, b, a] for each extruder row.
     #   \param line_type_brightness: compatibility layer view uses line type brightness of 0.5
-    def build(self, material_color_map, line_type_brightness = 1.0):
+    #   \param compact: whether to store the layer data in less memory, see
+    #   _buildCompact.
+    #   \param spill_threshold: the number of bytes of layer data above which
+    #   its arrays are moved to a LayerDataSpillFile on the disk, or None to
+    #   always keep them in memory.
+    def build(self, material_color_map, line_type_brightness = 1.0, compact = False, spill_threshold = None):
         vertex_count = 0
         index_count = 0
         for layer, data in self._layers.items():
@@ -61,12 +68,19 @@ class LayerDataBuilder(MeshBuilder):
             index_count += data.lineMeshElementCount()
 
         vertices = numpy.empty((vertex_count, 3), numpy.float32)
-        line_dimensions = numpy.empty((vertex_count, 2), numpy.float32)
-        colors = numpy.empty((vertex_count, 4), numpy.float32)
         indices = numpy.empty((index_count, 2), numpy.int32)
-        feedrates = numpy.empty((vertex_count), numpy.float32)
-        extruders = numpy.empty((vertex_count), numpy.float32)
-        line_types = numpy.empty((vertex_count), numpy.float32)
+        if compact:
+            line_dimensions = numpy.empty((vertex_count, 2), numpy.float16)
+            colors = None  # The colors follow from the line types.
+            feedrates = numpy.empty((vertex_count), numpy.float16)
+            extruders = numpy.empty((vertex_count), numpy.uint8)
+            line_types = numpy.empty((vertex_count), numpy.uint8)
+        else:
+            line_dimensions = numpy.empty((vertex_count, 2), numpy.float32)
+            colors = numpy.empty((vertex_count, 4), numpy.float32)
+            feedrates = numpy.empty((vertex_count), numpy.float32)
+            extruders = numpy.empty((vertex_count), numpy.float32)
+            line_types = numpy.empty((vertex_count), numpy.float32)
 
         vertex_offset = 0
         index_offset = 0
@@ -74,6 +88,9 @@ class LayerDataBuilder(MeshBuilder):
             ( vertex_offset, index_offset ) = data.build( vertex_offset, index_offset, vertices, colors, line_dimensions, feedrates, extruders, line_types, indices)
             self._element_counts[layer] = data.elementCount
 
+        if compact:
+            return self._buildCompact(material_color_map, line_type_brightness, vertices, indices, line_dimensions, feedrates, extruders, line_types, spill_threshold)
+
         self.addVertices(vertices)
         colors[:, 0:3] *= line_type_brightness
         self.addColors(colors)
@@ -116,7 +133,108 @@ class LayerDataBuilder(MeshBuilder):
                 }
             }
 
-        return LayerData(vertices=self.getVertices(), normals=self.getNormals(), indices=self.getIndices(),
-                        colors=self.getColors(), uvs=self.getUVCoordinates(), file_name=self.getFileName(),
-                        center_position=self.getCenterPosition(), layers=self._layers,
-                        element_counts=self._element_counts, attributes=attributes)
+        layer_index = LayerIndex(self._layers, self._element_counts, feedrates = feedrates, thicknesses = line_dimensions[:, 1])
+
+        return self._createLayerData(self.getVertices(), self.getIndices(), self.getColors(), attributes, layer_index, spill_threshold = spill_threshold)
+
+    ##  Create the LayerData from the filled arrays in a form that takes less
+    #   memory, for previewing large prints.
+    #
+    #   - The vertex colors and the material colors only depend on the line
+    #     type and the extruder, so they are stored as an index in a palette.
+    #   - The line dimensions and feedrates are stored in half precision, and
+    #     the extruders and line types as bytes.
+    #   - The polygons release their own arrays, and read them back from the
+    #     combined arrays of the layer data when they are needed.
+    #   The attributes are converted to the full 32-bit floats that the shaders
+    #   use while they are uploaded to the graphics card.
+    def _buildCompact(self, material_color_map, line_type_brightness, vertices, indices, line_dimensions, feedrates, extruders, line_types, spill_threshold):
+        color_palette = LayerPolygon.getColorMap().astype(numpy.float32)
+        color_palette[:, 0:3] *= line_type_brightness
+        type_count = color_palette.shape[0]
+
+        # One material color for every combination of extruder and line type, like in build().
+        material_palette = numpy.zeros((256, type_count, 4), dtype = numpy.float32)
+        material_palette[:material_color_map.shape[0]] = material_color_map[:, numpy.newaxis, :]
+        material_palette[:, LayerPolygon.MoveCombingType] = color_palette[LayerPolygon.MoveCombingType]
+        material_palette[:, LayerPolygon.MoveRetractionType] = color_palette[LayerPolygon.MoveRetractionType]
+        material_colors = extruders.astype(numpy.uint16) * type_count + line_types
+
+        # Read-only arrays are not copied by the LayerData, so the vertex colors and the line types can share theirs.
+        indices = indices.flatten()
+        for array in (vertices, indices, line_dimensions, feedrates, extruders, line_types, material_colors):
+            array.flags.writeable = False
+        self.addVertices(vertices)
+        self.addIndices(indices)
+
+        attributes = {
+            "line_dimensions": {
+                "value": line_dimensions,
+                "opengl_name": "a_line_dim",
+                "opengl_type": "vector2f"
+                },
+            "extruders": {
+                "value": extruders,
+                "opengl_name": "a_extruder",
+                "opengl_type": "float"
+                },
+            "colors": {
+                "value": material_colors,
+                "palette": material_palette.reshape((-1, 4)),
+                "opengl_name": "a_material_color",
+                "opengl_type": "vector4f"
+                },
+            "line_types": {
+                "value": line_types,
+                "opengl_name": "a_line_type",
+                "opengl_type": "float"
+                },
+            "feedrates": {
+                "value": feedrates,
+                "opengl_name": "a_feedrate",
+                "opengl_type": "float"
+                }
+            }
+
+        layer_index = LayerIndex(self._layers, self._element_counts, feedrates = feedrates, thicknesses = line_dimensions[:, 1])
+
+        return self._createLayerData(vertices, indices, line_types, attributes, layer_index, color_palette = color_palette,
+                                     release_polygon_data = True, spill_threshold = spill_threshold)
+
+    ##  Create the LayerData from the combined arrays.
+    #
+    #   If the arrays are bigger than the spill threshold, they are moved to a
+    #   LayerDataSpillFile. The polygons then release their own arrays too, so
+    #   that only the parts of the layer data that are in use stay in memory.
+    #   \param release_polygon_data: whether the polygons should release their
+    #   source arrays in any case.
+    def _createLayerData(self, vertices, indices, colors, attributes, layer_index, color_palette = None, release_polygon_data = False, spill_threshold = None):
+        data_size = sum(array.nbytes for array in [vertices, indices, colors] + [attribute["value"] for attribute in attributes.values()] if array is not None)
+        if spill_threshold is not None and data_size > spill_threshold:
+            spill_file = LayerDataSpillFile()
+            vertices = spill_file.store(vertices)
+            indices = spill_file.store(indices)
+            colors = spill_file.store(colors)
+            for attribute in attributes.values():
+                attribute["value"] = spill_file.store(attribute["value"])
+            spill_file.close()
+            Logger.log("i", "Moved %s bytes of layer data to a file on the disk.", data_size)
+            release_polygon_data = True
+
+        layer_data = LayerData(vertices=vertices, normals=self.getNormals(), indices=indices,
+                               colors=colors, uvs=self.getUVCoordinates(), file_name=self.getFileName(),
+                               center_position=self.getCenterPosition(), layers=self._layers,
+                               element_counts=self._element_counts, attributes=attributes, layer_index=layer_index,
+                               color_palette=color_palette)
+
+        if release_polygon_data:
+            # The LayerData doesn't copy read-only arrays, but ask it for them to be sure that the polygons read the arrays that it keeps.
+            vertices = layer_data.getVertices()
+            line_dimensions = layer_data.getAttribute("line_dimensions")["value"]
+            feedrates = layer_data.getAttribute("feedrates")["value"]
+            line_types = layer_data.getAttribute("line_types")["value"]
+            for layer in self._layers.values():
+                for polygon in layer.polygons:
+                    polygon.releaseSourceData(vertices, line_dimensions, feedrates, line_types)
+
+        return layer_data
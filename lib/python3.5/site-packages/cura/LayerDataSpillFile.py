@@ -0,0 +1,64 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import tempfile
+
+import numpy
+
+
+##  A temporary file to keep the arrays of large layer data in, instead of in
+#   memory.
+#
+#   The arrays are written to the file and read back as read-only memory
+#   mapped arrays. The operating system then only keeps the parts of the
+#   arrays in memory that were used recently, such as the layers around the
+#   layer slider of the simulation view, and reads the rest from the disk
+#   when it's needed. The file is deleted when all arrays are.
+class LayerDataSpillFile:
+    alignment = 64  # Start every array at a multiple of this many bytes.
+
+    ##  Creates a new, empty file.
+    #   \param directory The directory to create the file in, or None to use
+    #   the directory for temporary files.
+    def __init__(self, directory = None):
+        self._file = tempfile.TemporaryFile(dir = directory)
+        self._size = 0
+        self._stored = {}  # The stored arrays by the ID of the original, so that arrays that are used twice are only stored once.
+
+    ##  Write an array to the file.
+    #
+    #   \param array The numpy array to store.
+    #   \return A read-only memory mapped array with the same contents, or
+    #   None if the array is None.
+    def store(self, array):
+        if array is None:
+            return None
+        if id(array) in self._stored:
+            return self._stored[id(array)][1]
+
+        data = numpy.ascontiguousarray(array)
+        offset = (self._size + self.alignment - 1) // self.alignment * self.alignment
+        self._file.seek(offset)
+        self._file.write(memoryview(data.reshape(-1).view(numpy.uint8)))
+        self._file.flush()
+        self._size = offset + data.nbytes
+
+        if data.nbytes == 0:  # Zero-length arrays can't be memory mapped.
+            result = data.copy()
+            result.flags.writeable = False
+        else:
+            result = numpy.memmap(self._file, dtype = data.dtype, mode = "r", offset = offset, shape = data.shape)
+        self._stored[id(array)] = (array, result)  # Keep the original alive so that its ID is not re-used.
+        return result
+
+    ##  Stop storing arrays, and forget about the originals.
+    #
+    #   The memory mapped arrays remain valid. The file is deleted when they
+    #   are.
+    def close(self):
+        self._stored.clear()
+        self._file.close()
+
+    ##  The number of bytes in the file.
+    def getSize(self):
+        return self._size
@@ -61,7 +61,10 @@ class LayerPolygon:
         
         self._build_cache_line_mesh_mask = None
         self._build_cache_needed_points = None
-        
+
+        # The combined arrays of the layer data, once the source arrays are released.
+        self._source_buffers = None
+
     def buildCache(self):
         # For the line mesh we do not draw Infill or Jumps. Therefore those lines are filtered out.
         self._build_cache_line_mesh_mask = numpy.ones(self._jump_mask.shape, dtype=bool)
@@ -84,7 +87,7 @@ class LayerPolygon:
     #   \param vertex_offset : determines where to start and end filling the arrays
     #   \param index_offset : determines where to start and end filling the arrays
     #   \param vertices : vertex numpy array to be filled
-    #   \param colors : vertex numpy array to be filled
+    #   \param colors : vertex numpy array to be filled, or None if the colors are not needed
     #   \param line_dimensions : vertex numpy array to be filled
     #   \param feedrates : vertex numpy array to be filled
     #   \param extruders : vertex numpy array to be filled
@@ -110,7 +113,8 @@ class LayerPolygon:
         vertices[self._vertex_begin:self._vertex_end, :] = self._data[index_list, :]
 
         # Create an array with colors for each vertex and remove the color data for the points that has been thrown away. 
-        colors[self._vertex_begin:self._vertex_end, :] = numpy.tile(self._colors, (1, 2)).reshape((-1, 4))[needed_points_list.ravel()]
+        if colors is not None:
+            colors[self._vertex_begin:self._vertex_end, :] = numpy.tile(self._colors, (1, 2)).reshape((-1, 4))[needed_points_list.ravel()]
 
         # Create an array with line widths and thicknesses for each vertex.
         line_dimensions[self._vertex_begin:self._vertex_end, 0] = numpy.tile(self._line_widths, (1, 2)).reshape((-1, 1))[needed_points_list.ravel()][:, 0]
@@ -138,7 +142,40 @@ class LayerPolygon:
         self._build_cache_line_mesh_mask = None
         self._build_cache_needed_points = None
 
+    ##  Free the arrays that this polygon was created with, after build() has
+    #   put them in the combined arrays of the layer data.
+    #
+    #   The properties read them back from the combined arrays when they are
+    #   needed, with the precision of those arrays.
+    #   \param vertices : vertex numpy array that build() filled
+    #   \param line_dimensions : vertex numpy array that build() filled
+    #   \param feedrates : vertex numpy array that build() filled
+    #   \param line_types : vertex numpy array that build() filled
+    def releaseSourceData(self, vertices, line_dimensions, feedrates, line_types):
+        self._source_buffers = (vertices, line_dimensions, feedrates, line_types)
+        self._types = None
+        self._data = None
+        self._line_widths = None
+        self._line_thicknesses = None
+        self._line_feedrates = None
+        self._jump_mask = None
+        self._colors = None
+
+    ##  The index of the vertex at the end of each line in the combined arrays.
+    #
+    #   Every line has a vertex at its end. Only the first line and the lines
+    #   where the type changes have another vertex at their start, with the
+    #   new type. So a vertex is the start of a line if it's the first one or
+    #   if the type differs from the vertex before it.
+    def _getLineEndVertices(self):
+        line_types = self._source_buffers[3][self._vertex_begin:self._vertex_end]
+        is_line_start = numpy.ones(len(line_types), dtype = bool)
+        is_line_start[1:] = line_types[1:] != line_types[:-1]
+        return self._vertex_begin + numpy.flatnonzero(numpy.logical_not(is_line_start))
+
     def getColors(self):
+        if self._colors is None:
+            return self._color_map[self.types]
         return self._colors
 
     def mapLineTypeToColor(self, line_types):
@@ -159,10 +196,15 @@ class LayerPolygon:
 
     @property
     def types(self):
+        if self._types is None:
+            return self._source_buffers[3][self._getLineEndVertices()].reshape((-1, 1)).astype(numpy.uint8)  # The line types of the vertices can be floats.
         return self._types
 
     @property
     def data(self):
+        if self._data is None:
+            vertices = self._source_buffers[0]
+            return vertices[numpy.concatenate(([self._vertex_begin], self._getLineEndVertices()))]
         return self._data
 
     @property
@@ -171,18 +213,26 @@ class LayerPolygon:
 
     @property
     def lineWidths(self):
+        if self._line_widths is None:
+            return self._source_buffers[1][self._getLineEndVertices(), 0:1].astype(numpy.float32)
         return self._line_widths
 
     @property
     def lineThicknesses(self):
+        if self._line_thicknesses is None:
+            return self._source_buffers[1][self._getLineEndVertices(), 1:2].astype(numpy.float32)
         return self._line_thicknesses
 
     @property
     def lineFeedrates(self):
+        if self._line_feedrates is None:
+            return self._source_buffers[2][self._getLineEndVertices()].reshape((-1, 1)).astype(numpy.float32)
         return self._line_feedrates
     
     @property
     def jumpMask(self):
+        if self._jump_mask is None:
+            return self.__jump_map[self.types]
         return self._jump_mask
 
     @property
@@ -195,7 +245,7 @@ class LayerPolygon:
 
     # Calculate normals for the entire polygon using numpy.
     def getNormals(self):
-        normals = numpy.copy(self._data)
+        normals = numpy.copy(self.data)
         normals[:, 1] = 0.0 # We are only interested in 2D normals
 
         # Calculate the edges between points.
@@ -4,7 +4,7 @@
 from collections import defaultdict, OrderedDict
 import copy
 import uuid
-from typing import Dict, cast
+from typing import Dict, Iterable, Set, Tuple, cast
 from typing import Optional, TYPE_CHECKING
 
 from PyQt5.Qt import QTimer, QObject, pyqtSignal, pyqtSlot
@@ -36,6 +36,10 @@ if TYPE_CHECKING:
 # but so far the creation of the tables and maps is very fast and there is no noticeable slowness, we keep it like this
 # because it's simple.
 #
+# The materials that are available for a machine, a variant and a diameter are stored in an index the first time they
+# are needed, so that switching between machines and nozzles that were used before is a lookup in that index. When
+# materials are added or removed, only the entries of the machine definitions of those materials are removed from it.
+#
 class MaterialManager(QObject):
 
     materialsUpdated = pyqtSignal()  # Emitted whenever the material lookup tables are updated.
@@ -63,6 +67,12 @@ class MaterialManager(QObject):
         self._default_machine_definition_id = "fdmprinter"
         self._default_approximate_diameter_for_quality_search = "3"
 
+        # (machine definition ID, variant name, approximate diameter str) -> root material ID -> MaterialNode
+        self._available_materials_index = dict()  # type: Dict[Tuple[str, Optional[str], str], Dict[str, MaterialNode]]
+        # The machine definitions of the materials that changed since the maps were last updated, or None if all
+        # entries of the index need to be removed.
+        self._changed_material_definition_ids = None  # type: Optional[Set[str]]
+
         # When a material gets added/imported, there can be more than one InstanceContainers. In those cases, we don't
         # want to react on every container/metadata changed signal. The timer here is to buffer it a bit so we don't
         # react too many time.
@@ -82,24 +92,24 @@ class MaterialManager(QObject):
                               metadata.get("GUID")}
 
         self._material_group_map = dict()
-                
+
+        # The maps below share a single node for every material, so that there are only as many nodes as there are
+        # materials and a container that is loaded through one map is loaded for the other maps as well.
+        material_nodes = {material_id: MaterialNode(material_metadata) for material_id, material_metadata in material_metadatas.items()
+                          if material_id != "empty_material"}  # We don't store empty material in the lookup tables
+
         # Map #1
         #    root_material_id -> MaterialGroup
-        for material_id, material_metadata in material_metadatas.items():
-            # We don't store empty material in the lookup tables
-            if material_id == "empty_material":
-                continue
-
-            root_material_id = material_metadata.get("base_file")
+        for material_id, material_node in material_nodes.items():
+            root_material_id = material_node.metadata.get("base_file")
             if root_material_id not in self._material_group_map:
-                self._material_group_map[root_material_id] = MaterialGroup(root_material_id, MaterialNode(material_metadatas[root_material_id]))
+                self._material_group_map[root_material_id] = MaterialGroup(root_material_id, material_nodes[root_material_id])
                 self._material_group_map[root_material_id].is_read_only = self._container_registry.isReadOnly(root_material_id)
             group = self._material_group_map[root_material_id]
 
             # Store this material in the group of the appropriate root material.
             if material_id != root_material_id:
-                new_node = MaterialNode(material_metadata)
-                group.derived_material_node_list.append(new_node)
+                group.derived_material_node_list.append(material_node)
 
         # Order this map alphabetically so it's easier to navigate in a debugger
         self._material_group_map = OrderedDict(sorted(self._material_group_map.items(), key = lambda x: x[0]))
@@ -190,11 +200,8 @@ class MaterialManager(QObject):
         #    "machine" -> "variant_name" -> "root material ID" -> specific material InstanceContainer
         # Construct the "machine" -> "variant" -> "root material ID" -> specific material InstanceContainer
         self._diameter_machine_variant_material_map = dict()
-        for material_metadata in material_metadatas.values():
-            # We don't store empty material in the lookup tables
-            if material_metadata["id"] == "empty_material":
-                continue
-
+        for material_node in material_nodes.values():
+            material_metadata = material_node.metadata
             root_material_id = material_metadata["base_file"]
             definition = material_metadata["definition"]
             approximate_diameter = material_metadata["approximate_diameter"]
@@ -210,7 +217,7 @@ class MaterialManager(QObject):
             variant_name = material_metadata.get("variant_name")
             if not variant_name:
                 # if there is no variant, this material is for the machine, so put its metadata in the machine node.
-                machine_node.material_map[root_material_id] = MaterialNode(material_metadata)
+                machine_node.material_map[root_material_id] = material_node
             else:
                 # this material is variant-specific, so we save it in a variant-specific node under the
                 # machine-specific node
@@ -225,12 +232,15 @@ class MaterialManager(QObject):
                     if root_material_id in variant_node.material_map:  # We shouldn't have duplicated variant-specific materials for the same machine.
                         ConfigurationErrorMessage.getInstance().addFaultyContainers(root_material_id)
                         continue
-                    variant_node.material_map[root_material_id] = MaterialNode(material_metadata)
+                    variant_node.material_map[root_material_id] = material_node
                 else:
                     # Add this container id to the wrong containers list in the registry
                     Logger.log("w", "Not adding {id} to the material manager because the variant does not exist.".format(id = material_metadata["id"]))
                     self._container_registry.addWrongContainerId(material_metadata["id"])
 
+        self._invalidateAvailableMaterialsIndex(self._changed_material_definition_ids)
+        self._changed_material_definition_ids = set()
+
         self.materialsUpdated.emit()
 
     def _updateMaps(self):
@@ -245,9 +255,24 @@ class MaterialManager(QObject):
         if container_type != "material":
             return
 
+        if self._changed_material_definition_ids is not None:
+            self._changed_material_definition_ids.add(container.getMetaDataEntry("definition"))
+
         # update the maps
         self._update_timer.start()
 
+    ##  Removes the entries of the given machine definitions from the index of available materials.
+    #
+    #   \param definition_ids The machine definitions of which the materials changed, or None to remove all entries.
+    def _invalidateAvailableMaterialsIndex(self, definition_ids: Optional[Iterable[str]]) -> None:
+        if definition_ids is None or self._default_machine_definition_id in definition_ids:
+            # The generic materials are available for every machine.
+            self._available_materials_index = dict()
+            return
+        definition_ids = set(definition_ids)
+        for key in [key for key in self._available_materials_index if key[0] in definition_ids]:
+            del self._available_materials_index[key]
+
     def getMaterialGroup(self, root_material_id: str) -> Optional[MaterialGroup]:
         return self._material_group_map.get(root_material_id)
 
@@ -272,6 +297,16 @@ class MaterialManager(QObject):
             return dict()
 
         machine_definition_id = machine_definition.getId()
+        key = (machine_definition_id, extruder_variant_name, rounded_diameter)
+        if key not in self._available_materials_index:
+            self._available_materials_index[key] = self._findAvailableMaterials(machine_definition, extruder_variant_name, rounded_diameter)
+
+        # A copy, so that the index can't be changed by the caller.
+        return dict(self._available_materials_index[key])
+
+    def _findAvailableMaterials(self, machine_definition: "DefinitionContainer", extruder_variant_name: Optional[str],
+                                rounded_diameter: str) -> Dict[str, MaterialNode]:
+        machine_definition_id = machine_definition.getId()
 
         # If there are variant materials, get the variant material
         machine_variant_material_map = self._diameter_machine_variant_material_map[rounded_diameter]
@@ -1,7 +1,7 @@
 # Copyright (c) 2018 Ultimaker B.V.
 # Cura is released under the terms of the LGPLv3 or higher.
 
-from typing import TYPE_CHECKING, Optional, cast
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple, cast
 
 from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
 
@@ -32,6 +32,12 @@ if TYPE_CHECKING:
 # but so far the creation of the tables and maps is very fast and there is no noticeable slowness, we keep it like this
 # because it's simple.
 #
+# Finding the qualities for a machine walks through the lookup tree in a fall-back manner for every extruder. The node
+# that is found only depends on the machine definition, the variant and the materials, so it is stored in an index the
+# first time it is needed. Switching between machines, nozzles and materials that were used before is then a lookup in
+# that index. When qualities are added or removed, only the entries of the machine definitions of those qualities are
+# removed from the index.
+#
 class QualityManager(QObject):
 
     qualitiesUpdated = pyqtSignal()
@@ -50,6 +56,13 @@ class QualityManager(QObject):
 
         self._default_machine_definition_id = "fdmprinter"
 
+        # (machine definition ID, has variant materials, variant name, root material IDs) -> the node with the
+        # qualities for that combination. The variant name and root material IDs are None for the global stack.
+        self._quality_node_index = {}  # type: Dict[Tuple[str, bool, Optional[str], Optional[Tuple[str, ...]]], Optional[QualityNode]]
+        # The machine definitions of the qualities that changed since the lookup tree was last updated, or None if
+        # all entries of the index need to be removed.
+        self._changed_quality_definition_ids = None  # type: Optional[Set[str]]
+
         self._container_registry.containerMetaDataChanged.connect(self._onContainerMetadataChanged)
         self._container_registry.containerAdded.connect(self._onContainerMetadataChanged)
         self._container_registry.containerRemoved.connect(self._onContainerMetadataChanged)
@@ -142,6 +155,9 @@ class QualityManager(QObject):
             machine_node = self._machine_quality_type_to_quality_changes_dict[machine_definition_id]
             machine_node.addQualityChangesMetadata(quality_type, metadata)
 
+        self._invalidateQualityNodeIndex(self._changed_quality_definition_ids)
+        self._changed_quality_definition_ids = set()
+
         Logger.log("d", "Lookup tables updated.")
         self.qualitiesUpdated.emit()
 
@@ -156,9 +172,96 @@ class QualityManager(QObject):
         if container_type not in ("quality", "quality_changes"):
             return
 
+        if container_type == "quality" and self._changed_quality_definition_ids is not None:
+            self._changed_quality_definition_ids.add(container.getMetaDataEntry("definition"))
+
         # update the cache table
         self._update_timer.start()
 
+    ##  Removes the entries of the given machine definitions from the quality node index.
+    #
+    #   \param definition_ids The machine definitions of which the qualities changed, or None to remove all entries.
+    def _invalidateQualityNodeIndex(self, definition_ids: Optional[Iterable[str]]) -> None:
+        if definition_ids is None or self._default_machine_definition_id in definition_ids:
+            # The generic qualities are the fall-back for every machine.
+            self._quality_node_index = {}
+            return
+        definition_ids = set(definition_ids)
+        for key in [key for key in self._quality_node_index if key[0] in definition_ids]:
+            del self._quality_node_index[key]
+
+    # Returns the first node with qualities in the given nodes. If the machine has variant materials, either only the
+    # nodes with global qualities or only the nodes without them are used.
+    def _findQualityNode(self, nodes_to_check: List[Optional[QualityNode]], has_variant_materials: bool,
+                         global_qualities: bool) -> Optional[QualityNode]:
+        for node in nodes_to_check:
+            if node and node.quality_type_map:
+                if has_variant_materials:
+                    quality_node = list(node.quality_type_map.values())[0]
+                    is_global_quality = parseBool(quality_node.metadata.get("global_quality", False))
+                    if is_global_quality != global_qualities:
+                        continue
+                return node
+        return None
+
+    # Gets the node with the qualities for the global stack of a machine, through the quality node index.
+    def _getGlobalQualityNode(self, machine_definition_id: str, has_variant_materials: bool) -> Optional[QualityNode]:
+        key = (machine_definition_id, has_variant_materials, None, None)
+        if key not in self._quality_node_index:
+            # To find the quality container for the GlobalStack, check in the following fall-back manner:
+            #   (1) the machine-specific node
+            #   (2) the generic node
+            machine_node = self._machine_variant_material_quality_type_to_quality_dict.get(machine_definition_id)
+            default_machine_node = self._machine_variant_material_quality_type_to_quality_dict.get(self._default_machine_definition_id)
+            # Only include global qualities
+            self._quality_node_index[key] = self._findQualityNode([machine_node, default_machine_node], has_variant_materials, global_qualities = True)
+        return self._quality_node_index[key]
+
+    # Gets the node with the qualities for an extruder stack, through the quality node index. The root material IDs are
+    # in prioritized order, and empty if the extruder has no material.
+    def _getExtruderQualityNode(self, machine_definition_id: str, has_variant_materials: bool, variant_name: Optional[str],
+                                root_material_id_list: Tuple[str, ...]) -> Optional[QualityNode]:
+        key = (machine_definition_id, has_variant_materials, variant_name, root_material_id_list)
+        if key not in self._quality_node_index:
+            machine_node = self._machine_variant_material_quality_type_to_quality_dict.get(machine_definition_id)
+            default_machine_node = self._machine_variant_material_quality_type_to_quality_dict.get(self._default_machine_definition_id)
+
+            # Here we construct a list of nodes we want to look for qualities with the highest priority first.
+            # The use case is that, when we look for qualities for a machine, we first want to search in the following
+            # order:
+            #   1. machine-variant-and-material-specific qualities if exist
+            #   2. machine-variant-specific qualities if exist
+            #   3. machine-material-specific qualities if exist
+            #   4. machine-specific qualities if exist
+            #   5. generic qualities if exist
+            # Each points above can be represented as a node in the lookup tree, so here we simply put those nodes into
+            # the list with priorities as the order. Later, we just need to loop over each node in this list and fetch
+            # qualities from there.
+            nodes_to_check = []
+
+            if variant_name:
+                # In this case, we have both a specific variant and a specific material
+                variant_node = machine_node.getChildNode(variant_name)
+                if variant_node:
+                    for root_material_id in root_material_id_list:
+                        material_node = variant_node.getChildNode(root_material_id)
+                        if material_node:
+                            nodes_to_check.append(material_node)
+                            break
+                nodes_to_check.append(variant_node)
+
+            # In this case, we only have a specific material but NOT a variant
+            for root_material_id in root_material_id_list:
+                material_node = machine_node.getChildNode(root_material_id)
+                if material_node:
+                    nodes_to_check.append(material_node)
+                    break
+
+            nodes_to_check += [machine_node, default_machine_node]
+            # Only include variant qualities; skip non global qualities
+            self._quality_node_index[key] = self._findQualityNode(nodes_to_check, has_variant_materials, global_qualities = False)
+        return self._quality_node_index[key]
+
     # Updates the given quality groups' availabilities according to which extruders are being used/ enabled.
     def _updateQualityGroupsAvailability(self, machine: "GlobalStack", quality_group_list):
         used_extruders = set()
@@ -214,29 +317,14 @@ class QualityManager(QObject):
         # This determines if we should only get the global qualities for the global stack and skip the global qualities for the extruder stacks
         has_variant_materials = parseBool(machine.getMetaDataEntry("has_variant_materials", False))
 
-        # To find the quality container for the GlobalStack, check in the following fall-back manner:
-        #   (1) the machine-specific node
-        #   (2) the generic node
-        machine_node = self._machine_variant_material_quality_type_to_quality_dict.get(machine_definition_id)
-        default_machine_node = self._machine_variant_material_quality_type_to_quality_dict.get(self._default_machine_definition_id)
-        nodes_to_check = [machine_node, default_machine_node]
-
         # Iterate over all quality_types in the machine node
         quality_group_dict = {}
-        for node in nodes_to_check:
-            if node and node.quality_type_map:
-                # Only include global qualities
-                if has_variant_materials:
-                    quality_node = list(node.quality_type_map.values())[0]
-                    is_global_quality = parseBool(quality_node.metadata.get("global_quality", False))
-                    if not is_global_quality:
-                        continue
-
-                for quality_type, quality_node in node.quality_type_map.items():
-                    quality_group = QualityGroup(quality_node.metadata["name"], quality_type)
-                    quality_group.node_for_global = quality_node
-                    quality_group_dict[quality_type] = quality_group
-                break
+        node = self._getGlobalQualityNode(machine_definition_id, has_variant_materials)
+        if node is not None:
+            for quality_type, quality_node in node.quality_type_map.items():
+                quality_group = QualityGroup(quality_node.metadata["name"], quality_type)
+                quality_group.node_for_global = quality_node
+                quality_group_dict[quality_type] = quality_group
 
         # Iterate over all extruders to find quality containers for each extruder
         for position, extruder in machine.extruders.items():
@@ -247,9 +335,7 @@ class QualityManager(QObject):
             # This is a list of root material IDs to use for searching for suitable quality profiles.
             # The root material IDs in this list are in prioritized order.
             root_material_id_list = []
-            has_material = False  # flag indicating whether this extruder has a material assigned
             if extruder.material.getId() != "empty_material":
-                has_material = True
                 root_material_id = extruder.material.getMetaDataEntry("base_file")
                 # Convert possible generic_pla_175 -> generic_pla
                 root_material_id = self._material_manager.getRootMaterialIDWithoutDiameter(root_material_id)
@@ -261,56 +347,15 @@ class QualityManager(QObject):
                 if fallback_root_material_id:
                     root_material_id_list.append(fallback_root_material_id)
 
-            # Here we construct a list of nodes we want to look for qualities with the highest priority first.
-            # The use case is that, when we look for qualities for a machine, we first want to search in the following
-            # order:
-            #   1. machine-variant-and-material-specific qualities if exist
-            #   2. machine-variant-specific qualities if exist
-            #   3. machine-material-specific qualities if exist
-            #   4. machine-specific qualities if exist
-            #   5. generic qualities if exist
-            # Each points above can be represented as a node in the lookup tree, so here we simply put those nodes into
-            # the list with priorities as the order. Later, we just need to loop over each node in this list and fetch
-            # qualities from there.
-            nodes_to_check = []
-
-            if variant_name:
-                # In this case, we have both a specific variant and a specific material
-                variant_node = machine_node.getChildNode(variant_name)
-                if variant_node and has_material:
-                    for root_material_id in root_material_id_list:
-                        material_node = variant_node.getChildNode(root_material_id)
-                        if material_node:
-                            nodes_to_check.append(material_node)
-                            break
-                nodes_to_check.append(variant_node)
-
-            # In this case, we only have a specific material but NOT a variant
-            if has_material:
-                for root_material_id in root_material_id_list:
-                    material_node = machine_node.getChildNode(root_material_id)
-                    if material_node:
-                        nodes_to_check.append(material_node)
-                        break
+            node = self._getExtruderQualityNode(machine_definition_id, has_variant_materials, variant_name, tuple(root_material_id_list))
+            if node is not None:
+                for quality_type, quality_node in node.quality_type_map.items():
+                    if quality_type not in quality_group_dict:
+                        quality_group = QualityGroup(quality_node.metadata["name"], quality_type)
+                        quality_group_dict[quality_type] = quality_group
 
-            nodes_to_check += [machine_node, default_machine_node]
-            for node in nodes_to_check:
-                if node and node.quality_type_map:
-                    if has_variant_materials:
-                        # Only include variant qualities; skip non global qualities
-                        quality_node = list(node.quality_type_map.values())[0]
-                        is_global_quality = parseBool(quality_node.metadata.get("global_quality", False))
-                        if is_global_quality:
-                            continue
-
-                    for quality_type, quality_node in node.quality_type_map.items():
-                        if quality_type not in quality_group_dict:
-                            quality_group = QualityGroup(quality_node.metadata["name"], quality_type)
-                            quality_group_dict[quality_type] = quality_group
-
-                        quality_group = quality_group_dict[quality_type]
-                        quality_group.nodes_for_extruders[position] = quality_node
-                    break
+                    quality_group = quality_group_dict[quality_type]
+                    quality_group.nodes_for_extruders[position] = quality_node
 
         # Update availabilities for each quality group
         self._updateQualityGroupsAvailability(machine, quality_group_dict.values())
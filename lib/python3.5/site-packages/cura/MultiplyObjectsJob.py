@@ -2,8 +2,10 @@
 # Cura is released under the terms of the LGPLv3 or higher.
 
 import copy
+import time
 
 from UM.Job import Job
+from UM.Logger import Logger
 from UM.Operations.GroupedOperation import GroupedOperation
 from UM.Message import Message
 from UM.i18n import i18nCatalog
@@ -24,6 +26,7 @@ class MultiplyObjectsJob(Job):
         self._min_offset = min_offset
 
     def run(self):
+        start_time = time.time()
         status_message = Message(i18n_catalog.i18nc("@info:status", "Multiplying and placing objects"), lifetime=0,
                                  dismissable=False, progress=0, title = i18n_catalog.i18nc("@info:title", "Placing Object"))
         status_message.show()
@@ -64,6 +67,7 @@ class MultiplyObjectsJob(Job):
             arranger.resetLastPriority()
             for i in range(self._count):
                 # We do place the nodes one by one, as we want to yield in between.
+                # The copies share the mesh data of the original; only the decorators are copied.
                 new_node = copy.deepcopy(node)
                 solution_found = False
                 if not node_too_big:
@@ -95,6 +99,7 @@ class MultiplyObjectsJob(Job):
                 op.addOperation(AddSceneNodeOperation(new_node, current_node.getParent()))
             op.push()
         status_message.hide()
+        Logger.log("d", "Creating %s copies of %s objects took %s seconds", self._count, len(processed_nodes), time.time() - start_time)
 
         if not found_solution_for_all:
             no_full_solution_message = Message(i18n_catalog.i18nc("@info:status", "Unable to find a location within the build volume for all objects"), title = i18n_catalog.i18nc("@info:title", "Placing Object"))
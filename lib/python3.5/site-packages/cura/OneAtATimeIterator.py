@@ -1,20 +1,25 @@
 # Copyright (c) 2015 Ultimaker B.V.
 # Cura is released under the terms of the LGPLv3 or higher.
 
+import heapq
+
 from UM.Scene.Iterator import Iterator
 from UM.Scene.SceneNode import SceneNode
-from functools import cmp_to_key
-from UM.Application import Application
 
 ## Iterator that returns a list of nodes in the order that they need to be printed
 #  If there is no solution an empty list is returned.
 #  Take note that the list of nodes can have children (that may or may not contain mesh data)
+#
+#  An object can't be printed before another object if the head would hit it
+#  while printing the other object. These constraints form a precedence graph,
+#  which is sorted topologically. If the graph has a cycle, there is no order
+#  in which all objects can be printed. When several objects could be printed
+#  next, the one closest to the front of the build plate is printed first.
 class OneAtATimeIterator(Iterator.Iterator):
     def __init__(self, scene_node):
         super().__init__(scene_node) # Call super to make multiple inheritence work.
         self._hit_map = [[]]
-        self._original_node_list = []
-    
+
     def _fillStack(self):
         node_list = []
         for node in self._scene_node.getChildren():
@@ -27,86 +32,54 @@ class OneAtATimeIterator(Iterator.Iterator):
 
         if len(node_list) < 2:
             self._node_stack = node_list[:]
-            return 
-
-        # Copy the list
-        self._original_node_list = node_list[:]
+            return
 
         ## Initialise the hit map (pre-compute all hits between all objects)
-        self._hit_map = [[self._checkHit(i,j) for i in node_list] for j in node_list]
-
-        # Check if we have to files that block eachother. If this is the case, there is no solution!
-        for a in range(0,len(node_list)):
-            for b in range(0,len(node_list)):
-                if a != b and self._hit_map[a][b] and self._hit_map[b][a]:
-                    return 
-
-        # Sort the original list so that items that block the most other objects are at the beginning.
-        # This does not decrease the worst case running time, but should improve it in most cases.
-        sorted(node_list, key = cmp_to_key(self._calculateScore))
-
-        todo_node_list = [_ObjectOrder([], node_list)]
-        while len(todo_node_list) > 0:
-            current = todo_node_list.pop()
-            for node in current.todo:
-                # Check if the object can be placed with what we have and still allows for a solution in the future
-                if not self._checkHitMultiple(node, current.order) and not self._checkBlockMultiple(node, current.todo):
-                    # We found a possible result. Create new todo & order list.
-                    new_todo_list = current.todo[:]
-                    new_todo_list.remove(node)
-                    new_order = current.order[:] + [node]
-                    if len(new_todo_list) == 0: 
-                        # We have no more nodes to check, so quit looking.
-                        todo_node_list = None
-                        self._node_stack = new_order
-
-                        return
-                    todo_node_list.append(_ObjectOrder(new_order, new_todo_list))
-        self._node_stack = [] #No result found!
-
-
-    # Check if first object can be printed before the provided list (using the hit map)
-    def _checkHitMultiple(self, node, other_nodes):
-        node_index = self._original_node_list.index(node)
-        for other_node in other_nodes:
-            other_node_index = self._original_node_list.index(other_node)
-            if self._hit_map[node_index][other_node_index]:
-                return True
-        return False
-
-    def _checkBlockMultiple(self, node, other_nodes):
-        node_index = self._original_node_list.index(node)
-        for other_node in other_nodes:
-            other_node_index = self._original_node_list.index(other_node)
-            if self._hit_map[other_node_index][node_index] and node_index != other_node_index:
-                return True
-        return False
-
-    ##  Calculate score simply sums the number of other objects it 'blocks'
-    def _calculateScore(self, a, b):
-        score_a = sum(self._hit_map[self._original_node_list.index(a)])
-        score_b = sum(self._hit_map[self._original_node_list.index(b)])
-        return score_a - score_b
-
-    #   Checks if A can be printed before B
-    def _checkHit(self, a, b):
-        if a == b:
-            return False
-
-        overlap = a.callDecoration("getConvexHullBoundary").intersectsPolygon(b.callDecoration("getConvexHullHeadFull"))
-        if overlap:
-            return True
-        else: 
-            return False
-
-
-## Internal object used to keep track of a possible order in which to print objects.      
-class _ObjectOrder():
-    def __init__(self, order, todo):
-        """
-        :param order:   List of indexes in which to print objects, ordered by printing order.
-        :param todo:    List of indexes which are not yet inserted into the order list.
-        """
-        self.order = order
-        self.todo = todo
-
+        self._hit_map = self._calculateHitMap(node_list)
+
+        # Count for each object how many objects have to be printed before it.
+        # _hit_map[a][b] means that a can't be printed before b, so b must be printed before a.
+        blocked_by_count = [sum(row[b] for b in range(len(node_list)) if b != a) for a, row in enumerate(self._hit_map)]
+
+        # Start with the objects that can be printed first, in order of their distance to the front (+Z).
+        available = [(self._getPriority(node_list[index]), index) for index in range(len(node_list)) if blocked_by_count[index] == 0]
+        heapq.heapify(available)
+
+        order = []
+        while available:
+            _, index = heapq.heappop(available)
+            order.append(node_list[index])
+            # Printing this object may have freed the objects that had to wait for it.
+            for other_index in range(len(node_list)):
+                if other_index != index and self._hit_map[other_index][index]:
+                    blocked_by_count[other_index] -= 1
+                    if blocked_by_count[other_index] == 0:
+                        heapq.heappush(available, (self._getPriority(node_list[other_index]), other_index))
+
+        if len(order) < len(node_list):
+            # Some objects are blocked by each other (a cycle in the precedence graph), so there is no solution!
+            self._node_stack = []
+            return
+        self._node_stack = order
+
+    ##  Compute for each pair of objects whether the first can't be printed
+    #   before the second.
+    #
+    #   \return A list of rows, where hit_map[a][b] is True if the boundary of
+    #   object a is hit by the head while printing object b.
+    def _calculateHitMap(self, node_list):
+        head_hulls = [node.callDecoration("getConvexHullHeadFull") for node in node_list]
+        hit_map = []
+        for index, node in enumerate(node_list):
+            overlaps = node.callDecoration("getConvexHullBoundary").intersectsPolygons(head_hulls)
+            row = [overlap is not None for overlap in overlaps] # Touching, with an overlap of (0, 0), counts as a hit too.
+            row[index] = False
+            hit_map.append(row)
+        return hit_map
+
+    ##  The key to decide which object to print first if there are multiple
+    #   candidates. Objects closest to the front are printed first, with the
+    #   X coordinate and the original order as deterministic tie-breaks.
+    def _getPriority(self, node):
+        position = node.getWorldPosition()
+        return (-position.z, position.x)
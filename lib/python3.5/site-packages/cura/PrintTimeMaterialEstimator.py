@@ -0,0 +1,125 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+from typing import Dict, List, Tuple
+
+import numpy
+
+from .LayerPolygon import LayerPolygon
+
+
+##  Estimates the print time per feature and the material usage from layer
+#   data, for prints that the engine didn't report them for, such as loaded
+#   g-code.
+#
+#   The estimates have the same form as the PrintTimeMaterialEstimates message
+#   of the engine, so that they can be shown by the PrintInformation. All
+#   lines are processed at once with numpy, using the combined arrays of the
+#   layer data.
+#
+#   The time of each line is approximated with a trapezoid speed profile: the
+#   head accelerates from the speed at the start of the line to the feedrate,
+#   and decelerates to the speed at the end. The speed at the junction of two
+#   lines is limited by the jerk, the maximum instantaneous change in
+#   velocity. Unlike the planner of a printer, the junction speeds are not
+#   propagated along lines that are too short to reach them.
+class PrintTimeMaterialEstimator:
+    ##  The names of the features that the line types belong to, like the
+    #   engine reports them.
+    feature_names = {
+        LayerPolygon.NoneType: "none",
+        LayerPolygon.Inset0Type: "inset_0",
+        LayerPolygon.InsetXType: "inset_x",
+        LayerPolygon.SkinType: "skin",
+        LayerPolygon.SupportType: "support",
+        LayerPolygon.SkirtType: "skirt",
+        LayerPolygon.InfillType: "infill",
+        LayerPolygon.SupportInfillType: "support_infill",
+        LayerPolygon.MoveCombingType: "travel",
+        LayerPolygon.MoveRetractionType: "retract",
+        LayerPolygon.SupportInterfaceType: "support_interface"
+    }
+
+    ##  Whether each line type is a move that doesn't extrude material.
+    _is_travel_type = numpy.zeros(len(feature_names), dtype = bool)
+    _is_travel_type[[LayerPolygon.NoneType, LayerPolygon.MoveCombingType, LayerPolygon.MoveRetractionType]] = True
+
+    ##  Creates an estimator for a printer.
+    #
+    #   \param acceleration The acceleration of the head, in mm/s². Use 0 to
+    #   ignore the acceleration.
+    #   \param jerk The maximum instantaneous change in velocity, in mm/s.
+    #   \param minimum_feedrate Slower lines are assumed to go at this speed,
+    #   in mm/s. This prevents lines without a feedrate from taking forever.
+    def __init__(self, acceleration: float = 3000.0, jerk: float = 20.0, minimum_feedrate: float = 1.0) -> None:
+        self._acceleration = acceleration
+        self._jerk = jerk
+        self._minimum_feedrate = minimum_feedrate
+
+    ##  Estimate the print time and material usage of layer data.
+    #
+    #   \param layer_data The LayerData of the print.
+    #   \param extruder_count The number of extruders to report the material
+    #   usage of.
+    #   \return The print time in seconds per feature, and the volume of
+    #   extruded material in mm³ per extruder.
+    def estimate(self, layer_data, extruder_count: int = 1) -> Tuple[Dict[str, float], List[float]]:
+        indices = layer_data.getIndices()
+        if indices is None or len(indices) == 0:
+            return {name: 0.0 for name in self.feature_names.values()}, [0.0] * extruder_count
+
+        # Every line goes between two vertices. The attributes of the line are those of the vertex at its end.
+        indices = numpy.asarray(indices).reshape((-1, 2))
+        vertices = layer_data.getVertices()
+        line_ends = indices[:, 1]
+        directions = vertices[line_ends].astype(numpy.float64) - vertices[indices[:, 0]]
+        line_types = layer_data.getAttribute("line_types")["value"][line_ends].astype(numpy.int64)
+        feedrates = numpy.maximum(layer_data.getAttribute("feedrates")["value"][line_ends].astype(numpy.float64), self._minimum_feedrate)
+        line_dimensions = layer_data.getAttribute("line_dimensions")["value"][line_ends].astype(numpy.float64)
+        extruders = layer_data.getAttribute("extruders")["value"][line_ends].astype(numpy.int64)
+
+        lengths = numpy.sqrt(numpy.einsum("ij,ij->i", directions, directions))
+        non_zero = lengths > 0
+        directions[non_zero] /= lengths[non_zero, numpy.newaxis]
+
+        times = self._getLineTimes(directions, lengths, feedrates)
+        feature_times = numpy.bincount(line_types, weights = times, minlength = len(self.feature_names))
+        print_times = {name: float(feature_times[line_type]) for line_type, name in self.feature_names.items()}
+
+        # The extruded volume is a rectangular cross section along the line.
+        volumes = lengths * line_dimensions[:, 0] * line_dimensions[:, 1]
+        volumes[self._is_travel_type[line_types]] = 0
+        material_amounts = numpy.bincount(extruders, weights = volumes, minlength = extruder_count)
+        return print_times, [float(amount) for amount in material_amounts]
+
+    ##  The time that each line takes.
+    #
+    #   \param directions The unit vector in the direction of each line, or a
+    #   zero vector for lines without length.
+    #   \param lengths The length of each line.
+    #   \param feedrates The speed of the head on each line.
+    def _getLineTimes(self, directions: numpy.ndarray, lengths: numpy.ndarray, feedrates: numpy.ndarray) -> numpy.ndarray:
+        if self._acceleration <= 0:
+            return lengths / feedrates
+        acceleration = self._acceleration
+
+        # At the junction of two lines, take the speed of the slowest line, but no faster than the jerk allows for the change in direction.
+        junction_speeds = numpy.minimum(feedrates[:-1], feedrates[1:])
+        velocity_changes = junction_speeds * numpy.linalg.norm(directions[1:] - directions[:-1], axis = 1)
+        too_fast = velocity_changes > self._jerk
+        junction_speeds[too_fast] *= self._jerk / velocity_changes[too_fast]
+        # The head starts and ends standing still.
+        entry_speeds = numpy.concatenate(([min(feedrates[0], self._jerk)], junction_speeds))
+        exit_speeds = numpy.concatenate((junction_speeds, [min(feedrates[-1], self._jerk)]))
+
+        # A line may be too short to change between the two speeds. Then the higher speed is lowered.
+        reachable = 2 * acceleration * lengths
+        entry_speeds, exit_speeds = numpy.minimum(entry_speeds, numpy.sqrt(exit_speeds ** 2 + reachable)), numpy.minimum(exit_speeds, numpy.sqrt(entry_speeds ** 2 + reachable))
+
+        accelerate_distances = (feedrates ** 2 - entry_speeds ** 2) / (2 * acceleration)
+        decelerate_distances = (feedrates ** 2 - exit_speeds ** 2) / (2 * acceleration)
+        cruise_distances = lengths - accelerate_distances - decelerate_distances
+        reaches_feedrate = cruise_distances >= 0
+        # Lines that are too short to reach the feedrate have a triangular profile instead, peaking halfway between the speeds.
+        peak_speeds = numpy.where(reaches_feedrate, feedrates, numpy.sqrt((reachable + entry_speeds ** 2 + exit_speeds ** 2) / 2))
+        return (2 * peak_speeds - entry_speeds - exit_speeds) / acceleration + numpy.where(reaches_feedrate, cruise_distances, 0) / feedrates
@@ -132,15 +132,17 @@ class ConvexHullDecorator(SceneNodeDecorator):
         hull_node = ConvexHullNode.ConvexHullNode(self._node, convex_hull, self._raft_thickness, root)
         self._convex_hull_node = hull_node
 
-    def _onSettingValueChanged(self, key, property_name):
-        if property_name != "value": #Not the value that was changed.
-            return
+    ##  Called once for all settings that changed since the event loop last ran.
+    #
+    #   \param changes The (key, property name) pairs of the changed settings.
+    def _onSettingValuesChanged(self, changes):
+        changed_keys = {key for key, property_name in changes if property_name == "value"} #Only the values.
 
-        if key in self._affected_settings:
-            self._onChanged()
-        if key in self._influencing_settings:
+        if not changed_keys.isdisjoint(self._influencing_settings):
             self._init2DConvexHullCache() #Invalidate the cache.
             self._onChanged()
+        elif not changed_keys.isdisjoint(self._affected_settings):
+            self._onChanged()
 
     def _init2DConvexHullCache(self):
         # Cache for the group code path in _compute2DConvexHull()
@@ -302,21 +304,21 @@ class ConvexHullDecorator(SceneNodeDecorator):
 
     def _onGlobalStackChanged(self):
         if self._global_stack:
-            self._global_stack.propertyChanged.disconnect(self._onSettingValueChanged)
+            self._global_stack.batchedPropertiesChanged.disconnect(self._onSettingValuesChanged)
             self._global_stack.containersChanged.disconnect(self._onChanged)
             extruders = ExtruderManager.getInstance().getMachineExtruders(self._global_stack.getId())
             for extruder in extruders:
-                extruder.propertyChanged.disconnect(self._onSettingValueChanged)
+                extruder.batchedPropertiesChanged.disconnect(self._onSettingValuesChanged)
 
         self._global_stack = Application.getInstance().getGlobalContainerStack()
 
         if self._global_stack:
-            self._global_stack.propertyChanged.connect(self._onSettingValueChanged)
+            self._global_stack.batchedPropertiesChanged.connect(self._onSettingValuesChanged)
             self._global_stack.containersChanged.connect(self._onChanged)
 
             extruders = ExtruderManager.getInstance().getMachineExtruders(self._global_stack.getId())
             for extruder in extruders:
-                extruder.propertyChanged.connect(self._onSettingValueChanged)
+                extruder.batchedPropertiesChanged.connect(self._onSettingValuesChanged)
 
             self._onChanged()
 
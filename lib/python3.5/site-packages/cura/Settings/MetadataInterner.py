@@ -0,0 +1,69 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import threading
+from typing import Any, Dict, Hashable
+
+
+##  Shares equal metadata values between the metadata of many containers.
+#
+#   Material profiles are expanded into metadata for every machine and nozzle
+#   that they have settings for, and many profiles have the same properties,
+#   compatibility tables, descriptions and names of brands and machines. The
+#   interner keeps one copy of every distinct immutable value, like strings
+#   and numbers, and returns that copy for every equal value, so that it is
+#   stored only once.
+#
+#   Dictionaries are not shared, since the metadata of a container may be
+#   changed in place (for instance the properties of a custom material). They
+#   are copied instead, with the keys and values of the copy interned.
+class MetadataInterner:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values = {}  # type: Dict[Hashable, Any] # Key of the contents -> the shared value with those contents.
+        self._lookup_count = 0
+        self._shared_count = 0
+
+    ##  Get the shared copy of a value.
+    #
+    #   \param value The value to intern. Dictionaries are copied with their
+    #   keys and values interned. Other values that are not hashable are
+    #   returned as they are.
+    #   \return A value equal to the given value, that is shared with all
+    #   other equal values that were interned.
+    def intern(self, value: Any) -> Any:
+        with self._lock:
+            return self._intern(value)
+
+    ##  Intern all keys and values of a metadata dictionary.
+    #
+    #   \param metadata The metadata of a container.
+    #   \return A new dictionary with the same entries, that contains shared
+    #   copies of the keys and values.
+    def internMetadata(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        return self.intern(metadata)
+
+    ##  The number of distinct values, the number of values that were interned
+    #   and how many of those were replaced by an equal value that was already
+    #   known.
+    def getStatistics(self) -> Dict[str, int]:
+        with self._lock:
+            return {"distinct_count": len(self._values), "lookup_count": self._lookup_count, "shared_count": self._shared_count}
+
+    ##  Should be called with the lock held.
+    def _intern(self, value: Any) -> Any:
+        if isinstance(value, dict):
+            return {self._intern(key): self._intern(entry) for key, entry in value.items()}
+
+        try:
+            content_key = (type(value), value)  # type: Hashable # The type distinguishes between for instance 1, 1.0 and True.
+            hash(content_key)
+        except TypeError:
+            return value
+
+        self._lookup_count += 1
+        if content_key in self._values:
+            self._shared_count += 1
+            return self._values[content_key]
+        self._values[content_key] = value
+        return value
@@ -1,6 +1,8 @@
 # Copyright (c) 2017 Ultimaker B.V.
 # Cura is released under the terms of the LGPLv3 or higher.
-from typing import List
+import collections
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
 
 from PyQt5.QtCore import QObject, QTimer, pyqtProperty, pyqtSignal
 from UM.FlameProfiler import pyqtSlot
@@ -13,6 +15,11 @@ from UM.Logger import Logger
 #     because some profiles tend to have 'hardcoded' values that break our inheritance. A good example of that are the
 #     speed settings. If all the children of print_speed have a single value override, changing the speed won't
 #     actually do anything, as only the 'leaf' settings are used by the engine.
+#
+#     All settings are only checked when the containers of the stacks change. When the value of a setting changes,
+#     only that setting is checked again, and the category it is in is updated from the number of settings in it that
+#     overwrite their inheritance. The result is remembered for every extruder that was active, so that switching back
+#     to an extruder only checks the settings that changed in the meanwhile.
 from UM.Settings.ContainerStack import ContainerStack
 from UM.Settings.Interfaces import ContainerInterface
 from UM.Settings.SettingFunction import SettingFunction
@@ -20,23 +27,71 @@ from UM.Settings.SettingInstance import InstanceState
 
 from cura.Settings.ExtruderManager import ExtruderManager
 
+
+##  The settings that overwrite their inheritance in one stack.
+#
+#   While the stack is not active, the settings that change in it are
+#   remembered, so that only those need to be checked again once it is.
+class _StackInheritanceState:
+    def __init__(self, stack: ContainerStack, on_property_changed: Callable[["_StackInheritanceState", str], None], on_containers_changed: Callable[[Any], None]) -> None:
+        self.stack = stack
+        self.overridden_keys = set()  # type: Set[str]
+        self.dirty_keys = set()  # type: Set[str] # Settings that changed while the stack wasn't active.
+        self.is_complete = False  # Whether all settings were checked since the containers last changed.
+        self.containers = None  # type: Optional[List[ContainerInterface]] # The containers of this stack and the stacks after it.
+
+        self._on_property_changed = on_property_changed
+        self._on_containers_changed = on_containers_changed
+        # The global stack passes its changes on to the extruder stacks, so they don't need to be connected separately.
+        self.stack.propertyChanged.connect(self._onPropertyChanged)
+        self.stack.containersChanged.connect(self._on_containers_changed)
+
+    def disconnect(self) -> None:
+        self.stack.propertyChanged.disconnect(self._onPropertyChanged)
+        self.stack.containersChanged.disconnect(self._on_containers_changed)
+
+    ##  Forget everything that was checked, because the containers changed.
+    def invalidate(self) -> None:
+        self.is_complete = False
+        self.containers = None
+        self.dirty_keys = set()
+
+    def _onPropertyChanged(self, key: str, property_name: str) -> None:
+        if property_name == "value" or property_name == "enabled":
+            self._on_property_changed(self, key)
+
+
 class SettingInheritanceManager(QObject):
     def __init__(self, parent = None):
         super().__init__(parent)
+        self._update_timer = QTimer()
+        self._update_timer.setInterval(500)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.timeout.connect(self._update)
+
+        self._settings_with_inheritance_warning = []  # type: List[str]
+        self._warning_keys = set()  # type: Set[str] # The same keys as in _settings_with_inheritance_warning, to look them up quickly.
+        self._category_keys = {}  # type: Dict[str, str] # For each setting, the key of the category it is in.
+        self._categories = set()  # type: Set[str]
+        self._category_override_counts = collections.Counter()  # type: Dict[str, int] # For each category, how many of its settings overwrite their inheritance.
+        self._stack_states = {}  # type: Dict[str, _StackInheritanceState] # Per stack ID, for the extruders that were active.
+        self._active_state = None  # type: Optional[_StackInheritanceState]
+        self._active_stack_keys = None  # type: Optional[Set[str]]
+
+        # How often and how long the settings were checked, to find out where the time goes.
+        self._full_update_count = 0
+        self._full_update_time = 0.0
+        self._key_update_count = 0
+        self._key_update_time = 0.0
+
         Application.getInstance().globalContainerStackChanged.connect(self._onGlobalContainerChanged)
         self._global_container_stack = None
-        self._settings_with_inheritance_warning = []
         self._active_container_stack = None
         self._onGlobalContainerChanged()
 
         ExtruderManager.getInstance().activeExtruderChanged.connect(self._onActiveExtruderChanged)
         self._onActiveExtruderChanged()
 
-        self._update_timer = QTimer()
-        self._update_timer.setInterval(500)
-        self._update_timer.setSingleShot(True)
-        self._update_timer.timeout.connect(self._update)
-
     settingsWithIntheritanceChanged = pyqtSignal()
 
     ##  Get the keys of all children settings with an override.
@@ -48,7 +103,7 @@ class SettingInheritanceManager(QObject):
             return []
         result = []
         for key in definitions[0].getAllKeys():
-            if key in self._settings_with_inheritance_warning:
+            if key in self._warning_keys:
                 result.append(key)
         return result
 
@@ -74,79 +129,134 @@ class SettingInheritanceManager(QObject):
 
     @pyqtSlot(str)
     def manualRemoveOverride(self, key):
-        if key in self._settings_with_inheritance_warning:
-            self._settings_with_inheritance_warning.remove(key)
+        if key in self._warning_keys:
+            if self._active_state is not None and key in self._active_state.overridden_keys:
+                self._active_state.overridden_keys.remove(key)
+                self._removeCategoryOverride(key)
+            self._removeWarning(key)
             self.settingsWithIntheritanceChanged.emit()
 
     @pyqtSlot()
     def forceUpdate(self):
         self._update()
 
+    ##  Get how often the settings were checked and how long that took.
+    #
+    #   \return A dictionary with the number of times all settings were checked
+    #   ("full_update_count") and the total time that took in seconds
+    #   ("full_update_time"), and the same for checking a single setting after
+    #   it changed ("key_update_count" and "key_update_time").
+    def getUpdateStatistics(self) -> Dict[str, Any]:
+        return {
+            "full_update_count": self._full_update_count,
+            "full_update_time": self._full_update_time,
+            "key_update_count": self._key_update_count,
+            "key_update_time": self._key_update_time
+        }
+
     def _onActiveExtruderChanged(self):
         new_active_stack = ExtruderManager.getInstance().getActiveExtruderStack()
         if not new_active_stack:
             self._active_container_stack = None
+            self._active_state = None
             return
 
         if new_active_stack != self._active_container_stack:  # Check if changed
-            if self._active_container_stack:  # Disconnect signal from old container (if any)
-                self._active_container_stack.propertyChanged.disconnect(self._onPropertyChanged)
-                self._active_container_stack.containersChanged.disconnect(self._onContainersChanged)
-
             self._active_container_stack = new_active_stack
-            self._active_container_stack.propertyChanged.connect(self._onPropertyChanged)
-            self._active_container_stack.containersChanged.connect(self._onContainersChanged)
-            self._update()  # Ensure that the settings_with_inheritance_warning list is populated.
-
-    def _onPropertyChanged(self, key, property_name):
-        if (property_name == "value" or property_name == "enabled") and self._global_container_stack:
-            definitions = self._global_container_stack.definition.findDefinitions(key = key)
-            if not definitions:
+            self._active_stack_keys = None
+            state = self._stack_states.get(new_active_stack.getId())
+            if state is None or state.stack is not new_active_stack:
+                if state is not None:
+                    state.disconnect()
+                state = _StackInheritanceState(new_active_stack, self._onStackPropertyChanged, self._onContainersChanged)
+                self._stack_states[new_active_stack.getId()] = state
+            self._active_state = state
+
+            if not state.is_complete:
+                self._update()  # Ensure that the settings_with_inheritance_warning list is populated.
                 return
+            # Only check what changed since this extruder was last active.
+            dirty_keys = state.dirty_keys
+            state.dirty_keys = set()
+            self._updateKeys(dirty_keys)
+            self._updateWarnings()
+            self.settingsWithIntheritanceChanged.emit()
 
-            has_overwritten_inheritance = self._settingIsOverwritingInheritance(key)
+    def _onStackPropertyChanged(self, state: _StackInheritanceState, key: str) -> None:
+        if self._global_container_stack is None:
+            return
+        if state is not self._active_state:
+            state.dirty_keys.add(key)
+            return
+        if not self._global_container_stack.definition.findDefinitions(key = key):
+            return
+        if self._updateKeys([key]):
+            self.settingsWithIntheritanceChanged.emit()
 
-            settings_with_inheritance_warning_changed = False
-
-            # Check if the setting needs to be in the list.
-            if key not in self._settings_with_inheritance_warning and has_overwritten_inheritance:
-                self._settings_with_inheritance_warning.append(key)
-                settings_with_inheritance_warning_changed = True
-            elif key in self._settings_with_inheritance_warning and not has_overwritten_inheritance:
-                self._settings_with_inheritance_warning.remove(key)
-                settings_with_inheritance_warning_changed = True
-
-            parent = definitions[0].parent
-            # Find the topmost parent (Assumed to be a category)
-            if parent is not None:
-                while parent.parent is not None:
-                    parent = parent.parent
+    ##  Check the settings with the specified keys again in the active stack,
+    #   and update the categories they are in.
+    #
+    #   \param keys The keys of the settings that changed.
+    #   \return Whether the list of settings with an inheritance warning changed.
+    def _updateKeys(self, keys: Iterable[str]) -> bool:
+        state = self._active_state
+        if state is None:
+            return False
+        start_time = time.perf_counter()
+        changed = False
+        for key in keys:
+            if key in self._categories:
+                continue  # Categories have no value. Their warning only depends on the settings in them.
+            self._key_update_count += 1
+            has_overwritten_inheritance = self._settingIsOverwritingInheritance(key)
+            category_key = self._category_keys.get(key)
+
+            # Check if the setting and its category need to be in the list.
+            if has_overwritten_inheritance:
+                if key not in state.overridden_keys:
+                    state.overridden_keys.add(key)
+                    if category_key is not None:
+                        self._category_override_counts[category_key] += 1
+                changed |= self._addWarning(key)
+                if category_key is not None:
+                    changed |= self._addWarning(category_key)
             else:
-                parent = definitions[0]  # Already at a category
-
-            if parent.key not in self._settings_with_inheritance_warning and has_overwritten_inheritance:
-                # Category was not in the list yet, so needs to be added now.
-                self._settings_with_inheritance_warning.append(parent.key)
-                settings_with_inheritance_warning_changed = True
-
-            elif parent.key in self._settings_with_inheritance_warning and not has_overwritten_inheritance:
-                # Category was in the list and one of it's settings is not overwritten.
-                if not self._recursiveCheck(parent):  # Check if any of it's children have overwritten inheritance.
-                    self._settings_with_inheritance_warning.remove(parent.key)
-                    settings_with_inheritance_warning_changed = True
-
-            # Emit the signal if there was any change to the list.
-            if settings_with_inheritance_warning_changed:
-                self.settingsWithIntheritanceChanged.emit()
-
-    def _recursiveCheck(self, definition):
-        for child in definition.children:
-            if child.key in self._settings_with_inheritance_warning:
-                return True
-            if child.children:
-                if self._recursiveCheck(child):
-                    return True
-        return False
+                if key in state.overridden_keys:
+                    state.overridden_keys.remove(key)
+                    self._removeCategoryOverride(key)
+                changed |= self._removeWarning(key)
+                if category_key is not None and self._category_override_counts[category_key] == 0:
+                    # None of the settings in the category overwrite their inheritance any more.
+                    changed |= self._removeWarning(category_key)
+        self._key_update_time += time.perf_counter() - start_time
+        return changed
+
+    def _addWarning(self, key: str) -> bool:
+        if key in self._warning_keys:
+            return False
+        self._warning_keys.add(key)
+        self._settings_with_inheritance_warning.append(key)
+        return True
+
+    def _removeWarning(self, key: str) -> bool:
+        if key not in self._warning_keys:
+            return False
+        self._warning_keys.remove(key)
+        self._settings_with_inheritance_warning.remove(key)
+        return True
+
+    def _removeCategoryOverride(self, key: str) -> None:
+        category_key = self._category_keys.get(key)
+        if category_key is not None and self._category_override_counts[category_key] > 0:
+            self._category_override_counts[category_key] -= 1
+
+    ##  Fill the list of settings with an inheritance warning from the
+    #   settings that overwrite their inheritance in the active stack.
+    def _updateWarnings(self) -> None:
+        overridden_keys = self._active_state.overridden_keys if self._active_state is not None else set()
+        self._category_override_counts = collections.Counter(self._category_keys[key] for key in overridden_keys if key in self._category_keys)
+        self._settings_with_inheritance_warning = list(overridden_keys) + list(self._category_override_counts.keys())
+        self._warning_keys = set(self._settings_with_inheritance_warning)
 
     @pyqtProperty("QVariantList", notify = settingsWithIntheritanceChanged)
     def settingsWithInheritanceWarning(self):
@@ -159,7 +269,6 @@ class SettingInheritanceManager(QObject):
             stack = self._active_container_stack
         if not stack: #No active container stack yet!
             return False
-        containers = [] # type: List[ContainerInterface]
 
         ## Check if the setting has a user state. If not, it is never overwritten.
         has_user_state = stack.getProperty(key, "state") == InstanceState.User
@@ -176,9 +285,7 @@ class SettingInheritanceManager(QObject):
             return False
 
         ##  Mash all containers for all the stacks together.
-        while stack:
-            containers.extend(stack.getContainers())
-            stack = stack.getNextStack()
+        containers = self._getAllContainers(stack)
         has_non_function_value = False
         for container in containers:
             try:
@@ -189,8 +296,9 @@ class SettingInheritanceManager(QObject):
                 # If a setting doesn't use any keys, it won't change it's value, so treat it as if it's a fixed value
                 has_setting_function = isinstance(value, SettingFunction)
                 if has_setting_function:
+                    active_stack_keys = self._getActiveStackKeys()
                     for setting_key in value.getUsedSettingKeys():
-                        if setting_key in self._active_container_stack.getAllKeys():
+                        if setting_key in active_stack_keys:
                             break # We found an actual setting. So has_setting_function can remain true
                     else:
                         # All of the setting_keys turned out to not be setting keys at all!
@@ -205,38 +313,89 @@ class SettingInheritanceManager(QObject):
                 break  # There is a setting function somewhere, stop looking deeper.
         return has_setting_function and has_non_function_value
 
+    ##  Get the containers of a stack and of all the stacks after it.
+    #
+    #   For the active stack these are remembered until its containers change.
+    def _getAllContainers(self, stack: ContainerStack) -> List[ContainerInterface]:
+        state = self._active_state
+        if state is not None and stack is state.stack and state.containers is not None:
+            return state.containers
+        containers = [] # type: List[ContainerInterface]
+        next_stack = stack
+        while next_stack:
+            containers.extend(next_stack.getContainers())
+            next_stack = next_stack.getNextStack()
+        if state is not None and stack is state.stack:
+            state.containers = containers
+        return containers
+
+    ##  Get all setting keys of the active stack, which are remembered until
+    #   the containers change.
+    def _getActiveStackKeys(self) -> Set[str]:
+        if self._active_stack_keys is None:
+            self._active_stack_keys = self._active_container_stack.getAllKeys() if self._active_container_stack else set()
+        return self._active_stack_keys
+
+    ##  Find the category that every setting is in.
+    def _updateCategoryKeys(self) -> None:
+        self._category_keys = {}
+        self._categories = set()
+        for category in self._global_container_stack.definition.findDefinitions(type = "category"):
+            self._categories.add(category.key)
+            for key in category.getAllKeys():
+                if key != category.key:
+                    self._category_keys[key] = category.key
+
     def _update(self):
+        self._update_timer.stop()
         self._settings_with_inheritance_warning = []  # Reset previous data.
+        self._warning_keys = set()
+        self._category_override_counts = collections.Counter()
 
         # Make sure that the GlobalStack is not None. sometimes the globalContainerChanged signal gets here late.
         if self._global_container_stack is None:
             return
 
-        # Check all setting keys that we know of and see if they are overridden.
-        for setting_key in self._global_container_stack.getAllKeys():
-            override = self._settingIsOverwritingInheritance(setting_key)
-            if override:
-                self._settings_with_inheritance_warning.append(setting_key)
+        start_time = time.perf_counter()
+        self._updateCategoryKeys()
+        self._active_stack_keys = None
+        state = self._active_state
+        if state is not None:
+            state.invalidate()
+            # Check all setting keys that we know of and see if they are overridden.
+            state.overridden_keys = {setting_key for setting_key in self._global_container_stack.getAllKeys() if self._settingIsOverwritingInheritance(setting_key)}
+            state.is_complete = True
 
         # Check all the categories if any of their children have their inheritance overwritten.
-        for category in self._global_container_stack.definition.findDefinitions(type = "category"):
-            if self._recursiveCheck(category):
-                self._settings_with_inheritance_warning.append(category.key)
+        self._updateWarnings()
+        update_time = time.perf_counter() - start_time
+        self._full_update_count += 1
+        self._full_update_time += update_time
+        Logger.log("d", "Checking the inheritance of all settings took %.3f s, %s settings overwrite their inheritance", update_time, len(self._settings_with_inheritance_warning))
 
         # Notify others that things have changed.
         self.settingsWithIntheritanceChanged.emit()
 
     def _onGlobalContainerChanged(self):
         if self._global_container_stack:
-            self._global_container_stack.propertyChanged.disconnect(self._onPropertyChanged)
             self._global_container_stack.containersChanged.disconnect(self._onContainersChanged)
+        for state in self._stack_states.values():
+            state.disconnect()
+        self._stack_states = {}
+        self._active_state = None
+        self._active_container_stack = None
+
         self._global_container_stack = Application.getInstance().getGlobalContainerStack()
         if self._global_container_stack:
             self._global_container_stack.containersChanged.connect(self._onContainersChanged)
-            self._global_container_stack.propertyChanged.connect(self._onPropertyChanged)
         self._onActiveExtruderChanged()
 
+    ##  The containers of a stack changed, so all settings need to be checked
+    #   again.
     def _onContainersChanged(self, container):
+        for state in self._stack_states.values():
+            state.invalidate()
+        self._active_stack_keys = None
         self._update_timer.start()
 
     @staticmethod
@@ -59,14 +59,15 @@ class SettingOverrideDecorator(SceneNodeDecorator):
         ## Create a fresh decorator object
         deep_copy = SettingOverrideDecorator()
 
-        ## Copy the instance
-        instance_container = copy.deepcopy(self._stack.getContainer(0), memo)
+        ## Copy the instance, but only if it has any settings. The fresh decorator already has an empty one.
+        if self._stack.getContainer(0).getAllKeys():
+            instance_container = copy.deepcopy(self._stack.getContainer(0), memo)
 
-        # A unique name must be added, or replaceContainer will not replace it
-        instance_container.setMetaDataEntry("id", self._generateUniqueName())
+            # A unique name must be added, or replaceContainer will not replace it
+            instance_container.setMetaDataEntry("id", self._generateUniqueName())
 
-        ## Set the copied instance as the first (and only) instance container of the stack.
-        deep_copy._stack.replaceContainer(0, instance_container)
+            ## Set the copied instance as the first (and only) instance container of the stack.
+            deep_copy._stack.replaceContainer(0, instance_container)
 
         # Properly set the right extruder on the copy
         deep_copy.setActiveExtruder(self._extruder_stack)
@@ -0,0 +1,413 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Cura is released under the terms of the LGPLv3 or higher.
+
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, TYPE_CHECKING
+
+from UM.Settings.InstanceContainer import InstanceContainer
+from UM.Settings.Interfaces import ContainerInterface, PropertyEvaluationContext
+from UM.Settings.SettingFunction import SettingFunction
+from UM.Settings.SettingInstance import InstanceState
+from UM.Logger import Logger
+import cura.CuraApplication
+
+if TYPE_CHECKING:
+    from cura.Settings.GlobalStack import GlobalStack
+
+
+##  A copy of the settings of an instance container, as they were when the
+#   snapshot was taken.
+#
+#   The properties of the setting instances are copied into plain
+#   dictionaries, so reading them doesn't instantiate cached values or emit
+#   signals, and can be done from any thread.
+class ContainerSnapshot:
+    ##  \param container The instance container to copy the settings of. This
+    #   must be called from the thread that changes the container, normally
+    #   the main thread.
+    def __init__(self, container: InstanceContainer) -> None:
+        self._id = container.getId() #type: str
+        self._metadata = dict(container.getMetaData()) #type: Dict[str, Any]
+        self._properties = {} #type: Dict[str, Dict[str, Any]]
+
+        for key in container.getAllKeys():
+            instance = container.getInstance(key)
+            if instance is None:
+                continue
+            properties = {property_name: getattr(instance, property_name) for property_name in instance.getPropertyNames()}
+            properties["state"] = instance.state
+            if instance.validationState is not None:
+                properties["validationState"] = instance.validationState
+            self._properties[key] = properties
+
+    def getId(self) -> str:
+        return self._id
+
+    def getMetaData(self) -> Dict[str, Any]:
+        return self._metadata
+
+    def getMetaDataEntry(self, entry: str, default: Any = None) -> Any:
+        return self._metadata.get(entry, default)
+
+    def getAllKeys(self) -> Set[str]:
+        return set(self._properties.keys())
+
+    def getProperty(self, key: str, property_name: str, context: Optional[PropertyEvaluationContext] = None) -> Any:
+        properties = self._properties.get(key)
+        if properties is None:
+            return None
+        return properties.get(property_name)
+
+    def hasProperty(self, key: str, property_name: str) -> bool:
+        return property_name in self._properties.get(key, {})
+
+
+##  A read-only copy of a container stack.
+#
+#   The instance containers of the stack are copied, while the definition
+#   containers are shared with the stack since they don't change after they
+#   are loaded. Properties are evaluated in the same way as ContainerStack
+#   does, but setting functions use the operators of the settings snapshot,
+#   so they never read from the stacks that the user is changing.
+class StackSnapshot:
+    ##  \param snapshot The settings snapshot this stack is part of.
+    #   \param stack The stack to copy.
+    #   \param container_snapshots The copies of instance containers that were
+    #   already made for other stacks in this snapshot, by their Python ID.
+    def __init__(self, snapshot: "SettingsSnapshot", stack: ContainerInterface, container_snapshots: Dict[int, ContainerSnapshot]) -> None:
+        self._snapshot = snapshot
+        self._id = stack.getId() #type: str
+        self._metadata = dict(stack.getMetaData()) #type: Dict[str, Any]
+        self._next_stack = None #type: Optional[StackSnapshot]
+        self._all_keys = None #type: Optional[Set[str]] # Only computed when requested.
+
+        self._containers = [] #type: List[ContainerInterface]
+        for container in stack.getContainers():
+            if isinstance(container, InstanceContainer):
+                if id(container) not in container_snapshots:
+                    container_snapshots[id(container)] = ContainerSnapshot(container)
+                container = container_snapshots[id(container)]
+            self._containers.append(container)
+
+    def getId(self) -> str:
+        return self._id
+
+    def getMetaData(self) -> Dict[str, Any]:
+        return self._metadata
+
+    def getMetaDataEntry(self, entry: str, default: Any = None) -> Any:
+        return self._metadata.get(entry, default)
+
+    def getContainers(self) -> List[ContainerInterface]:
+        return self._containers[:]
+
+    def getTop(self) -> Optional[ContainerInterface]:
+        if self._containers:
+            return self._containers[0]
+        return None
+
+    ##  Find the first container with the specified metadata entries, like
+    #   ContainerStack.findContainer.
+    def findContainer(self, criteria: Dict[str, Any] = None, **kwargs: Any) -> Optional[ContainerInterface]:
+        if not criteria:
+            criteria = kwargs
+        for container in self._containers:
+            if all(criteria[key] == "*" or container.getMetaDataEntry(key) == criteria[key] for key in criteria):
+                return container
+        return None
+
+    def getNextStack(self) -> Optional["StackSnapshot"]:
+        return self._next_stack
+
+    def getAllKeys(self) -> Set[str]:
+        if self._all_keys is None:
+            keys = set() #type: Set[str]
+            for container in self._containers:
+                if not isinstance(container, ContainerSnapshot):
+                    keys |= container.getAllKeys()
+            if self._next_stack:
+                keys |= self._next_stack.getAllKeys()
+            self._all_keys = keys
+        return self._all_keys
+
+    def hasProperty(self, key: str, property_name: str) -> bool:
+        for container in self._containers:
+            if container.hasProperty(key, property_name):
+                return True
+        if self._next_stack:
+            return self._next_stack.hasProperty(key, property_name)
+        return False
+
+    ##  Get the value of a property, like ContainerStack.getProperty.
+    def getProperty(self, key: str, property_name: str, context: Optional[PropertyEvaluationContext] = None) -> Any:
+        context = self._snapshot.prepareContext(context)
+        value = self.getRawProperty(key, property_name, context = context)
+        if isinstance(value, SettingFunction):
+            context.pushContainer(self)
+            value = value(self, context)
+            context.popContainer()
+        return value
+
+    ##  Get the raw value of a property, like ContainerStack.getRawProperty.
+    def getRawProperty(self, key: str, property_name: str, *, context: Optional[PropertyEvaluationContext] = None,
+                       use_next: bool = True, skip_until_container: Optional[str] = None) -> Any:
+        containers = self._containers
+        if context is not None:
+            start_index = context.context.get("evaluate_from_container_index", 0)
+            if start_index >= len(self._containers):
+                return None
+            containers = self._containers[start_index:]
+
+        for container in containers:
+            if skip_until_container and container.getId() != skip_until_container:
+                continue
+            skip_until_container = None
+
+            value = container.getProperty(key, property_name, context)
+            if value is not None:
+                return value
+
+        if self._next_stack and use_next:
+            return self._next_stack.getRawProperty(key, property_name, context = context, use_next = use_next, skip_until_container = skip_until_container)
+        return None
+
+
+##  A read-only copy of a global stack, which evaluates properties like
+#   GlobalStack does.
+class GlobalStackSnapshot(StackSnapshot):
+    def __init__(self, snapshot: "SettingsSnapshot", stack: "GlobalStack", container_snapshots: Dict[int, ContainerSnapshot]) -> None:
+        super().__init__(snapshot, stack, container_snapshots)
+        self._definition = stack.definition
+        self._extruders = {} #type: Dict[str, ExtruderStackSnapshot]
+
+        # The settings that are being resolved, to prevent infinite recursion.
+        # Every thread that evaluates the snapshot has its own set.
+        self._resolving_settings = threading.local()
+
+    @property
+    def definition(self) -> ContainerInterface:
+        return self._definition
+
+    @property
+    def extruders(self) -> Dict[str, "ExtruderStackSnapshot"]:
+        return self._extruders
+
+    def getProperty(self, key: str, property_name: str, context: Optional[PropertyEvaluationContext] = None) -> Any:
+        if not self._definition.findDefinitions(key = key):
+            return None
+
+        context = self._snapshot.prepareContext(context)
+        context.pushContainer(self)
+
+        # Handle the "resolve" property.
+        if self._shouldResolve(key, property_name, context):
+            resolving_settings = self._getResolvingSettings()
+            resolving_settings.add(key)
+            resolve = super().getProperty(key, "resolve", context)
+            resolving_settings.remove(key)
+            if resolve is not None:
+                context.popContainer()
+                return resolve
+
+        # Handle the "limit_to_extruder" property.
+        limit_to_extruder = super().getProperty(key, "limit_to_extruder", context)
+        if limit_to_extruder is not None:
+            if limit_to_extruder == -1:
+                limit_to_extruder = int(self._snapshot.getDefaultExtruderPosition())
+            limit_to_extruder = str(limit_to_extruder)
+        if limit_to_extruder is not None and limit_to_extruder != "-1" and limit_to_extruder in self._extruders:
+            if super().getProperty(key, "settable_per_extruder", context):
+                result = self._extruders[limit_to_extruder].getProperty(key, property_name, context)
+                if result is not None:
+                    context.popContainer()
+                    return result
+            else:
+                Logger.log("e", "Setting {setting} has limit_to_extruder but is not settable per extruder!", setting = key)
+
+        result = super().getProperty(key, property_name, context)
+        context.popContainer()
+        return result
+
+    def _getResolvingSettings(self) -> Set[str]:
+        try:
+            return self._resolving_settings.keys
+        except AttributeError:
+            self._resolving_settings.keys = set()
+            return self._resolving_settings.keys
+
+    def _shouldResolve(self, key: str, property_name: str, context: PropertyEvaluationContext) -> bool:
+        if property_name != "value":
+            return False
+        if key in self._getResolvingSettings():
+            return False
+        setting_state = super().getProperty(key, "state", context)
+        if setting_state is not None and setting_state != InstanceState.Default:
+            return False
+        return True
+
+
+##  A read-only copy of an extruder stack, which evaluates properties like
+#   ExtruderStack does.
+class ExtruderStackSnapshot(StackSnapshot):
+    def __init__(self, snapshot: "SettingsSnapshot", stack: ContainerInterface, container_snapshots: Dict[int, ContainerSnapshot], global_stack: GlobalStackSnapshot) -> None:
+        super().__init__(snapshot, stack, container_snapshots)
+        self._next_stack = global_stack
+        self._is_enabled = stack.isEnabled #type: bool
+
+    @property
+    def isEnabled(self) -> bool:
+        return self._is_enabled
+
+    def getNextStack(self) -> GlobalStackSnapshot:
+        return self._next_stack
+
+    def getProperty(self, key: str, property_name: str, context: Optional[PropertyEvaluationContext] = None) -> Any:
+        context = self._snapshot.prepareContext(context)
+        context.pushContainer(self)
+
+        if not super().getProperty(key, "settable_per_extruder", context):
+            result = self.getNextStack().getProperty(key, property_name, context)
+            context.popContainer()
+            return result
+
+        limit_to_extruder = super().getProperty(key, "limit_to_extruder", context)
+        if limit_to_extruder is not None:
+            if limit_to_extruder == -1:
+                limit_to_extruder = int(self._snapshot.getDefaultExtruderPosition())
+            limit_to_extruder = str(limit_to_extruder)
+        if (limit_to_extruder is not None and limit_to_extruder != "-1") and self.getMetaDataEntry("position") != limit_to_extruder:
+            if limit_to_extruder in self.getNextStack().extruders:
+                result = self.getNextStack().extruders[limit_to_extruder].getProperty(key, property_name, context)
+                if result is not None:
+                    context.popContainer()
+                    return result
+
+        result = super().getProperty(key, property_name, context)
+        context.popContainer()
+        return result
+
+    ##  The material of the extruder, to get the metadata of.
+    @property
+    def material(self) -> Optional[ContainerInterface]:
+        return self.findContainer({"type": "material"})
+
+
+##  An immutable copy of the settings of a global stack and its extruders.
+#
+#   Taking a snapshot only copies the instance containers of the stacks,
+#   which hold the few settings that differ from the definitions, so it is
+#   cheap enough to do on the main thread when a job is started. The job can
+#   then evaluate any setting of the snapshot from its own thread, while the
+#   user keeps changing the settings. No locks are taken and no signals are
+#   emitted while evaluating, and setting functions get their values from the
+#   snapshot, also through extruderValue(s), resolveOrValue and
+#   defaultExtruderPosition.
+class SettingsSnapshot:
+    ##  Take a snapshot of the settings.
+    #
+    #   This must be called from the main thread.
+    #   \param global_stack The global stack to copy, with its extruders.
+    #   \param default_extruder_position The position of the extruder that
+    #   settings limited to extruder -1 use. Defaults to the one of the
+    #   machine manager.
+    def __init__(self, global_stack: "GlobalStack", default_extruder_position: Optional[str] = None) -> None:
+        if default_extruder_position is None:
+            default_extruder_position = cura.CuraApplication.CuraApplication.getInstance().getMachineManager().defaultExtruderPosition
+        self._default_extruder_position = str(default_extruder_position) #type: str
+
+        # The operators for setting functions, for normal evaluation and for
+        # evaluation that skips containers at the top of the stacks.
+        self._operators = self._createOperators(use_defaults = False) #type: Dict[str, Callable]
+        self._default_operators = self._createOperators(use_defaults = True) #type: Dict[str, Callable]
+
+        container_snapshots = {} #type: Dict[int, ContainerSnapshot]
+        self._global_stack = GlobalStackSnapshot(self, global_stack, container_snapshots)
+        for position, extruder_stack in global_stack.extruders.items():
+            self._global_stack.extruders[position] = ExtruderStackSnapshot(self, extruder_stack, container_snapshots, self._global_stack)
+
+    def getGlobalStack(self) -> GlobalStackSnapshot:
+        return self._global_stack
+
+    def getExtruderStack(self, position: str) -> Optional[ExtruderStackSnapshot]:
+        return self._global_stack.extruders.get(str(position))
+
+    ##  Get the extruders, ordered by their position.
+    def getExtruderStacks(self) -> List[ExtruderStackSnapshot]:
+        return [self._global_stack.extruders[position] for position in sorted(self._global_stack.extruders, key = int)]
+
+    def getDefaultExtruderPosition(self) -> str:
+        return self._default_extruder_position
+
+    ##  Make a context evaluate setting functions with the operators of this
+    #   snapshot.
+    #
+    #   \param context The context to evaluate a property with, or None to
+    #   create a new one.
+    #   \return The context to evaluate the property with.
+    def prepareContext(self, context: Optional[PropertyEvaluationContext] = None) -> PropertyEvaluationContext:
+        if context is None:
+            context = PropertyEvaluationContext()
+        operators = self._default_operators if context.context.get("evaluate_from_container_index", 0) else self._operators
+        if context.context.get("override_operators") is not operators:
+            context.context["override_operators"] = operators
+        return context
+
+    def _createContext(self, stack: StackSnapshot, use_defaults: bool) -> PropertyEvaluationContext:
+        context = PropertyEvaluationContext(stack)
+        if use_defaults:
+            context.context["evaluate_from_container_index"] = 1 # Skip the user changes container.
+        return self.prepareContext(context)
+
+    ##  Creates the operators like those of the extruder manager, which read
+    #   from this snapshot.
+    #
+    #   \param use_defaults Whether to skip the user changes, like the
+    #   getDefault... functions of the extruder manager.
+    def _createOperators(self, use_defaults: bool) -> Dict[str, Callable]:
+        def extruderValues(key: str) -> List[Any]:
+            global_stack = self._global_stack
+            context = self._createContext(global_stack, use_defaults) if use_defaults else None
+            result = []
+            for extruder in self.getExtruderStacks():
+                if not use_defaults and not extruder.isEnabled:
+                    continue
+                # Only include values from extruders that are "active" for the current machine instance.
+                if int(extruder.getMetaDataEntry("position")) >= global_stack.getProperty("machine_extruder_count", "value", context = context):
+                    continue
+
+                value = extruder.getRawProperty(key, "value", context = context)
+                if value is None:
+                    continue
+                if isinstance(value, SettingFunction):
+                    value = value(extruder, context = context if use_defaults else self._createContext(extruder, False))
+                result.append(value)
+
+            if not result:
+                result.append(global_stack.getProperty(key, "value", context = context))
+            return result
+
+        def extruderValue(extruder_index: int, key: str) -> Any:
+            if extruder_index == -1 and not use_defaults:
+                extruder_index = int(self._default_extruder_position)
+            extruder = self.getExtruderStack(str(extruder_index))
+            if extruder:
+                context = self._createContext(extruder, use_defaults)
+                value = extruder.getRawProperty(key, "value", context = context if use_defaults else None)
+                if isinstance(value, SettingFunction):
+                    value = value(extruder, context = context)
+            else: # Just a value from global.
+                value = self._global_stack.getProperty(key, "value", context = self._createContext(self._global_stack, use_defaults) if use_defaults else None)
+            return value
+
+        def resolveOrValue(key: str) -> Any:
+            return self._global_stack.getProperty(key, "value", context = self._createContext(self._global_stack, use_defaults) if use_defaults else None)
+
+        def defaultExtruderPosition() -> str:
+            return self._default_extruder_position
+
+        return {
+            "extruderValues": extruderValues,
+            "extruderValue": extruderValue,
+            "resolveOrValue": resolveOrValue,
+            "defaultExtruderPosition": defaultExtruderPosition
+        }
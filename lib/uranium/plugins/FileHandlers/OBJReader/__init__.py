@@ -4,19 +4,5 @@
 #Shoopdawoop
 from . import OBJReader
 
-from UM.i18n import i18nCatalog
-i18n_catalog = i18nCatalog("uranium")
-
-def getMetaData():
-    return {
-        "mesh_reader": [
-            {
-                "extension": "obj",
-                "description": i18n_catalog.i18nc("@item:inlistbox", "Wavefront OBJ File")
-            }
-        ]
-    }
-
-
 def register(app):
     return {"mesh_reader": OBJReader.OBJReader()}
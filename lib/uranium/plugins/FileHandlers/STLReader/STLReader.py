@@ -4,6 +4,7 @@
 
 from UM.Mesh.MeshReader import MeshReader
 from UM.Mesh.MeshBuilder import MeshBuilder
+from UM.Mesh.MeshData import MeshData
 from UM.Logger import Logger
 from UM.Scene.SceneNode import SceneNode
 from UM.Job import Job
@@ -61,15 +62,27 @@ class STLReader(MeshReader):
 
     ## Decide if we need to use ascii or binary in order to read file
     def _read(self, file_name):
-        mesh_builder = MeshBuilder()
+        mesh_builder = self._loadMeshBuilder(file_name)
+
+        if mesh_builder.getVertexCount() == 0:
+            Logger.log("d", "File did not contain valid data, unable to read.")
+            return None  # We didn't load anything.
         scene_node = SceneNode()
+        scene_node.setMeshData(mesh_builder.build())
+        Logger.log("d", "Loaded a mesh with %s vertices", mesh_builder.getVertexCount())
 
-        self.load_file(file_name, mesh_builder, _use_numpystl = use_numpystl)
+        return scene_node
 
-        mesh = mesh_builder.build()
+    def getWorkerReadFunction(self):
+        return readMeshArrays
 
-        if use_numpystl:
-            verts = mesh.getVertices()
+    ##  Load a file into a mesh builder, with or without numpy-stl.
+    def _loadMeshBuilder(self, file_name):
+        mesh_builder = MeshBuilder()
+        self.load_file(file_name, mesh_builder, _use_numpystl = use_numpystl)
+
+        if use_numpystl and mesh_builder.getVertexCount() > 0:
+            verts = mesh_builder.getVertices()
             # In some cases numpy stl reads incorrectly and the result is that the Z values are all 0
             # Add new error cases if you find them.
             if numpy.amin(verts[:, 1]) == numpy.amax(verts[:, 1]):
@@ -77,19 +90,12 @@ class STLReader(MeshReader):
                 Logger.log("w", "All Z coordinates are the same using numpystl, trying again without numpy stl.")
                 mesh_builder = MeshBuilder()
                 self.load_file(file_name, mesh_builder, _use_numpystl = False)
-                mesh = mesh_builder.build()
 
-                verts = mesh.getVertices()
+                verts = mesh_builder.getVertices()
                 if numpy.amin(verts[:, 1]) == numpy.amax(verts[:, 1]):
                     Logger.log("e", "All Z coordinates are still the same without numpy stl... let's hope for the best")
 
-        if mesh_builder.getVertexCount() == 0:
-            Logger.log("d", "File did not contain valid data, unable to read.")
-            return None  # We didn't load anything.
-        scene_node.setMeshData(mesh)
-        Logger.log("d", "Loaded a mesh with %s vertices", mesh_builder.getVertexCount())
-
-        return scene_node
+        return mesh_builder
 
     def _swapColumns(self, array, frm, to):
         array[:, [frm, to]] = array[:, [to, frm]]
@@ -164,3 +170,28 @@ class STLReader(MeshReader):
             Job.yieldThread()
 
         return True
+
+
+##  Read an STL file into arrays, centered around (0, 0, 0).
+#
+#   This runs in a worker process, see MeshReader.getWorkerReadFunction. Next
+#   to parsing, it also centers the mesh and computes its convex hull, so that
+#   the application only has to create the scene node.
+#   \param file_name The STL file to read.
+#   \return A dictionary with the arrays of the mesh, or None if the file did
+#   not contain valid data.
+def readMeshArrays(file_name):
+    mesh_builder = STLReader()._loadMeshBuilder(file_name)
+    if mesh_builder.getVertexCount() == 0:
+        return None
+
+    vertices = mesh_builder.getVertices()
+    center = (vertices.min(axis = 0) + vertices.max(axis = 0)) / 2
+    vertices = vertices - center
+    convex_hull_vertices = MeshData(vertices = vertices).getConvexHullVertices()
+    return {
+        "vertices": vertices,
+        "normals": mesh_builder.getNormals(),
+        "convex_hull_vertices": convex_hull_vertices,
+        "center": center.tolist()
+    }
@@ -1,13 +1,30 @@
+import multiprocessing
 import os.path
+import threading
+import time
+from unittest.mock import MagicMock, patch
 
+import numpy
+import pytest
 import sys
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 
 import STLReader
+from UM.Math.Vector import Vector
 from UM.Mesh.MeshBuilder import MeshBuilder
+from UM.Mesh.MeshFileHandler import MeshFileHandler
+from UM.Mesh.MeshReadProcessPool import MeshReadProcessPool
+import UM.Mesh.MeshReadWorker as MeshReadWorker
 
 test_path = os.path.join(os.path.dirname(STLReader.__file__), "tests")
 
+##  Read functions for the worker processes to run.
+def readMainModuleFile(file_name):
+    return os.path.basename(sys.modules["__main__"].__file__)
+
+def readSlowly(file_name):
+    time.sleep(30)
+
 def test_readASCII(application):
     reader = STLReader.STLReader()
     ascii_path = os.path.join(test_path, "simpleTestCubeASCII.stl")
@@ -38,3 +55,129 @@ def test_readBinary(application):
         assert mesh_builder.getVertexCount() != 0
     assert result
 
+
+def test_readMeshArrays(application):
+    reader = STLReader.STLReader()
+    binary_path = os.path.join(test_path, "simpleTestCubeBinary.stl")
+    mesh = reader.read(binary_path).getMeshData()
+
+    result = STLReader.readMeshArrays(binary_path)
+
+    assert result["vertices"].shape == mesh.getVertices().shape
+    # The result must be centered around (0, 0, 0).
+    assert numpy.allclose(result["vertices"].min(axis = 0), -result["vertices"].max(axis = 0))
+    assert numpy.allclose(result["vertices"] + result["center"], mesh.getVertices())
+    assert result["convex_hull_vertices"] is not None
+
+##  The node made from the worker result must end up where a centered node
+#   that is read in this process ends up.
+def test_createNodeFromWorkerResult(application):
+    reader = STLReader.STLReader()
+    binary_path = os.path.join(test_path, "simpleTestCubeBinary.stl")
+    node = reader.read(binary_path)
+    extents = node.getMeshData().getExtents()
+    node.setCenterPosition(Vector(extents.center.x, extents.center.y, extents.center.z)) # As MeshFileHandler.readerRead does.
+
+    worker_node = reader.createNodeFromWorkerResult(binary_path, STLReader.readMeshArrays(binary_path))
+
+    assert numpy.allclose(worker_node.getMeshData().getVertices(), node.getMeshData().getVertices())
+    assert worker_node.getMeshData().getCenterPosition() == node.getMeshData().getCenterPosition()
+    assert worker_node.getMeshData().getZeroPosition() == node.getMeshData().getZeroPosition()
+
+##  If the worker process fails, the file is read in this process instead.
+def test_readerReadFallsBackWithoutWorker(application):
+    file_handler = MeshFileHandler.getInstance() or MeshFileHandler(application)
+    reader = STLReader.STLReader()
+    binary_path = os.path.join(test_path, "simpleTestCubeBinary.stl")
+
+    with patch.object(MeshReadProcessPool, "read", side_effect = ImportError("Can't import the reader.")):
+        result = file_handler.readerRead(reader, binary_path)
+
+    assert result is not None
+    assert len(result) == 1
+    assert result[0].getMeshData().getVertexCount() == 36
+
+##  The worker processes must not run the main script of the application.
+def test_workerMainModule():
+    pool = MeshReadProcessPool(1)
+    try:
+        assert pool.read(readMainModuleFile, "") == "MeshReadWorker.py"
+    finally:
+        pool.shutdown()
+
+##  A read that takes too long fails rather than waiting for the worker forever.
+def test_readTimeout():
+    pool = MeshReadProcessPool(1, timeout = 1)
+    try:
+        with pytest.raises(multiprocessing.TimeoutError):
+            pool.read(readSlowly, "")
+        assert pool._pool is None # The worker is stopped, so the next read gets a new one.
+    finally:
+        pool.shutdown()
+
+##  The module of the read function is found before anything else with the
+#   same name on the module search path.
+def test_readFunctionSearchPathFirst(tmpdir):
+    tmpdir.join("STLReader.py").write("") # Has no readMeshArrays.
+    binary_path = os.path.join(test_path, "simpleTestCubeBinary.stl")
+    original_path = list(sys.path)
+    original_module = sys.modules.pop("STLReader")
+    sys.path.insert(0, str(tmpdir))
+    try:
+        result, _ = MeshReadWorker.runReadFunction([os.path.dirname(STLReader.__file__)], "STLReader", "readMeshArrays", binary_path)
+    finally:
+        sys.path[:] = original_path
+        sys.modules["STLReader"] = original_module
+
+    assert result["vertices"].shape == (36, 3)
+
+##  Frozen builds only read in worker processes on Windows.
+@pytest.mark.parametrize("is_windows", [True, False])
+def test_readerReadFrozen(application, is_windows):
+    file_handler = MeshFileHandler.getInstance() or MeshFileHandler(application)
+    reader = STLReader.STLReader()
+    binary_path = os.path.join(test_path, "simpleTestCubeBinary.stl")
+    pool = MagicMock(read = MagicMock(return_value = STLReader.readMeshArrays(binary_path)))
+
+    with patch.object(sys, "frozen", True, create = True):
+        with patch("UM.Platform.Platform.isWindows", MagicMock(return_value = is_windows)):
+            with patch.object(MeshReadProcessPool, "getInstance", MagicMock(return_value = pool)):
+                result = file_handler.readerRead(reader, binary_path)
+
+    assert result[0].getMeshData().getVertexCount() == 36
+    assert pool.read.called == is_windows
+
+##  Read a file many times at once in the worker processes, like a job per file does.
+def readInThreads(pool, file_name, count):
+    results = []
+    threads = [threading.Thread(target = lambda: results.append(pool.read(STLReader.readMeshArrays, file_name))) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+##  Benchmark of loading many files at once in worker processes versus in this process.
+#
+#   The files are tiny, so this mostly measures the overhead of sending the
+#   work to the workers and the result back, which must stay small.
+@pytest.mark.parametrize("file_count", [1, 10, 50])
+def test_benchmarkReadInWorkerProcesses(application, file_count):
+    reader = STLReader.STLReader()
+    binary_path = os.path.join(test_path, "simpleTestCubeBinary.stl")
+    pool = MeshReadProcessPool()
+    readInThreads(pool, binary_path, 4 * pool._process_count) # Start the worker processes before timing.
+
+    start_time = time.time()
+    for _ in range(file_count):
+        reader.read(binary_path)
+    serial_time = time.time() - start_time
+
+    start_time = time.time()
+    results = readInThreads(pool, binary_path, file_count)
+    pool_time = time.time() - start_time
+    pool.shutdown()
+
+    assert len(results) == file_count
+    assert all(result["vertices"].shape == (36, 3) for result in results)
+    assert pool_time < serial_time + 0.05 * file_count
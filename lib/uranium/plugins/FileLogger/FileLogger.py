@@ -9,11 +9,23 @@ import logging
 import sys
 import os.path
 
+
+##  A file handler that doesn't flush after every message. The Logger calls
+#   FileLogger.flush once per batch of messages instead.
+class _BatchedFileHandler(logging.FileHandler):
+    def flush(self):
+        pass
+
+    def flushBatch(self):
+        super().flush()
+
+
 class FileLogger(LogOutput):
     def __init__(self, file_name):
         super().__init__()
         self._logger =  logging.getLogger(self._name)  # Create python logger
         self._logger.setLevel(logging.DEBUG)
+        self._file_handlers = []
 
         # Do not try to save to the app dir as it may not be writeable or may not be the right
         # location to save the log file. Instead, try and save in the settings location since
@@ -23,10 +35,11 @@ class FileLogger(LogOutput):
 
     def setFileName(self, file_name):
         if ".log" in file_name:
-            file_handler = logging.FileHandler(file_name, encoding = "utf-8")
+            file_handler = _BatchedFileHandler(file_name, encoding = "utf-8")
             format_handler = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
             file_handler.setFormatter(format_handler)
             self._logger.addHandler(file_handler)
+            self._file_handlers.append(file_handler)
         else:
             pass  # TODO, add handling
     
@@ -46,3 +59,8 @@ class FileLogger(LogOutput):
             self._logger.critical(message)
         else:
             print("Unable to log. Received unknown type %s" % log_type)
+
+    ##  Write the messages to the file.
+    def flush(self):
+        for file_handler in self._file_handlers:
+            file_handler.flushBatch()
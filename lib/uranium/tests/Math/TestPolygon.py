@@ -0,0 +1,168 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Uranium is released under the terms of the LGPLv3 or higher.
+
+import time
+
+import numpy
+import pytest
+
+from UM.Math.Polygon import Polygon
+
+
+def createConvexPolygon(random, point_count, offset = (0, 0)):
+    return Polygon(random.uniform(-10, 10, (point_count, 2)).astype(numpy.float32) + numpy.array(offset, numpy.float32)).getConvexHull()
+
+
+##  The previous implementations of the polygon functions, which test one
+#   edge, point or pair of points at a time. These serve as reference for the
+#   results and as baseline for the benchmarks.
+def referenceIntersectsPolygon(polygon, other):
+    ret_size = 10000000.0
+    ret = None
+    for points in (polygon.getPoints(), other.getPoints()):
+        for n in range(0, len(points)):
+            normal = (points[n] - points[n - 1])[::-1]
+            normal[1] = -normal[1]
+            normal /= numpy.linalg.norm(normal)
+
+            a_min, a_max = min(numpy.dot(normal, point) for point in polygon.getPoints()), max(numpy.dot(normal, point) for point in polygon.getPoints())
+            b_min, b_max = min(numpy.dot(normal, point) for point in other.getPoints()), max(numpy.dot(normal, point) for point in other.getPoints())
+            if a_min > b_max or b_min > a_max:
+                return None
+            size = min(a_max, b_max) - max(a_min, b_min)
+            if size < ret_size:
+                ret = normal * (-size if a_min < b_min else size)
+                ret_size = size
+    return (ret[0], ret[1]) if ret is not None else None
+
+def referenceMinkowskiHull(polygon, other):
+    points = numpy.zeros((len(polygon.getPoints()) * len(other.getPoints()), 2))
+    for n in range(0, len(polygon.getPoints())):
+        for m in range(0, len(other.getPoints())):
+            points[n * len(other.getPoints()) + m] = polygon.getPoints()[n] + other.getPoints()[m]
+    return Polygon(points).getConvexHull()
+
+def referenceIsInside(polygon, point):
+    points = polygon.getPoints()
+    for i in range(0, len(points)):
+        if polygon._isRightTurn(points[i], points[(i + 1) % len(points)], point) == -1:
+            return False
+    return True
+
+
+def test_intersectsPolygon():
+    random = numpy.random.RandomState(1337)
+    for _ in range(200):
+        polygon = createConvexPolygon(random, 8)
+        other = createConvexPolygon(random, 8, random.uniform(-15, 15, 2))
+        expected = referenceIntersectsPolygon(polygon, other)
+        result = polygon.intersectsPolygon(other)
+        if expected is None:
+            assert result is None
+        else:
+            assert result == pytest.approx(expected, abs = 1e-4)
+
+def test_intersectsPolygonSquares():
+    square = Polygon(numpy.array([[0, 0], [0, 10], [10, 10], [10, 0]], numpy.float32))
+    assert square.intersectsPolygon(square.translate(20, 0)) is None
+    assert square.intersectsPolygon(square.translate(8, 0)) == pytest.approx((-2, 0))
+    assert square.intersectsPolygon(square.translate(-8, 0)) == pytest.approx((2, 0))
+    assert square.intersectsPolygon(Polygon(numpy.zeros((1, 2)))) is None
+
+def test_intersectsPolygons():
+    random = numpy.random.RandomState(1337)
+    polygon = createConvexPolygon(random, 8)
+    others = [createConvexPolygon(random, random.randint(3, 12), random.uniform(-20, 20, 2)) for _ in range(100)]
+    others += [None, Polygon(numpy.zeros((1, 2)))]
+
+    results = polygon.intersectsPolygons(others)
+
+    assert len(results) == len(others)
+    for other, result in zip(others, results):
+        expected = polygon.intersectsPolygon(other)
+        if expected is None:
+            assert result is None
+        else:
+            assert result == pytest.approx(expected, abs = 1e-4)
+
+##  Polygons on a small grid of whole numbers often touch or have overlaps of
+#   the same size on several axes. The results must still be exactly those of
+#   intersectsPolygon.
+@pytest.mark.parametrize("dtype", [numpy.float32, numpy.float64])
+def test_intersectsPolygonsSameAsIntersectsPolygon(dtype):
+    random = numpy.random.RandomState(1337)
+    for _ in range(300):
+        polygon = Polygon(random.randint(0, 6, (random.randint(3, 7), 2)).astype(dtype)).getConvexHull()
+        others = [Polygon(random.randint(0, 6, (random.randint(3, 7), 2)).astype(dtype)).getConvexHull() for _ in range(10)]
+
+        results = polygon.intersectsPolygons(others)
+
+        assert results == [polygon.intersectsPolygon(other) for other in others]
+
+def test_intersectsPolygonsTouching():
+    square = Polygon(numpy.array([[0, 0], [0, 10], [10, 10], [10, 0]], numpy.float32))
+    others = [square.translate(10, 0), square.translate(0, -10), square.translate(10, 10), square.translate(10.001, 0)]
+
+    assert square.intersectsPolygons(others) == [(0, 0), (0, 0), (0, 0), None]
+    assert [square.intersectsPolygon(other) for other in others] == [(0, 0), (0, 0), (0, 0), None]
+
+    # Overlaps of the same size on two axes must pick the same axis and direction.
+    polygon = Polygon(numpy.array([[2, 5], [5, 3], [2, 0]], numpy.float64))
+    other = Polygon(numpy.array([[3, 5], [4, 5], [3, 3], [0, 2]], numpy.float64))
+    assert polygon.intersectsPolygons([other]) == [polygon.intersectsPolygon(other)]
+    assert polygon.intersectsPolygon(other) == pytest.approx((1, -1))
+
+def test_getMinkowskiHull():
+    random = numpy.random.RandomState(1337)
+    for _ in range(200):
+        polygon = Polygon(random.uniform(-10, 10, (random.randint(3, 40), 2)).astype(numpy.float32)) # Both small and big enough to merge the edges.
+        other = Polygon(random.uniform(-10, 10, (random.randint(3, 40), 2)).astype(numpy.float32))
+        expected = referenceMinkowskiHull(polygon, other).getPoints()
+        result = polygon.getMinkowskiHull(other).getPoints()
+
+        assert len(result) == len(expected)
+        start = numpy.argmin(numpy.linalg.norm(result - expected[0], axis = 1)) # The hulls may start at a different vertex.
+        assert numpy.roll(result, -start, axis = 0) == pytest.approx(expected, abs = 1e-4)
+
+def test_getMinkowskiHullDegenerate():
+    line = Polygon(numpy.array([[0, 0], [10, 0]], numpy.float32))
+    square = Polygon(numpy.array([[0, 0], [0, 1], [1, 1], [1, 0]], numpy.float32))
+    assert len(line.getMinkowskiHull(square).getPoints()) == 4
+
+def test_areInside():
+    random = numpy.random.RandomState(1337)
+    polygon = createConvexPolygon(random, 10)
+    points = random.uniform(-12, 12, (500, 2))
+    points[0] = polygon.getPoints()[0] # On a vertex.
+
+    results = polygon.areInside(points)
+
+    assert list(results) == [referenceIsInside(polygon, point) for point in points]
+    assert [polygon.isInside(point) for point in points] == list(results)
+
+
+def benchmark(function, repetitions):
+    start_time = time.time()
+    for _ in range(repetitions):
+        function()
+    return (time.time() - start_time) / repetitions
+
+##  Micro-benchmarks of the polygon functions against the previous
+#   implementations, for polygons with a typical and with a large number of
+#   vertices. Each of them has to be faster than before.
+@pytest.mark.parametrize("point_count", [8, 64])
+def test_benchmarkPolygon(point_count):
+    random = numpy.random.RandomState(1337)
+    polygon = Polygon(Polygon.approximatedCircle(10).getPoints() if point_count == 8 else createConvexPolygon(random, point_count * 4).getPoints()[:point_count])
+    overlapping = polygon.translate(5, 5)
+    others = [polygon.translate(*random.uniform(-40, 40, 2)) for _ in range(100)]
+    points = random.uniform(-12, 12, (1000, 2))
+
+    timings = [
+        ("intersectsPolygon", benchmark(lambda: referenceIntersectsPolygon(polygon, overlapping), 20), benchmark(lambda: polygon.intersectsPolygon(overlapping), 20)),
+        ("intersectsPolygons x100", benchmark(lambda: [referenceIntersectsPolygon(polygon, other) for other in others], 2), benchmark(lambda: polygon.intersectsPolygons(others), 2)),
+        ("getMinkowskiHull", benchmark(lambda: referenceMinkowskiHull(polygon, overlapping), 5), benchmark(lambda: polygon.getMinkowskiHull(overlapping), 5)),
+        ("areInside x1000", benchmark(lambda: [referenceIsInside(polygon, point) for point in points], 1), benchmark(lambda: polygon.areInside(points), 1)),
+    ]
+    for name, reference_time, new_time in timings:
+        assert new_time < reference_time, name
@@ -0,0 +1,134 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Uranium is released under the terms of the LGPLv3 or higher.
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from UM.Settings.ContainerStack import ContainerStack
+from UM.Settings.InstanceContainer import InstanceContainer
+from UM.Settings.SettingDefinition import SettingDefinition
+from UM.Signal import Signal
+
+##  The setting definitions, with the lookup that instance containers need.
+class Definitions:
+    def __init__(self, setting_count):
+        self.category = SettingDefinition("category")
+        children = {"setting_{index}".format(index = index): {"label": "Setting", "description": "A setting.", "type": "float", "default_value": 1}
+                    for index in range(setting_count)}
+        self.category.deserialize({"label": "Category", "description": "A category.", "type": "category", "children": children})
+
+    def findDefinitions(self, **kwargs):
+        return self.category.findDefinitions(**kwargs)
+
+##  An event loop that runs the events when asked, and counts them.
+class EventLoop:
+    def __init__(self):
+        self.events = []
+        self.event_count = 0
+
+    def functionEvent(self, event):
+        self.events.append(event)
+        self.event_count += 1
+
+    def callLater(self, function, *args, **kwargs):
+        self.functionEvent(MagicMock(call = lambda: function(*args, **kwargs)))
+
+    def getMainThread(self):
+        return threading.current_thread()
+
+    ##  Runs all events, including the ones that they add.
+    def run(self):
+        while self.events:
+            self.events.pop(0).call()
+
+@pytest.fixture
+def event_loop():
+    result = EventLoop()
+    with patch.object(Signal, "_app", result), patch("UM.Application.Application.getInstance", return_value = result):
+        yield result
+
+@pytest.fixture
+def stack():
+    definitions = Definitions(200)
+    registry = MagicMock()
+    registry.findDefinitionContainers.return_value = [definitions]
+    with patch("UM.Settings.InstanceContainer._containerRegistry", registry):
+        result = ContainerStack("stack")
+        container = InstanceContainer("user")
+        container.setDefinition("definitions")
+        result.addContainer(container)
+        yield result
+
+##  Applies a profile that changes the value of all settings.
+def applyProfile(stack, value):
+    for definition in stack.getTop().getDefinition().findDefinitions(type = "float"):
+        stack.getTop().setProperty(definition.key, "value", value)
+
+def test_batchedPropertiesChanged(event_loop, stack):
+    batches = []
+    changes = set()
+    def onBatch(batch):
+        batches.append(batch)
+    def onPropertyChanged(key, property_name):
+        changes.add((key, property_name))
+    stack.batchedPropertiesChanged.connect(onBatch)
+    stack.propertyChanged.connect(onPropertyChanged)
+
+    applyProfile(stack, 2)
+    event_loop.run()
+
+    assert len(batches) == 1
+    assert batches[0] == changes # The same changes, all at once.
+    assert ("setting_7", "value") in batches[0]
+
+    event_loop.run()
+    assert len(batches) == 1 # Nothing changed since.
+
+def test_notifyPropertyChanged(event_loop, stack):
+    batches = []
+    changes = []
+    def onBatch(batch):
+        batches.append(batch)
+    def onPropertyChanged(key, property_name):
+        changes.append((key, property_name))
+    stack.batchedPropertiesChanged.connect(onBatch)
+    stack.propertyChanged.connect(onPropertyChanged)
+
+    stack.notifyPropertyChanged("post_processing_plugin", "value")
+    stack.getTop().setProperty("setting_1", "value", 2)
+    event_loop.run()
+
+    assert len(batches) == 1
+    assert {("post_processing_plugin", "value"), ("setting_1", "value")} <= batches[0] # Together with the changes of the containers.
+    assert ("post_processing_plugin", "value") in changes
+
+##  Counts the events and the calls of five receivers, like the build volume,
+#   the back-end and the error checker, when a profile with 200 settings is
+#   applied.
+def test_benchmarkProfileSwitch(event_loop, stack):
+    applyProfile(stack, 1) # So that the settings have instances in both cases.
+    event_loop.run()
+    results = {}
+    for name, signal in (("per property", stack.propertyChanged), ("batched", stack.batchedPropertiesChanged)):
+        calls = []
+        receivers = [lambda *args: calls.append(args) for _ in range(5)]
+        for receiver in receivers:
+            signal.connect(receiver)
+        event_loop.event_count = 0
+
+        start_time = time.perf_counter()
+        applyProfile(stack, len(results) + 2)
+        event_loop.run()
+        duration = time.perf_counter() - start_time
+
+        results[name] = (event_loop.event_count, len(calls), duration)
+        for receiver in receivers:
+            signal.disconnect(receiver)
+
+    assert results["per property"][1] >= 5 * 200 # At least one call per receiver per setting.
+    assert results["batched"][1] == 5 # One call per receiver.
+    assert results["batched"][0] <= results["per property"][0] # Batching doesn't post extra events.
+    assert results["batched"][2] < results["per property"][2] * 1.5 + 0.01
@@ -0,0 +1,187 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Uranium is released under the terms of the LGPLv3 or higher.
+
+import inspect
+import threading
+import time
+
+import pytest
+
+from UM.Logger import Logger, LogOutput
+
+
+##  Keeps the messages in memory.
+class MemoryLogOutput(LogOutput):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.flush_count = 0
+        self.threads = set()
+
+    def log(self, log_type, message):
+        self.messages.append((log_type, message))
+        self.threads.add(threading.current_thread().name)
+
+    def flush(self):
+        self.flush_count += 1
+
+@pytest.fixture
+def output():
+    result = MemoryLogOutput()
+    Logger.addLogger(result)
+    yield result
+    Logger.flush()
+    Logger.getLoggers().remove(result)
+    Logger.setLevel("d")
+    Logger.setRateLimit(100)
+    Logger.setAsynchronous(True)
+
+##  An object that counts how often it's converted to a string.
+class FormatCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __str__(self):
+        self.count += 1
+        return "formatted"
+
+##  Logger.log as it was before, which looks up the source of the caller and
+#   writes the message on the calling thread. This serves as the baseline for
+#   the benchmark.
+def referenceLog(log_type, message, *args):
+    caller_frame = inspect.currentframe().f_back
+    frame_info = inspect.getframeinfo(caller_frame)
+    if args:
+        new_message = message.format(*args)
+        if new_message == message:
+            new_message = message % args
+        message = new_message
+    message = "[{thread}] {class_name}.{function} [{line}]: {message}".format(thread = threading.current_thread().name,
+                                                                              class_name = caller_frame.f_globals["__name__"],
+                                                                              function = frame_info.function,
+                                                                              line = frame_info.lineno,
+                                                                              message = message)
+    for logger in Logger.getLoggers():
+        logger.log(log_type, message)
+
+def test_messageFormat(output):
+    Logger.log("i", "Loaded %s plug-ins in %s seconds", 12, 0.5); line = inspect.currentframe().f_lineno
+    Logger.log("w", "Unknown setting {key}", key = "foo")
+    Logger.flush()
+
+    assert output.messages[0] == ("i", "[{thread}] {module}.test_messageFormat [{line}]: Loaded 12 plug-ins in 0.5 seconds".format(thread = threading.current_thread().name, module = __name__, line = line))
+    assert output.messages[1][1].endswith(": Unknown setting foo")
+
+def test_writtenByBackgroundThread(output):
+    for index in range(10):
+        Logger.log("d", "Message %s", index)
+    Logger.flush()
+
+    assert [message.split(": ")[-1] for _, message in output.messages] == ["Message {index}".format(index = index) for index in range(10)]
+    assert output.threads == {"LogWriter"} or output.threads == {threading.current_thread().name} #Either the writer thread or the flush wrote them.
+    assert output.flush_count <= 10 #Flushed per batch.
+
+def test_synchronous(output):
+    Logger.setAsynchronous(False)
+    Logger.log("i", "Right now")
+
+    assert len(output.messages) == 1 #Without flushing first.
+    assert output.flush_count == 1
+
+def test_criticalIsWrittenImmediately(output):
+    Logger.log("c", "Crashing")
+
+    assert output.messages[-1][1].endswith(": Crashing")
+
+def test_disabledLevelIsNotFormatted(output):
+    Logger.setLevel("w")
+    argument = FormatCounter()
+    Logger.log("d", "Value: %s", argument)
+    Logger.log("i", "Value: {0}", argument)
+    Logger.log("e", "Value: %s", argument)
+    Logger.flush()
+
+    assert argument.count == 1 #Only the error.
+    assert len(output.messages) == 1
+    assert not Logger.isEnabledFor("i")
+    assert Logger.isEnabledFor("w")
+
+def test_rateLimit(output):
+    def logLayer(index):
+        Logger.log("d", "Layer %s", index) #Always the same line of code.
+    Logger.setRateLimit(5)
+    for index in range(20):
+        logLayer(index)
+        Logger.log("e", "Error %s", index) #Errors are never suppressed.
+    Logger.flush()
+
+    debug_messages = [message for log_type, message in output.messages if log_type == "d"]
+    assert len(debug_messages) == 5
+    assert len(output.messages) == 25
+
+    #A new second tells how many were suppressed.
+    time.sleep(1.01)
+    logLayer(20)
+    Logger.flush()
+    assert output.messages[-1][1].endswith("Layer 20 (15 more messages from here were suppressed)")
+
+def test_logException(output):
+    Logger.setRateLimit(1)
+    try:
+        raise ValueError("Broken")
+    except ValueError:
+        Logger.logException("w", "Something went wrong with %s", "this")
+    Logger.flush()
+
+    messages = [message for _, message in output.messages]
+    assert ".test_logException [" in messages[0] #The location of the caller.
+    assert messages[0].endswith("Exception: Something went wrong with this")
+    assert messages[-1].endswith("ValueError: Broken") #The traceback isn't rate-limited.
+
+##  Many threads logging at once mustn't lose or mix up messages.
+def test_threads(output):
+    def logMessages(thread_index):
+        for index in range(200):
+            Logger.log("i", "Thread {thread_index} message {index}", thread_index = thread_index, index = index)
+    Logger.setRateLimit(0)
+    threads = [threading.Thread(target = logMessages, args = (thread_index, )) for thread_index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    Logger.flush()
+
+    assert len(output.messages) == 8 * 200
+    for thread_index in range(8):
+        indices = [int(message.split(" ")[-1]) for _, message in output.messages if "Thread {thread_index} ".format(thread_index = thread_index) in message]
+        assert indices == list(range(200)) #In order per thread.
+
+##  Benchmark of logging against the previous Logger.log. Logging has to be
+#   faster, even including writing the messages, and logging at a disabled
+#   level has to be at least ten times faster still.
+def test_benchmarkLog(output):
+    Logger.setRateLimit(0)
+    count = 50000
+
+    start_time = time.time()
+    for index in range(count):
+        referenceLog("d", "Processing layer %s of %s", index, count)
+    reference_time = time.time() - start_time
+    del output.messages[:]
+
+    start_time = time.time()
+    for index in range(count):
+        Logger.log("d", "Processing layer %s of %s", index, count)
+    log_time = time.time() - start_time
+    Logger.flush()
+    written_time = time.time() - start_time
+
+    Logger.setLevel("i")
+    start_time = time.time()
+    for index in range(count):
+        Logger.log("d", "Processing layer %s of %s", index, count)
+    disabled_time = time.time() - start_time
+
+    assert len(output.messages) == count
+    assert written_time < reference_time #Even including the time to write the messages.
+    assert disabled_time < log_time / 10
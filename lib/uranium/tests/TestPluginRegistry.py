@@ -0,0 +1,194 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Uranium is released under the terms of the LGPLv3 or higher.
+
+import json
+import os
+import sys
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from UM.FileHandler.FileHandler import FileHandler
+from UM.FileHandler.FileReader import FileReader
+from UM.PluginRegistry import PluginRegistry
+from UM.StartupProfiler import StartupProfiler
+
+##  A plug-in that provides its metadata with getMetaData, so it must be
+#   imported to get it.
+tool_plugin = """
+import sys
+sys.imported_test_plugins.append(__name__)
+
+from UM.PluginObject import PluginObject
+
+def getMetaData():
+    return {"test_tool": {"name": "Test Tool"}}
+
+def register(app):
+    return {"test_tool": PluginObject()}
+"""
+
+##  A reader plug-in that provides its metadata in its plugin.json.
+reader_plugin = """
+import sys
+sys.imported_test_plugins.append(__name__)
+
+from UM.FileHandler.FileReader import FileReader
+
+class TestReader(FileReader):
+    def __init__(self):
+        super().__init__()
+        self._supported_extensions = [".{extension}"]
+
+def register(app):
+    return {{"test_reader": TestReader()}}
+"""
+
+def createPlugin(location, plugin_id, source, metadata = None, module_size = 0):
+    plugin_path = os.path.join(location, plugin_id)
+    os.makedirs(plugin_path)
+    plugin_info = {"name": plugin_id, "author": "Ultimaker B.V.", "version": "1.0.0", "description": "A plug-in to test with.", "api": PluginRegistry.APIVersion}
+    if metadata is not None:
+        plugin_info["metadata"] = metadata
+    with open(os.path.join(plugin_path, "plugin.json"), "w", encoding = "utf-8") as f:
+        json.dump(plugin_info, f)
+    with open(os.path.join(plugin_path, "__init__.py"), "w", encoding = "utf-8") as f:
+        f.write(source)
+        # Some code to compile, like the modules of a real plug-in.
+        for index in range(module_size):
+            f.write("def function{index}(value):\n    return [value * {index} for _ in range(10)]\n".format(index = index))
+
+def createReaderPlugin(location, plugin_id, extension, module_size = 0):
+    metadata = {"test_reader": [{"extension": extension, "description": "Test File"}]}
+    createPlugin(location, plugin_id, reader_plugin.format(extension = extension), metadata = metadata, module_size = module_size)
+
+class TestFileHandler(FileHandler):
+    pass
+
+@pytest.fixture
+def registry(tmpdir):
+    sys.imported_test_plugins = []
+    application = MagicMock()
+    application.getApplicationName.return_value = "test"
+    application.getStartupProfiler.return_value = StartupProfiler()
+
+    PluginRegistry._PluginRegistry__instance = None
+    result = PluginRegistry(application)
+    result._savePluginData = MagicMock() # Don't write plugins.json.
+    result.addPluginLocation(str(tmpdir))
+    result.registered_objects = []
+    PluginRegistry.addType("test_tool", result.registered_objects.append)
+    yield result
+
+    for plugin_id in sys.imported_test_plugins:
+        sys.modules.pop(plugin_id, None)
+    del sys.imported_test_plugins
+    PluginRegistry.removeType("test_tool")
+    PluginRegistry._PluginRegistry__instance = None
+
+@pytest.fixture
+def file_handler(registry):
+    TestFileHandler._FileHandler__instance = None
+    result = TestFileHandler(MagicMock(), writer_type = "test_writer", reader_type = "test_reader")
+    yield result
+    PluginRegistry.removeType("test_reader")
+    PluginRegistry.removeType("test_writer")
+    TestFileHandler._FileHandler__instance = None
+
+def test_metaDataFromPluginJson(registry, tmpdir):
+    createReaderPlugin(str(tmpdir), "StubReader", "stub")
+
+    metadata = registry.getMetaData("StubReader")
+
+    assert metadata["test_reader"] == [{"extension": "stub", "description": "Test File"}]
+    assert metadata["plugin"]["version"] == "1.0.0"
+    assert "metadata" not in metadata["plugin"]
+    assert sys.imported_test_plugins == [] # Not imported to get the metadata.
+
+def test_importedOnce(registry, tmpdir):
+    createPlugin(str(tmpdir), "StubTool", tool_plugin)
+
+    registry.loadPlugins()
+
+    assert registry.isLoadedPlugin("StubTool")
+    assert len(registry.registered_objects) == 1
+    assert sys.imported_test_plugins == ["StubTool"] # Not imported again to load it after getting its metadata.
+    times = registry._application.getStartupProfiler().getPluginTimes()
+    assert set(times["StubTool"].keys()) == {"import", "register"}
+
+def test_lazyActivation(registry, file_handler, tmpdir):
+    createPlugin(str(tmpdir), "StubTool", tool_plugin)
+    createReaderPlugin(str(tmpdir), "StubReader", "stub")
+    createReaderPlugin(str(tmpdir), "OtherReader", "other")
+    registry.setLazyActivation(True)
+
+    registry.loadPlugins()
+
+    assert registry.isLoadedPlugin("StubTool") # Tools can't be loaded lazily.
+    assert sorted(registry.getDeferredPlugins()) == ["OtherReader", "StubReader"]
+    assert sys.imported_test_plugins == ["StubTool"]
+    assert registry.isActivePlugin("StubReader")
+    assert file_handler.getSupportedFileTypesRead() == {"stub": "Test File", "other": "Test File"}
+
+    reader = file_handler.getReaderForFile("model.STUB")
+
+    assert reader is not None
+    assert reader.getPluginId() == "StubReader"
+    assert registry.getDeferredPlugins() == ["OtherReader"] # Only the reader for this file was loaded.
+    assert sys.imported_test_plugins == ["StubTool", "StubReader"]
+    assert file_handler.getReaderForFile("model.unknown") is None
+
+def test_noLazyActivation(registry, file_handler, tmpdir):
+    createReaderPlugin(str(tmpdir), "StubReader", "stub")
+
+    registry.loadPlugins()
+
+    assert registry.getDeferredPlugins() == []
+    assert registry.isLoadedPlugin("StubReader")
+
+##  Plug-ins of types that aren't registered as lazy are always loaded.
+def test_typeNotLazy(registry, tmpdir):
+    createReaderPlugin(str(tmpdir), "StubReader", "stub")
+    PluginRegistry.addType("test_reader", lambda reader: None)
+    registry.setLazyActivation(True)
+
+    registry.loadPlugins()
+
+    PluginRegistry.removeType("test_reader")
+    assert registry.getDeferredPlugins() == []
+    assert registry.isLoadedPlugin("StubReader")
+
+def test_deferredPluginPath(registry, file_handler, tmpdir):
+    createReaderPlugin(str(tmpdir), "StubReader", "stub")
+    registry.setLazyActivation(True)
+    registry.loadPlugins()
+
+    assert registry.getPluginPath("StubReader") == os.path.join(str(tmpdir), "StubReader")
+    assert sys.imported_test_plugins == []
+
+##  Starting up with many reader plug-ins, which are imported for the first
+#   time, with lazy activation. Starting up and finding the reader for the
+#   first file must take less time than loading the plug-ins that are still
+#   deferred afterwards, which an eager start-up would have done as well.
+def test_benchmarkLoadPlugins(registry, file_handler, tmpdir):
+    count = 30
+    for index in range(count):
+        createReaderPlugin(str(tmpdir), "BenchmarkReader{index}".format(index = index), "benchmark{index}".format(index = index), module_size = 200)
+    registry.setLazyActivation(True)
+
+    start_time = time.perf_counter()
+    registry.loadPlugins()
+    file_handler.getReaderForFile("model.benchmark0")
+    lazy_time = time.perf_counter() - start_time
+    deferred_plugins = list(registry.getDeferredPlugins())
+    assert len(deferred_plugins) == count - 1
+
+    start_time = time.perf_counter()
+    for plugin_id in deferred_plugins:
+        registry.loadPlugin(plugin_id)
+    deferred_time = time.perf_counter() - start_time
+
+    assert registry.getDeferredPlugins() == []
+    assert file_handler.getReaderForFile("model.benchmark{index}".format(index = count - 1)) is not None
+    assert lazy_time < deferred_time
@@ -0,0 +1,271 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Uranium is released under the terms of the LGPLv3 or higher.
+
+import random
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from PyQt5.QtCore import QModelIndex
+
+from UM.Settings.Models.SettingDefinitionsModel import SettingDefinitionsModel
+from UM.Settings.SettingDefinition import SettingDefinition
+
+words = ["infill", "density", "wall", "line", "width", "speed", "print", "travel", "support", "angle", "top", "bottom",
+         "layer", "height", "temperature", "flow", "retraction", "distance", "cooling", "fan", "brim", "skirt", "pattern",
+         "minimum", "maximum", "outer", "inner", "initial", "extrusion", "coasting"]
+
+##  The setting definitions, with the same lookups as a definition container.
+class Definitions:
+    def __init__(self, categories):
+        self._definitions = categories
+
+    def findDefinitions(self, **kwargs):
+        result = []
+        for definition in self._definitions:
+            result.extend(definition.findDefinitions(**kwargs))
+        return result
+
+    def getInheritedFiles(self):
+        return []
+
+def createSetting(generator, key, children = None):
+    label = " ".join(generator.choice(words) for _ in range(3)).capitalize()
+    result = {"label": label, "description": "The " + " ".join(generator.choice(words) for _ in range(8)) + ".", "type": "float", "default_value": 1}
+    if children:
+        result["children"] = children
+    return result
+
+##  Creates categories with settings that have children.
+def createDefinitions(category_count = 5, parent_count = 4, child_count = 3):
+    generator = random.Random(1337)
+    categories = []
+    for category_index in range(category_count):
+        settings = {}
+        for parent_index in range(parent_count):
+            children = {}
+            for child_index in range(child_count):
+                key = "setting_{category}_{parent}_{child}".format(category = category_index, parent = parent_index, child = child_index)
+                children[key] = createSetting(generator, key)
+            key = "setting_{category}_{parent}".format(category = category_index, parent = parent_index)
+            settings[key] = createSetting(generator, key, children)
+        category = SettingDefinition("category_{category}".format(category = category_index))
+        category.deserialize({"label": "Category {index}".format(index = category_index), "description": "A category.", "type": "category", "children": settings})
+        categories.append(category)
+    return Definitions(categories)
+
+##  The model as it was before, which checks every definition recursively
+#   and adds or removes rows one by one. This serves as the reference for the
+#   results and as the baseline for the benchmark.
+class ReferenceModel(SettingDefinitionsModel):
+    def _buildTree(self):
+        super()._buildTree()
+        self._row_index_list = []
+
+    def _findVisibleRows(self):
+        return []
+
+    def _updateVisibleRows(self):
+        currently_visible = set(self._row_index_list)
+        new_visible = set()
+        for index in range(len(self._definition_list)):
+            if self._isDefinitionVisible(self._definition_list[index]):
+                new_visible.add(index)
+        for index in sorted(list(new_visible - currently_visible)):
+            row = self._findRowToInsert(index)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._row_index_list.insert(row, index)
+            self.endInsertRows()
+        for index in sorted(list(currently_visible - new_visible)):
+            row = self._row_index_list.index(index)
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._row_index_list[row]
+            self.endRemoveRows()
+
+    def _update(self):
+        super()._update()
+        self._updateVisibleRows()
+
+    def _isDefinitionVisible(self, definition):
+        key = definition.key
+        if key in self._exclude or definition.getAncestors() & self._exclude:
+            return False
+        if definition.parent and not definition.parent.key in self._expanded:
+            return False
+        if not self._show_all and key not in self._visible:
+            return False
+        filter = self._filter_dict.copy()
+        filter["i18n_catalog"] = self._i18n_catalog
+        if self._filter_dict and not definition.matchesFilter(**filter):
+            if self._show_ancestors and self._isAnyDescendantFiltered(definition):
+                return True
+            return False
+        if definition.type == "category" and not self._isReferenceDescendantVisible(definition):
+            return False
+        return True
+
+    def _isAnyDescendantFiltered(self, definition):
+        filter = self._filter_dict.copy()
+        filter["i18n_catalog"] = self._i18n_catalog
+        for child in definition.children:
+            if self._isAnyDescendantFiltered(child):
+                return True
+            if self._filter_dict and child.matchesFilter(**filter):
+                return True
+        return False
+
+    def _isReferenceDescendantVisible(self, definition):
+        if self._show_all:
+            return True
+        filter = self._filter_dict.copy()
+        filter["i18n_catalog"] = self._i18n_catalog
+        for child in definition.children:
+            if child.key in self._exclude:
+                continue
+            if self._filter_dict and not child.matchesFilter(**filter):
+                continue
+            if child.key in self._visible:
+                from UM.Application import Application
+                if Application.getInstance().getGlobalContainerStack().getProperty(child.key, "enabled"):
+                    return True
+            if self._isReferenceDescendantVisible(child):
+                return True
+        return False
+
+    def _findRowToInsert(self, index):
+        parent = self._definition_list[index].parent
+        parent_row = 0
+        while parent:
+            parent_index = self._definition_list.index(parent)
+            try:
+                parent_row = self._row_index_list.index(parent_index)
+                break
+            except ValueError:
+                parent = parent.parent
+        insert_row = parent_row
+        while insert_row < len(self._row_index_list) and self._row_index_list[insert_row] < index:
+            insert_row += 1
+        return insert_row
+
+@pytest.fixture
+def application():
+    result = MagicMock()
+    disabled = {"setting_0_0_0", "setting_1_1"}
+    result.getGlobalContainerStack.return_value.getProperty.side_effect = lambda key, property_name: key not in disabled
+    with patch("UM.Application.Application.getInstance", return_value = result):
+        yield result
+
+def createModel(definitions, model_type = SettingDefinitionsModel, visible = None):
+    model = model_type()
+    handler = MagicMock()
+    handler.getVisible.return_value = set(visible) if visible is not None else set()
+    model.setVisibilityHandler(handler)
+    with patch("UM.Settings.ContainerRegistry.ContainerRegistry.getInstance") as registry:
+        registry.return_value.findDefinitionContainers.return_value = [definitions]
+        model.setContainerId("test")
+    return model
+
+def getKeys(model):
+    return [model.data(model.index(row, 0), SettingDefinitionsModel.KeyRole) for row in range(model.rowCount())]
+
+##  Changes that the model should show the same rows for as before.
+changes = [
+    ("expanded", {"expanded": ["*"]}),
+    ("collapse category", {"expanded": ["*"], "collapse": "category_1"}),
+    ("show all", {"expanded": ["*"], "showAll": True}),
+    ("exclude", {"expanded": ["*"], "exclude": ["setting_2_1", "category_3"]}),
+    ("filter", {"expanded": ["*"], "filter": {"i18n_label": "*speed"}}),
+    ("filter with ancestors", {"expanded": ["*"], "showAncestors": True, "filter": {"i18n_label": "*speed"}}),
+    ("filter all", {"expanded": ["*"], "showAll": True, "showAncestors": True, "filter": {"i18n_label": "*speed"}}),
+    ("property filter", {"expanded": ["*"], "filter": {"type": "float", "i18n_label": "*in"}}),
+    ("description filter", {"expanded": ["*"], "filter": {"description": "*cooling"}}),
+    ("exact key filter", {"expanded": ["*"], "showAll": True, "filter": {"key": "setting_2_1_0"}})
+]
+
+@pytest.mark.parametrize("name,change", changes)
+def test_sameRowsAsReference(application, name, change):
+    definitions = createDefinitions()
+    visible = {definition.key for index, definition in enumerate(definitions.findDefinitions()) if index % 3 != 0 or definition.key == "setting_0_0_0"}
+    models = [createModel(definitions, model_type, visible) for model_type in (SettingDefinitionsModel, ReferenceModel)]
+
+    for model in models:
+        for property_name, value in sorted(change.items()):
+            if property_name == "collapse":
+                model.collapse(value)
+            else:
+                setattr(model, property_name, value)
+
+    assert getKeys(models[0]) == getKeys(models[1])
+    assert models[0].visibleCount == models[1].visibleCount
+    assert models[0].categoryCount == models[1].categoryCount
+
+def test_typingFilter(application):
+    definitions = createDefinitions()
+    model = createModel(definitions, visible = [definition.key for definition in definitions.findDefinitions()])
+    reference = createModel(definitions, ReferenceModel, visible = [definition.key for definition in definitions.findDefinitions()])
+    model.expanded = reference.expanded = ["*"]
+
+    for text in ["s", "sp", "spe", "sp", "", "in", "in ", "in s"]:
+        model.filter = reference.filter = {"i18n_label": "*" + text} if text else {}
+        assert getKeys(model) == getKeys(reference)
+
+def test_getIndex(application):
+    definitions = createDefinitions()
+    model = createModel(definitions, visible = ["category_1", "setting_1_0", "setting_1_0_1"])
+    model.expanded = ["*"]
+
+    assert getKeys(model) == ["category_1", "setting_1_0", "setting_1_0_1"]
+    assert model.getIndex("setting_1_0_1") == 2
+    assert model.getIndex("setting_1_0_0") == -1 # Not visible.
+    assert model.getIndex("unknown") == -1
+
+##  Rows that are next to each other are added and removed at once.
+def test_blocksOfRows(application):
+    definitions = createDefinitions()
+    model = createModel(definitions, visible = [definition.key for definition in definitions.findDefinitions()])
+    model.expanded = ["category_0", "category_1"]
+    inserted = []
+    removed = []
+    model.rowsInserted.connect(lambda parent, first, last: inserted.append((first, last)))
+    model.rowsRemoved.connect(lambda parent, first, last: removed.append((first, last)))
+
+    model.expand("setting_0_1")
+    model.collapse("category_0")
+
+    assert inserted == [(3, 5)] # The three children of the second setting in the first category.
+    assert removed == [(1, 7)] # All settings in the first category.
+
+##  Types a search text of 10 characters in the settings panel, which shows
+#   all settings that match, with their ancestors.
+#
+#   \return The time it took, the number of row signals, the number of rows
+#   that were inserted or removed and the keys that are shown in the end.
+def typeFilter(model_type):
+    definitions = createDefinitions(category_count = 20, parent_count = 6, child_count = 5)
+    model = createModel(definitions, model_type)
+    model.showAll = True
+    model.showAncestors = True
+    model.expanded = ["*"]
+    text = "infill den"
+    row_changes = []
+    model.rowsInserted.connect(lambda parent, first, last: row_changes.append(last - first + 1))
+    model.rowsRemoved.connect(lambda parent, first, last: row_changes.append(last - first + 1))
+
+    start_time = time.perf_counter()
+    for length in range(1, len(text) + 1):
+        model.filter = {"i18n_label": "*" + text[:length]}
+    filter_time = time.perf_counter() - start_time
+    return filter_time, len(row_changes), sum(row_changes), getKeys(model)
+
+##  Typing a search text with a model that updates only the rows that changed,
+#   compared with one that checks every setting for every key.
+def test_benchmarkTypeFilter(application):
+    reference_results = [typeFilter(ReferenceModel) for _ in range(3)]
+    results = [typeFilter(SettingDefinitionsModel) for _ in range(3)]
+
+    _, reference_signals, reference_rows, reference_keys = reference_results[0]
+    _, signals, rows, keys = results[0]
+    assert keys == reference_keys
+    assert rows == reference_rows
+    assert signals < reference_signals # Adjacent rows are inserted and removed together.
+    assert min(result[0] for result in results) < min(result[0] for result in reference_results)
@@ -0,0 +1,51 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Uranium is released under the terms of the LGPLv3 or higher.
+
+import json
+import time
+
+import pytest
+
+from UM.StartupProfiler import StartupProfiler
+
+
+def test_phases():
+    profiler = StartupProfiler()
+    profiler.startPhase("Loading plugins")
+    time.sleep(0.01)
+    profiler.startPhase("Loading preferences") # Ends the previous phase.
+    profiler.finish()
+
+    phases = profiler.getPhases()
+    assert [name for name, _ in phases] == ["Loading plugins", "Loading preferences"]
+    assert phases[0][1] >= 0.01
+    assert profiler.isFinished()
+
+def test_pluginTimes():
+    profiler = StartupProfiler()
+    profiler.addPluginTime("SolidView", "import", 1.0, 1.5)
+    profiler.addPluginTime("SolidView", "register", 1.5, 1.75)
+    profiler.addPluginTime("X3DReader", "import", 2.0, 2.1)
+
+    assert profiler.getPluginTimes() == {"SolidView": {"import": 0.5, "register": 0.25}, "X3DReader": {"import": pytest.approx(0.1)}}
+    summary = profiler.getSummary(plugin_count = 1)
+    assert "Loaded 2 plug-ins in 0.850s" in summary
+    assert "SolidView: 0.750s (import 0.500s, register 0.250s)" in summary
+    assert "X3DReader" not in summary # Only the slowest one.
+
+def test_chromeTrace(tmpdir):
+    profiler = StartupProfiler()
+    profiler.startPhase("Loading plugins")
+    start_time = profiler.now()
+    profiler.addPluginTime("SolidView", "import", start_time, profiler.now())
+    profiler.finish()
+    profiler.addPluginTime("X3DReader", "import", profiler.now(), profiler.now()) # Loaded when it was first used.
+
+    file_path = str(tmpdir.join("startup.json"))
+    profiler.writeChromeTrace(file_path)
+    with open(file_path, encoding = "utf-8") as f:
+        events = json.load(f)["traceEvents"]
+
+    assert [(event["name"], event["cat"]) for event in events] == [("SolidView (import)", "plugin"), ("Loading plugins", "phase"), ("X3DReader (import)", "plugin")]
+    assert not events[0]["args"]["after_startup"]
+    assert events[2]["args"]["after_startup"]
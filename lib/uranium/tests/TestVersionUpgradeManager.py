@@ -0,0 +1,151 @@
+# Copyright (c) 2018 Ultimaker B.V.
+# Uranium is released under the terms of the LGPLv3 or higher.
+
+import configparser
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from UM.Resources import Resources
+from UM.VersionUpgradeManager import UpgradeTask, VersionUpgradeManager
+
+
+##  Reads the version from a test configuration file, and counts how many files
+#   it was asked to read.
+class VersionCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, serialised):
+        self.count += 1
+        parser = configparser.ConfigParser(interpolation = None)
+        parser.read_string(serialised)
+        return int(parser["general"]["version"])
+
+def writeFile(directory, file_name, version, padding = ""):
+    with open(os.path.join(directory, file_name), "w", encoding = "utf-8") as f:
+        f.write("[general]\nversion = {version}\n{padding}".format(version = version, padding = padding))
+
+@pytest.fixture
+def storage(tmpdir):
+    result = tmpdir.mkdir("storage")
+    result.mkdir("tests")
+    with patch.object(Resources, "getConfigStoragePath", lambda: str(result)), patch.object(Resources, "getDataStoragePath", lambda: str(result)):
+        yield result
+
+##  Creates a version upgrade manager that scans the "tests" directory for
+#   files of version 1 and 2.
+def createManager(manifest_file_path):
+    VersionUpgradeManager._VersionUpgradeManager__instance = None
+    application = MagicMock()
+    application.getVersion.return_value = "3.4.0"
+    with patch("UM.PluginRegistry.PluginRegistry.getInstance"):
+        manager = VersionUpgradeManager(application)
+    manager.setManifestFilePath(manifest_file_path)
+    manager.version_counter = VersionCounter()
+    manager._get_version_functions = {"test": manager.version_counter}
+    manager._storage_paths = {"test": {1: {"tests"}, 2: {"tests"}}}
+    return manager
+
+@pytest.fixture
+def manifest_file_path(tmpdir):
+    yield str(tmpdir.join("cache", "upgrade_manifest.json"))
+    VersionUpgradeManager._VersionUpgradeManager__instance = None
+
+def getTasks(manager):
+    result = sorted(os.path.basename(task.file_name) for task in manager._getUpgradeTasks())
+    manager._saveManifest()
+    return result
+
+def test_manifestSkipsUnchangedFiles(storage, manifest_file_path):
+    tests_path = str(storage.join("tests"))
+    writeFile(tests_path, "old.cfg", 1)
+    writeFile(tests_path, "current.cfg", 3)
+
+    manager = createManager(manifest_file_path)
+    assert getTasks(manager) == ["old.cfg"]
+    assert manager.version_counter.count == 2 # Read once, even though the directory is searched for two versions.
+    assert os.path.exists(manifest_file_path)
+
+    manager = createManager(manifest_file_path)
+    assert getTasks(manager) == ["old.cfg"] # Still found with the version from the manifest.
+    assert manager.version_counter.count == 0
+
+def test_manifestRereadsChangedFiles(storage, manifest_file_path):
+    tests_path = str(storage.join("tests"))
+    writeFile(tests_path, "changed.cfg", 3)
+    writeFile(tests_path, "same.cfg", 3)
+    writeFile(tests_path, "removed.cfg", 3)
+    getTasks(createManager(manifest_file_path))
+
+    writeFile(tests_path, "changed.cfg", 2, padding = "# Now a different size.\n")
+    writeFile(tests_path, "new.cfg", 1)
+    os.remove(os.path.join(tests_path, "removed.cfg"))
+    manager = createManager(manifest_file_path)
+
+    assert getTasks(manager) == ["changed.cfg", "new.cfg"]
+    assert manager.version_counter.count == 2
+    assert sorted(os.path.basename(file_path) for file_path in manager._manifest["test"]) == ["changed.cfg", "new.cfg", "same.cfg"]
+
+def test_manifestOfOtherVersion(storage, manifest_file_path):
+    writeFile(str(storage.join("tests")), "current.cfg", 3)
+    getTasks(createManager(manifest_file_path))
+
+    manager = createManager(manifest_file_path)
+    manager._application.getVersion.return_value = "3.5.0"
+    getTasks(manager)
+
+    assert manager.version_counter.count == 1 # The application was updated, so the manifest can't be trusted.
+
+def test_brokenManifest(storage, manifest_file_path):
+    writeFile(str(storage.join("tests")), "old.cfg", 1)
+    os.makedirs(os.path.dirname(manifest_file_path))
+    with open(manifest_file_path, "w", encoding = "utf-8") as f:
+        f.write("{Not JSON")
+
+    manager = createManager(manifest_file_path)
+
+    assert getTasks(manager) == ["old.cfg"]
+    assert manager.version_counter.count == 1
+
+##  The files are upgraded one after another, in the order they were found,
+#   followed by the files that the upgrades scheduled.
+def test_upgradeInOrder(manifest_file_path):
+    manager = createManager(manifest_file_path)
+    tasks = [UpgradeTask("tests", "./file0.cfg", "test"), UpgradeTask("tests", "./file0.inst.cfg", "test"), UpgradeTask("tests", "./file1.cfg", "test")]
+    upgraded = []
+    def upgradeFile(storage_path, file_name, configuration_type):
+        upgraded.append(file_name)
+        if file_name == "./file0.cfg":
+            manager.upgradeExtraFile(storage_path, "./extra.cfg", configuration_type)
+        return True
+    manager._upgradeFile = upgradeFile
+    manager._getUpgradeTasks = lambda: tasks
+
+    manager.upgrade()
+
+    assert upgraded == ["./file0.cfg", "./file0.inst.cfg", "./file1.cfg", "./extra.cfg"]
+    assert os.path.exists(manifest_file_path)
+
+##  Searching for files to upgrade in a configuration directory with many
+#   files, without and with a manifest of a previous run.
+def test_benchmarkScan(storage, manifest_file_path):
+    count = 2000
+    tests_path = str(storage.join("tests"))
+    for index in range(count):
+        writeFile(tests_path, "file{index}.cfg".format(index = index), 3, padding = "[values]\n" + "".join("setting_{i} = {i}\n".format(i = i) for i in range(50)))
+
+    manager = createManager(manifest_file_path)
+    start_time = time.perf_counter()
+    assert getTasks(manager) == []
+    cold_time = time.perf_counter() - start_time
+
+    manager = createManager(manifest_file_path)
+    start_time = time.perf_counter()
+    assert getTasks(manager) == []
+    manifest_time = time.perf_counter() - start_time
+
+    assert manager.version_counter.count == 0
+    assert manifest_time < cold_time / 3